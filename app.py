@@ -1,142 +1,49 @@
 import argparse
 import json
 
-from src.agents.assistant_agent import create_assistant_agent
-from src.agents.user_proxy_agent import create_user_proxy_agent
-from src.tools.tools import *
-from src.utils.agent_utils import (
-    determine_agents,
-    interpret_query,
-    launch_chat,
-    process_sequential_chats,
-    register_agent_functions,
-    run_workflow,
-)
-from src.utils.config_loader import load_config
-
-filter_dict = {"model": "gpt-4o-mini"}
-llm_config = {"config_list": load_config(filter_dict)}
-
-open_camera_agent = create_assistant_agent(
-    name="open_camera_agent",
-    sys_msg="You can execute the following functions: open_camera",
-    llm_config=llm_config,
-    function_map={"open_camera": open_camera},
-)
-
-close_camera_agent = create_assistant_agent(
-    name="close_camera_agent",
-    sys_msg="You can execute the following functions: close_camera",
-    llm_config=llm_config,
-    function_map={"close_camera": close_camera},
-)
-
-minimize_camera_agent = create_assistant_agent(
-    name="minimize_camera_agent",
-    sys_msg="You can execute the following functions: minimize_camera",
-    llm_config=llm_config,
-    function_map={"minimize_camera": minimize_camera},
-)
-
-restore_camera_agent = create_assistant_agent(
-    name="restore_camera_agent",
-    sys_msg="You can execute the following functions: restore_camera",
-    llm_config=llm_config,
-    function_map={"restore_camera": restore_camera},
-)
-
-set_automatic_framing_agent = create_assistant_agent(
-    name="set_automatic_framing_agent",
-    sys_msg="set_automatic_framing_agent_msg.txt",
-    llm_config=llm_config,
-    function_map={"set_automatic_framing": set_automatic_framing},
-)
-
-set_blur_type_agent = create_assistant_agent(
-    name="set_blur_type_agent",
-    sys_msg="set_blur_type_agent_msg.txt",
-    llm_config=llm_config,
-    function_map={"set_blur_type": set_blur_type},
-)
-
-set_background_effects_agent = create_assistant_agent(
-    name="set_background_effects_agent",
-    sys_msg="set_background_effects_agent_msg.txt",
-    llm_config=llm_config,
-    function_map={"set_background_effects": set_background_effects},
-)
-
-switch_camera_agent = create_assistant_agent(
-    name="switch_camera_agent",
-    sys_msg="switch_camera_agent_msg.txt",
-    llm_config=llm_config,
-    function_map={"switch_camera": switch_camera},
-)
-
-camera_mode_agent = create_assistant_agent(
-    name="camera_mode_agent",
-    sys_msg="You can execute the following functions: camera_mode. You can switch between 'photo' and 'video' mode.",
-    llm_config=llm_config,
-    function_map={"camera_mode": camera_mode},
-)
-
-take_photo_agent = create_assistant_agent(
-    name="take_photo_agent",
-    sys_msg="take_photo_agent_msg.txt",
-    llm_config=llm_config,
-    function_map={"take_photo": take_photo},
-)
-
-take_video_agent = create_assistant_agent(
-    name="take_video_agent",
-    sys_msg="take_video_agent_msg.txt",
-    llm_config=llm_config,
-    function_map={"take_video": take_video},
-)
-
-interpreter_agent = create_assistant_agent(
-    name="interpreter_agent",
-    sys_msg="interpreter_agent_msg.txt",
-    llm_config=llm_config,
-)
-
-manager_agent = create_assistant_agent(
-    name="manager_agent",
-    sys_msg="manager_agent_msg.txt",
-    llm_config=llm_config,
-)
-
-user_proxy_agent = create_user_proxy_agent(
-    name="user_proxy_agent",
-    sys_msg="user_proxy_agent_msg.txt",
-    llm_config=llm_config,
-    human_input_mode="NEVER",
-)
-
-conversation_agent = create_assistant_agent(
-    name="conversation_agent",
-    sys_msg="conversation_agent_msg.txt",
-    llm_config=llm_config,
-)
+TEST_CASES_PATH = "cases/test_cases.json"
 
 
-if __name__ == "__main__":
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Camera Control Application")
+
+    # Add arguments
+    parser.add_argument("--test_id", type=str, help="Test case ID to run")
+    parser.add_argument("--query", type=str, help="Custom query to run")
+    parser.add_argument("--interactive", action="store_true", help="Launch interactive chat mode")
+    parser.add_argument("--local", action="store_true", help="Run server locally on 127.0.0.1")
+    parser.add_argument("--ngrok", action="store_true", help="Run server on 0.0.0.0 for ngrok")
+    parser.add_argument("--list_tests", action="store_true", help="List available test cases")
+    parser.add_argument("--save_results", action="store_true", help="Append test results to the results store")
+    parser.add_argument("--force_status", choices=["Pass", "Fail"], help="Force a specific pass/fail status")
+    parser.add_argument("--pool_size", type=int, default=4, help="Agent sets serving concurrent chat sessions")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID", help="Resume an interrupted workflow from its checkpoint journal")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS", help="Stop the workflow cleanly after this many seconds")
+    parser.add_argument("--dry_run", action="store_true", help="Plan the query and print its estimated timeline without touching the camera")
 
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Camera Control Application
 
     A CLI tool for running camera control tests and commands through an agent-based system.
 
     Usage:
-        python camera_control.py [OPTIONS]
+        python app.py [OPTIONS]
 
     Options:
         --test_id ID           Run a specific test case by ID from test_cases.json
         --query TEXT           Run a custom query (e.g., "Open camera and take photo")
         --interactive          Launch interactive chat mode with the agent system
         --list_tests           Display all available test cases with their IDs and descriptions
-        --save_results         Save test results to the test_cases.json file
+        --save_results         Append the test result to the results store
         --force_status STATUS  Force a specific test result status ("Pass" or "Fail")
+        --pool_size N          Number of agent sets serving concurrent chat users (default 4)
+        --resume RUN_ID        Continue an interrupted workflow after its last checkpointed step
+        --deadline SECONDS     Stop the workflow cleanly once it has run this long
+        --dry_run              Interpret and plan only; print the estimated timeline
 
     Examples:
         # List all available test cases
@@ -145,7 +52,7 @@ if __name__ == "__main__":
         # Run a specific test case
         python app.py --test_id 3
 
-        # Run a test case and save results (auto-determine pass/fail)
+        # Run a test case and save results (pass/fail from its post-conditions)
         python app.py --test_id 3 --save_results
 
         # Run a test case and force it to be marked as passed
@@ -157,68 +64,66 @@ if __name__ == "__main__":
         # Run a custom query without saving results
         python app.py --query "Open the camera and set blur to portrait"
 
+        # Resume a workflow that crashed or was interrupted part-way
+        python app.py --resume 20250101-120000-a1b2c3
+
+        # See how long a workflow would take before running it
+        python app.py --query "Record a 60 second video 20 times" --dry_run
+
+        # Give a long workflow at most ten minutes
+        python app.py --query "Record a 60 second video 20 times" --deadline 600
+
         # Launch interactive mode
         python app.py --interactive
 
     Notes:
         - If no options are provided, interactive mode is launched by default
         - Test cases are loaded from cases/test_cases.json
-        - When saving results without --force_status:
-        1. If the test case has an 'expected_result' field, pass/fail is determined automatically
-        2. If no 'expected_result' exists, you'll be prompted to manually confirm if the test passed
+        - Agents, autogen, gradio and the camera tools are only imported once a
+          command actually needs them, so --list_tests starts instantly
+        - With CAMERA_JOB_QUEUE_DB set, workflows go through the host's job queue
+          (see src/jobs/job_queue.py); test cases run at batch priority
+        - For full regression passes, run the cases concurrently and unattended
+          with python -m src.regression.runner (JUnit/JSON reports)
+        - Workflows run without the job queue checkpoint every step (iteration, step,
+          summary and UI snapshot) to data/checkpoints/<run_id>.jsonl (CAMERA_CHECKPOINT_DIR);
+          --resume re-checks the Camera state and continues from the last good step.
+          List runs with python -m src.utils.workflow_journal list
+        - Ctrl+C (or --deadline, default CAMERA_WORKFLOW_DEADLINE_S) stops a workflow at its
+          next tool call; a recording is stopped early. The run can then be resumed.
+          A second Ctrl+C aborts immediately
+        - --dry_run predicts the run time from the step timings recorded on this host
+          (src/jobs/cost_model.py); the camera tools are never called
+        - Results are appended to data/results.sqlite3 (CAMERA_RESULTS_DB); query
+          them with python -m src.regression.results_store
+        - When running a test case without --force_status:
+        1. If the test case has an 'expected' block, pass/fail is determined by checking its
+           post-conditions against a UI snapshot taken after the run (src/regression/verifier.py)
+        2. If no 'expected' block exists, the result is recorded as "Unverified"; nothing prompts
     """
-    # args parser
-    parser = argparse.ArgumentParser(description="Camera Control Application")
+    args = parse_args(argv)
 
-    # Add arguments
-    parser.add_argument("--test_id", type=str, help="Test case ID to run")
-    parser.add_argument("--query", type=str, help="Custom query to run")
-    parser.add_argument("--interactive", action="store_true", help="Launch interactive chat mode")
-    parser.add_argument("--local", action="store_true", help="Run server locally on 127.0.0.1")
-    parser.add_argument("--ngrok", action="store_true", help="Run server on 0.0.0.0 for ngrok")
-    parser.add_argument("--list_tests", action="store_true", help="List available test cases")
-    parser.add_argument("--save_results", action="store_true", help="Save test results to file")
-    parser.add_argument("--force_status", choices=["Pass", "Fail"], help="Force a specific pass/fail status")
+    # A resumed run replays its original command and skips planning
+    resume_journal = None
+    if args.resume:
+        from src.utils.workflow_journal import SUCCEEDED, WorkflowJournal
 
-    # Parse arguments
-    args = parser.parse_args()
-
-    # Register the functions first
-    agent_functions = [
-        (open_camera, open_camera_agent, "open_camera", "Open the camera"),
-        (close_camera, close_camera_agent, "close_camera", "Close the camera"),
-        (minimize_camera, minimize_camera_agent, "minimize_camera", "Minimize the camera"),
-        (restore_camera, restore_camera_agent, "restore_camera", "Restore the camera"),
-        (set_automatic_framing, set_automatic_framing_agent, "set_automatic_framing", "Set automatic framing to on or off"),
-        (set_blur_type, set_blur_type_agent, "set_blur_type", "Set blur type to standard or portrait"),
-        (set_background_effects, set_background_effects_agent, "set_background_effects", "Set background effects to on or off"),
-        (switch_camera, switch_camera_agent, "switch_camera", "Switch between cameras"),
-        (camera_mode, camera_mode_agent, "camera_mode", "Switch between photo and video mode"),
-        (take_photo, take_photo_agent, "take_photo", "Take a photo"),
-        (take_video, take_video_agent, "take_video", "Take a video"),
-    ]
-    register_agent_functions(user_proxy_agent, agent_functions)
-
-    # agents map
-    agent_map = {
-        "open_camera_agent": open_camera_agent,
-        "close_camera_agent": close_camera_agent,
-        "minimize_camera_agent": minimize_camera_agent,
-        "restore_camera_agent": restore_camera_agent,
-        "set_automatic_framing_agent": set_automatic_framing_agent,
-        "set_blur_type_agent": set_blur_type_agent,
-        "set_background_effects_agent": set_background_effects_agent,
-        "switch_camera_agent": switch_camera_agent,
-        "camera_mode_agent": camera_mode_agent,
-        "take_photo_agent": take_photo_agent,
-        "take_video_agent": take_video_agent,
-    }
+        try:
+            resume_journal = WorkflowJournal.open(args.resume)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot resume run {args.resume}: {e}")
+            exit(1)
+        if resume_journal.status == SUCCEEDED:
+            print(f"Run {args.resume} already finished.")
+            exit(0)
+        args.test_id = args.test_id or resume_journal.plan.get("test_id")
+        args.query = args.query or resume_journal.plan.get("command")
 
     # Load test cases if needed
     test_data = None
     if args.test_id or args.list_tests:
         try:
-            with open("cases/test_cases.json", "r") as f:
+            with open(TEST_CASES_PATH, "r") as f:
                 test_data = json.load(f)
         except FileNotFoundError:
             print("Error: Test cases file not found.")
@@ -236,7 +141,7 @@ if __name__ == "__main__":
     if args.test_id and test_data:
         if args.test_id in test_data["testCases"]:
             test_case = test_data["testCases"][args.test_id]
-            query = test_case["query"] if "query" in test_case else test_case
+            query = test_case.get("query") or test_case["description"]
             print(f"Running test: {test_case.get('description', 'No description')}")
         else:
             print(f"Error: Test ID {args.test_id} not found.")
@@ -245,58 +150,150 @@ if __name__ == "__main__":
         query = args.query
         print(f"Running custom query: {query}")
 
+    # Every remaining path needs the agents, so build them only now
+    from src.agents.agent_factory import build_agent_set
+    from src.jobs.job_queue import get_job_queue
+    from src.utils.agent_utils import (
+        determine_agents,
+        interpret_query,
+        iter_checkpointed_workflow,
+        iter_queued_workflow,
+        launch_chat,
+    )
+    from src.utils.llm_metrics import (
+        format_usage_summary,
+        get_usage_summary,
+        track_request,
+        track_test_case,
+    )
+
+    agents = build_agent_set()
+
+    # Post-conditions of the test case, checked against UI snapshots
+    expected = test_case.get("expected") if args.test_id and not args.force_status else None
+    from src.tools.backend import get_backend_name, get_tools
+
+    tools = get_tools() if query and not args.dry_run else None
+    snapshot_before = None
+    if expected and not args.dry_run:
+        # A resumed run counts new photos/videos from where the run began
+        if resume_journal is not None:
+            snapshot_before = resume_journal.plan.get("snapshot_before")
+        else:
+            snapshot_before = tools.take_snapshot()
+
     # Execute the query if we have one
     if query and not args.interactive:
-        msg_type, iterations, interpreted_query = interpret_query(
-            query, interpreter_agent
-        )
-        print("msg_type: ", msg_type)
-        print("iterations: ", iterations)
-        print("interpreted_query: ", interpreted_query)
-
-        # Determine the agents to use
-        agent_sequence, agent_states = determine_agents(
-            interpreted_query, manager_agent, agent_map
-        )
-        print("agent_sequence: ", agent_sequence)
-        print("agent_states: ", agent_states)
-
-        # Run the workflow
-        result = run_workflow(
-            query=interpreted_query,
-            iterations=iterations,
-            agent_sequence=agent_sequence,
-            agent_states=agent_states,
-            agent_map=agent_map,
-            user_proxy_agent=user_proxy_agent,
-        )
+        with track_test_case(args.test_id or "custom"), track_request() as request_id:
+            if resume_journal is not None:
+                plan = resume_journal.plan
+                iterations, interpreted_query = plan["iterations"], plan["query"]
+                agent_sequence, agent_states = plan["agent_sequence"], plan["agent_states"]
+                print(f"Resuming run {resume_journal.run_id}: {resume_journal.summary()['steps_done']} step(s) done")
+            else:
+                msg_type, iterations, interpreted_query = interpret_query(
+                    query, agents.interpreter_agent
+                )
+                print("msg_type: ", msg_type)
+                print("iterations: ", iterations)
+                print("interpreted_query: ", interpreted_query)
 
-        # Determine if test passed based on expected results or user override
+                # Determine the agents to use
+                agent_sequence, agent_states = determine_agents(
+                    interpreted_query, agents.manager_agent, agents.agent_map
+                )
+            print("agent_sequence: ", agent_sequence)
+            print("agent_states: ", agent_states)
+
+            if args.dry_run:
+                from src.jobs.cost_model import estimate_plan, format_timeline
+
+                print(format_timeline(estimate_plan({"agent_sequence": agent_sequence, "agent_states": agent_states, "iterations": iterations})))
+                print(format_usage_summary(get_usage_summary(request_id=request_id)))
+                return
+
+            # Run the workflow, through the host's job queue when one is configured;
+            # a resumed run continues here, from its own journal
+            job_queue = get_job_queue() if resume_journal is None else None
+            if job_queue is not None:
+                from src.jobs.job_queue import PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+                try:
+                    for event in iter_queued_workflow(
+                        job_queue,
+                        interpreted_query,
+                        iterations,
+                        agent_sequence,
+                        agent_states,
+                        priority=PRIORITY_BATCH if args.test_id else PRIORITY_INTERACTIVE,
+                        source="cli",
+                        deadline_s=args.deadline,
+                    ):
+                        print("job event: ", event)
+                except Exception as e:
+                    print(f"Error running queued job: {e}")
+            else:
+                from src.utils.cancellation import CancellationToken, cancel_on_interrupt, default_deadline
+                from src.utils.workflow_journal import WorkflowJournal
+
+                journal = resume_journal or WorkflowJournal.create(
+                    {
+                        "command": query,
+                        "query": interpreted_query,
+                        "iterations": iterations,
+                        "agent_sequence": agent_sequence,
+                        "agent_states": agent_states,
+                        "test_id": args.test_id,
+                        "backend": get_backend_name(),
+                        "snapshot_before": snapshot_before,
+                    }
+                )
+                print(f"Checkpointing run {journal.run_id}; if interrupted, continue with: python app.py --resume {journal.run_id}")
+                token = CancellationToken(args.deadline or default_deadline())
+                try:
+                    with cancel_on_interrupt(token):
+                        for event in iter_checkpointed_workflow(
+                            journal,
+                            agents.agent_map,
+                            agents.user_proxy_agent,
+                            snapshot=tools.take_snapshot,
+                            resume=resume_journal is not None,
+                            token=token,
+                        ):
+                            if event["event"] == "resumed":
+                                print(f"Resuming at iteration {event['iteration']}, step {event['step'] + 1}" + ("" if event["state_ok"] else " (Camera state changed; iteration restarted)"))
+                            elif event["event"] == "cancelled":
+                                print(f"Workflow stopped: {event['reason']}. Continue with: python app.py --resume {journal.run_id}")
+                except Exception as e:
+                    print(f"Error during task execution: {str(e)}")
+        print(format_usage_summary(get_usage_summary(request_id=request_id)))
+
+        # Determine if test passed from its post-conditions or user override
+        checks = None
         if args.force_status:
             test_status = args.force_status
+        elif expected:
+            from src.regression.verifier import failed_checks, format_checks, verify
+
+            checks = verify(expected, snapshot_before, tools.take_snapshot())
+            test_status = "Fail" if failed_checks(checks) else "Pass"
+            print(f"Post-conditions: {len(checks) - len(failed_checks(checks))}/{len(checks)} hold")
+            if test_status == "Fail":
+                print(format_checks(checks))
         else:
-            test_status = "Pass"
-            if args.test_id and test_data:
-                expected_result = test_data["testCases"][args.test_id].get(
-                    "expected_result"
-                )
-                if expected_result:
-                    # Compare actual result with expected result
-                    # This logic can be customized based on your specific requirements
-                    if expected_result != result:
-                        test_status = "Fail"
-                else:
-                    # If no expected result is defined, ask user for manual verification
-                    print(f"\nTest result: {result}")
-                    user_input = input("Did the test pass? (y/n): ").strip().lower()
-                    test_status = "Pass" if user_input.startswith("y") else "Fail"
-
-        # Save results if requested
+            test_status = "Unverified"
+
+        # Save results if requested; test_cases.json itself stays read-only
         if args.save_results and args.test_id and test_data:
-            test_data["testCases"][args.test_id]["result"] = result
-            test_data["testCases"][args.test_id]["status"] = test_status
-            with open("cases/test_cases.json", "w") as f:
-                json.dump(test_data, f, indent=2)
+            from src.regression.results_store import get_results_store
+
+            get_results_store().record(
+                args.test_id,
+                test_status,
+                result={"checks": checks} if checks else None,
+                description=test_data["testCases"][args.test_id].get("description"),
+                source="cli",
+            )
             print(f"Results saved for test ID {args.test_id}: {test_status}")
 
     # Determine server name based on arguments
@@ -308,12 +305,21 @@ if __name__ == "__main__":
 
     # Launch interactive mode if requested or if no other action was specified
     if args.interactive or (not query and not args.list_tests):
+        from src.agents.agent_pool import AgentPool
+
         print(f"Starting interactive chat mode on {server_name}...")
+        # Each chat request gets its own agent set; camera actions are serialised
+        agent_pool = AgentPool(size=args.pool_size, agent_sets=[agents])
         launch_chat(
-            interpreter_agent, 
-            manager_agent, 
-            agent_map, 
-            user_proxy_agent,
-            conversation_agent,
-            server_name=server_name
+            agents.interpreter_agent,
+            agents.manager_agent,
+            agents.agent_map,
+            agents.user_proxy_agent,
+            agents.conversation_agent,
+            server_name=server_name,
+            agent_pool=agent_pool,
         )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+End-to-end planning-latency benchmark over recorded LLM responses.
+
+Replays every query in cases/test_cases.json through interpret_query ->
+determine_agents -> the sequential step chats, with the LLM answered by
+the replay server (src/utils/llm_replay_server.py) from a cassette and
+the tools served by the simulated backend. Inputs are identical on every
+run, so changes to the orchestration (merged planning calls, direct
+execution, caching) can be compared by their numbers.
+
+Per case it reports LLM calls, tokens and wall time, split into:
+
+    llm_s       Client-side latency of the LLM calls (injected by the profile)
+    parse_s     parse_interpreter_response and parse_agent_lists
+    tool_s      Time inside the tool functions
+    overhead_s  The rest: prompt building, autogen dispatch, summaries' glue
+
+Agent set-up (building the agent set once, resetting it per case) is
+reported separately. Each --profile runs the whole suite with its
+injected latency: none, recorded (latency stored in the cassette), fast,
+typical or slow.
+
+No cassette is committed: its responses come from the model configured in
+config/OAI_CONFIG_LIST.json and stop matching whenever a system message or
+prompt changes. Record one once against the real API (OPENAI_API_KEY, and
+LLM_UPSTREAM_URL for a non-OpenAI endpoint), then replay it offline;
+--mode auto records only the requests the cassette does not have yet:
+
+    OPENAI_API_KEY=... python -m benchmarks.bench_planning --mode record
+    python -m benchmarks.bench_planning --profile none typical
+        [--cassette cassettes/planning.jsonl] [--ids 1 2]
+        [--baseline reports/bench_planning_before.json]
+        [--json reports/bench_planning.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+from src.utils.llm_replay_server import MODES, LatencyProfile, ReplayServer
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CASSETTE = ROOT / "cassettes" / "planning.jsonl"
+DEFAULT_JSON_REPORT = ROOT / "reports" / "bench_planning.json"
+
+PROFILES = {
+    "none": LatencyProfile(),
+    "recorded": LatencyProfile(recorded_scale=1.0),
+    "fast": LatencyProfile(fixed_ms=150, jitter_ms=100),
+    "typical": LatencyProfile(fixed_ms=400, jitter_ms=300),
+    "slow": LatencyProfile(fixed_ms=1500, jitter_ms=1000),
+}
+
+TOTAL_KEYS = (
+    "llm_calls",
+    "prompt_tokens",
+    "completion_tokens",
+    "wall_s",
+    "llm_s",
+    "parse_s",
+    "tool_s",
+    "overhead_s",
+)
+
+
+class StageTimer:
+    """Accumulates the time spent in wrapped functions."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.calls = 0
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.elapsed += time.perf_counter() - start
+                self.calls += 1
+
+        return timed
+
+    def take(self) -> float:
+        elapsed, self.elapsed, self.calls = self.elapsed, 0.0, 0
+        return elapsed
+
+
+def run_case(case_id: str, case: dict, agents, profile: str, parse: StageTimer) -> dict:
+    """Interpret, plan and execute one case; never raises."""
+    from src.agents.agent_pool import reset_agent_set
+    from src.regression.runner import case_query
+    from src.tools.device import get_device_metrics
+    from src.tools.simulated import reset_state
+    from src.utils.agent_utils import determine_agents, interpret_query, iter_workflow
+    from src.utils.llm_metrics import get_usage_summary, track_test_case
+
+    tracked_id = f"{profile}:{case_id}"
+    result = {"case_id": case_id, "error": None}
+
+    start = time.perf_counter()
+    reset_agent_set(agents)
+    reset_state()
+    result["reset_s"] = time.perf_counter() - start
+
+    parse.take()
+    tools_before = get_device_metrics()
+    start = time.perf_counter()
+    try:
+        with track_test_case(tracked_id):
+            t = time.perf_counter()
+            msg_type, iterations, query = interpret_query(
+                case_query(case), agents.interpreter_agent
+            )
+            result["interpret_s"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            agent_sequence, agent_states = determine_agents(
+                query, agents.manager_agent, agents.agent_map
+            )
+            result["plan_s"] = time.perf_counter() - t
+            result["plan"] = {
+                "iterations": iterations,
+                "agent_sequence": agent_sequence,
+            }
+
+            t = time.perf_counter()
+            steps = 0
+            for event in iter_workflow(
+                query,
+                iterations,
+                agent_sequence,
+                agent_states,
+                agents.agent_map,
+                agents.user_proxy_agent,
+            ):
+                steps += event["event"] == "step_end"
+                if event["event"] == "error":
+                    result["error"] = event["error"]
+            result["execute_s"] = time.perf_counter() - t
+            result["steps"] = steps
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["wall_s"] = time.perf_counter() - start
+
+    tools_after = get_device_metrics()
+    usage = get_usage_summary(test_case=tracked_id)
+    result.update(
+        llm_calls=usage["calls"],
+        prompt_tokens=usage["prompt_tokens"],
+        completion_tokens=usage["completion_tokens"],
+        llm_s=usage["latency"],
+        llm_by_component={
+            name: {"calls": t["calls"], "latency_s": t["latency"]}
+            for name, t in usage["by_component"].items()
+        },
+        parse_s=parse.take(),
+        tool_calls=tools_after["acquisitions"] - tools_before["acquisitions"],
+        tool_s=tools_after["total_held_s"] - tools_before["total_held_s"],
+    )
+    result["overhead_s"] = max(
+        0.0, result["wall_s"] - result["llm_s"] - result["parse_s"] - result["tool_s"]
+    )
+    return result
+
+
+def run_profile(server, cases: dict, agents, profile: str, parse: StageTimer) -> dict:
+    server.latency = PROFILES[profile]
+    server.cassette.rewind()
+    misses_before = server.misses
+    results = []
+    output = io.StringIO()
+    for case_id, case in cases.items():
+        # The agents print every message; keep the table readable
+        with contextlib.redirect_stdout(output):
+            results.append(run_case(case_id, case, agents, profile, parse))
+    totals = {key: sum(r[key] for r in results) for key in TOTAL_KEYS}
+    totals["errors"] = sum(r["error"] is not None for r in results)
+    totals["replay_misses"] = server.misses - misses_before
+    return {"totals": totals, "cases": results}
+
+
+def format_profile(name: str, run: dict, baseline_run: dict = None) -> str:
+    lines = [
+        f"Profile {name}:",
+        f"  {'case':<6} {'calls':>5} {'tokens':>7} {'wall s':>8} {'llm s':>7} "
+        f"{'parse ms':>9} {'tool s':>7} {'other s':>8}",
+    ]
+    rows = [(r["case_id"], r) for r in run["cases"]] + [("total", run["totals"])]
+    for label, r in rows:
+        tokens = r["prompt_tokens"] + r["completion_tokens"]
+        lines.append(
+            f"  {label:<6} {r['llm_calls']:>5} {tokens:>7} {r['wall_s']:>8.2f} "
+            f"{r['llm_s']:>7.2f} {r['parse_s'] * 1000:>9.2f} {r['tool_s']:>7.2f} "
+            f"{r['overhead_s']:>8.2f}"
+            + (f"  {r['error'][:60]}" if r.get("error") else "")
+        )
+    if baseline_run:
+        # Compare the cases both runs have, so --ids subsets stay comparable
+        base_cases = {r["case_id"]: r for r in baseline_run["cases"]}
+        common = [r for r in run["cases"] if r["case_id"] in base_cases]
+        changes = []
+        for key in ("llm_calls", "prompt_tokens", "completion_tokens", "wall_s"):
+            before = sum(base_cases[r["case_id"]][key] for r in common)
+            after = sum(r[key] for r in common)
+            change = f" ({after / before - 1:+.0%})" if before else ""
+            changes.append(f"{key} {before:.4g} -> {after:.4g}{change}")
+        lines.append(f"  vs baseline ({len(common)} cases): {', '.join(changes)}")
+    totals = run["totals"]
+    if totals["errors"] or totals["replay_misses"]:
+        lines.append(
+            f"  {totals['errors']} case(s) failed, {totals['replay_misses']} "
+            "request(s) not in the cassette"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark planning latency")
+    parser.add_argument("--cassette", type=str, default=str(DEFAULT_CASSETTE))
+    parser.add_argument("--mode", choices=MODES, default="replay")
+    parser.add_argument(
+        "--profile", nargs="+", choices=sorted(PROFILES), default=["none"]
+    )
+    parser.add_argument("--cases", type=str, help="Test cases JSON file")
+    parser.add_argument("--ids", nargs="+", help="Only these case ids")
+    parser.add_argument("--baseline", type=str, help="Earlier report to compare")
+    parser.add_argument("--json", type=str, default=str(DEFAULT_JSON_REPORT))
+    args = parser.parse_args()
+    if args.mode == "replay" and not Path(args.cassette).exists():
+        parser.error(
+            f"no cassette at {args.cassette}; record one first with --mode record"
+        )
+
+    from src.regression.runner import load_test_cases, select_cases
+
+    cases = select_cases(load_test_cases(args.cases), args.ids)
+    server = ReplayServer(args.cassette, mode=args.mode, port=0).start()
+    os.environ["LLM_BASE_URL"] = server.base_url
+    os.environ["CAMERA_BACKEND"] = "simulated"
+
+    from src.agents.agent_factory import build_agent_set, load_llm_config
+    from src.utils import agent_utils
+
+    parse = StageTimer()
+    agent_utils.parse_interpreter_response = parse.wrap(
+        agent_utils.parse_interpreter_response
+    )
+    agent_utils.parse_agent_lists = parse.wrap(agent_utils.parse_agent_lists)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Every call must reach the replay server, not autogen's disk cache
+        agents = build_agent_set({**load_llm_config(), "cache_seed": None})
+    setup_s = time.perf_counter() - start
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = {
+        "meta": {
+            "cassette": args.cassette,
+            "mode": args.mode,
+            "cases": list(cases),
+            "agent_setup_s": setup_s,
+        },
+        "profiles": {},
+    }
+    print(f"Agent set built in {setup_s:.2f}s; {len(server.cassette)} recordings")
+    try:
+        for profile in args.profile:
+            run = run_profile(server, cases, agents, profile, parse)
+            report["profiles"][profile] = run
+            print(
+                format_profile(
+                    profile, run, (baseline or {}).get("profiles", {}).get(profile)
+                )
+            )
+    finally:
+        server.stop()
+
+    json_path = Path(args.json)
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Report: {json_path}")
@@ -0,0 +1,313 @@
+"""
+Microbenchmarks for the Windows tool layer (src/tools/tools.py).
+
+Each benchmark calls one tool repeatedly against a fresh FakeCameraApp
+(benchmarks/fake_uia.py), a deterministic UI tree with a configurable
+number of controls and lookup latencies. The tools' fixed UI waits are
+counted at their nominal length but not slept (CAMERA_UI_WAIT_SCALE=0),
+so a run takes seconds and reports, per benchmark:
+
+    ops_per_s         Tool calls per second without the UI waits
+    lookups_per_op    UI tree lookups per call (deterministic)
+    lookup_ms_per_op  Time spent in lookups per call
+    wait_s_per_op     Nominal UI settle wait per call (deterministic)
+    other_ms_per_op   Everything else: tool logic, tree matching overhead
+
+Results are compared with a stored baseline. Any increase in lookups or
+waits per call, or an ops/sec drop beyond --tolerance, is a regression
+and the run exits with status 1, so CI can gate changes to the tools.
+Lookups and waits compare exactly. Speed is compared as cost relative
+to a calibration workload timed next to each run, which absorbs most of
+the difference between machines and load; it is skipped when the fake
+tree settings differ from the baseline's.
+
+Usage:
+    python -m benchmarks.bench_tools [--only take_photo switch_camera]
+        [--iterations 200] [--repeat 5] [--filler_controls 200] [--lookup_latency 0]
+        [--control_latency 0] [--tolerance 0.25]
+        [--baseline benchmarks/baseline.json] [--save_baseline]
+        [--json reports/bench_tools.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.fake_uia import FakeCameraApp, install
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+DEFAULT_JSON_REPORT = ROOT / "reports" / "bench_tools.json"
+
+DEFAULT_ITERATIONS = 200
+
+# Deterministic metrics may not grow at all; this absorbs float noise
+EXACT_TOLERANCE = 1e-6
+
+
+@dataclass
+class Benchmark:
+    name: str
+    tool: str
+    # Argument sets cycled through on successive calls
+    args: list = field(default_factory=lambda: [{}])
+    # Initial FakeCameraApp state
+    state: dict = field(default_factory=dict)
+
+
+_VIDEO_FFC = {"mode": "video", "camera": "FFC"}
+
+BENCHMARKS = [
+    Benchmark("get_current_camera", "get_current_camera", state=_VIDEO_FFC),
+    Benchmark(
+        "set_background_effects",
+        "set_background_effects",
+        args=[{"desired_state": True}, {"desired_state": False}],
+        state=_VIDEO_FFC,
+    ),
+    Benchmark(
+        "set_automatic_framing",
+        "set_automatic_framing",
+        args=[{"desired_state": True}, {"desired_state": False}],
+        state=_VIDEO_FFC,
+    ),
+    Benchmark(
+        "set_blur_type",
+        "set_blur_type",
+        args=[{"blur_type": "standard"}, {"blur_type": "portrait"}],
+        state=_VIDEO_FFC,
+    ),
+    Benchmark("take_photo", "take_photo", args=[{"num_photos": 1}]),
+    Benchmark("take_photo_burst", "take_photo", args=[{"num_photos": 5}]),
+    Benchmark("switch_camera", "switch_camera", state={"mode": "photo"}),
+    Benchmark(
+        "get_video_quality_options", "get_video_quality_options", state=_VIDEO_FFC
+    ),
+]
+
+
+def _load_tools():
+    """src.tools.tools bound to the fake pywinauto, never the real one."""
+    os.environ["CAMERA_UI_WAIT_SCALE"] = "0"
+    install(FakeCameraApp())
+    sys.modules.pop("src.tools.tools", None)
+    from src.tools import tools
+
+    return tools
+
+
+def calibrate(rounds: int = 50) -> float:
+    """
+    Seconds for a fixed reference workload (walks of an idle fake tree).
+
+    Timed next to every repeat, so ops/sec can be compared as a cost
+    relative to this machine's speed at that moment.
+    """
+    reference = FakeCameraApp(filler_controls=200)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        reference.find({"title": "Calibration"})
+    return time.perf_counter() - start
+
+
+def run_benchmark(
+    tools, benchmark: Benchmark, config: dict, iterations: int, repeat: int = 5
+) -> dict:
+    """
+    Time one benchmark.
+
+    Args:
+        tools: The src.tools.tools module, loaded against the fake
+        benchmark: What to call and from which state
+        config: FakeCameraApp settings (filler_controls, latencies)
+        iterations: Timed calls per repeat, after a short warmup
+        repeat: Timed repeats; the fastest is reported, as with timeit,
+            since slower ones measure other load on the machine
+
+    Returns:
+        dict: The per-call metrics described in the module docstring
+    """
+    from src.tools.device import get_device_metrics
+
+    app = install(FakeCameraApp(**config, **benchmark.state))
+    func = getattr(tools, benchmark.tool)
+    calls = len(benchmark.args)
+    output = io.StringIO()
+
+    # Warm up and reach the steady state of the argument cycle
+    with contextlib.redirect_stdout(output):
+        for i in range(max(2, calls)):
+            func(**benchmark.args[i % calls])
+
+    best = None
+    calibration = min(calibrate() for _ in range(3))
+    for _ in range(repeat):
+        calibration = min(calibration, calibrate())
+        app.reset_counters()
+        waits_before = get_device_metrics()["total_ui_wait_s"]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            for i in range(iterations):
+                result = func(**benchmark.args[i % calls])
+        elapsed = time.perf_counter() - start
+        waits = get_device_metrics()["total_ui_wait_s"] - waits_before
+        if best is None or elapsed < best["elapsed"]:
+            best = {
+                "elapsed": elapsed,
+                "waits": waits,
+                "lookups": app.lookups,
+                "lookup_time": app.lookup_time,
+                "clicks": app.clicks,
+            }
+
+    elapsed = best["elapsed"]
+    return {
+        "ops_per_s": iterations / elapsed if elapsed else 0.0,
+        "ms_per_op": elapsed / iterations * 1000,
+        "lookups_per_op": best["lookups"] / iterations,
+        "lookup_ms_per_op": best["lookup_time"] / iterations * 1000,
+        "wait_s_per_op": best["waits"] / iterations,
+        "other_ms_per_op": (elapsed - best["lookup_time"]) / iterations * 1000,
+        "clicks_per_op": best["clicks"] / iterations,
+        # Cost in units of the calibration workload; steadier than ops/sec
+        "relative_cost": elapsed / iterations / calibration,
+        "last_result": result if isinstance(result, (str, int, list)) else str(result),
+    }
+
+
+def _speed_change(metrics: dict, base: dict) -> float:
+    """Relative speed change, e.g. -0.3 for 30% slower, corrected for machine speed."""
+    return base["relative_cost"] / metrics["relative_cost"] - 1
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Regressions against a baseline.
+
+    Args:
+        results: Metrics by benchmark name
+        baseline: A report written with --save_baseline
+        tolerance: Allowed calibrated speed drop, e.g. 0.25
+
+    Returns:
+        list: One message per regression
+    """
+    regressions = []
+    same_config = baseline.get("config") == results["config"]
+    for name, metrics in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        for key in ("lookups_per_op", "wait_s_per_op"):
+            if metrics[key] > base[key] + EXACT_TOLERANCE:
+                regressions.append(f"{name}: {key} {base[key]:g} -> {metrics[key]:g}")
+        # Timings are only comparable with the same fake tree settings
+        change = _speed_change(metrics, base)
+        if same_config and change < -tolerance:
+            regressions.append(
+                f"{name}: ops/sec {base['ops_per_s']:.0f} -> "
+                f"{metrics['ops_per_s']:.0f} ({change:+.0%} calibrated)"
+            )
+    return regressions
+
+
+def format_table(results: dict, baseline: dict = None) -> str:
+    base = (baseline or {}).get("benchmarks", {})
+    lines = [
+        f"{'benchmark':<26} {'ops/s':>9} {'vs base':>8} {'lookups':>8} "
+        f"{'lookup ms':>10} {'other ms':>9} {'wait s':>7}"
+    ]
+    for name, m in results["benchmarks"].items():
+        ratio = f"{_speed_change(m, base[name]):+.0%}" if name in base else "-"
+        lines.append(
+            f"{name:<26} {m['ops_per_s']:>9.0f} {ratio:>8} {m['lookups_per_op']:>8.1f} "
+            f"{m['lookup_ms_per_op']:>10.3f} {m['other_ms_per_op']:>9.3f} "
+            f"{m['wait_s_per_op']:>7.1f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Camera tool layer")
+    parser.add_argument("--only", nargs="+", help="Benchmark names to run")
+    parser.add_argument("--iterations", type=int, help="Default: the baseline's")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filler_controls", type=int, default=200)
+    parser.add_argument("--lookup_latency", type=float, default=0.0)
+    parser.add_argument("--control_latency", type=float, default=0.0)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save_baseline", action="store_true")
+    parser.add_argument("--json", type=str, default=str(DEFAULT_JSON_REPORT))
+    args = parser.parse_args()
+
+    names = [b.name for b in BENCHMARKS]
+    unknown = set(args.only or []) - set(names)
+    if unknown:
+        parser.error(f"Unknown benchmarks {sorted(unknown)}; use {names}")
+
+    baseline_path = Path(args.baseline)
+    baseline = None
+    if baseline_path.exists():
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    iterations = args.iterations or (baseline or {}).get("meta", {}).get(
+        "iterations", DEFAULT_ITERATIONS
+    )
+
+    config = {
+        "filler_controls": args.filler_controls,
+        "lookup_latency": args.lookup_latency,
+        "control_latency": args.control_latency,
+    }
+    tools = _load_tools()
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "iterations": iterations,
+            "repeat": args.repeat,
+        },
+        "config": config,
+        "benchmarks": {},
+    }
+    for benchmark in BENCHMARKS:
+        if args.only and benchmark.name not in args.only:
+            continue
+        results["benchmarks"][benchmark.name] = run_benchmark(
+            tools, benchmark, config, iterations, args.repeat
+        )
+
+    print(format_table(results, baseline))
+    json_path = Path(args.json)
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {baseline_path}")
+        raise SystemExit(0)
+
+    if baseline is None:
+        print(f"No baseline at {baseline_path}; run with --save_baseline")
+        raise SystemExit(0)
+    if baseline.get("config") != config:
+        print("Fake UI settings differ from the baseline; ops/sec not compared")
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regression(s) against {baseline_path}")
+    raise SystemExit(1 if regressions else 0)
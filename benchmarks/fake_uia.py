@@ -0,0 +1,392 @@
+"""
+Deterministic fake of the Camera app's UI Automation tree.
+
+install() puts stand-ins for pywinauto, pywinauto.findwindows and
+pywinauto.keyboard into sys.modules, so src/tools/tools.py imports and
+runs anywhere against a FakeCameraApp instead of the real Camera window.
+The tree mirrors the controls the tools look up (capture buttons per
+mode and camera, the Windows Studio Effects panel, the video quality
+combo box) and is padded with filler controls.
+
+Every lookup walks the whole tree, like a UIA search, and costs
+lookup_latency plus control_latency per control visited. Lookups and
+the time spent in them are counted, so benchmarks can separate lookup
+cost from the tools' fixed UI waits (src/tools/device.ui_wait).
+
+    app = install(FakeCameraApp(filler_controls=400, lookup_latency=0.0005))
+    from src.tools import tools
+    tools.get_current_camera()
+    app.lookups, app.lookup_time
+"""
+
+import sys
+import time
+import types
+
+QUALITY_OPTIONS = [
+    "1440p 16:9 30fps",
+    "1440p 4:3 30fps",
+    "1080p 16:9 30fps",
+    "1080p 4:3 30fps",
+    "720p 16:9 30fps",
+    "480p 4:3 30fps",
+    "360p 16:9 30fps",
+]
+
+
+class ElementNotFoundError(Exception):
+    """Stand-in for pywinauto.findwindows.ElementNotFoundError."""
+
+
+class ElementInfo:
+    def __init__(self, name, automation_id, control_type, class_name):
+        self.name = name
+        self.automation_id = automation_id
+        self.control_type = control_type
+        self.class_name = class_name
+
+
+class FakeControl:
+    """A resolved control: the wrapper object returned by a lookup."""
+
+    def __init__(
+        self,
+        app,
+        name,
+        auto_id="",
+        control_type="Button",
+        class_name="Button",
+        on_click=None,
+        toggle=None,
+    ):
+        self.app = app
+        self.element_info = ElementInfo(name, auto_id, control_type, class_name)
+        self._on_click = on_click
+        self._toggle = toggle
+
+    def matches(self, criteria: dict) -> bool:
+        info = self.element_info
+        for key, attr in (
+            ("title", "name"),
+            ("auto_id", "automation_id"),
+            ("control_type", "control_type"),
+            ("class_name", "class_name"),
+        ):
+            if criteria.get(key) is not None and criteria[key] != getattr(info, attr):
+                return False
+        return True
+
+    def exists(self, *args, **kwargs) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def window_text(self) -> str:
+        return self.element_info.name
+
+    def get_toggle_state(self) -> int:
+        return int(bool(self._toggle())) if self._toggle else 0
+
+    def click_input(self, *args, **kwargs) -> None:
+        self.app.clicks += 1
+        if self._on_click is not None:
+            self._on_click()
+
+
+class ControlSpec:
+    """Lazy child_window() result; every call resolves it with a fresh lookup."""
+
+    def __init__(self, app, criteria: dict):
+        self.app = app
+        self.criteria = criteria
+
+    def _resolve(self) -> FakeControl:
+        matches = self.app.find(self.criteria)
+        if not matches:
+            raise ElementNotFoundError(self.criteria)
+        return matches[0]
+
+    def exists(self, *args, **kwargs) -> bool:
+        return bool(self.app.find(self.criteria))
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+
+class FakeWindow:
+    def __init__(self, app):
+        self.app = app
+
+    def exists(self, *args, **kwargs) -> bool:
+        return self.app.running
+
+    def is_minimized(self) -> bool:
+        return self.app.minimized
+
+    def restore(self) -> None:
+        self.app.minimized = False
+
+    def set_focus(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.app.running = False
+
+    def child_window(self, **criteria) -> ControlSpec:
+        return ControlSpec(self.app, criteria)
+
+    def children(self, **criteria) -> list:
+        return self.app.find(criteria)
+
+    def descendants(self, **criteria) -> list:
+        return self.app.find(criteria)
+
+    def menu_select(self, path: str) -> None:
+        self.app.clicks += 1
+
+    def type_keys(self, keys: str, *args, **kwargs) -> None:
+        self.app.keys += 1
+
+
+class FakeApplication:
+    """Stand-in for pywinauto.Application, bound to the installed fake app."""
+
+    current = None
+
+    def __init__(self, backend="uia"):
+        self.backend = backend
+
+    def connect(self, **kwargs) -> "FakeApplication":
+        app = FakeApplication.current
+        # A top-level window search: one round trip, no tree walk
+        start = time.perf_counter()
+        app.lookups += 1
+        app.charge(start, visited=0)
+        if not app.running:
+            raise ElementNotFoundError(kwargs)
+        return self
+
+    def window(self, **kwargs) -> FakeWindow:
+        return FakeWindow(FakeApplication.current)
+
+
+class FakeCameraApp:
+    """State of the fake Camera app, its control tree and lookup counters."""
+
+    def __init__(
+        self,
+        filler_controls: int = 200,
+        lookup_latency: float = 0.0,
+        control_latency: float = 0.0,
+        camera: str = "FFC",
+        mode: str = "photo",
+    ):
+        """
+        Args:
+            filler_controls: Extra controls in the tree, each visited by
+                every lookup
+            lookup_latency: Fixed seconds per lookup (UIA round trip)
+            control_latency: Seconds per control visited by a lookup
+            camera: Initial camera, "FFC" or "RFC"
+            mode: Initial mode, "photo" or "video"
+        """
+        self.filler_controls = filler_controls
+        self.lookup_latency = lookup_latency
+        self.control_latency = control_latency
+        self.running = True
+        self.minimized = False
+        self.camera = camera
+        self.mode = mode
+        self.studio_effects_open = False
+        self.background_effects = False
+        self.automatic_framing = False
+        self.blur_type = "standard"
+        self.quality_open = False
+        self.photos = 0
+        self.lookups = 0
+        self.lookup_time = 0.0
+        self.clicks = 0
+        self.keys = 0
+        self._filler = [
+            FakeControl(self, f"Control {i}", f"Filler_{i}", "Text", "TextBlock")
+            for i in range(filler_controls)
+        ]
+
+    def reset_counters(self) -> None:
+        self.lookups = 0
+        self.lookup_time = 0.0
+        self.clicks = 0
+        self.keys = 0
+
+    # State transitions behind the buttons
+
+    def _set(self, **changes):
+        def apply():
+            for key, value in changes.items():
+                setattr(self, key, value)
+
+        return apply
+
+    def _switch_camera(self):
+        self.camera = "RFC" if self.camera == "FFC" else "FFC"
+        self.studio_effects_open = False
+
+    def _toggle(self, attr: str):
+        def apply():
+            setattr(self, attr, not getattr(self, attr))
+
+        return apply
+
+    def _take_photo(self):
+        self.photos += 1
+
+    def _open_quality(self):
+        self.quality_open = True
+
+    def controls(self) -> list:
+        """The current tree, in UIA traversal order."""
+        c = [
+            FakeControl(
+                self, "Minimize Camera", "Minimize", on_click=self._set(minimized=True)
+            ),
+            FakeControl(self, "Open Settings Menu", "settingsButton"),
+            FakeControl(
+                self,
+                "Change camera",
+                "SwitchCameraButtonId",
+                on_click=self._switch_camera,
+            ),
+        ]
+        if self.mode == "photo":
+            c += [
+                FakeControl(
+                    self, "Take photo", "CaptureButton_0", on_click=self._take_photo
+                ),
+                FakeControl(
+                    self,
+                    "Switch to video mode",
+                    "CaptureButton_1",
+                    on_click=self._set(mode="video"),
+                ),
+                FakeControl(self, "Photo settings"),
+            ]
+            if self.camera == "FFC":
+                c.append(FakeControl(self, "Switch to barcode mode", "CaptureButton_5"))
+            else:
+                c.append(
+                    FakeControl(self, "Switch to document mode", "CaptureButton_3")
+                )
+        else:
+            c += [
+                FakeControl(
+                    self,
+                    "Switch to photo mode",
+                    "CaptureButton_0",
+                    on_click=self._set(mode="photo", studio_effects_open=False),
+                ),
+                FakeControl(self, "Take video", "CaptureButton_1"),
+                FakeControl(self, "Video settings"),
+            ]
+            if self.camera == "FFC":
+                c.append(
+                    FakeControl(
+                        self,
+                        "Windows Studio Effects",
+                        class_name="ToggleButton",
+                        on_click=self._toggle("studio_effects_open"),
+                        toggle=lambda: self.studio_effects_open,
+                    )
+                )
+            else:
+                c.append(
+                    FakeControl(self, "Switch to panorama mode", "CaptureButton_2")
+                )
+        if self.mode == "video" and self.camera == "FFC" and self.studio_effects_open:
+            c += [
+                FakeControl(
+                    self,
+                    "Background effects",
+                    "Switch",
+                    on_click=self._toggle("background_effects"),
+                    toggle=lambda: self.background_effects,
+                ),
+                FakeControl(
+                    self,
+                    "Automatic framing",
+                    "Switch",
+                    on_click=self._toggle("automatic_framing"),
+                    toggle=lambda: self.automatic_framing,
+                ),
+            ]
+            if self.background_effects:
+                c += [
+                    FakeControl(
+                        self,
+                        "Standard blur",
+                        control_type="RadioButton",
+                        on_click=self._set(blur_type="standard"),
+                    ),
+                    FakeControl(
+                        self,
+                        "Portrait blur",
+                        control_type="RadioButton",
+                        on_click=self._set(blur_type="portrait"),
+                    ),
+                ]
+        c.append(
+            FakeControl(
+                self,
+                "Video quality",
+                control_type="ComboBox",
+                class_name="ComboBox",
+                on_click=self._open_quality,
+            )
+        )
+        if self.quality_open:
+            c += [
+                FakeControl(
+                    self, option, control_type="ListItem", class_name="ListItem"
+                )
+                for option in QUALITY_OPTIONS
+            ]
+        return c + self._filler
+
+    def find(self, criteria: dict) -> list:
+        """One lookup: walk the tree and return the matching controls."""
+        start = time.perf_counter()
+        self.lookups += 1
+        tree = self.controls() if self.running else []
+        matches = [control for control in tree if control.matches(criteria)]
+        self.charge(start, visited=len(tree))
+        return matches
+
+    def charge(self, start: float, visited: int) -> None:
+        """Add the configured latency of a lookup that began at start."""
+        delay = self.lookup_latency + self.control_latency * visited
+        if delay > 0:
+            time.sleep(delay)
+        self.lookup_time += time.perf_counter() - start
+
+
+def install(app: FakeCameraApp) -> FakeCameraApp:
+    """
+    Make `import pywinauto` resolve to the fake, driving app.
+
+    Replaces a real pywinauto too, so a benchmark never drives the real
+    Camera app. Call before src.tools.tools is first imported; later calls
+    only swap the app the already-imported tools talk to.
+    """
+    FakeApplication.current = app
+    pywinauto = types.ModuleType("pywinauto")
+    pywinauto.Application = FakeApplication
+    findwindows = types.ModuleType("pywinauto.findwindows")
+    findwindows.ElementNotFoundError = ElementNotFoundError
+    keyboard = types.ModuleType("pywinauto.keyboard")
+    keyboard.send_keys = lambda keys, *args, **kwargs: None
+    pywinauto.findwindows = findwindows
+    pywinauto.keyboard = keyboard
+    sys.modules["pywinauto"] = pywinauto
+    sys.modules["pywinauto.findwindows"] = findwindows
+    sys.modules["pywinauto.keyboard"] = keyboard
+    return app
@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from typing import Any
+
+# (tool name, agent name, system message, registration description)
+TOOL_AGENT_SPECS = [
+    (
+        "open_camera",
+        "open_camera_agent",
+        "You can execute the following functions: open_camera",
+        "Open the camera",
+    ),
+    (
+        "close_camera",
+        "close_camera_agent",
+        "You can execute the following functions: close_camera",
+        "Close the camera",
+    ),
+    (
+        "minimize_camera",
+        "minimize_camera_agent",
+        "You can execute the following functions: minimize_camera",
+        "Minimize the camera",
+    ),
+    (
+        "restore_camera",
+        "restore_camera_agent",
+        "You can execute the following functions: restore_camera",
+        "Restore the camera",
+    ),
+    (
+        "set_automatic_framing",
+        "set_automatic_framing_agent",
+        "set_automatic_framing_agent_msg.txt",
+        "Set automatic framing to on or off",
+    ),
+    (
+        "set_blur_type",
+        "set_blur_type_agent",
+        "set_blur_type_agent_msg.txt",
+        "Set blur type to standard or portrait",
+    ),
+    (
+        "set_background_effects",
+        "set_background_effects_agent",
+        "set_background_effects_agent_msg.txt",
+        "Set background effects to on or off",
+    ),
+    (
+        "switch_camera",
+        "switch_camera_agent",
+        "switch_camera_agent_msg.txt",
+        "Switch between cameras",
+    ),
+    (
+        "camera_mode",
+        "camera_mode_agent",
+        "You can execute the following functions: camera_mode. You can switch between 'photo' and 'video' mode.",
+        "Switch between photo and video mode",
+    ),
+    ("take_photo", "take_photo_agent", "take_photo_agent_msg.txt", "Take a photo"),
+    ("take_video", "take_video_agent", "take_video_agent_msg.txt", "Take a video"),
+]
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+@dataclass
+class AgentSet:
+    """All agents needed to interpret, plan and execute one camera command."""
+
+    interpreter_agent: Any
+    manager_agent: Any
+    user_proxy_agent: Any
+    conversation_agent: Any
+    agent_map: dict
+
+    def all_agents(self) -> list:
+        """Every agent in the set, tool agents included."""
+        return [
+            self.interpreter_agent,
+            self.manager_agent,
+            self.user_proxy_agent,
+            self.conversation_agent,
+            *self.agent_map.values(),
+        ]
+
+
+def load_llm_config(model: str = DEFAULT_MODEL) -> dict:
+    """
+    Build the llm_config shared by every agent.
+
+    Args:
+        model: Model name used to filter config/OAI_CONFIG_LIST.json
+    """
+    from src.utils.config_loader import load_config
+
+    return {"config_list": load_config({"model": model})}
+
+
+def build_agent_set(llm_config: dict = None, backend: str = None) -> AgentSet:
+    """
+    Create the interpreter, manager, conversation, user proxy and tool agents
+    and register every tool with the user proxy for execution.
+
+    The heavyweight imports (autogen, pywinauto) happen here rather than at
+    module import so that commands which never talk to an agent stay fast.
+
+    Args:
+        llm_config: llm_config for all agents, loaded from config if None
+        backend: Tool backend (windows, simulated or remote), CAMERA_BACKEND
+            if None
+
+    Returns:
+        AgentSet: The constructed agents
+    """
+    from src.agents.assistant_agent import create_assistant_agent
+    from src.agents.user_proxy_agent import create_user_proxy_agent
+    from src.tools.backend import get_backend_name, get_tools
+    from src.utils.agent_utils import register_agent_functions
+    from src.utils.executors import LLM_EXECUTOR, TOOL_EXECUTOR
+
+    if llm_config is None:
+        llm_config = load_llm_config()
+    tools = get_tools(backend)
+    # Remote tools only wait on the daemon, so they need no UI thread
+    executor = LLM_EXECUTOR if get_backend_name(backend) == "remote" else TOOL_EXECUTOR
+
+    agent_map = {}
+    agent_functions = []
+    for tool_name, agent_name, sys_msg, description in TOOL_AGENT_SPECS:
+        func = getattr(tools, tool_name)
+        agent = create_assistant_agent(
+            name=agent_name,
+            sys_msg=sys_msg,
+            llm_config=llm_config,
+            function_map={tool_name: func},
+        )
+        agent_map[agent_name] = agent
+        agent_functions.append((func, agent, tool_name, description))
+
+    interpreter_agent = create_assistant_agent(
+        name="interpreter_agent",
+        sys_msg="interpreter_agent_msg.txt",
+        llm_config=llm_config,
+    )
+
+    manager_agent = create_assistant_agent(
+        name="manager_agent",
+        sys_msg="manager_agent_msg.txt",
+        llm_config=llm_config,
+    )
+
+    user_proxy_agent = create_user_proxy_agent(
+        name="user_proxy_agent",
+        sys_msg="user_proxy_agent_msg.txt",
+        llm_config=llm_config,
+        human_input_mode="NEVER",
+        # Tools run off the event loop in async chats
+        tool_executor=executor,
+    )
+
+    conversation_agent = create_assistant_agent(
+        name="conversation_agent",
+        sys_msg="conversation_agent_msg.txt",
+        llm_config=llm_config,
+    )
+
+    register_agent_functions(user_proxy_agent, agent_functions)
+
+    return AgentSet(
+        interpreter_agent=interpreter_agent,
+        manager_agent=manager_agent,
+        user_proxy_agent=user_proxy_agent,
+        conversation_agent=conversation_agent,
+        agent_map=agent_map,
+    )
@@ -0,0 +1,213 @@
+"""
+Pool of pre-built agent sets for concurrent chat sessions.
+
+Each request checks out its own AgentSet, so two users never share an
+autogen conversation. Sets are reset when they are returned. Camera UI
+actions are still serialised by the device lock (src/tools/device.py).
+
+Because of that reset, no pooled agent keeps history from one request to
+the next, and the per-agent history policies (src/utils/history_policy.py)
+only bound history within a request. They matter for the single shared
+agent set of the CLI and of a chat served without a pool. A set is not
+tied to a chat session, so history that should span a session has to
+come from the session itself, e.g. the chat history the UI sends.
+
+    pool = AgentPool(size=4)
+    with pool.checkout() as agents:
+        ...
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from src.agents.agent_factory import AgentSet, build_agent_set
+
+# Longest sleep between polls of an async checkout waiting for a free set
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class AgentPoolTimeout(Exception):
+    """No agent set became free within the checkout timeout."""
+
+
+def reset_agent_set(agents: AgentSet) -> None:
+    """Clear every agent's conversations and reply counters."""
+    for agent in agents.all_agents():
+        agent.reset()
+
+
+class AgentPool:
+    """Fixed-size pool of AgentSets with checkout metrics."""
+
+    def __init__(
+        self,
+        size: int = 4,
+        llm_config: dict = None,
+        agent_sets: list = None,
+        timeout: float = 120.0,
+    ):
+        """
+        Args:
+            size: Number of agent sets
+            llm_config: llm_config for sets built by the pool
+            agent_sets: Already built sets to include in the pool
+            timeout: Default seconds to wait for a free set
+        """
+        agent_sets = list(agent_sets or [])
+        if size < 1:
+            raise ValueError("Agent pool size must be at least 1")
+
+        self.size = max(size, len(agent_sets))
+        self.timeout = timeout
+        self._available = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_checkout = 0.0
+        self._total_held = 0.0
+
+        for agents in agent_sets:
+            self._available.put(agents)
+        for _ in range(self.size - len(agent_sets)):
+            self._available.put(build_agent_set(llm_config))
+
+    def _get(self, timeout: float):
+        """Take a free set, blocking up to timeout. Returns (agents, waited)."""
+        try:
+            return self._available.get_nowait(), False
+        except queue.Empty:
+            pass
+        try:
+            return self._available.get(timeout=timeout), True
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise AgentPoolTimeout(
+                f"No free agent set after {timeout:.0f}s ({self.size} in use)"
+            )
+
+    async def _a_get(self, timeout: float):
+        """
+        Async _get. It polls instead of blocking a worker thread, so a
+        cancelled waiter never takes a set that nobody returns.
+        """
+        try:
+            return self._available.get_nowait(), False
+        except queue.Empty:
+            pass
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0.0)))
+            try:
+                return self._available.get_nowait(), True
+            except queue.Empty:
+                pass
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    self._timeouts += 1
+                raise AgentPoolTimeout(
+                    f"No free agent set after {timeout:.0f}s ({self.size} in use)"
+                )
+            delay = min(delay * 2, ASYNC_POLL_INTERVAL)
+
+    def _checked_out(self, start: float, waited: bool) -> float:
+        acquired = time.perf_counter()
+        with self._lock:
+            latency = acquired - start
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._total_checkout += latency
+            if waited:
+                self._waits += 1
+                self._total_wait += latency
+                self._max_wait = max(self._max_wait, latency)
+        return acquired
+
+    def _return(self, agents: AgentSet, acquired: float) -> None:
+        try:
+            reset_agent_set(agents)
+        except Exception as e:
+            print(f"Error resetting agent set: {e}")
+        with self._lock:
+            self._in_use -= 1
+            self._total_held += time.perf_counter() - acquired
+        self._available.put(agents)
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        """
+        Borrow an agent set for one request.
+
+        Args:
+            timeout: Seconds to wait for a free set, the pool default if None
+
+        Raises:
+            AgentPoolTimeout: If no set becomes free in time
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        agents, waited = self._get(timeout)
+        acquired = self._checked_out(start, waited)
+        try:
+            yield agents
+        finally:
+            self._return(agents, acquired)
+
+    @asynccontextmanager
+    async def a_checkout(self, timeout: float = None):
+        """Async checkout; waiting for a free set does not block the event loop."""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        agents, waited = await self._a_get(timeout)
+        acquired = self._checked_out(start, waited)
+        try:
+            yield agents
+        finally:
+            self._return(agents, acquired)
+
+    def metrics(self) -> dict:
+        """
+        Report pool utilisation.
+
+        Returns:
+            dict: Size, available/in-use sets, checkout, wait and timeout
+            counts, mean checkout latency, mean/max wait of the checkouts
+            that found the pool empty, and mean hold time in milliseconds
+        """
+        with self._lock:
+            n = self._checkouts
+            w = self._waits
+            return {
+                "pool_size": self.size,
+                "available": self._available.qsize(),
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "checkouts_total": n,
+                "waits_total": w,
+                "timeouts_total": self._timeouts,
+                "mean_wait_ms": self._total_wait / w * 1000 if w else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                "mean_checkout_ms": self._total_checkout / n * 1000 if n else 0.0,
+                "mean_held_ms": self._total_held / n * 1000 if n else 0.0,
+            }
+
+
+def format_pool_metrics(metrics: dict) -> str:
+    return (
+        f"Agent pool: {metrics['in_use']}/{metrics['pool_size']} in use "
+        f"(peak {metrics['peak_in_use']}), {metrics['checkouts_total']} checkouts, "
+        f"{metrics['waits_total']} waited ({metrics['mean_wait_ms']:.0f}ms mean / "
+        f"{metrics['max_wait_ms']:.0f}ms max), {metrics['timeouts_total']} timeouts, "
+        f"checkout {metrics['mean_checkout_ms']:.1f}ms mean, "
+        f"held {metrics['mean_held_ms']:.0f}ms mean"
+    )
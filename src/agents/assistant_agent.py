@@ -1,6 +1,6 @@
 from autogen import AssistantAgent
 
-from ..utils.load_system_message import get_system_message
+from ..utils.load_system_message import bind_agent, get_system_message
 
 
 def create_assistant_agent(
@@ -12,7 +12,7 @@ def create_assistant_agent(
         print(f"System message file not found: {sys_msg}")
         return None
     # Create the Result Analyzer Agent
-    return AssistantAgent(
+    agent = AssistantAgent(
         name=name,
         is_termination_msg=lambda msg: msg.get("content") is not None
         and "TERMINATE" in msg["content"],
@@ -20,3 +20,6 @@ def create_assistant_agent(
         llm_config=llm_config,
         **kwargs,
     )
+    # Pick up edits to the system message file without a restart
+    bind_agent(agent, sys_msg)
+    return agent
@@ -1,18 +1,63 @@
+import functools
+import inspect
+
 from autogen import UserProxyAgent
 
-from ..utils.load_system_message import get_system_message
+from ..utils.executors import run_blocking
+from ..utils.load_system_message import bind_agent, get_system_message
+
+
+class ToolUserProxyAgent(UserProxyAgent):
+    """
+    UserProxyAgent that runs its blocking tools off the event loop in async
+    chats.
+
+    Tools are registered as plain functions, so sync chats call them
+    directly; autogen would otherwise drive a coroutine tool with
+    run_until_complete, which fails when the sync chat is started from a
+    thread with a running event loop. In async chats a blocking tool is run
+    on tool_executor instead of on the loop.
+    """
+
+    def __init__(self, *args, tool_executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tool_executor = tool_executor
+
+    async def a_execute_function(self, func_call, call_id=None, verbose=False):
+        func = self._function_map.get(func_call.get("name", ""))
+        if (
+            self.tool_executor is None
+            or func is None
+            or inspect.iscoroutinefunction(func)
+        ):
+            return await super().a_execute_function(
+                func_call, call_id=call_id, verbose=verbose
+            )
+        return await run_blocking(
+            functools.partial(
+                self.execute_function, func_call, call_id=call_id, verbose=verbose
+            ),
+            executor=self.tool_executor,
+        )
 
 
 def create_user_proxy_agent(
     name: str, sys_msg: str, human_input_mode: str = "NEVER", **kwargs
 ) -> UserProxyAgent:
+    """
+    Create the user proxy agent that executes the tool agents' calls.
+
+    Args:
+        tool_executor: Passed through to ToolUserProxyAgent; blocking tools
+            run on the event loop in async chats if None
+    """
     try:
         system_message = get_system_message(sys_msg)
     except FileNotFoundError:
         print(f"System message file not found: {sys_msg}")
         return None
     # Create the User Proxy Agent
-    return UserProxyAgent(
+    agent = ToolUserProxyAgent(
         name=name,
         human_input_mode=human_input_mode,
         is_termination_msg=lambda msg: msg.get("content") is not None
@@ -21,3 +66,6 @@ def create_user_proxy_agent(
         code_execution_config={"work_dir": ".", "use_docker": False},
         **kwargs,
     )
+    # Pick up edits to the system message file without a restart
+    bind_agent(agent, sys_msg)
+    return agent
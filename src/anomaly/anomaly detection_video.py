@@ -4,8 +4,8 @@ import base64
 import cv2
 import pandas as pd
 from datetime import datetime
-from openai import OpenAI
 from pydantic import BaseModel, Field
+from src.utils.http_pool import get_openai_client
 import time
 
 # Set up logging configuration
@@ -16,7 +16,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 model = "gpt-4o-mini"
 
 class AnomalyDetection(BaseModel):
@@ -38,6 +37,8 @@ def detect_anomaly(base64_image):
     """First LLM call to determine if input is an anomaly"""
     logger.info("Starting anomaly detection analysis")
 
+    # Shared pooled client, created on first use rather than at import
+    client = get_openai_client(api_key=os.getenv("OPENAI_API_KEY"))
     completion = client.beta.chat.completions.parse(
         model=model,
         messages=[
@@ -158,6 +159,7 @@ def process_video(video_path, sample_rate=1, output_dir=None):
     return df_results
 
 
+# Run from the project root: python -m "src.anomaly.anomaly detection_video"
 if __name__ == "__main__":
     video_path = r"C:\Users\sfudally\Desktop\__Projects__\Automating-CameraApp-with-Vision-Language-Action-model\data\videos\bug_1.mp4"
     
@@ -2,8 +2,8 @@ import logging
 import os
 import base64
 from datetime import datetime
-from openai import OpenAI
 from pydantic import BaseModel, Field
+from src.utils.http_pool import get_openai_client
 
 # https://platform.openai.com/docs/guides/vision
 
@@ -15,7 +15,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 model = "gpt-4o-mini"
 
 class AnomalyDetection(BaseModel):
@@ -35,6 +34,8 @@ def detect_anomaly(base64_image):
     """First LLM call to determine if input is an anomaly"""
     logger.info("Starting anomaly detection analysis")
 
+    # Shared pooled client, created on first use rather than at import
+    client = get_openai_client(api_key=os.getenv("OPENAI_API_KEY"))
     completion = client.beta.chat.completions.parse(
         model=model,
         messages=[
@@ -65,6 +66,7 @@ def detect_anomaly(base64_image):
     return result
 
 
+# Run from the project root: python -m src.anomaly.anomaly_detection
 if __name__ == "__main__":
     image_path = r"C:\Users\sfudally\Desktop\__Projects__\Automating-CameraApp-with-Vision-Language-Action-model\data\images\bug_1.png"
     base64_image  = encode_image(image_path)
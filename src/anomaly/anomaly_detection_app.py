@@ -6,8 +6,8 @@ import pandas as pd
 import time
 import gradio as gr
 import matplotlib.pyplot as plt
-from openai import OpenAI
 from pydantic import BaseModel, Field
+from src.utils.http_pool import get_openai_client
 import logging
 import tempfile
 
@@ -19,8 +19,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 model = "gpt-4o-mini"
 
 class AnomalyDetection(BaseModel):
@@ -39,6 +37,8 @@ def detect_anomaly(frame):
     """Determine if the frame contains an anomaly"""
     base64_image = encode_image_from_array(frame)
     
+    # Shared pooled client, created on first use rather than at import
+    client = get_openai_client(api_key=os.getenv("OPENAI_API_KEY"))
     completion = client.beta.chat.completions.parse(
         model=model,
         messages=[
@@ -217,5 +217,6 @@ with gr.Blocks(title="Camera App Anomaly Detector") as app:
     )
 
 # Launch the app
+# Run from the project root: python -m src.anomaly.anomaly_detection_app
 if __name__ == "__main__":
     app.launch()
\ No newline at end of file
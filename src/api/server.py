@@ -0,0 +1,406 @@
+"""
+REST, SSE and WebSocket API for programmatic camera commands.
+
+Commands and pre-built plans become jobs on the host's job queue
+(src/jobs/job_queue.py) and return a job id straight away. Step events
+can be streamed over SSE or a WebSocket. Responses are ORJSON encoded.
+The Gradio chat is mounted at / unless --no_ui is given.
+
+Endpoints:
+    POST   /v1/commands              {"command": "...", "priority": "interactive"}
+    POST   /v1/plans                 {"query", "iterations", "agent_sequence", "agent_states"}
+                                     Both accept "deadline_s", seconds the job may run.
+                                     Plans are checked and repaired before queueing
+                                     (src/utils/plan_validator.py); 400 if one cannot run
+    POST   /v1/batch                 {"items": [{"command": ...} | {plan}], "priority": "batch"}
+                                     Commands are planned at most pool_size at a time
+    GET    /v1/jobs/{job_id}
+    DELETE /v1/jobs/{job_id}         Cancel; a running job stops at its next tool call
+    GET    /v1/jobs/{job_id}/events  Server-sent events; a "requeued" event means
+                                     the job starts over and its events repeat
+    WS     /v1/jobs/{job_id}/ws
+    GET    /v1/metrics
+
+Usage:
+    python -m src.api.server --host 127.0.0.1 --port 8000 [--pool_size 4] [--no_ui]
+
+Set CAMERA_API_KEY to require "Authorization: Bearer <key>" on /v1 routes.
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.websockets import WebSocketDisconnect
+
+from src.agents.agent_factory import TOOL_AGENT_SPECS
+from src.jobs.job_queue import (
+    FINISHED_STATUSES,
+    PRIORITIES,
+    AdmissionRejected,
+    JobQueue,
+    JobWorker,
+    get_job_queue,
+    make_workflow_handler,
+)
+from src.utils.executors import install_llm_executor, run_blocking
+from src.utils.plan_validator import validate_plan
+
+AGENT_NAMES = {agent_name for _, agent_name, _, _ in TOOL_AGENT_SPECS}
+
+# Seconds between job polls when streaming events
+EVENT_POLL_INTERVAL = 0.2
+
+# Upper bound on items per /v1/batch request
+MAX_BATCH_ITEMS = 5000
+
+
+class CommandRequest(BaseModel):
+    command: str
+    priority: str = "interactive"
+    deadline_s: Optional[float] = Field(None, gt=0)
+
+
+class PlanRequest(BaseModel):
+    query: str
+    iterations: int = Field(1, ge=1)
+    agent_sequence: List[str]
+    agent_states: List[str]
+    priority: str = "interactive"
+    deadline_s: Optional[float] = Field(None, gt=0)
+
+
+class BatchRequest(BaseModel):
+    # Items are validated one by one, so a bad item does not fail the batch
+    items: List[dict] = []
+    priority: str = "batch"
+
+
+class State:
+    """Objects shared by the request handlers, created at startup."""
+
+    job_queue: JobQueue = None
+    agent_pool = None
+    worker: JobWorker = None
+    # Bounds concurrent batch planning to the agent sets available
+    planning_slots: asyncio.Semaphore = None
+
+
+state = State()
+
+
+def _priority(name: str) -> int:
+    if name not in PRIORITIES:
+        raise HTTPException(400, f"Unknown priority {name!r}; use {sorted(PRIORITIES)}")
+    return PRIORITIES[name]
+
+
+def _validate_plan(plan: dict) -> dict:
+    """The plan, repaired against the Camera state machine, or a 400 listing why not."""
+    result = validate_plan(
+        plan["agent_sequence"], plan["agent_states"], AGENT_NAMES, plan["query"]
+    )
+    if not result["valid"]:
+        raise HTTPException(
+            400, {"message": "Plan cannot run", "errors": result["errors"]}
+        )
+    return {
+        **plan,
+        "agent_sequence": result["agent_sequence"],
+        "agent_states": result["agent_states"],
+    }
+
+
+async def _plan_command(command: str) -> dict:
+    """
+    Route and plan a free-form command with a pooled agent set.
+
+    Returns:
+        dict: {"type": "CONVERSATION", "reply": ...} or
+        {"type": "TASK", "plan": {...}}
+    """
+    from src.utils.agent_utils import (
+        a_determine_agents,
+        a_interpret_query,
+        handle_conversation,
+    )
+    from src.utils.intent_classifier import get_default_classifier
+
+    async with state.agent_pool.a_checkout() as agents:
+        routed = get_default_classifier().route(command)
+        if routed is None:
+            routed = await a_interpret_query(command, agents.interpreter_agent)
+        msg_type, iterations, query = routed
+
+        if msg_type != "TASK":
+            reply = await run_blocking(
+                handle_conversation, command, agents.conversation_agent
+            )
+            return {"type": msg_type or "UNCLEAR", "reply": reply}
+
+        agent_sequence, agent_states = await a_determine_agents(
+            query, agents.manager_agent, agents.agent_map
+        )
+    return {
+        "type": "TASK",
+        "plan": {
+            "query": query,
+            "iterations": iterations or 1,
+            "agent_sequence": agent_sequence,
+            "agent_states": agent_states,
+        },
+    }
+
+
+def _submit(plan: dict, priority: int, source: str) -> dict:
+    try:
+        job_id = state.job_queue.submit(plan, priority=priority, source=source)
+    except AdmissionRejected as e:
+        return {
+            "status": "rejected",
+            "job_id": e.job_id,
+            "error": str(e),
+            "estimated_wait_s": e.estimated_wait,
+        }
+    return {"status": "queued", "job_id": job_id, "plan": plan}
+
+
+def _single(result: dict):
+    """A rejected single submission is answered with 429 Too Many Requests."""
+    if result["status"] == "rejected":
+        return ORJSONResponse(result, status_code=429)
+    return result
+
+
+async def _submit_command(
+    command: str, priority: int, deadline_s: float = None
+) -> dict:
+    planned = await _plan_command(command)
+    if planned["type"] != "TASK":
+        return {
+            "status": "answered",
+            "type": planned["type"],
+            "reply": planned["reply"],
+        }
+    if not planned["plan"]["agent_sequence"]:
+        return {"status": "no_action", "plan": planned["plan"]}
+    if deadline_s:
+        planned["plan"]["deadline_s"] = deadline_s
+    return await run_blocking(_submit, planned["plan"], priority, "api")
+
+
+async def _job_events(job_id: str):
+    """Yield a job's progress events as they appear, then the final job."""
+    seen, started_at = 0, None
+    while True:
+        job = await run_blocking(state.job_queue.get, job_id)
+        if job is None:
+            return
+        # A requeued job clears its progress and runs again from the start
+        if seen and (len(job["progress"]) < seen or job["started_at"] != started_at):
+            yield {"event": "requeued", "reason": job["error"]}
+            seen = 0
+        started_at = job["started_at"]
+        for event in job["progress"][seen:]:
+            yield event
+        seen = len(job["progress"])
+        if job["status"] in FINISHED_STATUSES:
+            yield {"event": "finished", "job": job}
+            return
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+
+def _has_api_key(headers) -> bool:
+    api_key = os.getenv("CAMERA_API_KEY")
+    if not api_key:
+        return True
+    return secrets.compare_digest(
+        (headers.get("authorization") or "").encode(), f"Bearer {api_key}".encode()
+    )
+
+
+def require_api_key(request: Request):
+    if not _has_api_key(request.headers):
+        raise HTTPException(401, "Invalid or missing API key")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from src.agents.agent_factory import build_agent_set
+    from src.agents.agent_pool import AgentPool
+
+    install_llm_executor()
+    state.job_queue = get_job_queue() or JobQueue()
+    if state.agent_pool is None:
+        state.agent_pool = AgentPool(size=int(os.getenv("AGENT_POOL_SIZE", "4")))
+    state.planning_slots = asyncio.Semaphore(state.agent_pool.size)
+    if os.getenv("CAMERA_JOB_WORKER", "1") != "0":
+        state.worker = JobWorker(
+            state.job_queue, make_workflow_handler(build_agent_set())
+        ).start()
+    try:
+        yield
+    finally:
+        if state.worker is not None:
+            state.worker.stop(timeout=5)
+
+
+app = FastAPI(
+    title="Camera agent API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+
+@app.post("/v1/commands", status_code=202, dependencies=[Depends(require_api_key)])
+async def submit_command(body: CommandRequest):
+    """Plan a free-form command and queue it; conversational input is answered."""
+    return _single(
+        await _submit_command(body.command, _priority(body.priority), body.deadline_s)
+    )
+
+
+@app.post("/v1/plans", status_code=202, dependencies=[Depends(require_api_key)])
+async def submit_plan(body: PlanRequest):
+    """Queue a pre-built plan without any LLM planning."""
+    plan = _validate_plan(body.model_dump(exclude={"priority"}, exclude_none=True))
+    return _single(await run_blocking(_submit, plan, _priority(body.priority), "api"))
+
+
+@app.post("/v1/batch", status_code=202, dependencies=[Depends(require_api_key)])
+async def submit_batch(request: Request):
+    """
+    Queue many commands and/or plans. Plans are queued directly. Commands
+    are planned concurrently, but no more at once than there are agent
+    sets, so items wait here rather than time out on the pool.
+    """
+    try:
+        body = BatchRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(400, f"Invalid batch: {e}")
+    if len(body.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(413, f"At most {MAX_BATCH_ITEMS} items per batch")
+    priority = _priority(body.priority)
+
+    async def submit_item(item: dict) -> dict:
+        try:
+            if "command" in item:
+                request = CommandRequest(**item)
+                async with state.planning_slots:
+                    return await _submit_command(
+                        request.command, priority, request.deadline_s
+                    )
+            plan = _validate_plan(
+                PlanRequest(**item).model_dump(exclude={"priority"}, exclude_none=True)
+            )
+            return await run_blocking(_submit, plan, priority, "api")
+        except HTTPException as e:
+            return {"status": "invalid", "error": e.detail}
+        except Exception as e:
+            return {"status": "invalid", "error": str(e)}
+
+    return {"results": await asyncio.gather(*(submit_item(i) for i in body.items))}
+
+
+@app.get("/v1/jobs/{job_id}", dependencies=[Depends(require_api_key)])
+async def get_job(job_id: str):
+    job = await run_blocking(state.job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(404, f"Job {job_id} not found")
+    return job
+
+
+@app.delete("/v1/jobs/{job_id}", dependencies=[Depends(require_api_key)])
+async def cancel_job(job_id: str):
+    if not await run_blocking(state.job_queue.cancel, job_id):
+        raise HTTPException(409, f"Job {job_id} is not queued or running")
+    return {"job_id": job_id, "cancel_requested": True}
+
+
+@app.get("/v1/jobs/{job_id}/events", dependencies=[Depends(require_api_key)])
+async def job_events(job_id: str):
+    """Server-sent events: one "data:" line per step event."""
+
+    async def stream():
+        async for event in _job_events(job_id):
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.websocket("/v1/jobs/{job_id}/ws")
+async def job_events_ws(websocket: WebSocket, job_id: str):
+    if not _has_api_key(websocket.headers):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    try:
+        async for event in _job_events(job_id):
+            await websocket.send_bytes(orjson.dumps(event))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/v1/metrics", dependencies=[Depends(require_api_key)])
+async def metrics():
+    from src.tools.device import get_device_metrics
+    from src.utils.http_pool import get_pool_metrics
+    from src.utils.llm_metrics import get_usage_summary
+    from src.utils.llm_router import get_router_metrics
+
+    return {
+        "job_queue": await run_blocking(state.job_queue.metrics),
+        "agent_pool": state.agent_pool.metrics(),
+        "device": get_device_metrics(),
+        "http_pool": get_pool_metrics(),
+        "llm_usage": get_usage_summary(),
+        "llm_router": get_router_metrics(),
+    }
+
+
+def create_app(pool_size: int = 4, ui: bool = True) -> FastAPI:
+    """The API app with a pool of pool_size agent sets, and the chat UI at /."""
+    from src.agents.agent_pool import AgentPool
+
+    state.agent_pool = AgentPool(size=pool_size)
+    if not ui:
+        return app
+
+    import gradio as gr
+
+    from src.utils.agent_utils import create_chat_interface
+
+    agents = state.agent_pool
+    with agents.checkout() as shared:
+        chat = create_chat_interface(
+            shared.interpreter_agent,
+            shared.manager_agent,
+            shared.agent_map,
+            shared.user_proxy_agent,
+            shared.conversation_agent,
+            agent_pool=agents,
+        )
+    return gr.mount_gradio_app(app, chat, path="/")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Camera agent API server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pool_size", type=int, default=4)
+    parser.add_argument("--no_ui", action="store_true", help="Do not mount Gradio")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.pool_size, ui=not args.no_ui), host=args.host, port=args.port
+    )
@@ -0,0 +1,425 @@
+"""
+Run time cost model for planned camera workflows.
+
+Predicts how long a plan from determine_agents will occupy a worker and
+its device before it is queued. Each step of a plan costs the LLM turns
+of its agent plus the tool's UI work: the fixed settle waits (opening
+the app, switching cameras, opening the Windows Studio Effects panel,
+toggling a switch) and the parts that depend on the step's arguments (a
+recording's duration, the photos after the first).
+
+Per agent the model learns from the step timings this host has
+recorded: the progress of finished jobs, regression results and workflow
+checkpoint journals. Runs on the simulated backend, whose timings are
+scaled, are left out. The argument-dependent part is taken off each
+sample, so a 60 second recording teaches the model about take_video's
+overhead, not about 60 second videos. Agents with fewer than
+MIN_SAMPLES samples fall back to a prior: the nominal UI waits of the
+tool (src/tools/tools.py) plus a typical LLM step overhead.
+
+A plan's estimate sums its steps over the iterations. The bounds assume
+the step times are independent and their sum roughly normal; the
+uncertainty about each agent's mean, which repeats in every iteration,
+is added in full rather than averaged out, so long plans on little
+history get honestly wide bounds.
+
+    model = CostModel.from_history(job_queue)
+    estimate = model.estimate(agent_sequence, agent_states, iterations=5)
+    estimate["mean_s"], estimate["low_s"], estimate["high_s"]
+    print(format_timeline(estimate))
+
+Usage:
+    python -m src.jobs.cost_model stats
+    python -m src.jobs.cost_model estimate --query "take 3 photos. Repeat 10 times"
+    python -m src.jobs.cost_model estimate --plan plan.json [--json]
+    python -m src.jobs.cost_model estimate --agents open_camera_agent take_video_agent
+        --states open_camera_agent "take_video_agent(duration=30)" --iterations 4
+        [--priors_only] [--confidence 0.95]
+
+Configuration (environment variables):
+    CAMERA_COST_STEP_OVERHEAD_S  LLM and dispatch seconds per step assumed
+                                 before there is history (default 4)
+    CAMERA_COST_MODEL_TTL_S      Seconds the shared model is reused before it
+                                 is refitted from history (default 300)
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import threading
+import time
+
+from src.utils.step_scheduler import step_args
+
+# Samples an agent needs before its history replaces the prior
+MIN_SAMPLES = 3
+
+# Latest samples per agent the model keeps
+MAX_SAMPLES_PER_AGENT = 200
+
+# Recent jobs, results and journals read when fitting from history
+HISTORY_LIMIT = 200
+
+# Floor on a step's standard deviation, as a fraction of its mean
+MIN_RELATIVE_SD = 0.1
+
+DEFAULT_STEP_OVERHEAD = 4.0
+STEP_OVERHEAD_CV = 0.5
+DEFAULT_CONFIDENCE = 0.9
+
+# Nominal UI seconds of each agent's tool, (low, high): the fixed ui_wait
+# calls it always makes and those it makes only from some states (panel
+# closed, wrong camera, switch in the other position)
+TOOL_WAITS = {
+    "open_camera_agent": (3.0, 3.0),
+    "close_camera_agent": (0.0, 0.5),
+    "minimize_camera_agent": (1.0, 1.0),
+    "restore_camera_agent": (1.0, 1.0),
+    "set_automatic_framing_agent": (0.0, 6.0),
+    "set_background_effects_agent": (0.0, 6.0),
+    "set_blur_type_agent": (0.0, 3.0),
+    "switch_camera_agent": (0.0, 2.0),
+    "camera_mode_agent": (0.0, 1.0),
+    "take_photo_agent": (2.0, 4.0),
+    "take_video_agent": (1.0, 3.0),
+}
+UNKNOWN_TOOL_WAIT = (0.0, 3.0)
+
+# Settle wait after each photo beyond the first
+PHOTO_WAIT = 2.0
+
+
+def variable_seconds(agent: str, action: str) -> float:
+    """
+    Seconds of a step that follow from its arguments: the recording of
+    take_video and the settle waits of extra photos.
+    """
+    args = step_args(action)
+    try:
+        if agent == "take_video_agent":
+            return max(float(args.get("duration", 0)), 0.0)
+        if agent == "take_photo_agent":
+            return PHOTO_WAIT * max(int(float(args.get("num_photos", 1))) - 1, 0)
+    except ValueError:
+        pass
+    return 0.0
+
+
+def step_overhead() -> float:
+    """Assumed LLM and dispatch seconds per step without history."""
+    return float(os.getenv("CAMERA_COST_STEP_OVERHEAD_S", DEFAULT_STEP_OVERHEAD))
+
+
+def load_step_samples(
+    job_queue=None, results_store=None, journal_dir=None, limit: int = HISTORY_LIMIT
+) -> list:
+    """
+    Step timings recorded on this host, newest first per source.
+
+    Args:
+        job_queue: JobQueue whose finished jobs to read, or None to skip
+        results_store: ResultsStore whose regression results to read, or
+            None for the shared store
+        journal_dir: Checkpoint journal directory, CAMERA_CHECKPOINT_DIR if None
+        limit: Jobs, results and journals read from each source
+
+    Returns:
+        list: {"agent", "action", "elapsed"} per recorded step, without
+        those recorded on the simulated backend
+    """
+    from src.regression.results_store import get_results_store
+    from src.utils.workflow_journal import WorkflowJournal, get_journal_dir
+
+    samples = []
+    if job_queue is not None:
+        samples += job_queue.recent_steps(limit)
+    samples += (results_store or get_results_store()).recent_steps(limit)
+
+    paths = sorted(
+        get_journal_dir(journal_dir).glob("*.jsonl"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for path in paths[:limit]:
+        try:
+            journal = WorkflowJournal.open(path.stem, journal_dir)
+        except (OSError, ValueError):
+            continue
+        samples += [
+            {
+                "agent": record["agent"],
+                "action": record["action"],
+                "elapsed": record["elapsed"],
+                "device": journal.plan.get("backend"),
+            }
+            for record in journal.records
+            if record["type"] == "step"
+        ]
+    return [s for s in samples if s.get("device") != "simulated"]
+
+
+class CostModel:
+    """Per-agent step time statistics and plan estimates built from them."""
+
+    def __init__(self, samples=(), min_samples: int = MIN_SAMPLES):
+        """
+        Args:
+            samples: {"agent", "action", "elapsed"} step timings, newest first
+            min_samples: Samples an agent needs before its history is used
+        """
+        self.min_samples = min_samples
+        residuals = {}
+        for sample in samples:
+            if sample.get("elapsed") is None:
+                continue
+            agent = sample["agent"]
+            values = residuals.setdefault(agent, [])
+            if len(values) < MAX_SAMPLES_PER_AGENT:
+                values.append(
+                    max(
+                        sample["elapsed"] - variable_seconds(agent, sample["action"]), 0
+                    )
+                )
+        self.stats = {
+            agent: {
+                "samples": len(values),
+                "mean_s": statistics.fmean(values),
+                "sd_s": statistics.stdev(values) if len(values) > 1 else 0.0,
+            }
+            for agent, values in residuals.items()
+        }
+
+        # Overhead beyond the nominal tool waits, for agents without history
+        overheads = [
+            s["mean_s"] - sum(TOOL_WAITS.get(agent, UNKNOWN_TOOL_WAIT)) / 2
+            for agent, s in self.stats.items()
+            if s["samples"] >= min_samples
+        ]
+        self.step_overhead = (
+            max(statistics.median(overheads), 0.0) if overheads else step_overhead()
+        )
+
+    @classmethod
+    def from_history(cls, job_queue=None, **kwargs) -> "CostModel":
+        """Fit a model to load_step_samples(job_queue, **kwargs)."""
+        return cls(load_step_samples(job_queue, **kwargs))
+
+    def step_estimate(self, agent: str, action: str) -> dict:
+        """
+        Expected duration of one step.
+
+        Returns:
+            dict: agent, action, mean_s and sd_s (the step's spread from run
+            to run), se_s (uncertainty of mean_s itself), device_s (nominal
+            time in the tool), source ("history" or "prior") and samples
+        """
+        variable = variable_seconds(agent, action)
+        low, high = TOOL_WAITS.get(agent, UNKNOWN_TOOL_WAIT)
+        device = (low + high) / 2 + variable
+        stats = self.stats.get(agent)
+        if stats and stats["samples"] >= self.min_samples:
+            fixed = stats["mean_s"]
+            sd = max(stats["sd_s"], MIN_RELATIVE_SD * fixed)
+            se = sd / math.sqrt(stats["samples"])
+            source, samples = "history", stats["samples"]
+            device = min(device, fixed + variable)
+        else:
+            # The waits span (low, high) as about +-2 sd; a prior counts as one sample
+            fixed = (low + high) / 2 + self.step_overhead
+            sd = math.hypot((high - low) / 4, STEP_OVERHEAD_CV * self.step_overhead)
+            sd = max(sd, MIN_RELATIVE_SD * fixed)
+            se = sd
+            source, samples = "prior", stats["samples"] if stats else 0
+        return {
+            "agent": agent,
+            "action": action,
+            "mean_s": fixed + variable,
+            "sd_s": sd,
+            "se_s": se,
+            "device_s": device,
+            "source": source,
+            "samples": samples,
+        }
+
+    def estimate(
+        self,
+        agent_sequence: list,
+        agent_states: list,
+        iterations: int = 1,
+        confidence: float = DEFAULT_CONFIDENCE,
+    ) -> dict:
+        """
+        Predict the run time of a planned workflow.
+
+        Args:
+            agent_sequence: Agent names from determine_agents
+            agent_states: Intended action of each agent
+            iterations: Times the sequence runs
+            confidence: Probability the run time falls within the bounds
+
+        Returns:
+            dict: steps (step_estimate of each), iterations, iteration_s,
+            mean_s, sd_s, low_s and high_s (the confidence bounds), device_s
+            (nominal tool time of the whole run), confidence and
+            history_steps (steps estimated from history)
+        """
+        iterations = max(int(iterations or 1), 1)
+        steps = [
+            self.step_estimate(agent, action)
+            for agent, action in zip(agent_sequence, agent_states)
+        ]
+        iteration_s = sum(s["mean_s"] for s in steps)
+        mean = iterations * iteration_s
+        # Run-to-run spread averages out over iterations; errors in the
+        # per-agent means repeat in every iteration, so they add up linearly
+        variance = iterations * sum(s["sd_s"] ** 2 for s in steps)
+        variance += (iterations * sum(s["se_s"] for s in steps)) ** 2
+        sd = math.sqrt(variance)
+        z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        # No run is shorter than the recordings it makes
+        floor = iterations * sum(
+            variable_seconds(s["agent"], s["action"]) for s in steps
+        )
+        return {
+            "steps": steps,
+            "iterations": iterations,
+            "iteration_s": iteration_s,
+            "mean_s": mean,
+            "sd_s": sd,
+            "low_s": max(mean - z * sd, floor),
+            "high_s": mean + z * sd,
+            "device_s": iterations * sum(s["device_s"] for s in steps),
+            "confidence": confidence,
+            "history_steps": sum(s["source"] == "history" for s in steps),
+        }
+
+    def agent_stats(self) -> list:
+        """Every known agent with the estimate of its step without arguments."""
+        agents = sorted(set(TOOL_WAITS) | set(self.stats))
+        return [self.step_estimate(agent, agent) for agent in agents]
+
+
+_model = None
+_model_at = 0.0
+_model_lock = threading.Lock()
+
+
+def get_cost_model(job_queue=None) -> CostModel:
+    """
+    Shared CostModel, refitted from history once it is older than
+    CAMERA_COST_MODEL_TTL_S.
+
+    Args:
+        job_queue: Queue whose finished jobs to learn from; the configured
+            queue (get_job_queue) if None
+    """
+    global _model, _model_at
+    ttl = float(os.getenv("CAMERA_COST_MODEL_TTL_S", "300"))
+    with _model_lock:
+        if _model is None or time.monotonic() - _model_at > ttl:
+            if job_queue is None:
+                from src.jobs.job_queue import get_job_queue
+
+                job_queue = get_job_queue()
+            _model = CostModel.from_history(job_queue)
+            _model_at = time.monotonic()
+        return _model
+
+
+def estimate_plan(plan: dict, model: CostModel = None, **kwargs) -> dict:
+    """CostModel.estimate of a plan dict (agent_sequence, agent_states, iterations)."""
+    return (model or get_cost_model()).estimate(
+        plan["agent_sequence"],
+        plan["agent_states"],
+        plan.get("iterations", 1),
+        **kwargs,
+    )
+
+
+def format_estimate(estimate: dict) -> str:
+    return (
+        f"Estimated run time {estimate['mean_s']:.0f}s "
+        f"({estimate['confidence']:.0%}: {estimate['low_s']:.0f}-"
+        f"{estimate['high_s']:.0f}s), {estimate['device_s']:.0f}s in the camera "
+        f"tools; {estimate['history_steps']}/{len(estimate['steps'])} steps "
+        "from history"
+    )
+
+
+def format_timeline(estimate: dict, max_iterations: int = 3) -> str:
+    """
+    Expected start and end of each step, for dry runs.
+
+    Only the first max_iterations iterations are listed step by step;
+    the rest are summarised.
+    """
+    lines = [f"{'start':>8} {'end':>8}  {'step':<6} action"]
+    clock = 0.0
+    shown = min(estimate["iterations"], max_iterations)
+    for iteration in range(1, shown + 1):
+        for number, step in enumerate(estimate["steps"], start=1):
+            end = clock + step["mean_s"]
+            lines.append(
+                f"{clock:>7.1f}s {end:>7.1f}s  {iteration}.{number:<4} "
+                f"{step['action']}  (+-{step['sd_s']:.1f}s, {step['source']})"
+            )
+            clock = end
+    if estimate["iterations"] > shown:
+        rest = estimate["iterations"] - shown
+        lines.append(
+            f"{clock:>7.1f}s {estimate['mean_s']:>7.1f}s  "
+            f"{rest} more iteration(s) of {estimate['iteration_s']:.1f}s"
+        )
+    lines.append(format_estimate(estimate))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workflow run time estimates")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Per-agent step estimates and their source")
+    estimate = sub.add_parser("estimate", help="Estimate a plan without running it")
+    source = estimate.add_mutually_exclusive_group(required=True)
+    source.add_argument("--query", type=str, help="Plan the query with the LLM first")
+    source.add_argument("--plan", type=str, help="JSON file with a planned workflow")
+    source.add_argument("--agents", nargs="+", help="Agent sequence")
+    estimate.add_argument("--states", nargs="+", help="Agent states for --agents")
+    estimate.add_argument("--iterations", type=int, help="Override the iterations")
+    estimate.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    estimate.add_argument(
+        "--priors_only", action="store_true", help="Ignore recorded history"
+    )
+    estimate.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        model = get_cost_model()
+        print(f"Step overhead {model.step_overhead:.1f}s")
+        for s in model.agent_stats():
+            print(
+                f"{s['agent']:<30} {s['mean_s']:>6.1f}s +-{s['sd_s']:>5.1f}s  "
+                f"{s['source']:<7} {s['samples']} samples"
+            )
+    else:
+        if args.query:
+            from src.utils.agent_utils import plan_query
+
+            plan = plan_query(args.query)
+        elif args.plan:
+            with open(args.plan, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+        else:
+            plan = {
+                "agent_sequence": args.agents,
+                "agent_states": args.states or args.agents,
+            }
+        if args.iterations:
+            plan["iterations"] = args.iterations
+        model = CostModel() if args.priors_only else get_cost_model()
+        result = estimate_plan(plan, model, confidence=args.confidence)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(format_timeline(result))
@@ -0,0 +1,302 @@
+"""
+Fleet dispatcher: runs queued camera jobs across many tool daemons.
+
+Each registered device (a host running src/tools/daemon.py) gets its own
+worker thread and agent set. The worker claims jobs from the shared job
+queue and sends its tool calls to its device. A job whose payload has a
+"device" key only runs on that device; all other jobs go to whichever
+device is free first. A health-check thread pings every daemon. Devices
+that stop answering take no new jobs, and a job that lost its device
+mid-run goes back in the queue for another device.
+
+Devices come from config/devices.json:
+    [{"name": "lab-01", "url": "http://lab-01:8770"}, ...]
+
+Usage:
+    python -m src.jobs.dispatcher [--devices config/devices.json]
+    python -m src.jobs.dispatcher --device lab-01=http://lab-01:8770 --device ...
+    python -m src.jobs.dispatcher --local 3     # 3 simulated daemons on this host
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from src.jobs.job_queue import (
+    QUEUED,
+    JobQueue,
+    JobRetry,
+    JobWorker,
+    make_workflow_handler,
+)
+from src.tools.remote import (
+    DeviceUnavailable,
+    RemoteDevice,
+    track_device_loss,
+    use_device,
+)
+
+DEFAULT_DEVICES_PATH = Path(__file__).resolve().parents[2] / "config" / "devices.json"
+
+# Seconds between health checks of every device
+HEALTH_INTERVAL = 10.0
+
+
+def load_devices(path=None) -> list:
+    """
+    Read device definitions.
+
+    Returns:
+        list: RemoteDevice per entry of the JSON list
+    """
+    with open(path or DEFAULT_DEVICES_PATH, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [
+        RemoteDevice(entry["name"], entry["url"], entry.get("api_key"))
+        for entry in entries
+    ]
+
+
+class DeviceWorker(JobWorker):
+    """JobWorker bound to one remote device."""
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        handler,
+        device: RemoteDevice,
+        poll_interval: float = 0.5,
+    ):
+        super().__init__(job_queue, self._run_on_device, poll_interval)
+        self.device_handler = handler
+        self.device = device
+        self.name = f"{self.name}:{device.name}"
+        self.current_job = None
+        self.jobs_run = 0
+        self.jobs_requeued = 0
+
+    def claim(self) -> dict:
+        if not self.device.healthy:
+            return None
+        return self.queue.claim(self.name, device=self.device.name)
+
+    def _run_on_device(self, payload: dict, report) -> dict:
+        try:
+            with use_device(self.device), track_device_loss() as losses:
+                result = self.device_handler(payload, report)
+        except DeviceUnavailable as e:
+            raise JobRetry(str(e))
+        # Tool errors reach the agents as strings, so a lost device only
+        # shows up in the losses recorded for this job's own calls
+        if losses:
+            raise JobRetry(f"Device unavailable: {losses[-1]}")
+        return result
+
+    def execute(self, job: dict) -> None:
+        self.current_job = job["id"]
+        try:
+            super().execute(job)
+        finally:
+            self.current_job = None
+        if self.queue.get(job["id"])["status"] == QUEUED:
+            self.jobs_requeued += 1
+        else:
+            self.jobs_run += 1
+
+
+class Dispatcher:
+    """One DeviceWorker per device plus a health-check thread."""
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        devices: list,
+        llm_config: dict = None,
+        health_interval: float = HEALTH_INTERVAL,
+    ):
+        """
+        Args:
+            job_queue: Queue the workers drain
+            devices: RemoteDevice instances
+            llm_config: llm_config for the per-device agent sets
+            health_interval: Seconds between health checks
+        """
+        from src.agents.agent_factory import build_agent_set
+
+        if not devices:
+            raise ValueError("The dispatcher needs at least one device")
+        self.queue = job_queue
+        self.queue.parallelism = len(devices)
+        self.health_interval = health_interval
+        self.workers = []
+        for device in devices:
+            # Whatever CAMERA_BACKEND says, fleet workers drive their device
+            agents = build_agent_set(llm_config, backend="remote")
+            self.workers.append(
+                DeviceWorker(job_queue, make_workflow_handler(agents), device)
+            )
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    def check_health(self) -> None:
+        for worker in self.workers:
+            device = worker.device
+            was_healthy = device.healthy
+            if device.check_health() != was_healthy:
+                state = (
+                    "healthy" if device.healthy else f"unhealthy ({device.last_error})"
+                )
+                print(f"Device {device.name} is {state}")
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                print(f"Error in device health check: {e}")
+
+    def start(self) -> "Dispatcher":
+        self.check_health()
+        for worker in self.workers:
+            worker.start()
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name="camera-device-health", daemon=True
+        )
+        self._health_thread.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        for worker in self.workers:
+            worker.stop(timeout)
+        for worker in self.workers:
+            worker.device.close()
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            self.stop(timeout=5)
+
+    def metrics(self) -> dict:
+        """
+        Per-device health and throughput plus the queue metrics.
+
+        Returns:
+            dict: {"devices": {name: {...}}, "job_queue": {...}}
+        """
+        devices = {}
+        for worker in self.workers:
+            device = worker.device
+            devices[device.name] = {
+                "url": device.url,
+                "healthy": device.healthy,
+                "latency_ms": device.latency_ms,
+                "last_check": device.last_check,
+                "last_error": device.last_error,
+                "failures": device.failures,
+                "tool_calls": device.calls,
+                "current_job": worker.current_job,
+                "jobs_run": worker.jobs_run,
+                "jobs_requeued": worker.jobs_requeued,
+            }
+        return {"devices": devices, "job_queue": self.queue.metrics()}
+
+
+def format_dispatcher_metrics(metrics: dict) -> str:
+    lines = []
+    for name, device in metrics["devices"].items():
+        state = "up" if device["healthy"] else "DOWN"
+        latency = (
+            f"{device['latency_ms']:.0f}ms" if device["latency_ms"] is not None else "-"
+        )
+        lines.append(
+            f"{name} [{state}] ping {latency}, {device['jobs_run']} jobs, "
+            f"{device['jobs_requeued']} requeued, {device['failures']} failures"
+            + (f", running {device['current_job']}" if device["current_job"] else "")
+        )
+    return "\n".join(lines)
+
+
+def start_local_daemons(count: int, base_port: int = 8770) -> tuple:
+    """
+    Start simulated tool daemons as subprocesses of this host.
+
+    Returns:
+        tuple: (processes, devices)
+    """
+    processes, devices = [], []
+    for i in range(count):
+        port = base_port + i
+        name = f"sim-{i + 1:02d}"
+        processes.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "src.tools.daemon",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(port),
+                    "--backend",
+                    "simulated",
+                    "--device_id",
+                    name,
+                ],
+                cwd=Path(__file__).resolve().parents[2],
+            )
+        )
+        devices.append(RemoteDevice(name, f"http://127.0.0.1:{port}"))
+
+    deadline = time.monotonic() + 30
+    while not all(device.check_health() for device in devices):
+        if time.monotonic() > deadline:
+            for process in processes:
+                process.terminate()
+            raise RuntimeError("Local tool daemons did not start within 30s")
+        time.sleep(0.5)
+    return processes, devices
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Dispatch queued camera jobs across tool daemons"
+    )
+    parser.add_argument("--db", type=str, help="Job queue SQLite file")
+    parser.add_argument(
+        "--devices", type=str, help="Devices JSON file (default config/devices.json)"
+    )
+    parser.add_argument(
+        "--device", action="append", default=[], metavar="NAME=URL", help="Add a device"
+    )
+    parser.add_argument(
+        "--local", type=int, default=0, help="Start N simulated daemons locally"
+    )
+    parser.add_argument("--health_interval", type=float, default=HEALTH_INTERVAL)
+    args = parser.parse_args()
+
+    processes = []
+    if args.local:
+        processes, devices = start_local_daemons(args.local)
+    elif args.device:
+        devices = [RemoteDevice(*spec.split("=", 1)) for spec in args.device]
+    else:
+        devices = load_devices(args.devices)
+
+    dispatcher = Dispatcher(
+        JobQueue(args.db), devices, health_interval=args.health_interval
+    )
+    print(f"Dispatching {dispatcher.queue.path} across {len(devices)} devices")
+    try:
+        dispatcher.run_forever()
+    finally:
+        print(format_dispatcher_metrics(dispatcher.metrics()))
+        for process in processes:
+            process.terminate()
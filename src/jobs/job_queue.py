@@ -0,0 +1,867 @@
+"""
+Persistent job queue in front of the camera workflow.
+
+There is one Camera app per host, so every process that wants to drive it
+(the Gradio server, CLI runs, regression batches) submits a job here and
+a single worker per host executes them in priority order. Jobs are plain
+JSON: the planned workflow (query, iterations, agent sequence and
+states, and an optional deadline_s). The submitter plans and the worker
+only executes. Cancelling a running job stops it at its next tool call.
+Planned jobs are stamped with the cost model's run time estimate
+(estimate_s, src/jobs/cost_model.py), which the wait estimates of
+admission control add up instead of the mean run time.
+
+    queue = JobQueue()
+    job_id = queue.submit({"query": ..., "iterations": 1,
+                           "agent_sequence": [...], "agent_states": [...]})
+    queue.get(job_id)["status"]
+
+Usage:
+    python -m src.jobs.job_queue worker
+    python -m src.jobs.job_queue submit --query "turn on autoframing" [--batch]
+        [--deadline 300]
+    python -m src.jobs.job_queue status JOB_ID
+    python -m src.jobs.job_queue cancel JOB_ID
+    python -m src.jobs.job_queue metrics
+
+Configuration (environment variables):
+    CAMERA_JOB_QUEUE_DB         SQLite file (default data/jobs.sqlite3)
+    CAMERA_JOB_LATENCY_BUDGET   Seconds of expected queueing before admission
+                                control kicks in (default 120)
+    CAMERA_JOB_MAX_DEPTH        Queued jobs beyond which everything is
+                                rejected (default 200)
+    CAMERA_JOB_PARALLELISM      Workers draining the queue, e.g. the devices
+                                behind a fleet dispatcher (default 1)
+    CAMERA_JOB_LEASE_S          Seconds without a heartbeat after which a
+                                running job counts as orphaned by a crashed
+                                worker and is queued again (default 60)
+    CAMERA_WORKFLOW_DEADLINE_S  Deadline of jobs without deadline_s, in
+                                seconds of running (default: none)
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from src.utils.cancellation import (
+    Cancelled,
+    CancellationToken,
+    cancel_scope,
+    default_deadline,
+)
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "jobs.sqlite3"
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_DEFERRED = 20
+
+PRIORITIES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "batch": PRIORITY_BATCH,
+    "deferred": PRIORITY_DEFERRED,
+}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+REJECTED = "rejected"
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED, REJECTED)
+
+# Run time assumed for admission control until jobs have completed
+DEFAULT_EXPECTED_RUNTIME = 30.0
+
+# Completed jobs used for wait/run time statistics
+STATS_WINDOW = 200
+
+# Seconds without a heartbeat before a running job is requeued
+DEFAULT_LEASE = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    source TEXT,
+    payload TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '[]',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority, submitted_at);
+"""
+
+
+class AdmissionRejected(Exception):
+    """The queue is over its latency budget or depth limit."""
+
+    def __init__(self, message: str, job_id: str, estimated_wait: float):
+        super().__init__(message)
+        self.job_id = job_id
+        self.estimated_wait = estimated_wait
+
+
+class JobQueue:
+    """SQLite-backed priority queue of camera workflow jobs."""
+
+    def __init__(
+        self,
+        path=None,
+        latency_budget: float = None,
+        max_depth: int = None,
+        parallelism: int = None,
+    ):
+        """
+        Args:
+            path: SQLite file, CAMERA_JOB_QUEUE_DB or data/jobs.sqlite3 if None
+            latency_budget: Seconds of expected wait an interactive job may
+                face before it is rejected (batch jobs are deferred instead)
+            max_depth: Queued jobs beyond which every submission is rejected
+            parallelism: Jobs that run at once, used to estimate waits
+        """
+        self.path = Path(path or os.getenv("CAMERA_JOB_QUEUE_DB") or DEFAULT_DB_PATH)
+        self.latency_budget = (
+            latency_budget
+            if latency_budget is not None
+            else float(os.getenv("CAMERA_JOB_LATENCY_BUDGET", "120"))
+        )
+        self.max_depth = (
+            max_depth
+            if max_depth is not None
+            else int(os.getenv("CAMERA_JOB_MAX_DEPTH", "200"))
+        )
+        self.parallelism = max(
+            parallelism or int(os.getenv("CAMERA_JOB_PARALLELISM", "1")), 1
+        )
+        self.lease = float(os.getenv("CAMERA_JOB_LEASE_S", str(DEFAULT_LEASE)))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "heartbeat_at" not in columns:
+                # Queues created before worker leases
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, row) -> dict:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def expected_runtime(self) -> float:
+        """Mean run time of recently completed jobs."""
+        row = (
+            self._connect()
+            .execute(
+                "SELECT AVG(finished_at - started_at) FROM (SELECT started_at, finished_at "
+                "FROM jobs WHERE status IN (?, ?) AND started_at IS NOT NULL "
+                "ORDER BY finished_at DESC LIMIT ?)",
+                (SUCCEEDED, FAILED, STATS_WINDOW),
+            )
+            .fetchone()
+        )
+        return row[0] if row and row[0] is not None else DEFAULT_EXPECTED_RUNTIME
+
+    def recent_steps(self, limit: int = STATS_WINDOW) -> list:
+        """
+        Per-step timings reported by the latest finished jobs, newest first.
+
+        Returns:
+            list: {"agent", "action", "elapsed"} per completed step
+        """
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT progress FROM jobs WHERE status IN (?, ?) "
+                "ORDER BY finished_at DESC LIMIT ?",
+                (SUCCEEDED, FAILED, limit),
+            )
+            .fetchall()
+        )
+        return [
+            {
+                "agent": event["agent"],
+                "action": event["action"],
+                "elapsed": event["elapsed"],
+            }
+            for row in rows
+            for event in json.loads(row[0])
+            if event.get("event") == "step_end"
+        ]
+
+    def queued_work(self, priority: int = None) -> float:
+        """
+        Seconds of queued work, at or above priority if given: each job's
+        cost-model estimate, or the mean run time for jobs without one.
+        """
+        sql = (
+            "SELECT COALESCE(SUM(COALESCE(json_extract(payload, '$.estimate_s'), ?)), 0) "
+            "FROM jobs WHERE status = ?"
+        )
+        params = [self.expected_runtime(), QUEUED]
+        if priority is not None:
+            sql += " AND priority <= ?"
+            params.append(priority)
+        return self._connect().execute(sql, params).fetchone()[0]
+
+    def estimated_wait(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """
+        Seconds a job submitted now at this priority is expected to queue:
+        the jobs ahead of it plus the remainder of the running ones, shared
+        between the parallel workers. Jobs are counted at their cost-model
+        estimate (payload estimate_s) when they have one.
+        """
+        runtime = self.expected_runtime()
+        running = (
+            self._connect()
+            .execute(
+                "SELECT started_at, json_extract(payload, '$.estimate_s') FROM jobs "
+                "WHERE status = ?",
+                (RUNNING,),
+            )
+            .fetchall()
+        )
+        remaining = sum(
+            max((r[1] or runtime) - (time.time() - r[0]), 0.0) for r in running
+        )
+        return (self.queued_work(priority) + remaining) / self.parallelism
+
+    def submit(
+        self,
+        payload: dict,
+        priority: int = PRIORITY_INTERACTIVE,
+        source: str = None,
+        job_id: str = None,
+    ) -> str:
+        """
+        Queue a job, applying admission control.
+
+        Interactive jobs over the latency budget are rejected; batch jobs are
+        deferred to run after everything else. Rejected submissions are
+        recorded so they show up in the metrics.
+
+        Args:
+            payload: JSON-serialisable job description
+            priority: PRIORITY_INTERACTIVE, PRIORITY_BATCH or a custom value
+            source: Free-form submitter label, e.g. "gradio" or "cli"
+            job_id: Explicit id, generated if None
+
+        Returns:
+            str: The job id
+
+        Raises:
+            AdmissionRejected: When the job is not admitted
+        """
+        job_id = job_id or uuid.uuid4().hex
+        if "agent_sequence" in payload and "estimate_s" not in payload:
+            payload = {**payload, "estimate_s": _estimate_runtime(payload, self)}
+        conn = self._connect()
+        depth = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+        ).fetchone()[0]
+        wait = self.estimated_wait(priority)
+
+        status, reason = QUEUED, None
+        if depth >= self.max_depth:
+            status = REJECTED
+            reason = f"queue depth {depth} at limit {self.max_depth}"
+        elif wait > self.latency_budget:
+            if priority <= PRIORITY_INTERACTIVE:
+                status = REJECTED
+                reason = (
+                    f"estimated wait {wait:.0f}s exceeds budget "
+                    f"{self.latency_budget:.0f}s"
+                )
+            else:
+                priority = max(priority, PRIORITY_DEFERRED)
+
+        now = time.time()
+        conn.execute(
+            "INSERT INTO jobs (id, priority, status, source, payload, error, "
+            "submitted_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job_id,
+                priority,
+                status,
+                source,
+                json.dumps(payload),
+                reason,
+                now,
+                now if status == REJECTED else None,
+            ),
+        )
+        if status == REJECTED:
+            raise AdmissionRejected(f"Job rejected: {reason}", job_id, wait)
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        """Job row with decoded payload, progress and result, or None."""
+        row = (
+            self._connect()
+            .execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            .fetchone()
+        )
+        job = self._row(row)
+        if job is not None and job["status"] == QUEUED:
+            job["position"] = (
+                self._connect()
+                .execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND "
+                    "(priority < ? OR (priority = ? AND submitted_at < ?))",
+                    (QUEUED, job["priority"], job["priority"], job["submitted_at"]),
+                )
+                .fetchone()[0]
+            )
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. Queued jobs are cancelled immediately; running jobs are
+        flagged and stop at the handler's next cancellation check.
+
+        Returns:
+            bool: False if the job does not exist or has already finished
+        """
+        conn = self._connect()
+        now = time.time()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = 1 "
+            "WHERE id = ? AND status = ?",
+            (CANCELLED, now, job_id, QUEUED),
+        )
+        if cursor.rowcount:
+            return True
+        cursor = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+            (job_id, RUNNING),
+        )
+        return bool(cursor.rowcount)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        row = (
+            self._connect()
+            .execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))
+            .fetchone()
+        )
+        return bool(row and row[0])
+
+    def claim(self, worker: str = None, device: str = None) -> dict:
+        """
+        Atomically move the highest-priority queued job to running.
+
+        Args:
+            worker: Name recorded on the job
+            device: Only claim jobs pinned to this device (payload "device")
+                or not pinned at all; any job if None
+        """
+        query = "SELECT id FROM jobs WHERE status = ?"
+        params = [QUEUED]
+        if device is not None:
+            query += (
+                " AND (json_extract(payload, '$.device') IS NULL"
+                " OR json_extract(payload, '$.device') = ?)"
+            )
+            params.append(device)
+        query += " ORDER BY priority, submitted_at LIMIT 1"
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, "
+                "worker = ? WHERE id = ?",
+                (RUNNING, now, now, worker, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def heartbeat(self, job_id: str) -> None:
+        """Renew the lease of a running job."""
+        self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+            (time.time(), job_id, RUNNING),
+        )
+
+    def add_progress(self, job_id: str, event: dict) -> None:
+        """Append a JSON-serialisable progress event to a running job."""
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET progress = json_insert(progress, '$[#]', json(?)), "
+            "heartbeat_at = ? WHERE id = ?",
+            (json.dumps(event, default=str), time.time(), job_id),
+        )
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result=None,
+        error: str = None,
+        worker: str = None,
+    ) -> bool:
+        """
+        Record the outcome of a running job.
+
+        Args:
+            worker: Only finish the job if this worker still runs it; a
+                worker whose lease ran out must not overwrite the run that
+                replaced it. Any worker if None.
+
+        Returns:
+            bool: False if the job is no longer running (for worker)
+        """
+        query = (
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND status = ?"
+        )
+        params = [
+            status,
+            json.dumps(result, default=str) if result is not None else None,
+            error,
+            time.time(),
+            job_id,
+            RUNNING,
+        ]
+        if worker is not None:
+            query += " AND worker = ?"
+            params.append(worker)
+        return bool(self._connect().execute(query, params).rowcount)
+
+    def requeue(self, job_id: str, reason: str = None, worker: str = None) -> bool:
+        """
+        Put a running job back in the queue, e.g. after its device went away.
+        Progress is cleared since the job will run again from the start.
+
+        Args:
+            worker: Only requeue the job if this worker still runs it
+        """
+        query = (
+            "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL, "
+            "worker = NULL, progress = '[]', error = ? WHERE id = ? AND status = ?"
+        )
+        params = [QUEUED, reason, job_id, RUNNING]
+        if worker is not None:
+            query += " AND worker = ?"
+            params.append(worker)
+        return bool(self._connect().execute(query, params).rowcount)
+
+    def requeue_stale(self, lease: float = None) -> int:
+        """
+        Put jobs left running by a crashed worker back in the queue.
+
+        A live worker renews its job's heartbeat while it runs (JobWorker),
+        so a job whose heartbeat is older than the lease has lost its
+        worker, whichever host or process that was. Progress is cleared as
+        in requeue.
+
+        Args:
+            lease: Seconds without a heartbeat, self.lease if None; 0
+                requeues every running job
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        lease = self.lease if lease is None else lease
+        cutoff = time.time() - lease
+        return (
+            self._connect()
+            .execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL, "
+                "worker = NULL, progress = '[]', error = ? WHERE status = ? AND "
+                "COALESCE(heartbeat_at, started_at, 0) <= ?",
+                (QUEUED, f"No heartbeat for {lease:g}s", RUNNING, cutoff),
+            )
+            .rowcount
+        )
+
+    def wait(self, job_id: str, timeout: float = None, poll_interval: float = 0.5):
+        """
+        Block until a job finishes.
+
+        Returns:
+            dict: The final job, or its current state on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def metrics(self) -> dict:
+        """
+        Queue depth, wait and run time statistics for capacity planning.
+
+        Returns:
+            dict: Queued/running counts (total and per priority), age of the
+            oldest queued job, mean/p95/max wait and mean run time over the
+            last STATS_WINDOW started jobs, finished counts per status and
+            the current estimated wait for an interactive job
+        """
+        conn = self._connect()
+        now = time.time()
+        counts = dict(
+            conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        )
+        by_priority = dict(
+            conn.execute(
+                "SELECT priority, COUNT(*) FROM jobs WHERE status = ? GROUP BY priority",
+                (QUEUED,),
+            ).fetchall()
+        )
+        oldest = conn.execute(
+            "SELECT MIN(submitted_at) FROM jobs WHERE status = ?", (QUEUED,)
+        ).fetchone()[0]
+        recent = conn.execute(
+            "SELECT started_at - submitted_at, finished_at - started_at FROM jobs "
+            "WHERE started_at IS NOT NULL ORDER BY started_at DESC LIMIT ?",
+            (STATS_WINDOW,),
+        ).fetchall()
+        waits = sorted(r[0] for r in recent)
+        runtimes = [r[1] for r in recent if r[1] is not None]
+
+        return {
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "queued_by_priority": {str(k): v for k, v in by_priority.items()},
+            "oldest_queued_age_s": now - oldest if oldest else 0.0,
+            "wait_mean_s": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_s": _percentile(waits, 95) if waits else 0.0,
+            "wait_max_s": waits[-1] if waits else 0.0,
+            "runtime_mean_s": sum(runtimes) / len(runtimes) if runtimes else 0.0,
+            "succeeded": counts.get(SUCCEEDED, 0),
+            "failed": counts.get(FAILED, 0),
+            "cancelled": counts.get(CANCELLED, 0),
+            "rejected": counts.get(REJECTED, 0),
+            "queued_work_s": self.queued_work(),
+            "estimated_wait_s": self.estimated_wait(PRIORITY_INTERACTIVE),
+        }
+
+
+def _percentile(samples: list, q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class JobCancelled(Exception):
+    """Raised by a handler's progress callback once cancellation is requested."""
+
+
+class JobRetry(Exception):
+    """Raised by a handler to put its job back in the queue, e.g. on a lost device."""
+
+
+class JobWorker:
+    """
+    Executes queued jobs one at a time, in a background thread or in the
+    foreground with run_forever().
+
+    The handler is called as handler(payload, report) and returns a
+    JSON-serialisable result. report(event) records a progress event and
+    raises JobCancelled if the job has been cancelled.
+
+    The handler runs in the cancel_scope of a CancellationToken that polls
+    the job's cancel flag and expires after the payload's deadline_s
+    (CAMERA_WORKFLOW_DEADLINE_S by default), so a cancelled or overdue job
+    also stops inside a step, at its next tool call or recording wait.
+
+    While a job runs, a heartbeat thread renews its lease. Every worker
+    requeues jobs whose lease has run out, so the jobs of a worker that
+    crashed run again even if it never comes back.
+    """
+
+    def __init__(self, job_queue: JobQueue, handler, poll_interval: float = 0.5):
+        self.queue = job_queue
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_stale_check = 0.0
+
+    def run_one(self) -> bool:
+        """Execute the next job, if any. Returns False when the queue is empty."""
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def claim(self) -> dict:
+        return self.queue.claim(self.name)
+
+    def execute(self, job: dict) -> None:
+        """Run the handler on a claimed job and record the outcome."""
+        job_id = job["id"]
+        token = CancellationToken(
+            job["payload"].get("deadline_s") or default_deadline(),
+            should_cancel=lambda: self.queue.is_cancel_requested(job_id),
+        )
+
+        def report(event: dict):
+            self.queue.add_progress(job_id, event)
+            if self.queue.is_cancel_requested(job_id):
+                raise JobCancelled(job_id)
+
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.queue.lease / 3):
+                try:
+                    self.queue.heartbeat(job_id)
+                except sqlite3.Error as e:
+                    print(f"Could not renew the lease of job {job_id}: {e}")
+
+        threading.Thread(
+            target=heartbeat, name=f"job-heartbeat-{job_id[:8]}", daemon=True
+        ).start()
+        try:
+            with cancel_scope(token):
+                result = self.handler(job["payload"], report)
+        except (JobCancelled, Cancelled):
+            error = token.reason or "Cancelled while running"
+            finished = self.queue.finish(
+                job_id, CANCELLED, error=error, worker=self.name
+            )
+        except JobRetry as e:
+            print(f"Requeued job {job_id}: {e}")
+            finished = self.queue.requeue(job_id, str(e), worker=self.name)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            finished = self.queue.finish(job_id, FAILED, error=str(e), worker=self.name)
+        else:
+            finished = self.queue.finish(
+                job_id, SUCCEEDED, result=result, worker=self.name
+            )
+        finally:
+            done.set()
+        if not finished:
+            print(f"Job {job_id} was requeued or cancelled meanwhile; outcome dropped")
+
+    def requeue_stale(self) -> None:
+        """Requeue orphaned jobs, at most once per half lease."""
+        now = time.monotonic()
+        if now - self._last_stale_check < self.queue.lease / 2:
+            return
+        self._last_stale_check = now
+        count = self.queue.requeue_stale()
+        if count:
+            print(f"Requeued {count} job(s) orphaned by a stopped worker")
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.requeue_stale()
+                if not self.run_one():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                print(f"Error in job worker: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> "JobWorker":
+        self._thread = threading.Thread(
+            target=self.run_forever, name="camera-job-worker", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _estimate_runtime(payload: dict, job_queue: JobQueue) -> float:
+    """Cost-model estimate of a planned payload in seconds, or None if it fails."""
+    from src.jobs.cost_model import get_cost_model
+
+    try:
+        estimate = get_cost_model(job_queue).estimate(
+            payload["agent_sequence"],
+            payload["agent_states"],
+            payload.get("iterations", 1),
+        )
+    except Exception as e:
+        print(f"Could not estimate job run time: {e}")
+        return None
+    return round(estimate["mean_s"], 1)
+
+
+def make_workflow_handler(agents):
+    """
+    Job handler that executes a planned workflow with the given AgentSet.
+
+    Payload keys: query, iterations, agent_sequence, agent_states and
+    optionally deadline_s, which JobWorker applies through the token it
+    runs the handler under. Step events from iter_workflow are reported as
+    progress; a cancelled workflow ends the job as cancelled.
+    """
+    from src.utils.agent_utils import iter_workflow
+    from src.agents.agent_pool import reset_agent_set
+
+    def handler(payload: dict, report) -> dict:
+        summaries = []
+        errors = []
+        try:
+            for event in iter_workflow(
+                query=payload["query"],
+                iterations=payload.get("iterations", 1),
+                agent_sequence=payload["agent_sequence"],
+                agent_states=payload["agent_states"],
+                agent_map=agents.agent_map,
+                user_proxy_agent=agents.user_proxy_agent,
+            ):
+                event = {k: v for k, v in event.items() if k != "result"}
+                if event["event"] == "step_end":
+                    summaries.append(event["summary"])
+                elif event["event"] == "error":
+                    errors.append(event["error"])
+                report(event)
+                if event["event"] == "cancelled":
+                    raise JobCancelled(event["reason"])
+        finally:
+            reset_agent_set(agents)
+        return {"summaries": summaries, "errors": errors}
+
+    return handler
+
+
+def iter_job_progress(job_queue: JobQueue, job_id: str, poll_interval: float = 0.2):
+    """
+    Follow a job, yielding each new progress event and finally
+    {"event": "finished", "job": job}.
+    """
+    seen = 0
+    while True:
+        job = job_queue.get(job_id)
+        if job is None:
+            return
+        for event in job["progress"][seen:]:
+            yield event
+        seen = len(job["progress"])
+        if job["status"] in FINISHED_STATUSES:
+            yield {"event": "finished", "job": job}
+            return
+        time.sleep(poll_interval)
+
+
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Shared queue when CAMERA_JOB_QUEUE_DB is set, otherwise None and
+    workflows run directly in the calling process.
+    """
+    global _job_queue
+    if _job_queue is None and os.getenv("CAMERA_JOB_QUEUE_DB"):
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+def format_queue_metrics(metrics: dict) -> str:
+    return (
+        f"Job queue: {metrics['queued']} queued, {metrics['running']} running, "
+        f"oldest {metrics['oldest_queued_age_s']:.0f}s, wait "
+        f"{metrics['wait_mean_s']:.1f}s mean / {metrics['wait_p95_s']:.1f}s p95, "
+        f"run {metrics['runtime_mean_s']:.1f}s mean, "
+        f"{metrics['queued_work_s']:.0f}s of work queued, "
+        f"{metrics['rejected']} rejected, est. wait {metrics['estimated_wait_s']:.0f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Camera job queue")
+    parser.add_argument("--db", type=str, help="SQLite file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("worker", help="Execute queued jobs on this host")
+
+    submit = sub.add_parser("submit", help="Plan a query and queue it")
+    submit.add_argument("--query", type=str, required=True)
+    submit.add_argument("--batch", action="store_true", help="Batch priority")
+    submit.add_argument("--wait", action="store_true", help="Wait for the result")
+    submit.add_argument("--deadline", type=float, help="Seconds the job may run")
+
+    status = sub.add_parser("status", help="Show a job")
+    status.add_argument("job_id")
+
+    cancel = sub.add_parser("cancel", help="Cancel a job")
+    cancel.add_argument("job_id")
+
+    sub.add_parser("metrics", help="Print queue metrics as JSON")
+
+    args = parser.parse_args()
+    job_queue = JobQueue(args.db)
+
+    if args.command == "worker":
+        from src.agents.agent_factory import build_agent_set
+
+        print(f"Worker started on {job_queue.path}")
+        JobWorker(job_queue, make_workflow_handler(build_agent_set())).run_forever()
+    elif args.command == "submit":
+        from src.utils.agent_utils import plan_query
+
+        priority = PRIORITY_BATCH if args.batch else PRIORITY_INTERACTIVE
+        plan = plan_query(args.query)
+        if args.deadline:
+            plan["deadline_s"] = args.deadline
+        try:
+            job_id = job_queue.submit(plan, priority, source="cli")
+        except AdmissionRejected as e:
+            print(e)
+            raise SystemExit(2)
+        print(job_id)
+        if args.wait:
+            print(json.dumps(job_queue.wait(job_id), indent=2, default=str))
+    elif args.command == "status":
+        job = job_queue.get(args.job_id)
+        if job is None:
+            print(f"Job {args.job_id} not found")
+            raise SystemExit(1)
+        print(json.dumps(job, indent=2, default=str))
+    elif args.command == "cancel":
+        print("Cancelled" if job_queue.cancel(args.job_id) else "Not cancellable")
+    elif args.command == "metrics":
+        print(json.dumps(job_queue.metrics(), indent=2))
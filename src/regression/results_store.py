@@ -0,0 +1,528 @@
+"""
+Append-only store for test results.
+
+Every run of a test case adds one row keyed by test id, run id, build and
+timestamp. Rows are never updated or deleted, so parallel runs and
+several hosts can write at once, and the cost of writing does not grow
+with history. cases/test_cases.json only holds the test definitions and
+is never written.
+
+    store = ResultsStore()
+    run_id = store.start_run(build="1.4.2", source="regression")
+    store.record("3", "passed", run_id=run_id, elapsed=42.0)
+    store.latest()["3"]["status"]
+
+Usage:
+    python -m src.regression.results_store latest
+    python -m src.regression.results_store trend [--test_id 3] [--by build|day]
+    python -m src.regression.results_store latency --test_id 3 [--limit 20]
+    python -m src.regression.results_store runs [--limit 10]
+    python -m src.regression.results_store import-legacy   # old test_cases.json results
+
+Configuration (environment variables):
+    CAMERA_RESULTS_DB   SQLite file (default data/results.sqlite3)
+    CAMERA_BUILD        Build label recorded with results (default: git short hash)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_DB_PATH = ROOT / "data" / "results.sqlite3"
+
+PASSED = "passed"
+FAILED = "failed"
+
+# Labels written by earlier tools, mapped to the runner's statuses
+STATUS_ALIASES = {"pass": PASSED, "fail": FAILED}
+
+# Run that results imported from test_cases.json are grouped under
+LEGACY_RUN_ID = "legacy"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    build TEXT,
+    source TEXT,
+    started_at REAL NOT NULL,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    test_id TEXT NOT NULL,
+    run_id TEXT,
+    build TEXT,
+    recorded_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    description TEXT,
+    message TEXT,
+    result TEXT,
+    device TEXT,
+    source TEXT,
+    elapsed REAL,
+    timings TEXT,
+    llm_cost REAL,
+    llm_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_test ON results (test_id, id);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_build ON results (build, test_id);
+CREATE TRIGGER IF NOT EXISTS results_no_update BEFORE UPDATE ON results
+BEGIN SELECT RAISE(ABORT, 'results are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS results_no_delete BEFORE DELETE ON results
+BEGIN SELECT RAISE(ABORT, 'results are append-only'); END;
+"""
+
+
+def current_build() -> str:
+    """CAMERA_BUILD, else the git short hash of this checkout, else None."""
+    build = os.getenv("CAMERA_BUILD")
+    if build:
+        return build
+    try:
+        return (
+            subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                timeout=5,
+                check=True,
+            ).stdout.strip()
+            or None
+        )
+    except Exception:
+        return None
+
+
+def normalize_status(status: str) -> str:
+    status = str(status).strip().lower()
+    return STATUS_ALIASES.get(status, status)
+
+
+class ResultsStore:
+    """SQLite-backed, append-only test result history."""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: SQLite file, CAMERA_RESULTS_DB or data/results.sqlite3 if None
+        """
+        self.path = Path(path or os.getenv("CAMERA_RESULTS_DB") or DEFAULT_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._build = None
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _default_build(self) -> str:
+        if self._build is None:
+            self._build = current_build() or ""
+        return self._build or None
+
+    def start_run(
+        self, build: str = None, source: str = None, meta: dict = None
+    ) -> str:
+        """
+        Register a run that results can be grouped under.
+
+        Returns:
+            str: The new run id
+        """
+        run_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO runs (run_id, build, source, started_at, meta) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                run_id,
+                build or self._default_build(),
+                source,
+                time.time(),
+                json.dumps(meta or {}, default=str),
+            ),
+        )
+        return run_id
+
+    def record(
+        self,
+        test_id: str,
+        status: str,
+        run_id: str = None,
+        build: str = None,
+        result=None,
+        message: str = None,
+        description: str = None,
+        device: str = None,
+        source: str = None,
+        elapsed: float = None,
+        timings: dict = None,
+        llm_cost: float = None,
+        llm_tokens: int = None,
+        recorded_at: float = None,
+    ) -> int:
+        """
+        Append one result.
+
+        Args:
+            test_id: Test case id
+            status: passed, failed, error, timeout (Pass/Fail are accepted)
+            run_id: Run from start_run, if the result belongs to one
+            build: Build label, the run's build or current_build() if None
+            result: JSON-serialisable outcome details
+            recorded_at: When the result was produced, now if None
+
+        Returns:
+            int: Row id of the result
+        """
+        conn = self._connect()
+        if build is None and run_id is not None:
+            row = conn.execute(
+                "SELECT build FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            build = row[0] if row else None
+        cursor = conn.execute(
+            "INSERT INTO results (test_id, run_id, build, recorded_at, status, "
+            "description, message, result, device, source, elapsed, timings, "
+            "llm_cost, llm_tokens) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(test_id),
+                run_id,
+                build or self._default_build(),
+                time.time() if recorded_at is None else recorded_at,
+                normalize_status(status),
+                description,
+                message,
+                json.dumps(result, default=str) if result is not None else None,
+                device,
+                source,
+                elapsed,
+                json.dumps(timings) if timings else None,
+                llm_cost,
+                llm_tokens,
+            ),
+        )
+        return cursor.lastrowid
+
+    def record_case_result(self, case_result, run_id: str = None, build=None) -> int:
+        """Append a regression runner CaseResult."""
+        return self.record(
+            case_result.case_id,
+            case_result.status,
+            run_id=run_id,
+            build=build,
+            result={
+                "plan": case_result.plan,
+                "steps": case_result.steps,
+                "tool_failures": case_result.tool_failures,
+                "checks": case_result.checks,
+            },
+            message=case_result.message,
+            description=case_result.description,
+            device=case_result.device,
+            source="regression",
+            elapsed=case_result.elapsed,
+            timings=case_result.timings,
+            llm_cost=case_result.llm.get("cost"),
+            llm_tokens=case_result.llm.get("total_tokens"),
+        )
+
+    def _row(self, row) -> dict:
+        if row is None:
+            return None
+        record = dict(row)
+        for key in ("result", "timings"):
+            if record.get(key):
+                record[key] = json.loads(record[key])
+        return record
+
+    def latest(self, test_ids: list = None, build: str = None) -> dict:
+        """
+        Most recent result per test.
+
+        Args:
+            test_ids: Only these tests, all if None
+            build: Only results of this build
+
+        Returns:
+            dict: Result row by test id
+        """
+        query = "SELECT MAX(id) FROM results"
+        params = []
+        if build is not None:
+            query += " WHERE build = ?"
+            params.append(build)
+        query += " GROUP BY test_id"
+        rows = self._connect().execute(
+            f"SELECT * FROM results WHERE id IN ({query}) ORDER BY test_id", params
+        )
+        latest = {row["test_id"]: self._row(row) for row in rows}
+        if test_ids is not None:
+            latest = {k: v for k, v in latest.items() if k in set(map(str, test_ids))}
+        return latest
+
+    def history(self, test_id: str, limit: int = 50) -> list:
+        """Most recent results of one test, newest first."""
+        rows = self._connect().execute(
+            "SELECT * FROM results WHERE test_id = ? ORDER BY id DESC LIMIT ?",
+            (str(test_id), limit),
+        )
+        return [self._row(row) for row in rows]
+
+    def pass_rates(self, test_id: str = None, by: str = "build", limit: int = 30):
+        """
+        Pass-rate trend, oldest first.
+
+        Args:
+            test_id: One test, or every test if None
+            by: "build" or "day"
+            limit: Most recent groups to return
+
+        Returns:
+            list: {"group", "runs", "passed", "pass_rate", "mean_elapsed"} per group
+        """
+        if by == "build":
+            group = "COALESCE(build, '')"
+        elif by == "day":
+            group = "date(recorded_at, 'unixepoch', 'localtime')"
+        else:
+            raise ValueError("by must be 'build' or 'day'")
+        where, params = "", []
+        if test_id is not None:
+            where, params = "WHERE test_id = ?", [str(test_id)]
+        rows = (
+            self._connect()
+            .execute(
+                f"SELECT {group} AS grp, COUNT(*) AS runs, "
+                f"SUM(status = ?) AS passed, AVG(elapsed) AS mean_elapsed, "
+                f"MAX(id) AS last_id FROM results {where} "
+                f"GROUP BY grp ORDER BY last_id DESC LIMIT ?",
+                [PASSED, *params, limit],
+            )
+            .fetchall()
+        )
+        return [
+            {
+                "group": row["grp"],
+                "runs": row["runs"],
+                "passed": row["passed"],
+                "pass_rate": row["passed"] / row["runs"],
+                "mean_elapsed": row["mean_elapsed"],
+            }
+            for row in reversed(rows)
+        ]
+
+    def latency_history(self, test_id: str, limit: int = 100) -> list:
+        """
+        Elapsed time and phase timings of one test, oldest first.
+
+        Returns:
+            list: {"recorded_at", "build", "status", "elapsed", "timings"}
+        """
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT recorded_at, build, status, elapsed, timings FROM results "
+                "WHERE test_id = ? AND elapsed IS NOT NULL ORDER BY id DESC LIMIT ?",
+                (str(test_id), limit),
+            )
+            .fetchall()
+        )
+        return [self._row(row) for row in reversed(rows)]
+
+    def recent_steps(self, limit: int = 200) -> list:
+        """
+        Per-step timings of the latest regression results, newest first.
+
+        Returns:
+            list: {"agent", "action", "elapsed", "device"} per executed step
+        """
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT result, device FROM results WHERE source = ? AND result IS NOT NULL "
+                "ORDER BY id DESC LIMIT ?",
+                ("regression", limit),
+            )
+            .fetchall()
+        )
+        steps = []
+        for row in rows:
+            result = json.loads(row["result"])
+            if not isinstance(result, dict):
+                continue
+            for step in result.get("steps") or ():
+                steps.append(
+                    {
+                        "agent": step["agent"],
+                        "action": step["action"],
+                        "elapsed": step["elapsed_s"],
+                        "device": row["device"],
+                    }
+                )
+        return steps
+
+    def runs(self, limit: int = 20) -> list:
+        """Recent runs with their pass counts, newest first."""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT runs.run_id, runs.build, runs.source, runs.started_at, "
+                "COUNT(results.id) AS total, SUM(results.status = ?) AS passed, "
+                "SUM(results.elapsed) AS case_time FROM runs "
+                "LEFT JOIN results ON results.run_id = runs.run_id "
+                "GROUP BY runs.run_id ORDER BY runs.started_at DESC LIMIT ?",
+                (PASSED, limit),
+            )
+            .fetchall()
+        )
+        return [dict(row) for row in rows]
+
+    def import_legacy(self, test_cases_path=None) -> int:
+        """
+        Record the result/status fields that older versions wrote into
+        test_cases.json. The file itself is left untouched.
+
+        The results go under LEGACY_RUN_ID, timestamped with the file's
+        modification time, and are keyed on (test id, run id, timestamp).
+        Legacy results carry no time of their own and a checkout resets
+        the modification time, so a test whose status and result are
+        already in the legacy run is skipped too. Importing the same
+        results again adds nothing.
+
+        Returns:
+            int: Number of results imported
+        """
+        path = Path(test_cases_path or ROOT / "cases" / "test_cases.json")
+        with open(path, "r", encoding="utf-8") as f:
+            cases = json.load(f)["testCases"]
+        conn = self._connect()
+        recorded_at = path.stat().st_mtime
+        conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, build, source, started_at, meta) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (LEGACY_RUN_ID, "legacy", "legacy", recorded_at, json.dumps({})),
+        )
+        imported = 0
+        for test_id, case in cases.items():
+            if "status" not in case:
+                continue
+            result = case.get("result")
+            present = conn.execute(
+                "SELECT 1 FROM results WHERE test_id = ? AND run_id = ? "
+                "AND (recorded_at = ? OR (status = ? AND result IS ?))",
+                (
+                    str(test_id),
+                    LEGACY_RUN_ID,
+                    recorded_at,
+                    normalize_status(case["status"]),
+                    json.dumps(result, default=str) if result is not None else None,
+                ),
+            ).fetchone()
+            if present:
+                continue
+            self.record(
+                test_id,
+                case["status"],
+                run_id=LEGACY_RUN_ID,
+                result=result,
+                description=case.get("description"),
+                source="legacy",
+                build="legacy",
+                recorded_at=recorded_at,
+            )
+            imported += 1
+        return imported
+
+
+_results_store = None
+
+
+def get_results_store() -> ResultsStore:
+    """Process-wide ResultsStore."""
+    global _results_store
+    if _results_store is None:
+        _results_store = ResultsStore()
+    return _results_store
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the test results store")
+    parser.add_argument("--db", type=str, help="SQLite file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    latest = sub.add_parser("latest", help="Latest status of every test")
+    latest.add_argument("--build", type=str)
+
+    trend = sub.add_parser("trend", help="Pass rate per build or day")
+    trend.add_argument("--test_id", type=str)
+    trend.add_argument("--by", choices=["build", "day"], default="build")
+    trend.add_argument("--limit", type=int, default=30)
+
+    latency = sub.add_parser("latency", help="Latency history of one test")
+    latency.add_argument("--test_id", type=str, required=True)
+    latency.add_argument("--limit", type=int, default=20)
+
+    runs = sub.add_parser("runs", help="Recent runs")
+    runs.add_argument("--limit", type=int, default=10)
+
+    sub.add_parser("import-legacy", help="Import results saved in test_cases.json")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+
+    if args.command == "latest":
+        for test_id, row in store.latest(build=args.build).items():
+            print(
+                f"{test_id:>4} {row['status']:<8} {_format_time(row['recorded_at'])} "
+                f"build={row['build']} "
+                + (f"{row['elapsed']:.1f}s" if row["elapsed"] is not None else "")
+            )
+    elif args.command == "trend":
+        for row in store.pass_rates(args.test_id, by=args.by, limit=args.limit):
+            print(
+                f"{row['group'] or '-':<16} {row['passed']}/{row['runs']} "
+                f"({row['pass_rate']:.0%})"
+                + (
+                    f" mean {row['mean_elapsed']:.1f}s"
+                    if row["mean_elapsed"] is not None
+                    else ""
+                )
+            )
+    elif args.command == "latency":
+        for row in store.latency_history(args.test_id, limit=args.limit):
+            phases = ", ".join(
+                f"{k}={v:.2f}" for k, v in (row["timings"] or {}).items()
+            )
+            print(
+                f"{_format_time(row['recorded_at'])} {row['status']:<8} "
+                f"{row['elapsed']:.1f}s {phases}"
+            )
+    elif args.command == "runs":
+        for row in store.runs(limit=args.limit):
+            print(
+                f"{row['run_id']} {_format_time(row['started_at'])} "
+                f"build={row['build']} {row['passed'] or 0}/{row['total']} passed"
+            )
+    elif args.command == "import-legacy":
+        print(f"Imported {store.import_legacy()} results")
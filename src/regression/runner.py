@@ -0,0 +1,550 @@
+"""
+Parallel regression runner for cases/test_cases.json.
+
+Loads the test cases once and runs them on a pool of worker threads.
+Each worker borrows an agent set and a device. On a single local device
+(the Windows Camera app or the simulated backend), only planning runs in
+parallel and executions take turns. With several tool daemons
+(--devices / --device / --local), executions run in parallel too, one per
+device. Cases never prompt for input. A case with an "expected" block
+passes when its workflow runs without an error event and every
+post-condition holds in the UI snapshot taken after it
+(src/regression/verifier.py). A case without one passes when no tool
+call failed.
+
+Results go to a JSON report with per-case latency breakdowns (queueing,
+interpretation, planning, execution, each step and LLM usage) and a
+JUnit XML report for CI. Each case is also appended to the results store
+(src/regression/results_store.py) under one run id, unless --no_store is
+given. test_cases.json is never written.
+
+Usage:
+    python -m src.regression.runner [--ids 1 2 3] [--workers 4] [--timeout 600]
+        [--device_timeout 1800] [--shard 0/4] [--backend simulated]
+        [--devices config/devices.json | --device NAME=URL ... | --local N]
+        [--json reports/regression.json] [--junit reports/junit.xml]
+        [--build 1.4.2] [--no_store]
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from src.regression.verifier import failed_checks, format_checks, verify
+from src.utils.cancellation import CancellationToken
+
+ROOT = Path(__file__).resolve().parents[2]
+TEST_CASES_PATH = ROOT / "cases" / "test_cases.json"
+DEFAULT_JSON_REPORT = ROOT / "reports" / "regression.json"
+DEFAULT_JUNIT_REPORT = ROOT / "reports" / "junit.xml"
+
+# Seconds a case may run before it is stopped at its next step boundary;
+# time spent queueing for agents or a device does not count
+DEFAULT_TIMEOUT = 600.0
+
+# Seconds a case may queue for a free device before it times out
+DEFAULT_DEVICE_TIMEOUT = 1800.0
+
+# Tool results that mean the action did not happen
+FAILURE_MARKERS = (
+    "Failed",
+    "Error",
+    "not accessible",
+    "not found",
+    "Invalid",
+    "cannot be determined",
+)
+
+PASSED = "passed"
+FAILED = "failed"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+
+class CaseTimeout(Exception):
+    """The case ran past its deadline."""
+
+
+@dataclass
+class CaseResult:
+    case_id: str
+    description: str
+    status: str = ERROR
+    message: str = ""
+    device: str = None
+    worker: str = None
+    plan: dict = None
+    tool_failures: list = field(default_factory=list)
+    steps: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+    llm: dict = field(default_factory=dict)
+    checks: list = field(default_factory=list)
+    started_at: str = None
+    elapsed: float = 0.0
+
+
+def load_test_cases(path=None) -> dict:
+    """Test cases by id, in file order."""
+    with open(path or TEST_CASES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["testCases"]
+
+
+def case_query(case: dict) -> str:
+    """The command a case runs: its "query", else its description."""
+    return case.get("query") or case["description"]
+
+
+def select_cases(cases: dict, ids: list = None, shard: str = None) -> dict:
+    """
+    Filter cases by id and to one shard.
+
+    Args:
+        cases: Test cases by id
+        ids: Case ids to keep, all if None
+        shard: "INDEX/COUNT", e.g. "0/4"; cases are dealt round-robin in
+            file order, so every shard gets a similar mix
+
+    Returns:
+        dict: The selected cases by id
+    """
+    selected = {k: v for k, v in cases.items() if not ids or k in ids}
+    missing = set(ids or []) - set(selected)
+    if missing:
+        raise ValueError(f"Unknown test case ids: {sorted(missing)}")
+    if shard:
+        index, count = (int(part) for part in shard.split("/"))
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index must be in [0, {count}), got {index}")
+        selected = {
+            k: v for i, (k, v) in enumerate(selected.items()) if i % count == index
+        }
+    return selected
+
+
+def _tool_outputs(chat_result) -> list:
+    outputs = []
+    for message in getattr(chat_result, "chat_history", None) or []:
+        for response in message.get("tool_responses") or []:
+            outputs.append(str(response.get("content")))
+    return outputs
+
+
+def _is_failure(output: str) -> bool:
+    return any(marker in output for marker in FAILURE_MARKERS)
+
+
+class Slots:
+    """Blocking checkout of execution slots (devices, or one local lock)."""
+
+    def __init__(self, slots: list):
+        self._slots = queue.Queue()
+        for slot in slots:
+            self._slots.put(slot)
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        """
+        Raises:
+            CaseTimeout: If no slot is free within timeout seconds
+        """
+        try:
+            slot = self._slots.get(timeout=timeout)
+        except queue.Empty:
+            raise CaseTimeout(f"No device free within {timeout:.0f}s") from None
+        try:
+            yield slot
+        finally:
+            self._slots.put(slot)
+
+
+class RegressionRunner:
+    """Runs selected test cases on a worker pool and collects CaseResults."""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        timeout: float = DEFAULT_TIMEOUT,
+        backend: str = None,
+        devices: list = None,
+        llm_config: dict = None,
+        device_timeout: float = DEFAULT_DEVICE_TIMEOUT,
+    ):
+        """
+        Args:
+            workers: Cases in flight at once
+            timeout: Per-case deadline in seconds, not counting the time
+                spent waiting for agents and a device
+            backend: Local tool backend when no devices are given,
+                CAMERA_BACKEND if None
+            devices: RemoteDevice instances; executions run in parallel, one
+                per device
+            llm_config: llm_config for the agent sets
+            device_timeout: Seconds a case may wait for a device
+        """
+        from src.agents.agent_factory import build_agent_set
+        from src.agents.agent_pool import AgentPool
+        from src.tools.backend import get_backend_name
+
+        self.timeout = timeout
+        self.device_timeout = device_timeout
+        self.devices = list(devices or [])
+        self.backend = "remote" if self.devices else get_backend_name(backend)
+        self.workers = max(1, min(workers, 64))
+        self.agent_pool = AgentPool(
+            size=self.workers,
+            agent_sets=[
+                build_agent_set(llm_config, backend=self.backend)
+                for _ in range(self.workers)
+            ],
+        )
+        # A local Camera app is one device: executions take turns
+        self.slots = Slots(self.devices or [None])
+
+    def _bind(self, device):
+        if device is None:
+            return nullcontext()
+        from src.tools.remote import use_device
+
+        return use_device(device)
+
+    def run_case(self, case_id: str, case: dict) -> CaseResult:
+        """Plan and execute one case; never raises."""
+        from src.utils.agent_utils import (
+            determine_agents,
+            interpret_query,
+            iter_workflow,
+        )
+        from src.tools.backend import get_tools
+        from src.utils.llm_metrics import get_usage_summary, track_test_case
+
+        result = CaseResult(case_id=case_id, description=case.get("description", ""))
+        result.started_at = datetime.now().isoformat(timespec="seconds")
+        result.worker = threading.current_thread().name
+        start = time.perf_counter()
+        deadline = None
+        timings = result.timings
+        expected = case.get("expected")
+        tools = get_tools(self.backend)
+
+        def check_deadline(phase: str):
+            if time.monotonic() > deadline:
+                raise CaseTimeout(f"Timed out after {self.timeout:.0f}s during {phase}")
+
+        try:
+            with track_test_case(case_id), self.agent_pool.checkout() as agents:
+                timings["agents_wait_s"] = time.perf_counter() - start
+                deadline = time.monotonic() + self.timeout
+
+                t = time.perf_counter()
+                msg_type, iterations, interpreted_query = interpret_query(
+                    case_query(case), agents.interpreter_agent
+                )
+                timings["interpret_s"] = time.perf_counter() - t
+                check_deadline("interpretation")
+
+                t = time.perf_counter()
+                agent_sequence, agent_states = determine_agents(
+                    interpreted_query, agents.manager_agent, agents.agent_map
+                )
+                timings["plan_s"] = time.perf_counter() - t
+                result.plan = {
+                    "type": msg_type,
+                    "query": interpreted_query,
+                    "iterations": iterations,
+                    "agent_sequence": agent_sequence,
+                    "agent_states": agent_states,
+                }
+                if not agent_sequence:
+                    raise RuntimeError("Planner returned no agents")
+                check_deadline("planning")
+
+                t = time.perf_counter()
+                with self.slots.checkout(self.device_timeout) as device:
+                    timings["device_wait_s"] = time.perf_counter() - t
+                    # Waiting for the device is not the case running slowly
+                    deadline += timings["device_wait_s"]
+                    result.device = device.name if device else self.backend
+                    if self.backend == "simulated":
+                        from src.tools.simulated import reset_state
+
+                        reset_state()
+
+                    t = time.perf_counter()
+                    errors = []
+                    with self._bind(device):
+                        before = tools.take_snapshot() if expected else None
+                        # Also stops a step that overruns, at its next tool call
+                        token = CancellationToken(
+                            max(deadline - time.monotonic(), 0.001)
+                        )
+                        for event in iter_workflow(
+                            query=interpreted_query,
+                            iterations=iterations,
+                            agent_sequence=agent_sequence,
+                            agent_states=agent_states,
+                            agent_map=agents.agent_map,
+                            user_proxy_agent=agents.user_proxy_agent,
+                            token=token,
+                        ):
+                            if event["event"] == "cancelled":
+                                raise CaseTimeout(
+                                    f"Timed out after {self.timeout:.0f}s during "
+                                    f"iteration {event['iteration']}"
+                                )
+                            if event["event"] == "error":
+                                errors.append(event["error"])
+                            elif event["event"] == "step_end":
+                                outputs = _tool_outputs(event["result"])
+                                result.steps.append(
+                                    {
+                                        "iteration": event["iteration"],
+                                        "step": event["step"],
+                                        "agent": event["agent"],
+                                        "action": event["action"],
+                                        "elapsed_s": event["elapsed"],
+                                        "tool_outputs": outputs,
+                                    }
+                                )
+                                result.tool_failures += [
+                                    f"{event['agent']}: {o}"
+                                    for o in outputs
+                                    if _is_failure(o)
+                                ]
+                            check_deadline(
+                                f"iteration {event['iteration']} step "
+                                f"{event.get('step', '?')}"
+                            )
+                        timings["execute_s"] = time.perf_counter() - t
+                        if expected:
+                            t = time.perf_counter()
+                            result.checks = verify(
+                                expected, before, tools.take_snapshot()
+                            )
+                            timings["verify_s"] = time.perf_counter() - t
+
+            if errors:
+                result.status, result.message = FAILED, "; ".join(errors)
+            elif expected:
+                failed = failed_checks(result.checks)
+                result.status = FAILED if failed else PASSED
+                if failed:
+                    result.message = (
+                        f"{len(failed)}/{len(result.checks)} post-condition(s) "
+                        f"failed: {', '.join(c['key'] for c in failed)}"
+                    )
+            elif result.tool_failures:
+                result.status = FAILED
+                result.message = f"{len(result.tool_failures)} tool call(s) failed"
+            else:
+                result.status = PASSED
+        except CaseTimeout as e:
+            result.status, result.message = TIMEOUT, str(e)
+        except Exception as e:
+            result.status, result.message = ERROR, f"{type(e).__name__}: {e}"
+
+        result.elapsed = time.perf_counter() - start
+        usage = get_usage_summary(test_case=case_id)
+        result.llm = {
+            "calls": usage["calls"],
+            "total_tokens": usage["total_tokens"],
+            "cost": usage["cost"],
+            "latency_s": usage["latency"],
+            "latency_by_component_s": {
+                name: totals["latency"]
+                for name, totals in usage["by_component"].items()
+            },
+        }
+        return result
+
+    def run(self, cases: dict, on_result=None) -> list:
+        """
+        Run cases concurrently.
+
+        Args:
+            cases: Test cases by id
+            on_result: Called with each CaseResult as it completes
+
+        Returns:
+            list: CaseResults in case order
+        """
+        results = {}
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="regression"
+        ) as executor:
+            futures = {
+                executor.submit(self.run_case, case_id, case): case_id
+                for case_id, case in cases.items()
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if on_result is not None:
+                    on_result(result)
+        return [results[case_id] for case_id in cases]
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    counts = {status: 0 for status in (PASSED, FAILED, ERROR, TIMEOUT)}
+    for result in results:
+        counts[result.status] += 1
+    return {
+        "total": len(results),
+        **counts,
+        "elapsed_s": elapsed,
+        "case_time_s": sum(r.elapsed for r in results),
+        "llm_cost": sum(r.llm.get("cost", 0.0) for r in results),
+    }
+
+
+def write_json_report(path, results: list, summary: dict, meta: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {"meta": meta, "summary": summary, "cases": [asdict(r) for r in results]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def write_junit_report(path, results: list, summary: dict) -> None:
+    """JUnit XML: one testcase per case, failures and errors with details."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    root = ET.Element("testsuites")
+    suite = ET.SubElement(
+        root,
+        "testsuite",
+        name="camera-regression",
+        tests=str(summary["total"]),
+        failures=str(summary[FAILED]),
+        errors=str(summary[ERROR] + summary[TIMEOUT]),
+        time=f"{summary['elapsed_s']:.3f}",
+        timestamp=datetime.now().isoformat(timespec="seconds"),
+    )
+    for result in results:
+        case = ET.SubElement(
+            suite,
+            "testcase",
+            classname="camera",
+            name=f"{result.case_id}: {result.description}",
+            time=f"{result.elapsed:.3f}",
+        )
+        details = "\n".join(
+            ([format_checks(result.checks)] if failed_checks(result.checks) else [])
+            + result.tool_failures
+        )
+        if result.status == FAILED:
+            ET.SubElement(case, "failure", message=result.message).text = details
+        elif result.status in (ERROR, TIMEOUT):
+            ET.SubElement(
+                case, "error", message=result.message, type=result.status
+            ).text = details
+        timings = ", ".join(f"{k}={v:.2f}" for k, v in result.timings.items())
+        steps = "\n".join(
+            f"[{s['iteration']}.{s['step']}] {s['action']} {s['elapsed_s']:.2f}s"
+            for s in result.steps
+        )
+        ET.SubElement(case, "system-out").text = (
+            f"device={result.device} {timings}\n{steps}"
+        )
+    tree = ET.ElementTree(root)
+    ET.indent(tree)
+    tree.write(path, encoding="utf-8", xml_declaration=True)
+
+
+def format_case_line(result: CaseResult) -> str:
+    return (
+        f"[{result.status.upper():>7}] {result.case_id}: {result.description} "
+        f"({result.elapsed:.1f}s, {result.device or '-'})"
+        + (f" - {result.message}" if result.message else "")
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the camera regression suite")
+    parser.add_argument("--cases", type=str, help="Test cases JSON file")
+    parser.add_argument("--ids", nargs="+", help="Only these case ids")
+    parser.add_argument("--shard", type=str, help="INDEX/COUNT, e.g. 0/4")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--device_timeout", type=float, default=DEFAULT_DEVICE_TIMEOUT)
+    parser.add_argument("--backend", type=str, help="windows or simulated")
+    parser.add_argument("--devices", type=str, help="Devices JSON file")
+    parser.add_argument("--device", action="append", default=[], metavar="NAME=URL")
+    parser.add_argument("--local", type=int, default=0, help="N simulated daemons")
+    parser.add_argument("--json", type=str, default=str(DEFAULT_JSON_REPORT))
+    parser.add_argument("--junit", type=str, default=str(DEFAULT_JUNIT_REPORT))
+    parser.add_argument("--build", type=str, help="Build label for stored results")
+    parser.add_argument("--no_store", action="store_true", help="Skip the store")
+    args = parser.parse_args()
+
+    from src.jobs.dispatcher import load_devices, start_local_daemons
+    from src.regression.results_store import get_results_store
+    from src.tools.remote import RemoteDevice
+    from src.utils.llm_metrics import format_usage_summary, get_usage_summary
+
+    cases = select_cases(load_test_cases(args.cases), args.ids, args.shard)
+    processes, devices = [], []
+    if args.local:
+        processes, devices = start_local_daemons(args.local)
+    elif args.device:
+        devices = [RemoteDevice(*spec.split("=", 1)) for spec in args.device]
+    elif args.devices:
+        devices = load_devices(args.devices)
+
+    try:
+        runner = RegressionRunner(
+            workers=args.workers,
+            timeout=args.timeout,
+            backend=args.backend,
+            devices=devices,
+            device_timeout=args.device_timeout,
+        )
+        print(
+            f"Running {len(cases)} cases on {len(devices) or 1} device(s) "
+            f"({runner.backend}) with {runner.workers} workers"
+        )
+        meta = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "backend": runner.backend,
+            "devices": [d.name for d in devices],
+            "workers": runner.workers,
+            "shard": args.shard,
+            "timeout_s": args.timeout,
+            "device_timeout_s": args.device_timeout,
+        }
+        store = run_id = None
+        if not args.no_store:
+            store = get_results_store()
+            run_id = store.start_run(build=args.build, source="regression", meta=meta)
+            meta["run_id"] = run_id
+
+        def on_result(result: CaseResult):
+            print(format_case_line(result))
+            if store is not None:
+                store.record_case_result(result, run_id=run_id)
+
+        start = time.perf_counter()
+        results = runner.run(cases, on_result=on_result)
+        summary = summarize(results, time.perf_counter() - start)
+    finally:
+        for process in processes:
+            process.terminate()
+
+    write_json_report(args.json, results, summary, meta)
+    write_junit_report(args.junit, results, summary)
+    print(format_usage_summary(get_usage_summary(), title="Suite LLM usage"))
+    print(
+        f"{summary[PASSED]}/{summary['total']} passed, {summary[FAILED]} failed, "
+        f"{summary[ERROR]} errors, {summary[TIMEOUT]} timeouts in "
+        f"{summary['elapsed_s']:.1f}s (sequential case time "
+        f"{summary['case_time_s']:.1f}s)"
+    )
+    print(f"Reports: {args.json}, {args.junit}")
+    raise SystemExit(0 if summary[PASSED] == summary["total"] else 1)
@@ -0,0 +1,509 @@
+"""
+Soak and stress mode: drive a tool sequence directly, many times.
+
+The stress cases in cases/test_cases.json ("switch background effects to
+on and off. Repeat 5 times") go through the LLM agents, so they cannot
+run for thousands of cycles and their latency is mostly planning. Here
+the tool sequence is called directly, for a number of cycles or for a
+duration, and every cycle is timed. Rolling p50/p95/p99 over the last
+--window cycles, the failure rate and the latency drift against the
+first window are printed as the soak runs and written to a JSON report,
+so slowdowns and leaks in the Camera app that only show up after
+hundreds of cycles become visible.
+
+A tool call fails when it raises or returns one of the runner's failure
+messages (FAILURE_MARKERS in src/regression/runner.py).
+
+Usage:
+    python -m src.regression.soak --preset background_effects --cycles 1000
+    python -m src.regression.soak --step set_automatic_framing:desired_state=true \\
+        --step set_automatic_framing:desired_state=false --duration 3600
+        [--backend simulated | --device NAME=URL] [--window 100]
+        [--report_every 50] [--max_consecutive_failures 10]
+        [--json reports/soak.json]
+"""
+
+import argparse
+import json
+import math
+import time
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from src.regression.runner import ROOT, _is_failure
+from src.tools.backend import TOOL_NAMES, get_backend_name, get_tools
+
+DEFAULT_JSON_REPORT = ROOT / "reports" / "soak.json"
+DEFAULT_WINDOW = 100
+
+# p50 increase over the first window, in percent, reported as drift
+DEFAULT_DRIFT_THRESHOLD = 20.0
+
+_VIDEO_FFC_SETUP = [
+    {"tool": "open_camera", "args": {}},
+    {"tool": "camera_mode", "args": {"mode": "video"}},
+    {"tool": "switch_camera", "args": {"target_type": "FFC"}},
+]
+
+# Name -> (setup steps run once, steps run every cycle)
+PRESETS = {
+    "background_effects": (
+        _VIDEO_FFC_SETUP,
+        [
+            {"tool": "set_background_effects", "args": {"desired_state": True}},
+            {"tool": "set_background_effects", "args": {"desired_state": False}},
+        ],
+    ),
+    "automatic_framing": (
+        _VIDEO_FFC_SETUP,
+        [
+            {"tool": "set_automatic_framing", "args": {"desired_state": True}},
+            {"tool": "set_automatic_framing", "args": {"desired_state": False}},
+        ],
+    ),
+    "mixed_effects": (
+        _VIDEO_FFC_SETUP,
+        [
+            {"tool": "set_automatic_framing", "args": {"desired_state": True}},
+            {"tool": "set_background_effects", "args": {"desired_state": True}},
+            {"tool": "set_automatic_framing", "args": {"desired_state": False}},
+            {"tool": "set_background_effects", "args": {"desired_state": False}},
+        ],
+    ),
+    "minimize_restore": (
+        [{"tool": "open_camera", "args": {}}],
+        [
+            {"tool": "minimize_camera", "args": {}},
+            {"tool": "restore_camera", "args": {}},
+        ],
+    ),
+    "switch_camera": (
+        [{"tool": "open_camera", "args": {}}],
+        [{"tool": "switch_camera", "args": {}}],
+    ),
+    "photo": (
+        [
+            {"tool": "open_camera", "args": {}},
+            {"tool": "camera_mode", "args": {"mode": "photo"}},
+        ],
+        [{"tool": "take_photo", "args": {"num_photos": 1}}],
+    ),
+}
+
+
+def parse_step(spec: str) -> dict:
+    """
+    Parse a --step argument.
+
+    Args:
+        spec: "TOOL" or "TOOL:key=value,key=value"; values are read as JSON
+            when they parse (true, 2, null) and as strings otherwise
+
+    Returns:
+        dict: {"tool": name, "args": {...}}
+    """
+    tool, _, arg_text = spec.partition(":")
+    tool = tool.strip()
+    if tool not in TOOL_NAMES:
+        raise ValueError(f"Unknown tool {tool!r}; use one of {TOOL_NAMES}")
+    args = {}
+    for pair in filter(None, arg_text.split(",")):
+        key, _, value = pair.partition("=")
+        try:
+            args[key.strip()] = json.loads(value)
+        except ValueError:
+            args[key.strip()] = value.strip()
+    return {"tool": tool, "args": args}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list, 0.0 if empty."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q * len(sorted_values)) - 1
+    return sorted_values[min(len(sorted_values) - 1, max(0, rank))]
+
+
+def latency_summary(values) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean_s": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_s": percentile(ordered, 0.50),
+        "p95_s": percentile(ordered, 0.95),
+        "p99_s": percentile(ordered, 0.99),
+        "max_s": ordered[-1] if ordered else 0.0,
+    }
+
+
+def _slope(points: list) -> float:
+    """Least-squares slope of [(x, y), ...], 0.0 with fewer than two points."""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+@dataclass
+class Cycle:
+    cycle: int
+    offset_s: float
+    elapsed: float
+    ok: bool
+    steps: list = field(default_factory=list)
+    error: str = None
+
+
+class SoakStats:
+    """Rolling latency percentiles, failure rate and drift of soak cycles."""
+
+    def __init__(
+        self, window: int = DEFAULT_WINDOW, drift_threshold=DEFAULT_DRIFT_THRESHOLD
+    ):
+        """
+        Args:
+            window: Cycles in the rolling window, and in the drift baseline
+            drift_threshold: p50 increase over the baseline, in percent,
+                that counts as drift
+        """
+        self.window = window
+        self.drift_threshold = drift_threshold
+        self.cycles = []
+        self._recent = deque(maxlen=window)
+        self._baseline = None
+        self.failures = 0
+        self.consecutive_failures = 0
+
+    def add(self, cycle: Cycle) -> None:
+        self.cycles.append(cycle)
+        self._recent.append(cycle)
+        if cycle.ok:
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+        if self._baseline is None and len(self.cycles) == self.window:
+            self._baseline = latency_summary(c.elapsed for c in self.cycles if c.ok)
+
+    def rolling(self) -> dict:
+        """Latency of the successful cycles in the window, and its failure rate."""
+        recent = list(self._recent)
+        return {
+            **latency_summary(c.elapsed for c in recent if c.ok),
+            "failure_rate": (
+                sum(not c.ok for c in recent) / len(recent) if recent else 0.0
+            ),
+        }
+
+    def drift(self) -> dict:
+        """
+        Latency drift of the successful cycles.
+
+        Returns:
+            dict: baseline_p50_s (first window), current_p50_s (rolling
+            window), drift_pct between them, slope_ms_per_100 (least squares
+            over all cycles) and drifting (drift_pct over the threshold);
+            the p50 fields are None until the first window is full
+        """
+        points = [(c.cycle, c.elapsed) for c in self.cycles if c.ok]
+        drift = {
+            "baseline_p50_s": None,
+            "current_p50_s": None,
+            "drift_pct": None,
+            "slope_ms_per_100": _slope(points) * 1000 * 100,
+            "drifting": False,
+        }
+        if self._baseline is None or not self._baseline["count"]:
+            return drift
+        current = self.rolling()["p50_s"]
+        baseline = self._baseline["p50_s"]
+        drift_pct = (current / baseline - 1) * 100 if baseline else 0.0
+        drift.update(
+            baseline_p50_s=baseline,
+            current_p50_s=current,
+            drift_pct=drift_pct,
+            drifting=drift_pct > self.drift_threshold,
+        )
+        return drift
+
+    def summary(self) -> dict:
+        total = len(self.cycles)
+        return {
+            "cycles": total,
+            "failures": self.failures,
+            "failure_rate": self.failures / total if total else 0.0,
+            "latency": latency_summary(c.elapsed for c in self.cycles if c.ok),
+            "rolling": self.rolling(),
+            "drift": self.drift(),
+            "steps": self.step_summary(),
+        }
+
+    def step_summary(self) -> dict:
+        """Latency and failures per step position, e.g. "1:set_background_effects"."""
+        by_step = {}
+        for cycle in self.cycles:
+            for index, step in enumerate(cycle.steps, 1):
+                entry = by_step.setdefault(
+                    f"{index}:{step['tool']}", {"elapsed": [], "failures": 0}
+                )
+                entry["elapsed"].append(step["elapsed"])
+                entry["failures"] += not step["ok"]
+        return {
+            key: {**latency_summary(entry["elapsed"]), "failures": entry["failures"]}
+            for key, entry in by_step.items()
+        }
+
+
+class SoakRunner:
+    """Runs a tool sequence in a loop against one device and times each cycle."""
+
+    def __init__(
+        self,
+        steps: list,
+        setup: list = None,
+        backend: str = None,
+        device=None,
+        stats: SoakStats = None,
+    ):
+        """
+        Args:
+            steps: [{"tool", "args"}, ...] run once per cycle
+            setup: Steps run once before the first cycle
+            backend: Tool backend, CAMERA_BACKEND if None; "remote" with device
+            device: RemoteDevice to drive instead of the local tools
+            stats: SoakStats collecting the cycles, a default one if None
+        """
+        self.steps = steps
+        self.setup = setup or []
+        self.device = device
+        self.backend = "remote" if device else get_backend_name(backend)
+        self.tools = get_tools(self.backend)
+        self.stats = stats or SoakStats()
+
+    def _bind(self):
+        if self.device is None:
+            return nullcontext()
+        from src.tools.remote import use_device
+
+        return use_device(self.device)
+
+    def _call(self, step: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            output = str(getattr(self.tools, step["tool"])(**step["args"]))
+            ok = not _is_failure(output)
+        except Exception as e:
+            output, ok = f"{type(e).__name__}: {e}", False
+        return {
+            "tool": step["tool"],
+            "elapsed": time.perf_counter() - start,
+            "ok": ok,
+            "output": output,
+        }
+
+    def run_setup(self) -> list:
+        """Run the setup steps; raises RuntimeError if one fails."""
+        with self._bind():
+            results = [self._call(step) for step in self.setup]
+        failed = [r for r in results if not r["ok"]]
+        if failed:
+            raise RuntimeError(
+                f"Setup failed at {failed[0]['tool']}: {failed[0]['output']}"
+            )
+        return results
+
+    def run_cycle(self, number: int, offset: float) -> Cycle:
+        start = time.perf_counter()
+        steps = []
+        with self._bind():
+            for step in self.steps:
+                result = self._call(step)
+                steps.append(result)
+                if not result["ok"]:
+                    break
+        failed = next((s for s in steps if not s["ok"]), None)
+        return Cycle(
+            cycle=number,
+            offset_s=offset,
+            elapsed=time.perf_counter() - start,
+            ok=failed is None,
+            # Outputs are kept for failed steps only, to bound report size
+            steps=[
+                {k: v for k, v in s.items() if k != "output" or not s["ok"]}
+                for s in steps
+            ],
+            error=f"{failed['tool']}: {failed['output']}" if failed else None,
+        )
+
+    def run(
+        self,
+        cycles: int = None,
+        duration: float = None,
+        report_every: int = 50,
+        max_consecutive_failures: int = None,
+        on_report=None,
+    ) -> SoakStats:
+        """
+        Run cycles until the count or the duration is reached.
+
+        Args:
+            cycles: Stop after this many cycles
+            duration: Stop after this many seconds; with neither, run until
+                interrupted
+            report_every: Call on_report every this many cycles
+            max_consecutive_failures: Stop when this many cycles in a row
+                failed, e.g. because the Camera app crashed
+            on_report: Called with (cycle number, SoakStats)
+
+        Returns:
+            SoakStats: The collected cycles; Ctrl+C stops the soak early
+        """
+        start = time.perf_counter()
+        number = 0
+        try:
+            while (cycles is None or number < cycles) and (
+                duration is None or time.perf_counter() - start < duration
+            ):
+                number += 1
+                cycle = self.run_cycle(number, time.perf_counter() - start)
+                self.stats.add(cycle)
+                if on_report is not None and number % report_every == 0:
+                    on_report(number, self.stats)
+                if (
+                    max_consecutive_failures
+                    and self.stats.consecutive_failures >= max_consecutive_failures
+                ):
+                    print(
+                        f"Stopping: {self.stats.consecutive_failures} consecutive "
+                        f"failed cycles (last: {cycle.error})"
+                    )
+                    break
+        except KeyboardInterrupt:
+            print(f"Interrupted after {len(self.stats.cycles)} cycles")
+        return self.stats
+
+
+def format_report_line(number: int, stats: SoakStats) -> str:
+    rolling = stats.rolling()
+    drift = stats.drift()
+    line = (
+        f"cycle {number}: p50 {rolling['p50_s'] * 1000:.0f}ms "
+        f"p95 {rolling['p95_s'] * 1000:.0f}ms p99 {rolling['p99_s'] * 1000:.0f}ms, "
+        f"failures {rolling['failure_rate']:.1%} (window) "
+        f"{stats.failures}/{len(stats.cycles)} (total)"
+    )
+    if drift["drift_pct"] is not None:
+        line += f", drift {drift['drift_pct']:+.1f}%" + (
+            " DRIFTING" if drift["drifting"] else ""
+        )
+    return line
+
+
+def write_json_report(path, stats: SoakStats, meta: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "meta": meta,
+        "summary": stats.summary(),
+        "cycles": [asdict(c) for c in stats.cycles],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak the Camera tools directly")
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="Tool sequence")
+    parser.add_argument("--step", action="append", default=[], metavar="TOOL[:K=V]")
+    parser.add_argument("--setup", action="append", default=[], metavar="TOOL[:K=V]")
+    parser.add_argument("--cycles", type=int, help="Number of cycles")
+    parser.add_argument("--duration", type=float, help="Seconds to run")
+    parser.add_argument("--backend", type=str, help="windows or simulated")
+    parser.add_argument("--device", type=str, metavar="NAME=URL", help="Tool daemon")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument(
+        "--drift_threshold", type=float, default=DEFAULT_DRIFT_THRESHOLD
+    )
+    parser.add_argument("--report_every", type=int, default=50)
+    parser.add_argument("--max_consecutive_failures", type=int, default=10)
+    parser.add_argument("--json", type=str, default=str(DEFAULT_JSON_REPORT))
+    args = parser.parse_args()
+
+    if args.step:
+        setup, steps = [], [parse_step(s) for s in args.step]
+    elif args.preset:
+        setup, steps = PRESETS[args.preset]
+    else:
+        parser.error("Give --preset or at least one --step")
+    if args.setup:
+        setup = [parse_step(s) for s in args.setup]
+
+    device = None
+    if args.device:
+        from src.tools.remote import RemoteDevice
+
+        device = RemoteDevice(*args.device.split("=", 1))
+
+    runner = SoakRunner(
+        steps,
+        setup=setup,
+        backend=args.backend,
+        device=device,
+        stats=SoakStats(window=args.window, drift_threshold=args.drift_threshold),
+    )
+    meta = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "backend": runner.backend,
+        "device": device.name if device else None,
+        "preset": None if args.step else args.preset,
+        "setup": setup,
+        "steps": steps,
+        "cycles": args.cycles,
+        "duration_s": args.duration,
+        "window": args.window,
+    }
+    print(
+        f"Soaking {' -> '.join(s['tool'] for s in steps)} on {runner.backend} "
+        f"({args.cycles or 'unlimited'} cycles"
+        + (f", {args.duration:.0f}s" if args.duration else "")
+        + ")"
+    )
+    runner.run_setup()
+    stats = runner.run(
+        cycles=args.cycles,
+        duration=args.duration,
+        report_every=args.report_every,
+        max_consecutive_failures=args.max_consecutive_failures,
+        on_report=lambda number, stats: print(format_report_line(number, stats)),
+    )
+
+    write_json_report(args.json, stats, meta)
+    summary = stats.summary()
+    latency, drift = summary["latency"], summary["drift"]
+    print(
+        f"{summary['cycles']} cycles, {summary['failures']} failed "
+        f"({summary['failure_rate']:.1%}); p50 {latency['p50_s'] * 1000:.0f}ms "
+        f"p95 {latency['p95_s'] * 1000:.0f}ms p99 {latency['p99_s'] * 1000:.0f}ms "
+        f"max {latency['max_s'] * 1000:.0f}ms; slope "
+        f"{drift['slope_ms_per_100']:+.2f}ms/100 cycles"
+        + (
+            f", drift {drift['drift_pct']:+.1f}%"
+            if drift["drift_pct"] is not None
+            else ""
+        )
+    )
+    for key, step in summary["steps"].items():
+        print(
+            f"  {key:<32} p50 {step['p50_s'] * 1000:6.0f}ms "
+            f"p99 {step['p99_s'] * 1000:6.0f}ms  {step['failures']} failed"
+        )
+    print(f"Report: {args.json}")
+    raise SystemExit(1 if drift["drifting"] or summary["failures"] else 0)
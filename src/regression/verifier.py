@@ -0,0 +1,90 @@
+"""
+Post-condition checks for test cases.
+
+Each test case in cases/test_cases.json may declare the end state it
+expects under "expected":
+
+    "expected": {"camera": "FFC", "mode": "video",
+                 "background_effects": true, "new_photos": 0}
+
+verify() compares that against take_snapshot() taken before and after
+the run. State keys are compared with the snapshot after the run;
+new_photos and new_videos are the difference between the two snapshots.
+A key the snapshot could not observe (None) fails its check.
+"""
+
+from typing import List, Optional
+
+# Keys read directly from the snapshot after the run
+STATE_KEYS = [
+    "running",
+    "minimized",
+    "camera",
+    "mode",
+    "background_effects",
+    "automatic_framing",
+]
+# Expected key -> snapshot counter compared before and after the run
+COUNT_KEYS = {"new_photos": "photos", "new_videos": "videos"}
+POSTCONDITION_KEYS = STATE_KEYS + list(COUNT_KEYS)
+
+
+def validate_expected(expected: dict) -> None:
+    """
+    Raises:
+        ValueError: If expected has keys verify() does not know
+    """
+    unknown = sorted(set(expected) - set(POSTCONDITION_KEYS))
+    if unknown:
+        raise ValueError(
+            f"Unknown post-condition keys {unknown}; use {POSTCONDITION_KEYS}"
+        )
+
+
+def _count_delta(before: Optional[dict], after: dict, counter: str):
+    if before is None or before.get(counter) is None or after.get(counter) is None:
+        return None
+    return after[counter] - before[counter]
+
+
+def verify(expected: dict, before: Optional[dict], after: dict) -> List[dict]:
+    """
+    Check a test case's post-conditions.
+
+    Args:
+        expected: The case's "expected" block
+        before: Snapshot taken before the run, needed for new_photos/new_videos
+        after: Snapshot taken after the run
+
+    Returns:
+        list: One {"key", "expected", "actual", "ok"} per expected key
+    """
+    validate_expected(expected)
+    checks = []
+    for key, value in expected.items():
+        if key in COUNT_KEYS:
+            actual = _count_delta(before, after, COUNT_KEYS[key])
+        else:
+            actual = after.get(key)
+        checks.append(
+            {
+                "key": key,
+                "expected": value,
+                "actual": actual,
+                "ok": actual is not None and actual == value,
+            }
+        )
+    return checks
+
+
+def failed_checks(checks: List[dict]) -> List[dict]:
+    return [c for c in checks if not c["ok"]]
+
+
+def format_checks(checks: List[dict]) -> str:
+    """One line per failed check, e.g. "camera: expected 'FFC', got 'RFC'"."""
+    lines = []
+    for check in failed_checks(checks):
+        actual = "not observable" if check["actual"] is None else repr(check["actual"])
+        lines.append(f"{check['key']}: expected {check['expected']!r}, got {actual}")
+    return "\n".join(lines)
@@ -0,0 +1,67 @@
+"""
+Selects the implementation behind the Camera tool functions.
+
+    windows     src/tools/tools.py, pywinauto against the local Camera app
+    simulated   src/tools/simulated.py, an in-memory Camera app
+    remote      src/tools/remote.py, forwarded to a tool daemon
+
+Configuration (environment variables):
+    CAMERA_BACKEND   windows (default), simulated or remote
+"""
+
+import importlib
+import os
+
+BACKENDS = {
+    "windows": "src.tools.tools",
+    "simulated": "src.tools.simulated",
+    "remote": "src.tools.remote",
+}
+
+# Every tool the agents or the daemon may call
+TOOL_NAMES = [
+    "open_camera",
+    "close_camera",
+    "minimize_camera",
+    "restore_camera",
+    "click_windows_studio_effects",
+    "check_background_effects_state",
+    "set_blur_type",
+    "set_background_effects",
+    "check_automatic_framing_state",
+    "set_automatic_framing",
+    "get_current_camera",
+    "switch_camera",
+    "camera_mode",
+    "take_photo",
+    "take_video",
+    "open_system_menu",
+    "open_photo_settings",
+    "open_video_settings",
+    "open_video_quality",
+    "get_video_quality_options",
+    "set_video_quality",
+]
+
+
+def get_backend_name(backend: str = None) -> str:
+    name = (backend or os.getenv("CAMERA_BACKEND") or "windows").lower()
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown CAMERA_BACKEND {name!r}; use one of {sorted(BACKENDS)}"
+        )
+    return name
+
+
+def get_tools(backend: str = None):
+    """
+    Module providing the Camera tool functions.
+
+    Args:
+        backend: Backend name, CAMERA_BACKEND or "windows" if None
+
+    Returns:
+        module: A module with one function per name in TOOL_NAMES, plus
+        take_snapshot() for post-condition checks
+    """
+    return importlib.import_module(BACKENDS[get_backend_name(backend)])
@@ -0,0 +1,166 @@
+"""
+Tool-execution daemon: serves the Camera tools of this host over HTTP.
+
+Run one daemon on every camera host. The orchestrator (LLM planning and
+the job queue) can then live anywhere and drive many hosts through
+src/tools/remote.py and src/jobs/dispatcher.py. Requests carry a batch of
+tool calls that run in order while holding the device lock, so batches
+from different callers never interleave on the Camera app. A caller
+whose workflow is cancelled stops its running batch through /v1/cancel;
+the batch's tools see it at their cancellation points, so a long
+recording is cut short and saved rather than run to the end.
+
+Endpoints:
+    POST /v1/tools/batch   {"calls": [{"tool": "take_photo", "args": {"num_photos": 2}}],
+                            "stop_on_error": true, "batch_id": "..."}
+    POST /v1/cancel        {"batch_id": "...", "reason": "Stopped by user"}
+    GET  /v1/snapshot      End state of the Camera app, for post-condition checks
+    GET  /v1/health
+
+Usage:
+    python -m src.tools.daemon --port 8770 [--backend simulated] [--device_id lab-01]
+
+Set CAMERA_DAEMON_KEY to require "Authorization: Bearer <key>".
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+
+from src.tools.backend import TOOL_NAMES, get_backend_name, get_tools
+from src.tools.device import DEVICE_LOCK, get_device_metrics
+from src.utils.cancellation import CancellationToken, Cancelled, cancel_scope
+
+
+class ToolCall(BaseModel):
+    tool: str
+    args: dict = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    calls: List[ToolCall]
+    stop_on_error: bool = True
+    batch_id: Optional[str] = None
+
+
+class CancelRequest(BaseModel):
+    batch_id: str
+    reason: str = "Cancelled by the caller"
+
+
+def require_daemon_key(request: Request):
+    api_key = os.getenv("CAMERA_DAEMON_KEY")
+    if api_key and request.headers.get("authorization") != f"Bearer {api_key}":
+        raise HTTPException(401, "Invalid or missing daemon key")
+
+
+def create_daemon_app(backend: str = None, device_id: str = None) -> FastAPI:
+    """
+    Args:
+        backend: Tool backend served, CAMERA_BACKEND or "windows" if None.
+            "remote" is refused; a daemon does not forward to another daemon.
+        device_id: Name reported by /v1/health, the hostname if None
+    """
+    backend = get_backend_name(backend)
+    if backend == "remote":
+        raise ValueError("A tool daemon cannot serve the remote backend")
+    tools = get_tools(backend)
+    device_id = device_id or socket.gethostname()
+    started = time.time()
+    stats = {"batches": 0, "calls": 0, "errors": 0, "cancelled": 0}
+    # Cancellation tokens of the batches running or queued for the device
+    running = {}
+    running_lock = threading.Lock()
+
+    app = FastAPI(title="Camera tool daemon", default_response_class=ORJSONResponse)
+
+    # Sync endpoints run in Starlette's thread pool; DEVICE_LOCK queues them
+    @app.post("/v1/tools/batch", dependencies=[Depends(require_daemon_key)])
+    def run_batch(body: BatchRequest):
+        unknown = [c.tool for c in body.calls if c.tool not in TOOL_NAMES]
+        if unknown:
+            raise HTTPException(400, f"Unknown tools: {unknown}")
+
+        token = CancellationToken()
+        if body.batch_id:
+            with running_lock:
+                running[body.batch_id] = token
+        results, cancelled = [], None
+        try:
+            with DEVICE_LOCK, cancel_scope(token):
+                stats["batches"] += 1
+                for call in body.calls:
+                    start = time.perf_counter()
+                    try:
+                        result, error = getattr(tools, call.tool)(**call.args), None
+                    except Cancelled as e:
+                        # The tool stopped at a cancellation point; skip the rest
+                        result, error, cancelled = None, f"Cancelled: {e}", str(e)
+                        stats["cancelled"] += 1
+                    except Exception as e:
+                        result, error = None, f"{type(e).__name__}: {e}"
+                        stats["errors"] += 1
+                    stats["calls"] += 1
+                    results.append(
+                        {
+                            "tool": call.tool,
+                            "result": result,
+                            "error": error,
+                            "elapsed": time.perf_counter() - start,
+                        }
+                    )
+                    if cancelled or (error and body.stop_on_error):
+                        break
+        finally:
+            if body.batch_id:
+                with running_lock:
+                    running.pop(body.batch_id, None)
+        return {"device": device_id, "results": results, "cancelled": cancelled}
+
+    @app.post("/v1/cancel", dependencies=[Depends(require_daemon_key)])
+    def cancel(body: CancelRequest):
+        with running_lock:
+            token = running.get(body.batch_id)
+        if token is not None:
+            token.cancel(body.reason)
+        return {"cancelled": token is not None}
+
+    @app.get("/v1/snapshot", dependencies=[Depends(require_daemon_key)])
+    def snapshot():
+        return tools.take_snapshot()
+
+    @app.get("/v1/health", dependencies=[Depends(require_daemon_key)])
+    def health():
+        return {
+            "device": device_id,
+            "backend": backend,
+            "uptime_s": time.time() - started,
+            "tools": TOOL_NAMES,
+            **stats,
+            "running": len(running),
+            "lock": get_device_metrics(),
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Camera tool-execution daemon")
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--backend", type=str, help="windows or simulated")
+    parser.add_argument("--device_id", type=str, help="Name reported in health")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_daemon_app(args.backend, args.device_id), host=args.host, port=args.port
+    )
@@ -0,0 +1,138 @@
+"""
+Serialised access to the physical Camera app.
+
+There is one Camera window per machine, so every UI action takes
+DEVICE_LOCK. Planning and conversation for different chat sessions still
+run in parallel; only the tool calls that drive the UI queue up here.
+
+A cancelled workflow (src/utils/cancellation.py) stops at the next tool
+call, including while it is queued for the lock, so it never holds up
+the callers behind it.
+"""
+
+import functools
+import os
+import threading
+import time
+
+from src.utils.cancellation import POLL_INTERVAL, check_cancelled, current_token
+
+DEVICE_LOCK = threading.RLock()
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {
+    "acquisitions": 0,
+    "waiting": 0,
+    "total_wait": 0.0,
+    "max_wait": 0.0,
+    "total_held": 0.0,
+    "ui_waits": 0,
+    "total_ui_wait": 0.0,
+}
+
+
+def device_action(func):
+    """
+    Run a Camera UI tool while holding DEVICE_LOCK.
+
+    The lock is re-entrant, so tools that call other tools (e.g.
+    set_blur_type opening the effects panel) do not deadlock. Only the
+    outermost call is counted in the metrics, and only it checks for
+    cancellation, so a tool is never abandoned half-way.
+
+    Raises:
+        Cancelled: If the current workflow is cancelled before the tool
+            gets the device
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, "depth", 0):
+            _local.depth += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.depth -= 1
+
+        check_cancelled()
+        with _stats_lock:
+            _stats["waiting"] += 1
+        start = time.perf_counter()
+        try:
+            _acquire()
+        finally:
+            with _stats_lock:
+                _stats["waiting"] -= 1
+        try:
+            acquired = time.perf_counter()
+            wait = acquired - start
+            with _stats_lock:
+                _stats["acquisitions"] += 1
+                _stats["total_wait"] += wait
+                _stats["max_wait"] = max(_stats["max_wait"], wait)
+            _local.depth = 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.depth = 0
+                with _stats_lock:
+                    _stats["total_held"] += time.perf_counter() - acquired
+        finally:
+            DEVICE_LOCK.release()
+
+    return wrapper
+
+
+def _acquire() -> None:
+    """Take DEVICE_LOCK, giving up if the current workflow is cancelled meanwhile."""
+    token = current_token()
+    if token is None:
+        DEVICE_LOCK.acquire()
+        return
+    while True:
+        remaining = token.remaining()
+        if DEVICE_LOCK.acquire(timeout=min(POLL_INTERVAL, remaining or POLL_INTERVAL)):
+            return
+        token.check()
+
+
+def ui_wait(seconds: float) -> None:
+    """
+    Wait for the Camera UI to settle after an action.
+
+    The fixed waits of the Windows tools go through here, so they show up
+    in get_device_metrics() and can be scaled with CAMERA_UI_WAIT_SCALE
+    (default 1; 0 skips the sleep but still counts the nominal wait, as in
+    the benchmarks against a fake UI tree).
+    """
+    with _stats_lock:
+        _stats["ui_waits"] += 1
+        _stats["total_ui_wait"] += seconds
+    scale = float(os.getenv("CAMERA_UI_WAIT_SCALE", "1"))
+    if scale > 0:
+        time.sleep(seconds * scale)
+
+
+def get_device_metrics() -> dict:
+    """
+    Report device lock contention.
+
+    Returns:
+        dict: Acquisitions, callers currently waiting, mean/max wait and
+        mean hold time in milliseconds, total hold time, and the number and
+        nominal total of UI settle waits
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    n = stats["acquisitions"]
+    return {
+        "acquisitions": n,
+        "waiting": stats["waiting"],
+        "mean_wait_ms": stats["total_wait"] / n * 1000 if n else 0.0,
+        "max_wait_ms": stats["max_wait"] * 1000,
+        "mean_held_ms": stats["total_held"] / n * 1000 if n else 0.0,
+        "total_held_s": stats["total_held"],
+        "ui_waits": stats["ui_waits"],
+        "total_ui_wait_s": stats["total_ui_wait"],
+    }
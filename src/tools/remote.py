@@ -0,0 +1,305 @@
+"""
+Camera tools forwarded to a tool daemon (src/tools/daemon.py) on another host.
+
+Each function here has the name and signature of the local tool, so the
+agents are unchanged. Calls go to the device bound with use_device(), or
+to CAMERA_DEVICE_URL when none is bound. The fleet dispatcher
+(src/jobs/dispatcher.py) binds one device per running job. Cancelling
+the workflow's token while a batch runs cancels it on the daemon too,
+so a long take_video stops early instead of holding the device.
+
+    device = RemoteDevice("lab-01", "http://lab-01:8770")
+    with use_device(device):
+        open_camera()
+
+Configuration (environment variables):
+    CAMERA_DEVICE_URL   Default daemon URL when no device is bound
+    CAMERA_DAEMON_KEY   Bearer key sent to the daemons
+"""
+
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import httpx
+
+from src.tools import simulated
+from src.tools.backend import TOOL_NAMES
+from src.utils.cancellation import (
+    POLL_INTERVAL,
+    Cancelled,
+    check_cancelled,
+    current_token,
+)
+
+
+class DeviceUnavailable(Exception):
+    """The tool daemon could not be reached or answered with an error status."""
+
+
+class ToolTimeout(Exception):
+    """The daemon still answers pings but did not finish a batch in time."""
+
+
+def batch_seconds(calls: list) -> float:
+    """Seconds a batch is expected to record for, from its take_video durations."""
+    seconds = 0.0
+    for call in calls:
+        if call["tool"] == "take_video":
+            try:
+                seconds += max(float(call.get("args", {}).get("duration", 0)), 0.0)
+            except (TypeError, ValueError):
+                pass
+    return seconds
+
+
+class RemoteDevice:
+    """Client for one tool daemon, with health state for the dispatcher."""
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        api_key: str = None,
+        timeout: float = 300.0,
+    ):
+        """
+        Args:
+            name: Device name, used to pin jobs to this device
+            url: Base URL of the daemon, e.g. http://lab-01:8770
+            api_key: Bearer key, CAMERA_DAEMON_KEY if None
+            timeout: Seconds to wait for a batch of tool calls on top of
+                the recordings it makes
+        """
+        self.name = name
+        self.timeout = timeout
+        self.url = url.rstrip("/")
+        api_key = api_key or os.getenv("CAMERA_DAEMON_KEY")
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.Client(
+            base_url=self.url,
+            headers=headers,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+        )
+        self._lock = threading.Lock()
+        self.healthy = True
+        self.last_check = None
+        self.last_error = None
+        self.latency_ms = None
+        self.failures = 0
+        self.calls = 0
+
+    def __repr__(self) -> str:
+        return f"RemoteDevice({self.name!r}, {self.url!r})"
+
+    def _failed(self, error: str) -> None:
+        with self._lock:
+            self.failures += 1
+            self.healthy = False
+            self.last_error = error
+
+    def _lost(self, error: Exception) -> DeviceUnavailable:
+        """Record a tool call that could not reach the daemon."""
+        self._failed(str(error))
+        losses = _device_losses.get()
+        if losses is not None:
+            losses.append(f"{self.name}: {error}")
+        return DeviceUnavailable(f"{self.name}: {error}")
+
+    def call_batch(self, calls: list, stop_on_error: bool = True) -> list:
+        """
+        Execute tool calls on the device in one request. The daemon holds
+        the device for the whole batch, so no other caller interleaves.
+
+        Args:
+            calls: [{"tool": name, "args": {...}}, ...]
+            stop_on_error: Skip the remaining calls after one raises
+
+        Returns:
+            list: One {"tool", "result", "error", "elapsed"} per executed call
+
+        Raises:
+            DeviceUnavailable: If the daemon cannot be reached
+            ToolTimeout: If the batch outlives its read timeout on a daemon
+                that still answers pings
+            Cancelled: If the current workflow was cancelled and the daemon
+                stopped the batch
+        """
+        timeout = self.timeout + batch_seconds(calls)
+        batch_id = uuid.uuid4().hex
+        done = threading.Event()
+        token = current_token()
+        if token is not None:
+            threading.Thread(
+                target=self._cancel_when,
+                args=(token, batch_id, done),
+                name=f"camera-cancel-{self.name}",
+                daemon=True,
+            ).start()
+        try:
+            response = self._client.post(
+                "/v1/tools/batch",
+                json={
+                    "calls": calls,
+                    "stop_on_error": stop_on_error,
+                    "batch_id": batch_id,
+                },
+                timeout=httpx.Timeout(timeout, connect=5.0),
+            )
+            response.raise_for_status()
+        except httpx.ReadTimeout as e:
+            # A daemon that answers pings is still running the batch under
+            # its device lock; re-running the job elsewhere would not help
+            if self.check_health():
+                raise ToolTimeout(
+                    f"{self.name}: no answer within {timeout:.0f}s"
+                ) from e
+            raise self._lost(e) from e
+        except httpx.HTTPError as e:
+            raise self._lost(e) from e
+        finally:
+            done.set()
+        body = response.json()
+        with self._lock:
+            self.calls += len(body["results"])
+        if body.get("cancelled"):
+            check_cancelled()
+            raise Cancelled(body["cancelled"])
+        return body["results"]
+
+    def _cancel_when(self, token, batch_id: str, done: threading.Event) -> None:
+        """Forward token's cancellation to the daemon until the batch is done."""
+        while not done.wait(POLL_INTERVAL):
+            if not token.cancelled:
+                continue
+            try:
+                response = self._client.post(
+                    "/v1/cancel",
+                    json={"batch_id": batch_id, "reason": token.reason},
+                    timeout=5.0,
+                )
+                # Not running yet means the batch is still on its way; retry
+                if response.json().get("cancelled"):
+                    return
+            except (httpx.HTTPError, ValueError):
+                pass
+
+    def call(self, tool: str, **kwargs):
+        """Execute one tool and return its result."""
+        result = self.call_batch([{"tool": tool, "args": kwargs}])[0]
+        if result["error"]:
+            raise RuntimeError(f"{tool} failed on {self.name}: {result['error']}")
+        return result["result"]
+
+    def snapshot(self) -> dict:
+        """The device's take_snapshot(), for post-condition checks."""
+        try:
+            response = self._client.get("/v1/snapshot")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise self._lost(e) from e
+        return response.json()
+
+    def check_health(self) -> bool:
+        """Ping the daemon and update healthy, latency_ms and last_check."""
+        start = time.perf_counter()
+        try:
+            response = self._client.get("/v1/health", timeout=5.0)
+            response.raise_for_status()
+            health = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self._failed(str(e))
+        else:
+            with self._lock:
+                self.healthy = True
+                self.last_error = None
+                self.latency_ms = (time.perf_counter() - start) * 1000
+                self.health = health
+        self.last_check = time.time()
+        return self.healthy
+
+    def close(self) -> None:
+        self._client.close()
+
+
+_current_device = contextvars.ContextVar("camera_device", default=None)
+_device_losses = contextvars.ContextVar("camera_device_losses", default=None)
+_default_device = None
+
+
+@contextmanager
+def use_device(device: RemoteDevice):
+    """Send the tool calls made in this context to device."""
+    token = _current_device.set(device)
+    try:
+        yield device
+    finally:
+        _current_device.reset(token)
+
+
+@contextmanager
+def track_device_loss():
+    """
+    Collect the errors of tool calls made in this context that could not
+    reach their device. Health checks from other threads are not counted,
+    so a missed ping does not make a job that ran fine look lost.
+
+    Yields:
+        list: One message per lost call, filled in as calls fail
+    """
+    losses = []
+    token = _device_losses.set(losses)
+    try:
+        yield losses
+    finally:
+        _device_losses.reset(token)
+
+
+def current_device() -> RemoteDevice:
+    """The bound device, or one for CAMERA_DEVICE_URL."""
+    global _default_device
+    device = _current_device.get()
+    if device is not None:
+        return device
+    if _default_device is None:
+        url = os.getenv("CAMERA_DEVICE_URL")
+        if not url:
+            raise DeviceUnavailable(
+                "No camera device bound and CAMERA_DEVICE_URL is not set"
+            )
+        _default_device = RemoteDevice("default", url)
+    return _default_device
+
+
+def _remote_tool(local_func):
+    """Forwarding function with local_func's name, signature and docstring."""
+    signature = inspect.signature(local_func)
+
+    @functools.wraps(local_func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        # Stop before sending; once sent, call_batch cancels it on the daemon
+        check_cancelled()
+        try:
+            return current_device().call(local_func.__name__, **bound.arguments)
+        except Exception as e:
+            print(f"{local_func.__name__} failed on remote device. Error: {e}")
+            return f"{local_func.__name__} failed on remote device. Error: {e}"
+
+    return wrapper
+
+
+# The simulated tools share the Windows signatures and import anywhere
+for _name in TOOL_NAMES:
+    globals()[_name] = _remote_tool(getattr(simulated, _name))
+
+
+def take_snapshot() -> dict:
+    """End state of the bound device's Camera app (see tools.take_snapshot)."""
+    return current_device().snapshot()
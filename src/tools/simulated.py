@@ -0,0 +1,606 @@
+"""
+Simulated Camera app with the same tool functions as src/tools/tools.py.
+
+The Windows tools drive the real app through pywinauto. These keep an
+in-memory model of the app instead: open/minimised, front or rear camera,
+photo or video mode, the Windows Studio Effects panel and its toggles,
+and a count of photos and videos taken. Names, signatures and result
+strings match the Windows tools, so agents, the job queue and the tool
+daemon run unchanged on any OS.
+
+Select it with CAMERA_BACKEND=simulated (see src/tools/backend.py).
+
+Configuration (environment variables):
+    CAMERA_SIM_TIME_SCALE   Multiplier for the UI waits of the real tools,
+                            0 = instant (default 0)
+"""
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Annotated, Any, Literal, Optional, Tuple
+
+from src.tools.device import device_action
+from src.utils.cancellation import Cancelled, interruptible_sleep
+
+VIDEO_QUALITIES = [
+    "1440p 16:9 30fps",
+    "1440p 4:3 30fps",
+    "1080p 16:9 30fps",
+    "1080p 4:3 30fps",
+    "720p 16:9 30fps",
+    "480p 4:3 30fps",
+    "360p 16:9 30fps",
+]
+
+
+@dataclass
+class CameraState:
+    """Everything the Camera tools can observe or change."""
+
+    running: bool = False
+    minimized: bool = False
+    camera: str = "FFC"
+    mode: str = "photo"
+    studio_effects_open: bool = False
+    background_effects: bool = False
+    blur_type: str = "standard"
+    automatic_framing: bool = False
+    open_menu: Optional[str] = None
+    video_quality: str = "1080p 16:9 30fps"
+    photos_taken: int = 0
+    videos_recorded: int = 0
+    actions: list = field(default_factory=list)
+
+
+_state = CameraState()
+_state_lock = threading.Lock()
+
+
+def _pause(seconds: float) -> None:
+    """The UI wait of the real tool, scaled by CAMERA_SIM_TIME_SCALE."""
+    scale = float(os.getenv("CAMERA_SIM_TIME_SCALE", "0"))
+    if scale > 0:
+        time.sleep(seconds * scale)
+
+
+def _record(action: str) -> None:
+    _state.actions.append(action)
+
+
+def get_state() -> dict:
+    """Snapshot of the simulated app."""
+    with _state_lock:
+        return asdict(_state)
+
+
+def reset_state(**overrides) -> dict:
+    """Reset the simulated app to a fresh state, optionally overriding fields."""
+    global _state
+    with _state_lock:
+        _state = CameraState(**overrides)
+        return asdict(_state)
+
+
+def _window_error() -> Optional[str]:
+    if not _state.running:
+        return "No windows for that process could be found"
+    return None
+
+
+@device_action
+def open_camera() -> Annotated[Optional[str], "Camera app opened successfully."]:
+    """
+    Open the Camera app if it's not already running.
+    """
+    _record("open_camera")
+    if _state.running:
+        print("Camera app is already running.")
+        return "Camera app is already running."
+    _state.running = True
+    _state.minimized = False
+    _pause(3)
+    print("Camera app opened successfully.")
+    return "Camera app opened successfully."
+
+
+@device_action
+def close_camera() -> Annotated[Optional[str], "Camera app closed successfully."]:
+    """
+    Close the Camera app.
+    """
+    _record("close_camera")
+    error = _window_error()
+    if error:
+        print(f"Failed to close Camera app. Error: {error}")
+        return f"Failed to close Camera app. Error: {error}"
+    _state.running = False
+    _state.studio_effects_open = False
+    _state.open_menu = None
+    print("Camera app closed successfully.")
+    return "Camera app closed successfully."
+
+
+@device_action
+def minimize_camera() -> Annotated[Optional[str], "Camera app minimized successfully."]:
+    """
+    Minimize the Camera app.
+    """
+    _record("minimize_camera")
+    error = _window_error()
+    if error:
+        print(f"Failed to minimize Camera app. Error: {error}")
+        return f"Failed to minimize Camera app. Error: {error}"
+    if _state.minimized:
+        print("Minimize button is not accessible.")
+        return "Minimize button is not accessible."
+    _state.minimized = True
+    _pause(1)
+    print("Camera app minimized successfully.")
+    return "Camera app minimized successfully."
+
+
+@device_action
+def restore_camera() -> Annotated[Optional[str], "Camera app restored successfully."]:
+    """
+    Restore the Camera app.
+    """
+    _record("restore_camera")
+    error = _window_error()
+    if error:
+        print(f"Failed to restore Camera app. Error: {error}")
+        return f"Failed to restore Camera app. Error: {error}"
+    _state.minimized = False
+    _pause(1)
+    print("Camera app restored successfully.")
+    return "Camera app restored successfully."
+
+
+def _ui_error() -> Optional[str]:
+    """Controls are only reachable while the window is open and visible."""
+    error = _window_error()
+    if error is None and _state.minimized:
+        error = "Element is not visible"
+    return error
+
+
+@device_action
+def click_windows_studio_effects() -> (
+    Annotated[Optional[str], "'Windows Studio Effects' button clicked."]
+):
+    """
+    Click the 'Windows Studio Effects' button if it's not already expanded.
+    """
+    mode_result = camera_mode("video")
+    if (
+        mode_result != "Already in video mode"
+        and mode_result != "Camera mode switched to video"
+    ):
+        print("Failed to ensure video mode")
+        return "Failed to ensure video mode"
+    if _state.camera != "FFC":
+        print("'Windows Studio Effects' button is not accessible.")
+        return "'Windows Studio Effects' button is not accessible."
+    if _state.studio_effects_open:
+        print("'Windows Studio Effects' panel is already open.")
+        return "'Windows Studio Effects' panel is already open."
+    _state.studio_effects_open = True
+    _pause(1)
+    print("'Windows Studio Effects' button clicked.")
+    return "'Windows Studio Effects' button clicked."
+
+
+@device_action
+def check_background_effects_state() -> (
+    Annotated[Optional[int], "The state of the toggle button (0 for off, 1 for on)."]
+):
+    """
+    Check the state of the background effects toggle button.
+    Returns:
+        int: The state of the toggle button (0 for off, 1 for on).
+    """
+    error = _ui_error()
+    if error:
+        print(f"Failed to check Background effects state. Error: {error}")
+        return None
+    click_windows_studio_effects()
+    if not _state.studio_effects_open:
+        print("Background effects button not found")
+        return None
+    state = "ON" if _state.background_effects else "OFF"
+    print(f"Background effects is {state}")
+    return int(_state.background_effects)
+
+
+@device_action
+def set_blur_type(
+    blur_type: Annotated[str, "Either 'standard' or 'portrait'"],
+) -> Annotated[Optional[str], "Blur type set successfully."]:
+    """
+    Set the blur type to either 'standard' or 'portrait'.
+    First checks if background effects is enabled, enables it if not.
+
+    Args:
+        blur_type (str): Either 'standard' or 'portrait'
+    """
+    _record(f"set_blur_type({blur_type})")
+    error = _ui_error()
+    if error:
+        print(f"Failed to set blur type. Error: {error}")
+        return f"Failed to set blur type. Error: {error}"
+    effects_state = check_background_effects_state()
+    if effects_state != 1 and _state.studio_effects_open:
+        _state.background_effects = True
+        _pause(1)
+        print("Enabled background effects")
+
+    if blur_type.lower() not in ("standard", "portrait"):
+        print(f"Invalid blur type: {blur_type}. Use 'standard' or 'portrait'")
+        return f"Invalid blur type: {blur_type}. Use 'standard' or 'portrait'"
+    if not _state.background_effects:
+        print(f"Could not find {blur_type} blur radio button")
+        return f"Could not find {blur_type} blur radio button"
+    _state.blur_type = blur_type.lower()
+    print(f"Set blur type to: {blur_type}")
+    return f"Set blur type to: {blur_type}"
+
+
+def _ensure_ffc_with_effects() -> Optional[str]:
+    """Shared first steps of the effect toggles: FFC camera, panel open."""
+    current_type, detect_msg = get_current_camera()
+    if current_type is None:
+        return f"Failed to detect camera type: {detect_msg}"
+    if current_type != "FFC":
+        switch_result = switch_camera(target_type="FFC")
+        if "successfully" not in switch_result:
+            return f"Failed to switch to FFC camera: {switch_result}"
+        _pause(2)
+    effects_result = click_windows_studio_effects()
+    if "not accessible" in effects_result or "Failed" in effects_result:
+        return f"Failed to access Windows Studio Effects: {effects_result}"
+    return None
+
+
+@device_action
+def set_background_effects(
+    desired_state: Annotated[bool, "True=ON, False=OFF"],
+) -> Annotated[str, "Background effects toggled successfully."]:
+    """
+    Set background effects to a specific state, ensuring FFC camera is active first.
+    Note: This function leaves the Windows Studio Effects panel open after completion.
+
+    Args:
+        desired_state (bool): True to set ON, False to set OFF
+    """
+    _record(f"set_background_effects({desired_state})")
+    error = _ensure_ffc_with_effects()
+    if error:
+        return error
+    if _state.background_effects != bool(desired_state):
+        _state.background_effects = bool(desired_state)
+        _pause(1)
+        print(f"Background effects switched to: {'ON' if desired_state else 'OFF'}")
+        return "Background effects toggled successfully."
+    print(
+        f"Background effects already in desired state: {'ON' if desired_state else 'OFF'}"
+    )
+    return "Background effects already in desired state."
+
+
+@device_action
+def check_automatic_framing_state() -> int:
+    """
+    Check the state of the automatic framing toggle button.
+    Returns:
+        int: The state of the toggle button (0 for off, 1 for on).
+    """
+    error = _ui_error()
+    if error:
+        print(f"Failed to check Automatic framing state. Error: {error}")
+        return None
+    click_windows_studio_effects()
+    if not _state.studio_effects_open:
+        print("Automatic framing button not found")
+        return None
+    state = "ON" if _state.automatic_framing else "OFF"
+    print(f"Automatic framing is {state}")
+    return int(_state.automatic_framing)
+
+
+@device_action
+def set_automatic_framing(
+    desired_state: Annotated[bool, "True=ON, False=OFF"],
+) -> Annotated[str, "Automatic framing toggled successfully."]:
+    """
+    Set automatic framing to a specific state.
+
+    Args:
+        desired_state (bool): True to set ON, False to set OFF
+    """
+    _record(f"set_automatic_framing({desired_state})")
+    error = _ensure_ffc_with_effects()
+    if error:
+        return error
+    if _state.automatic_framing != bool(desired_state):
+        _state.automatic_framing = bool(desired_state)
+        _pause(1)
+        print(f"Automatic framing switched to: {'ON' if desired_state else 'OFF'}")
+        return "Automatic framing toggled successfully."
+    print(
+        f"Automatic framing already in desired state: {'ON' if desired_state else 'OFF'}"
+    )
+    return "Automatic framing already in desired state."
+
+
+@device_action
+def get_current_camera() -> Tuple[Optional[Literal["FFC", "RFC"]], str]:
+    """
+    Detect current camera type (FFC or RFC).
+
+    Returns:
+        Tuple[Optional[CameraType], str]: (camera_type, message)
+        camera_type will be "FFC" or "RFC" if detected, None if detection fails
+    """
+    error = _ui_error()
+    if error:
+        return None, f"Failed to detect camera type. Error: {error}"
+    if _state.mode == "video":
+        if _state.camera == "FFC":
+            return (
+                "FFC",
+                "Front-facing camera detected (Windows Studio Effects available)",
+            )
+        return (
+            "RFC",
+            "Rear-facing camera detected (panorama mode available in video)",
+        )
+    if _state.camera == "FFC":
+        return "FFC", "Front-facing camera detected (barcode mode available)"
+    return "RFC", "Rear-facing camera detected (document mode available)"
+
+
+@device_action
+def switch_camera(
+    target_type: Optional[Literal["FFC", "RFC"]] = None,
+) -> Annotated[str, "Operation result message"]:
+    """
+    Switch between available cameras with optional target type specification.
+
+    Args:
+        target_type: Target camera type ("FFC" or "RFC"). If None, simply switches to other camera.
+
+    Returns:
+        str: Operation result message
+    """
+    _record(f"switch_camera({target_type})")
+    current_type, detect_msg = get_current_camera()
+    print(f"Current camera type: {current_type}")
+    if current_type is None:
+        print(f"Failed to switch camera. Error: {detect_msg}")
+        return f"Failed to switch camera. Error: {detect_msg}"
+    if target_type and current_type == target_type:
+        return f"Already using {target_type} camera, no switch needed"
+    _state.camera = "RFC" if current_type == "FFC" else "FFC"
+    # Studio effects only exist on the front camera
+    _state.studio_effects_open = False
+    _pause(2)
+    return "Camera switched successfully"
+
+
+@device_action
+def camera_mode(
+    mode: Annotated[str, "Either 'photo' or 'video'"],
+) -> Annotated[Optional[str], "Camera mode set successfully."]:
+    """
+    Set the camera mode to either 'photo' or 'video'.
+
+    Args:
+        mode (str): Either 'photo' or 'video'
+    """
+    error = _ui_error()
+    if error:
+        print(f"Failed to switch camera mode. Error: {error}")
+        return f"Failed to switch camera mode. Error: {error}"
+    if mode.lower() == "photo":
+        if _state.mode == "video":
+            _state.mode = "photo"
+            _pause(1)
+            print("Camera mode switched to photo")
+            return "Camera mode switched to photo"
+        print("Already in photo mode")
+        return "Already in photo mode"
+    elif mode.lower() == "video":
+        if _state.mode == "video":
+            print("Already in video mode")
+            return "Already in video mode"
+        _state.mode = "video"
+        _pause(1)
+        print("Camera mode switched to video")
+        return "Camera mode switched to video"
+    print(f"Invalid mode: {mode}. Use either 'photo' or 'video'")
+    return f"Invalid mode: {mode}. Use either 'photo' or 'video'"
+
+
+def _close_studio_effects() -> None:
+    if _state.studio_effects_open:
+        _state.studio_effects_open = False
+        _pause(1)
+        print("Closed Windows Studio Effects panel")
+
+
+@device_action
+def take_photo(
+    num_photos: Annotated[int, "Number of photos to take"] = 1,
+) -> Annotated[Optional[str], "Photos taken successfully."]:
+    """
+    Take one or more photos. If Windows Studio Effects button exists and panel is open, closes it before taking photos.
+
+    Args:
+        num_photos (int): Number of photos to take (default: 1)
+    """
+    _record(f"take_photo({num_photos})")
+    error = _ui_error()
+    if error:
+        print(f"Failed to take photos. Error: {error}")
+        return f"Failed to take photos. Error: {error}"
+    _close_studio_effects()
+    photo_result = camera_mode("photo")
+    if photo_result and "Failed" in photo_result:
+        return photo_result
+    for i in range(num_photos):
+        _state.photos_taken += 1
+        _pause(2)
+        print(f"Photo {i+1}/{num_photos} taken successfully")
+    return f"{num_photos} photo{'s' if num_photos > 1 else ''} taken successfully"
+
+
+@device_action
+def take_video(
+    duration: Annotated[float, "Recording duration in seconds"],
+) -> Annotated[Optional[str], "Video recorded successfully."]:
+    """
+    Record a video for a specified duration. If Windows Studio Effects button exists and panel is open, closes it before recording.
+
+    Args:
+        duration (float): Recording duration in seconds
+    """
+    _record(f"take_video({duration})")
+    error = _ui_error()
+    if error:
+        print(f"Failed to record video. Error: {error}")
+        return f"Failed to record video. Error: {error}"
+    _close_studio_effects()
+    video_result = camera_mode("video")
+    if video_result and "Failed" in video_result:
+        return video_result
+    print(f"Recording video for {duration} seconds...")
+    try:
+        # Like the real recording, the only wait a cancelled workflow cuts short
+        interruptible_sleep(duration * float(os.getenv("CAMERA_SIM_TIME_SCALE", "0")))
+        _pause(1)
+    except Cancelled:
+        # The real tool stops the recording, which still saves the file
+        print("Workflow cancelled; stopping the recording early")
+        _state.videos_recorded += 1
+        raise
+    _state.videos_recorded += 1
+    print("Video recorded successfully")
+    return "Video recorded successfully"
+
+
+def _open_menu(name: str, label: str, pause: float) -> str:
+    error = _ui_error()
+    if error:
+        print(f"Failed to open {label}. Error: {error}")
+        return f"Failed to open {label}. Error: {error}"
+    _state.open_menu = name
+    _pause(pause)
+    print(f"{label[0].upper()}{label[1:]} opened successfully")
+    return f"{label[0].upper()}{label[1:]} opened successfully"
+
+
+@device_action
+def open_system_menu() -> Annotated[Optional[str], "System menu opened successfully."]:
+    """
+    Open the system menu in the Camera app.
+    """
+    return _open_menu("system", "system menu", 1)
+
+
+@device_action
+def open_photo_settings() -> (
+    Annotated[Optional[str], "Photo settings opened successfully."]
+):
+    """
+    Open the photo settings menu in the Camera app.
+    """
+    return _open_menu("photo_settings", "photo settings", 0.5)
+
+
+@device_action
+def open_video_settings() -> (
+    Annotated[Optional[str], "Video settings opened successfully."]
+):
+    """
+    Open the video settings menu in the Camera app.
+    """
+    return _open_menu("video_settings", "video settings", 0.5)
+
+
+@device_action
+def open_video_quality() -> (
+    Annotated[Optional[Any], "Video quality ComboBox or error message"]
+):
+    """
+    Open the video quality settings in the Camera app.
+    Returns the selected quality if successful, error message string if not.
+    """
+    if _ui_error() or _state.open_menu != "video_settings":
+        print("Video quality settings not found")
+        return "Video quality settings not found"
+    _pause(0.5)
+    print("Video quality settings opened successfully")
+    return _state.video_quality
+
+
+@device_action
+def get_video_quality_options() -> (
+    Annotated[list[str], "List of available video quality options"]
+):
+    """
+    Get a list of all available video quality options from the Camera app.
+
+    Returns:
+        list[str]: List of available quality options (e.g., ['1440p 16:9 30fps', ...])
+    """
+    if _ui_error():
+        print("Video quality ComboBox not found")
+        return []
+    print(f"Found {len(VIDEO_QUALITIES)} video quality options: {VIDEO_QUALITIES}")
+    return list(VIDEO_QUALITIES)
+
+
+@device_action
+def set_video_quality(quality: str) -> str:
+    _record(f"set_video_quality({quality})")
+    error = _ui_error()
+    if error:
+        return f"Error: {error}"
+    if quality not in VIDEO_QUALITIES:
+        return f"Error: {quality!r} is not in list"
+    _state.video_quality = quality
+    return f"Set quality to {quality}"
+
+
+@device_action
+def take_snapshot() -> dict:
+    """
+    Observe the simulated app the way tools.take_snapshot observes the real
+    one: effect toggles are only visible while the Studio Effects panel is
+    open on the front camera.
+    """
+    snapshot = {
+        "running": _state.running,
+        "minimized": None,
+        "camera": None,
+        "mode": None,
+        "studio_effects_open": None,
+        "background_effects": None,
+        "automatic_framing": None,
+        "photos": _state.photos_taken,
+        "videos": _state.videos_recorded,
+    }
+    if not _state.running:
+        return snapshot
+    snapshot["minimized"] = _state.minimized
+    if _state.minimized:
+        return snapshot
+    snapshot["camera"] = _state.camera
+    snapshot["mode"] = _state.mode
+    if _state.camera == "FFC" and _state.mode == "video":
+        snapshot["studio_effects_open"] = _state.studio_effects_open
+        if _state.studio_effects_open:
+            snapshot["background_effects"] = _state.background_effects
+            snapshot["automatic_framing"] = _state.automatic_framing
+    return snapshot
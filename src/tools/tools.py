@@ -1,11 +1,17 @@
+import os
 import subprocess
 import time
+from pathlib import Path
 from typing import Annotated, Any, Literal, Optional, Tuple
 
 from pywinauto import Application
 from pywinauto.findwindows import ElementNotFoundError
 
+from src.tools.device import device_action, ui_wait
+from src.utils.cancellation import Cancelled, interruptible_sleep
 
+
+@device_action
 def open_camera() -> Annotated[Optional[str], "Camera app opened successfully."]:
     """
     Open the Camera app if it's not already running.
@@ -20,7 +26,7 @@ def open_camera() -> Annotated[Optional[str], "Camera app opened successfully."]
             # If connect fails, then open new instance
             subprocess.run("start microsoft.windows.camera:", shell=True, check=True)
             print("Camera app opened successfully.")
-            time.sleep(3)
+            ui_wait(3)
             return "Camera app opened successfully."
     except subprocess.CalledProcessError as e:
         print(f"Failed to open the Camera app. Error: {e}")
@@ -30,6 +36,7 @@ def open_camera() -> Annotated[Optional[str], "Camera app opened successfully."]
         return f"An error occurred: {e}"
 
 
+@device_action
 def close_camera() -> Annotated[Optional[str], "Camera app closed successfully."]:
     """
     Close the Camera app.
@@ -45,6 +52,7 @@ def close_camera() -> Annotated[Optional[str], "Camera app closed successfully."
         return f"Failed to close Camera app. Error: {e}"
 
 
+@device_action
 def minimize_camera() -> Annotated[Optional[str], "Camera app minimized successfully."]:
     """
     Minimize the Camera app.
@@ -57,7 +65,7 @@ def minimize_camera() -> Annotated[Optional[str], "Camera app minimized successf
         )
         if minimize_button.exists() and minimize_button.is_enabled():
             minimize_button.click_input()
-            time.sleep(1)
+            ui_wait(1)
             print("Camera app minimized successfully.")
             return "Camera app minimized successfully."
         else:
@@ -68,6 +76,7 @@ def minimize_camera() -> Annotated[Optional[str], "Camera app minimized successf
         return f"Failed to minimize Camera app. Error: {e}"
 
 
+@device_action
 def restore_camera() -> Annotated[Optional[str], "Camera app restored successfully."]:
     """
     Restore the Camera app.
@@ -79,7 +88,7 @@ def restore_camera() -> Annotated[Optional[str], "Camera app restored successful
         if window.exists():
             window.restore()
             window.set_focus()
-            time.sleep(1)
+            ui_wait(1)
             print("Camera app restored successfully.")
             return "Camera app restored successfully."
         else:
@@ -90,6 +99,7 @@ def restore_camera() -> Annotated[Optional[str], "Camera app restored successful
         return f"Failed to restore Camera app. Error: {e}"
 
 
+@device_action
 def click_windows_studio_effects() -> (
     Annotated[Optional[str], "'Windows Studio Effects' button clicked."]
 ):
@@ -117,7 +127,7 @@ def click_windows_studio_effects() -> (
             # Check if the button is already in pressed state (panel is open)
             if not button.get_toggle_state():
                 button.click_input()
-                time.sleep(1)
+                ui_wait(1)
                 print("'Windows Studio Effects' button clicked.")
                 return "'Windows Studio Effects' button clicked."
             else:
@@ -131,6 +141,7 @@ def click_windows_studio_effects() -> (
         return f"Failed to interact with 'Windows Studio Effects' button. Error: {e}"
 
 
+@device_action
 def check_background_effects_state() -> (
     Annotated[Optional[int], "The state of the toggle button (0 for off, 1 for on)."]
 ):
@@ -160,6 +171,7 @@ def check_background_effects_state() -> (
         return None
 
 
+@device_action
 def set_blur_type(
     blur_type: Annotated[str, "Either 'standard' or 'portrait'"],
 ) -> Annotated[Optional[str], "Blur type set successfully."]:
@@ -182,7 +194,7 @@ def set_blur_type(
             )
             if effects_button.exists():
                 effects_button.click_input()
-                time.sleep(1)
+                ui_wait(1)
                 print("Enabled background effects")
 
         # Now select the blur type
@@ -211,6 +223,7 @@ def set_blur_type(
         return f"Failed to set blur type. Error: {e}"
 
 
+@device_action
 def set_background_effects(
     desired_state: Annotated[bool, "True=ON, False=OFF"],
 ) -> Annotated[str, "Background effects toggled successfully."]:
@@ -231,7 +244,7 @@ def set_background_effects(
             switch_result = switch_camera(target_type="FFC")
             if "successfully" not in switch_result:
                 return f"Failed to switch to FFC camera: {switch_result}"
-            time.sleep(2)
+            ui_wait(2)
 
         app = Application(backend="uia").connect(title_re="Camera")
         window = app.window(title_re="Camera")
@@ -255,7 +268,7 @@ def set_background_effects(
 
             if should_click:
                 button.click_input()
-                time.sleep(1)
+                ui_wait(1)
                 new_state = "ON" if button.get_toggle_state() == 1 else "OFF"
                 print(f"Background effects switched to: {new_state}")
                 return f"Background effects toggled successfully."
@@ -273,6 +286,7 @@ def set_background_effects(
         return f"Failed to set background effects. Error: {e}"
 
 
+@device_action
 def check_automatic_framing_state() -> int:
     """
     Check the state of the automatic framing toggle button.
@@ -302,6 +316,7 @@ def check_automatic_framing_state() -> int:
         return None
 
 
+@device_action
 def set_automatic_framing(
     desired_state: Annotated[bool, "True=ON, False=OFF"],
 ) -> Annotated[str, "Automatic framing toggled successfully."]:
@@ -322,7 +337,7 @@ def set_automatic_framing(
             switch_result = switch_camera(target_type="FFC")
             if "successfully" not in switch_result:
                 return f"Failed to switch to FFC camera: {switch_result}"
-            time.sleep(2)
+            ui_wait(2)
 
         app = Application(backend="uia").connect(title_re="Camera")
         window = app.window(title_re="Camera")
@@ -347,7 +362,7 @@ def set_automatic_framing(
 
             if should_click:
                 button.click_input()
-                time.sleep(1)
+                ui_wait(1)
                 new_state = "ON" if button.get_toggle_state() == 1 else "OFF"
                 print(f"Automatic framing switched to: {new_state}")
                 return f"Automatic framing toggled successfully."
@@ -365,6 +380,7 @@ def set_automatic_framing(
         return f"Failed to set automatic framing. Error: {e}"
 
 
+@device_action
 def get_current_camera() -> Tuple[Optional[Literal["FFC", "RFC"]], str]:
     """
     Detect current camera type (FFC or RFC) based on UI elements present.
@@ -460,6 +476,7 @@ def get_current_camera() -> Tuple[Optional[Literal["FFC", "RFC"]], str]:
         return None, f"Failed to detect camera type. Error: {e}"
 
 
+@device_action
 def switch_camera(
     target_type: Optional[Literal["FFC", "RFC"]] = None,
 ) -> Annotated[str, "Operation result message"]:
@@ -491,7 +508,7 @@ def switch_camera(
 
         if button.exists() and button.is_enabled():
             button.click_input()
-            time.sleep(2)  # Increased wait time to 2 seconds
+            ui_wait(2)  # Increased wait time to 2 seconds
 
             # # Verify switch result if target was specified
             # if target_type:
@@ -529,6 +546,7 @@ def switch_camera(
         return f"Failed to switch camera. Error: {e}"
 
 
+@device_action
 def camera_mode(
     mode: Annotated[str, "Either 'photo' or 'video'"],
 ) -> Annotated[Optional[str], "Camera mode set successfully."]:
@@ -555,7 +573,7 @@ def camera_mode(
             if switch_to_photo.exists():
                 # If we can see "Switch to photo mode", we're in video mode and need to switch
                 switch_to_photo.click_input()
-                time.sleep(1)
+                ui_wait(1)
                 print("Camera mode switched to photo")
                 return "Camera mode switched to photo"
             else:
@@ -574,7 +592,7 @@ def camera_mode(
                 switch_to_video = window.child_window(auto_id="CaptureButton_1")
                 if switch_to_video.exists():
                     switch_to_video.click_input()
-                    time.sleep(1)
+                    ui_wait(1)
                     print("Camera mode switched to video")
                     return "Camera mode switched to video"
                 else:
@@ -618,6 +636,7 @@ def camera_mode(
 #         return f"Failed to take photo. Error: {e}"
 
 
+@device_action
 def take_photo(
     num_photos: Annotated[int, "Number of photos to take"] = 1,
 ) -> Annotated[Optional[str], "Photos taken successfully."]:
@@ -642,7 +661,7 @@ def take_photo(
         if button.exists():
             if button.is_enabled() and button.get_toggle_state():
                 button.click_input()
-                time.sleep(1)  # Wait for panel to close
+                ui_wait(1)  # Wait for panel to close
                 print("Closed Windows Studio Effects panel")
         else:
             print("Windows Studio Effects button not found (possibly in FFC mode)")
@@ -657,7 +676,7 @@ def take_photo(
         if take_button.exists() and take_button.is_enabled():
             for i in range(num_photos):
                 take_button.click_input()
-                time.sleep(2)  # Wait for photo to be taken
+                ui_wait(2)  # Wait for photo to be taken
                 print(f"Photo {i+1}/{num_photos} taken successfully")
 
             return (
@@ -717,6 +736,7 @@ def take_photo(
 #         return f"Failed to record video. Error: {e}"
 
 
+@device_action
 def take_video(
     duration: Annotated[float, "Recording duration in seconds"],
 ) -> Annotated[Optional[str], "Video recorded successfully."]:
@@ -741,7 +761,7 @@ def take_video(
         if button.exists():
             if button.is_enabled() and button.get_toggle_state():
                 button.click_input()
-                time.sleep(1)  # Wait for panel to close
+                ui_wait(1)  # Wait for panel to close
                 print("Closed Windows Studio Effects panel")
         else:
             print("Windows Studio Effects button not found (possibly in FFC mode)")
@@ -763,14 +783,29 @@ def take_video(
         record_button.click_input()
         print(f"Recording video for {duration} seconds...")
 
-        # Wait for specified duration
-        time.sleep(duration)
+        # Wait for specified duration; a cancelled workflow still stops the recording
+        try:
+            interruptible_sleep(duration)
+        except Cancelled:
+            print("Workflow cancelled; stopping the recording early")
+            _stop_recording(window)
+            raise
+
+        return _stop_recording(window)
+
+    except Exception as e:
+        print(f"Failed to record video. Error: {e}")
+        return f"Failed to record video. Error: {e}"
+
 
+def _stop_recording(window) -> str:
+    """Click the capture button again to end a recording started by take_video."""
+    try:
         # For stopping, we need to find the stop button (might have different title when recording)
         stop_button = window.child_window(auto_id="CaptureButton_1")
         if stop_button.exists() and stop_button.is_enabled():
             stop_button.click_input()
-            time.sleep(1)  # Wait for recording to finalize
+            ui_wait(1)  # Wait for recording to finalize
             print("Video recorded successfully")
             return "Video recorded successfully"
         else:
@@ -782,6 +817,7 @@ def take_video(
         return f"Failed to record video. Error: {e}"
 
 
+@device_action
 def open_system_menu() -> Annotated[Optional[str], "System menu opened successfully."]:
     """
     Open the system menu in the Camera app.
@@ -797,7 +833,7 @@ def open_system_menu() -> Annotated[Optional[str], "System menu opened successfu
 
         if system_menu.exists() and system_menu.is_enabled():
             system_menu.click_input()
-            time.sleep(1)  # Wait for menu to open
+            ui_wait(1)  # Wait for menu to open
             print("System menu opened successfully")
             return "System menu opened successfully"
         else:
@@ -809,6 +845,7 @@ def open_system_menu() -> Annotated[Optional[str], "System menu opened successfu
         return f"Failed to open system menu. Error: {e}"
 
 
+@device_action
 def open_photo_settings() -> (
     Annotated[Optional[str], "Photo settings opened successfully."]
 ):
@@ -826,7 +863,7 @@ def open_photo_settings() -> (
 
         if settings_button.exists() and settings_button.is_enabled():
             settings_button.click_input()
-            time.sleep(0.5)  # Wait for settings to open
+            ui_wait(0.5)  # Wait for settings to open
             print("Photo settings opened successfully")
             return "Photo settings opened successfully"
         else:
@@ -838,6 +875,7 @@ def open_photo_settings() -> (
         return f"Failed to open photo settings. Error: {e}"
 
 
+@device_action
 def open_video_settings() -> (
     Annotated[Optional[str], "Video settings opened successfully."]
 ):
@@ -855,7 +893,7 @@ def open_video_settings() -> (
 
         if settings_button.exists() and settings_button.is_enabled():
             settings_button.click_input()
-            time.sleep(0.5)  # Wait for settings to open
+            ui_wait(0.5)  # Wait for settings to open
             print("Video settings opened successfully")
             return "Video settings opened successfully"
         else:
@@ -867,6 +905,7 @@ def open_video_settings() -> (
         return f"Failed to open video settings. Error: {e}"
 
 
+@device_action
 def open_video_quality() -> (
     Annotated[Optional[Any], "Video quality ComboBox or error message"]
 ):
@@ -892,7 +931,7 @@ def open_video_quality() -> (
 
         if video_quality.exists() and video_quality.is_enabled():
             video_quality.click_input()
-            time.sleep(0.5)  # Wait for menu to open
+            ui_wait(0.5)  # Wait for menu to open
             print("Video quality settings opened successfully")
             return video_quality
         else:
@@ -904,6 +943,7 @@ def open_video_quality() -> (
         return f"Failed to open video quality settings. Error: {e}"
 
 
+@device_action
 def get_video_quality_options() -> (
     Annotated[list[str], "List of available video quality options"]
 ):
@@ -928,11 +968,11 @@ def get_video_quality_options() -> (
 
         # Click and send Down key to expand the ComboBox
         quality_combo.click_input()
-        time.sleep(0.5)
+        ui_wait(0.5)
         from pywinauto.keyboard import send_keys
 
         send_keys("{VK_DOWN}")
-        time.sleep(0.5)
+        ui_wait(0.5)
 
         # Get unique quality options (using the shorter format)
         quality_options = set()
@@ -960,6 +1000,7 @@ def get_video_quality_options() -> (
         return []
 
 
+@device_action
 def set_video_quality(quality: str) -> str:
     try:
         app = Application(backend="uia").connect(title_re="Camera")
@@ -977,7 +1018,7 @@ def set_video_quality(quality: str) -> str:
         # First go to top
         for _ in range(10):
             app.window(title_re="Camera").type_keys("{UP}")
-            time.sleep(0.1)
+            ui_wait(0.1)
 
         # Now move to desired option
         quality_list = [
@@ -993,7 +1034,7 @@ def set_video_quality(quality: str) -> str:
         target_index = quality_list.index(quality)
         for _ in range(target_index):
             app.window(title_re="Camera").type_keys("{DOWN}")
-            time.sleep(0.1)
+            ui_wait(0.1)
 
         # Select with enter
         app.window(title_re="Camera").type_keys("{ENTER}")
@@ -1002,3 +1043,104 @@ def set_video_quality(quality: str) -> str:
 
     except Exception as e:
         return f"Error: {str(e)}"
+
+
+
+PHOTO_EXTENSIONS = {".jpg", ".jpeg", ".png", ".heic"}
+VIDEO_EXTENSIONS = {".mp4", ".mov"}
+
+
+def count_media_files() -> Tuple[int, int]:
+    """
+    Count the photos and videos in the Camera Roll folder
+    (CAMERA_ROLL_DIR, default ~/Pictures/Camera Roll).
+    """
+    camera_roll = Path(
+        os.getenv("CAMERA_ROLL_DIR") or Path.home() / "Pictures" / "Camera Roll"
+    )
+    photos = videos = 0
+    if camera_roll.is_dir():
+        for path in camera_roll.iterdir():
+            suffix = path.suffix.lower()
+            photos += suffix in PHOTO_EXTENSIONS
+            videos += suffix in VIDEO_EXTENSIONS
+    return photos, videos
+
+
+@device_action
+def take_snapshot() -> dict:
+    """
+    Observe the Camera app's end state from one walk of its UI tree.
+
+    Returns:
+        dict: running, minimized, camera ("FFC"/"RFC"), mode ("photo"/"video"),
+        studio_effects_open, background_effects, automatic_framing, photos and
+        videos (Camera Roll file counts). Values that cannot be observed, e.g.
+        effect toggles while the Studio Effects panel is closed, are None.
+    """
+    photos, videos = count_media_files()
+    snapshot = {
+        "running": False,
+        "minimized": None,
+        "camera": None,
+        "mode": None,
+        "studio_effects_open": None,
+        "background_effects": None,
+        "automatic_framing": None,
+        "photos": photos,
+        "videos": videos,
+    }
+    try:
+        app = Application(backend="uia").connect(title_re="Camera")
+    except ElementNotFoundError:
+        return snapshot
+
+    try:
+        window = app.window(title_re="Camera")
+        snapshot["running"] = True
+        snapshot["minimized"] = window.is_minimized()
+
+        # One pass over the tree; later lookups are dictionary hits
+        controls = {}
+        for control in window.descendants():
+            info = control.element_info
+            controls.setdefault(info.name, {})[info.automation_id] = control
+
+        def find(name: str, auto_id: str = None):
+            matches = controls.get(name, {})
+            if auto_id is None:
+                return next(iter(matches.values()), None)
+            return matches.get(auto_id)
+
+        def toggle_state(control):
+            try:
+                return bool(control.get_toggle_state())
+            except Exception:
+                return None
+
+        if find("Take video", "CaptureButton_1"):
+            snapshot["mode"] = "video"
+            if find("Windows Studio Effects"):
+                snapshot["camera"] = "FFC"
+            elif find("Switch to panorama mode", "CaptureButton_2"):
+                snapshot["camera"] = "RFC"
+        elif find("Take photo", "CaptureButton_0"):
+            snapshot["mode"] = "photo"
+            if find("Switch to barcode mode", "CaptureButton_5"):
+                snapshot["camera"] = "FFC"
+            elif find("Switch to document mode", "CaptureButton_3"):
+                snapshot["camera"] = "RFC"
+
+        effects_button = find("Windows Studio Effects")
+        if effects_button is not None:
+            snapshot["studio_effects_open"] = toggle_state(effects_button)
+        for key, name in (
+            ("background_effects", "Background effects"),
+            ("automatic_framing", "Automatic framing"),
+        ):
+            control = find(name, "Switch")
+            if control is not None:
+                snapshot[key] = toggle_state(control)
+    except Exception as e:
+        print(f"Failed to take Camera app snapshot. Error: {e}")
+    return snapshot
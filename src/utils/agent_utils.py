@@ -1,16 +1,44 @@
+import os
 import time
-from typing import Tuple
-
-import gradio as gr
-from autogen import AssistantAgent, ConversableAgent, UserProxyAgent, register_function
-from fastapi import FastAPI
-from gradio.routes import mount_gradio_app
-
-from src.tools.tools import close_camera, open_camera
+import uuid
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from src.jobs.job_queue import get_job_queue
+from src.utils.cancellation import (
+    Cancelled,
+    CancellationToken,
+    DeadlineExceeded,
+    cancel_scope,
+    current_token,
+    default_deadline,
+)
+from src.utils.history_policy import (
+    apply_history_policies,
+    format_history_usage,
+    get_history_usage,
+)
+from src.utils.executors import install_llm_executor, run_blocking
+from src.utils.intent_classifier import (
+    get_default_classifier,
+    local_routing_enabled,
+)
+from src.utils.llm_metrics import (
+    format_usage_summary,
+    get_usage_summary,
+    track_component,
+    tracked_aiter,
+    tracked_iter,
+)
+from src.utils.llm_router import a_routed_reply, routed_reply
+from src.utils.plan_validator import check_plan
+from src.utils.step_scheduler import reorder_plan
+
+if TYPE_CHECKING:
+    from autogen import AssistantAgent, ConversableAgent, UserProxyAgent
 
 
 def register_agent_functions(
-    user_proxy_agent: ConversableAgent, agent_functions: list
+    user_proxy_agent: "ConversableAgent", agent_functions: list
 ) -> None:
     """
     Register multiple functions with their respective agents.
@@ -19,6 +47,8 @@ def register_agent_functions(
         user_proxy_agent: The executor agent for all functions
         agent_functions: List of tuples containing (function: function, caller_agent: ConversableAgent, name: str, description: str)
     """
+    from autogen import register_function
+
     for func, caller, name, description in agent_functions:
         register_function(
             f=func,
@@ -29,57 +59,52 @@ def register_agent_functions(
         )
 
 
-def interpret_query(
-    query: str, interpreter_agent: AssistantAgent
-) -> Tuple[str, int, str]:
+def parse_interpreter_response(response: str) -> Tuple[str, int, str]:
     """
-    Interpret a given query into command parameters using the interpreter agent.
+    Parse the interpreter's response into its components.
+    """
+    msg_type = None
+    iterations = 1
+    query = None
 
-    Args:
-        query (str): The user's input query to interpret
-        interpreter_agent: The LLM agent used for interpretation
+    try:
+        lines = response.strip().split("\n")
+        for line in lines:
+            if not line.strip():
+                continue
 
-    Returns:
-        tuple: (msg_type, iterations, query)
-    """
+            parts = [p.strip() for p in line.split(":", 1)]
+            if len(parts) != 2:
+                continue
 
-    def parse_interpreter_response(response):
-        """
-        Parse the interpreter's response into its components.
-        """
-        msg_type = None
-        iterations = 1
-        query = None
+            key, value = parts
 
-        try:
-            lines = response.strip().split("\n")
-            for line in lines:
-                if not line.strip():
-                    continue
+            if key == "TYPE":
+                msg_type = value
+            elif key == "ITERATIONS":
+                try:
+                    iterations = int(value)
+                except ValueError:
+                    iterations = 1
+            elif key == "QUERY":
+                query = value
 
-                parts = [p.strip() for p in line.split(":", 1)]
-                if len(parts) != 2:
-                    continue
+    except Exception as e:
+        print(f"Error parsing response: {e}")
 
-                key, value = parts
+    return msg_type, iterations, query
 
-                if key == "TYPE":
-                    msg_type = value
-                elif key == "ITERATIONS":
-                    try:
-                        iterations = int(value)
-                    except ValueError:
-                        iterations = 1
-                elif key == "QUERY":
-                    query = value
 
-        except Exception as e:
-            print(f"Error parsing response: {e}")
+def _interpretation_parsed(parsed: tuple) -> bool:
+    msg_type, _, query = parsed
+    return msg_type in ("TASK", "CONVERSATION", "UNCLEAR") and (
+        msg_type != "TASK" or bool(query)
+    )
 
-        return msg_type, iterations, query
 
+def _interpreter_messages(query: str) -> list:
     # Create the messages structure
-    messages = [
+    return [
         {
             "role": "user",
             "content": f"""Given this conversation context, interpret the user's intent into a clear command.
@@ -96,83 +121,41 @@ def interpret_query(
         }
     ]
 
-    # Get response from interpreter agent
-    response = interpreter_agent.generate_reply(messages)
-
-    # Parse and return the components
-    return parse_interpreter_response(response)
-
-
-# def determine_agents(
-#     task: str, decision_agent: ConversableAgent, agent_map: dict
-# ) -> Tuple[list, list]:
-#     """
-#     Determine the sequence of agents needed to complete a task.
-
-#     Args:
-#         task: The task to be completed
-#         decision_agent: The agent that will determine the sequence
-#         agent_map: Dictionary mapping agent names to actual agent objects
-#                   (e.g., {"data_fetcher_agent": data_fetcher})
-
-#     Returns:
-#         list: A list of agent objects in the order they should be executed
-#     """
-#     try:
-#         message = {
-#             "role": "user",
-#             "content": f"""Based on this task: '{task}', determine the sequence of agents needed to complete it.
-#                 Please respond with a Python list containing the required agents in order.
-#                 Use only these options:
-#                 {chr(10).join(f'- {agent}' for agent in agent_map.keys())}
-
-#                 If no agents are needed or the task is complete, return an empty list."""
-#         }
-
-#         response = decision_agent.generate_reply([message])
-
-#         try:
-#             agent_list = eval(response)
-#             if isinstance(agent_list, list):
-#                 if all(agent in agent_map for agent in agent_list):
-#                     return agent_list
-#                 else:
-#                     print(f"Invalid agent(s) in list: {agent_list}")
-#                     return []
-#             else:
-#                 print(f"Invalid response format: {response}")
-#                 return []
-#         except Exception as e:
-#             print(f"Error parsing response: {response}")
-#             print(f"Error details: {str(e)}")
-#             return []
-
-#     except Exception as e:
-#         print(f"Error in determine_agents: {str(e)}")
-#         return []
-
 
-def determine_agents(
-    task: str, decision_agent: ConversableAgent, agent_map: dict
-) -> Tuple[list, list]:
+def interpret_query(
+    query: str, interpreter_agent: "AssistantAgent"
+) -> Tuple[str, int, str]:
     """
-    Determine the sequence of agents needed to complete a task.
+    Interpret a given query into command parameters using the interpreter agent.
 
     Args:
-        task: The task to be completed
-        decision_agent: The agent that will determine the sequence
-        agent_map: Dictionary mapping agent names to actual agent objects
-                  (e.g., {"data_fetcher_agent": data_fetcher})
+        query (str): The user's input query to interpret
+        interpreter_agent: The LLM agent used for interpretation
 
     Returns:
-        Tuple[list, list]: A tuple containing:
-            - List of agent names in order they should be executed
-            - List of agent names with explicit state parameters
+        tuple: (msg_type, iterations, query)
+
+        The call is hedged and routed to the fastest configured model
+        (src/utils/llm_router.py).
     """
-    try:
-        message = {
-            "role": "user",
-            "content": f"""Based on this task: '{task}', determine the sequence of agents needed to complete it.
+
+    messages = _interpreter_messages(query)
+
+    # Get the parsed response from the interpreter agent
+    return routed_reply(
+        interpreter_agent,
+        messages,
+        "interpreter",
+        parse_interpreter_response,
+        _interpretation_parsed,
+        fast=True,
+    )
+
+
+def _manager_message(task: str, agent_map: dict) -> dict:
+    return {
+        "role": "user",
+        "content": f"""Based on this task: '{task}', determine the sequence of agents needed to complete it.
                 Analyze the task according to camera control operation requirements.
                 
                 Please respond with TWO Python lists:
@@ -183,85 +166,430 @@ def determine_agents(
                 {chr(10).join(f'- {agent}' for agent in agent_map.keys())}
                 
                 If no agents are needed or the task is complete, return two empty lists.""",
-        }
+    }
 
-        response = decision_agent.generate_reply([message])
 
-        try:
-            # Extract the two lists from the response
-            if "Sequence:" in response and "State:" in response:
-                sequence_part = (
-                    response.split("Sequence:")[1].split("State:")[0].strip()
-                )
-                state_part = response.split("State:")[1].strip()
-
-                agent_sequence = eval(sequence_part)
-                agent_states = eval(state_part)
+def parse_agent_lists(response: str, agent_map: dict) -> Optional[Tuple[list, list]]:
+    """
+    Parse the manager's "Sequence:" and "State:" lists.
 
-                if isinstance(agent_sequence, list) and isinstance(agent_states, list):
-                    if all(agent in agent_map for agent in agent_sequence):
-                        return agent_sequence, agent_states
-                    else:
-                        print(f"Invalid agent(s) in list: {agent_sequence}")
-                        return [], []
+    Returns:
+        The two lists, empty when the manager says no agents are needed,
+        or None if the reply does not parse or names an unknown agent
+    """
+    try:
+        # Extract the two lists from the response
+        if "Sequence:" in response and "State:" in response:
+            sequence_part = (
+                response.split("Sequence:")[1].split("State:")[0].strip()
+            )
+            state_part = response.split("State:")[1].strip()
+
+            agent_sequence = eval(sequence_part)
+            agent_states = eval(state_part)
+
+            if isinstance(agent_sequence, list) and isinstance(agent_states, list):
+                if all(agent in agent_map for agent in agent_sequence):
+                    return agent_sequence, agent_states
                 else:
-                    print(f"Invalid response format: {response}")
-                    return [], []
+                    print(f"Invalid agent(s) in list: {agent_sequence}")
+                    return None
             else:
-                print(f"Response missing Sequence or State: {response}")
-                return [], []
-        except Exception as e:
-            print(f"Error parsing response: {response}")
-            print(f"Error details: {str(e)}")
+                print(f"Invalid response format: {response}")
+                return None
+        else:
+            print(f"Response missing Sequence or State: {response}")
+            return None
+    except Exception as e:
+        print(f"Error parsing response: {response}")
+        print(f"Error details: {str(e)}")
+        return None
+
+
+def _plan_parsed(plan: Optional[tuple]) -> bool:
+    # Two empty lists are a valid answer: nothing to do
+    return plan is not None
+
+
+def determine_agents(
+    task: str, decision_agent: "ConversableAgent", agent_map: dict
+) -> Tuple[list, list]:
+    """
+    Determine the sequence of agents needed to complete a task.
+
+    Args:
+        task: The task to be completed
+        decision_agent: The agent that will determine the sequence
+        agent_map: Dictionary mapping agent names to actual agent objects
+                  (e.g., {"data_fetcher_agent": data_fetcher})
+
+    Returns:
+        Tuple[list, list]: A tuple containing:
+            - List of agent names in order they should be executed
+            - List of agent names with explicit state parameters
+
+        The plan is checked against the Camera state machine and repaired
+        where possible (src/utils/plan_validator.py); a plan that cannot
+        run comes back as two empty lists. Independent steps are then
+        reordered to save UI transitions (src/utils/step_scheduler.py).
+        The call is hedged, and a reply that does not parse is retried on
+        the stronger model if one is configured (src/utils/llm_router.py).
+    """
+    try:
+        message = _manager_message(task, agent_map)
+
+        plan = routed_reply(
+            decision_agent,
+            [message],
+            "manager",
+            lambda response: parse_agent_lists(response, agent_map),
+            _plan_parsed,
+        )
+        if plan is None:
             return [], []
+        return reorder_plan(*check_plan(*plan, agent_map, task))
 
     except Exception as e:
         print(f"Error in determine_agents: {str(e)}")
         return [], []
 
 
-def process_sequential_chats(
+def plan_query(query: str, agents=None) -> dict:
+    """
+    Interpret and plan a query into a workflow payload, as submitted to the
+    job queue.
+
+    Args:
+        agents: AgentSet to plan with; a new one is built if None
+    """
+    if agents is None:
+        from src.agents.agent_factory import build_agent_set
+
+        agents = build_agent_set()
+    _, iterations, interpreted_query = interpret_query(query, agents.interpreter_agent)
+    agent_sequence, agent_states = determine_agents(
+        interpreted_query, agents.manager_agent, agents.agent_map
+    )
+    return {
+        "query": interpreted_query,
+        "iterations": iterations,
+        "agent_sequence": agent_sequence,
+        "agent_states": agent_states,
+    }
+
+
+def reflection_summary(sender, recipient, summary_args: dict) -> str:
+    """
+    autogen's "reflection_with_llm" summary method, with its LLM call
+    accounted to the summary component of the step's agent.
+    """
+    from autogen import ConversableAgent
+
+    with track_component(f"summary:{recipient.name}"):
+        return ConversableAgent._reflection_with_llm_as_summary(
+            sender, recipient, summary_args
+        )
+
+
+def _step_context(
+    original_command: str, idx: int, agent_sequence: list, intended_action: str
+) -> str:
+    step_context = (
+        f"Original command: {original_command}\n"
+        f"Your role: You are step {idx + 1} in a {len(agent_sequence)}-step sequence.\n"
+        f"Your specific task: {intended_action}\n"
+        "\nPrevious steps executed:\n"
+    )
+
+    if idx > 0:
+        for step_num, prev_agent in enumerate(agent_sequence[:idx], 1):
+            step_context += f"Step {step_num}: Action by {prev_agent}\n"
+    else:
+        step_context += "No steps executed yet\n"
+    return step_context
+
+
+# summary_args of the reflection that ends each step's chat
+_STEP_SUMMARY_ARGS = {"summary_prompt": "What specific action did you take in this step?"}
+
+
+class _StepChat:
+    """A step's chat, yielded by _sequence_steps for its caller to run."""
+
+    def __init__(self, agent_name: str, message: str, carryover: list):
+        self.agent_name = agent_name
+        self.message = message
+        self.carryover = carryover
+
+    def run(self, user_proxy_agent, agent_map: dict, token: CancellationToken):
+        with track_component("steps"), cancel_scope(token):
+            return user_proxy_agent.initiate_chat(
+                agent_map[self.agent_name],
+                message=self.message,
+                max_turns=2,
+                summary_method=reflection_summary,
+                summary_args=_STEP_SUMMARY_ARGS,
+                carryover=self.carryover,
+            )
+
+    async def a_run(self, user_proxy_agent, agent_map: dict, token: CancellationToken):
+        # a_initiate_chat runs its summary method synchronously on the event
+        # loop, so the chat ends with "last_msg" and the reflection is awaited
+        recipient = agent_map[self.agent_name]
+        with track_component("steps"), cancel_scope(token):
+            result = await user_proxy_agent.a_initiate_chat(
+                recipient,
+                message=self.message,
+                max_turns=2,
+                summary_method="last_msg",
+                carryover=self.carryover,
+            )
+        result.summary = await a_reflection_summary(
+            user_proxy_agent, recipient, _STEP_SUMMARY_ARGS
+        )
+        return result
+
+
+def _sequence_steps(
     query: str,
     agent_sequence: list,
     agent_states: list,
-    agent_map: dict,
-    user_proxy_agent: UserProxyAgent,
-) -> None:
+    start_step: int = 0,
+    carryover: list = None,
+    token: CancellationToken = None,
+    tag: dict = None,
+):
     """
-    Process commands through a sequence of agents with clear action context.
-    Each agent receives information about what specific action they should take.
+    The steps of one pass over the agent sequence, without running them.
+
+    Yields each step's step_start event, then a _StepChat; the caller runs
+    it and sends back its ChatResult (or throws in its error), and the
+    step_end event follows. _run_steps and _a_run_steps are the callers.
     """
-    chat_configs = []
-    original_command = query
+    summaries = list(carryover or [])
+    total = len(agent_sequence)
 
-    # Build chat configurations for each agent
     for idx, (agent_name, intended_action) in enumerate(
         zip(agent_sequence, agent_states)
     ):
-        step_context = (
-            f"Original command: {original_command}\n"
-            f"Your role: You are step {idx + 1} in a {len(agent_sequence)}-step sequence.\n"
-            f"Your specific task: {intended_action}\n"
-            "\nPrevious steps executed:\n"
+        if idx < start_step:
+            continue
+        if token is not None:
+            token.check()
+        event = {
+            "step": idx + 1,
+            "total": total,
+            "agent": agent_name,
+            "action": intended_action,
+            **(tag or {}),
+        }
+        yield {"event": "step_start", **event}
+
+        start = time.perf_counter()
+        result = yield _StepChat(
+            agent_name,
+            _step_context(query, idx, agent_sequence, intended_action),
+            list(summaries),
         )
+        summaries.append(result.summary)
+
+        yield {
+            "event": "step_end",
+            **event,
+            "elapsed": time.perf_counter() - start,
+            "summary": result.summary,
+            "result": result,
+        }
 
-        if idx > 0:
-            for step_num, prev_agent in enumerate(agent_sequence[:idx], 1):
-                step_context += f"Step {step_num}: Action by {prev_agent}\n"
-        else:
-            step_context += "No steps executed yet\n"
-
-        chat_configs.append(
-            {
-                "recipient": agent_map[agent_name],
-                "message": step_context,
-                "max_turns": 2,
-                "summary_method": "reflection_with_llm",
-                "summary_prompt": "What specific action did you take in this step?",
-            }
+
+def _workflow_steps(
+    query: str,
+    iterations: int,
+    agent_sequence: list,
+    agent_states: list,
+    start_iteration: int = 1,
+    start_step: int = 0,
+    carryover: list = None,
+    token: CancellationToken = None,
+):
+    """_sequence_steps for every iteration, with iter_workflow's error events."""
+    i = start_iteration - 1
+    try:
+        for i in range(start_iteration - 1, iterations):
+            print(f"\nIteration {i+1}/{iterations}:")
+            resuming = i == start_iteration - 1
+            try:
+                yield from _sequence_steps(
+                    query,
+                    agent_sequence,
+                    agent_states,
+                    start_step=start_step if resuming else 0,
+                    carryover=carryover if resuming else None,
+                    token=token,
+                    tag={"iteration": i + 1, "iterations": iterations},
+                )
+            except Exception as e:
+                print(f"Error in iteration {i+1}: {str(e)}")
+                yield {
+                    "event": "error",
+                    "iteration": i + 1,
+                    "iterations": iterations,
+                    "error": str(e),
+                }
+    except Cancelled as e:
+        yield _cancelled_event(e, i + 1, iterations)
+
+
+def _run_steps(steps, user_proxy_agent, agent_map: dict, token: CancellationToken):
+    """Run the _StepChats of steps with initiate_chat, yielding its events."""
+    resume, value = steps.send, None
+    try:
+        while True:
+            try:
+                item = resume(value)
+            except StopIteration:
+                return
+            if not isinstance(item, _StepChat):
+                resume, value = steps.send, None
+                yield item
+                continue
+            try:
+                resume, value = steps.send, item.run(user_proxy_agent, agent_map, token)
+            except (Exception, Cancelled) as e:
+                resume, value = steps.throw, e
+    finally:
+        steps.close()
+
+
+async def _a_run_steps(steps, user_proxy_agent, agent_map: dict, token: CancellationToken):
+    """Async _run_steps, with a_initiate_chat."""
+    resume, value = steps.send, None
+    try:
+        while True:
+            try:
+                item = resume(value)
+            except StopIteration:
+                return
+            if not isinstance(item, _StepChat):
+                resume, value = steps.send, None
+                yield item
+                continue
+            try:
+                resume, value = steps.send, await item.a_run(user_proxy_agent, agent_map, token)
+            except (Exception, Cancelled) as e:
+                resume, value = steps.throw, e
+    finally:
+        steps.close()
+
+
+def iter_sequential_chats(
+    query: str,
+    agent_sequence: list,
+    agent_states: list,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+    start_step: int = 0,
+    carryover: list = None,
+    token: CancellationToken = None,
+):
+    """
+    Run the agent sequence one chat at a time, yielding progress events.
+
+    Each step is a separate initiate_chat that carries over the summaries of
+    the steps before it, the same as initiate_chats does.
+
+    Args:
+        start_step: 0-based index of the first step to run, when resuming
+        carryover: Summaries of the steps before start_step
+        token: Checked before each step and bound while it runs, so its
+            tool calls stop once it is cancelled; the current one if None
+
+    Raises:
+        Cancelled: If token is cancelled or its deadline passes
+
+    Yields:
+        dict: {"event": "step_start", "step", "total", "agent", "action"} before
+        each step and {"event": "step_end", ..., "elapsed", "summary",
+        "result"} after it
+    """
+    token = token or current_token()
+    steps = _sequence_steps(
+        query, agent_sequence, agent_states, start_step, carryover, token
+    )
+    yield from _run_steps(steps, user_proxy_agent, agent_map, token)
+
+
+def process_sequential_chats(
+    query: str,
+    agent_sequence: list,
+    agent_states: list,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+) -> list:
+    """
+    Process commands through a sequence of agents with clear action context.
+    Each agent receives information about what specific action they should take.
+    """
+    return [
+        event["result"]
+        for event in iter_sequential_chats(
+            query, agent_sequence, agent_states, agent_map, user_proxy_agent
         )
+        if event["event"] == "step_end"
+    ]
 
-    return user_proxy_agent.initiate_chats(chat_configs)
+
+def iter_workflow(
+    query: str,
+    iterations: int,
+    agent_sequence: list,
+    agent_states: list,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+    start_iteration: int = 1,
+    start_step: int = 0,
+    carryover: list = None,
+    token: CancellationToken = None,
+):
+    """
+    Execute the task for the given number of iterations, yielding the step
+    events of iter_sequential_chats tagged with their iteration.
+
+    A failing iteration is reported as an {"event": "error"} and the next
+    iteration still runs. A cancelled token, or one past its deadline, ends
+    the workflow with an {"event": "cancelled", "reason", "deadline"}; the
+    tool that was running finishes, or stops its recording, first.
+
+    Args:
+        start_iteration: 1-based iteration to start from, when resuming
+        start_step: First step of start_iteration to run; later iterations
+            run every step
+        carryover: Summaries of the steps of start_iteration before start_step
+        token: CancellationToken of the workflow; the current one if None
+    """
+    token = token or current_token()
+    steps = _workflow_steps(
+        query,
+        iterations,
+        agent_sequence,
+        agent_states,
+        start_iteration,
+        start_step,
+        carryover,
+        token,
+    )
+    yield from _run_steps(steps, user_proxy_agent, agent_map, token)
+
+
+def _cancelled_event(error: Cancelled, iteration: int, iterations: int) -> dict:
+    print(f"Workflow stopped in iteration {iteration}: {error}")
+    return {
+        "event": "cancelled",
+        "iteration": iteration,
+        "iterations": iterations,
+        "reason": str(error),
+        "deadline": isinstance(error, DeadlineExceeded),
+    }
 
 
 def run_workflow(
@@ -270,7 +598,8 @@ def run_workflow(
     agent_sequence: list,
     agent_states: list,
     agent_map: dict,
-    user_proxy_agent: UserProxyAgent,
+    user_proxy_agent: "UserProxyAgent",
+    deadline_s: float = None,
 ) -> None:
     """
     Execute a camera-related task for specified number of iterations with proper camera handling.
@@ -281,93 +610,651 @@ def run_workflow(
         agent_sequence: List of agents to use in sequence
         agent_map: Dictionary mapping agent names to actual agent objects
         user_proxy_agent: UserProxyAgent instance
+        deadline_s: Stop the workflow after this many seconds; defaults to
+            CAMERA_WORKFLOW_DEADLINE_S. Ignored inside a cancel_scope
     """
+    token = current_token() or CancellationToken(deadline_s or default_deadline())
     try:
-
-        # Execute the task for specified iterations
-        for i in range(iterations):
-            print(f"\nIteration {i+1}/{iterations}:")
-            try:
-                process_sequential_chats(
-                    query, agent_sequence, agent_states, agent_map, user_proxy_agent
-                )
-            except Exception as e:
-                print(f"Error in iteration {i+1}: {str(e)}")
-                continue
-
+        for _ in iter_workflow(
+            query,
+            iterations,
+            agent_sequence,
+            agent_states,
+            agent_map,
+            user_proxy_agent,
+            token=token,
+        ):
+            pass
     except Exception as e:
         print(f"Error during task execution: {str(e)}")
 
 
+def iter_checkpointed_workflow(
+    journal,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+    snapshot=None,
+    resume: bool = False,
+    token: CancellationToken = None,
+):
+    """
+    iter_workflow for the plan in a WorkflowJournal, checkpointing each step.
+
+    Every step_end is journaled with the app state from snapshot() and every
+    failed iteration with its error. With resume, the run continues from
+    the journal's resume point; the current state is first compared with
+    the state journaled after the last good step, and if it differs the
+    interrupted iteration restarts from its first step.
+
+    Args:
+        journal: src.utils.workflow_journal.WorkflowJournal
+        snapshot: Callable returning the app state (take_snapshot), or None
+            to journal steps without state and resume without checking it
+        resume: Continue an interrupted run instead of starting at the top
+        token: CancellationToken of the run; a cancelled run is journaled as
+            interrupted and can be resumed
+
+    Yields:
+        dict: The iter_workflow events, preceded on resume by
+        {"event": "resumed", "iteration", "step", "state_ok", "mismatches"}
+    """
+    from src.utils.workflow_journal import (
+        FAILED,
+        INTERRUPTED,
+        SUCCEEDED,
+        state_mismatches,
+    )
+
+    plan = journal.plan
+    point = {"iteration": 1, "step": 0, "carryover": []}
+    if resume:
+        point = journal.resume_point()
+        mismatches = {}
+        if snapshot is not None and point["step"] and point["state"]:
+            mismatches = state_mismatches(point["state"], snapshot())
+        state_ok = not mismatches
+        if not state_ok:
+            print(
+                f"Camera state changed since step {point['step']} of iteration "
+                f"{point['iteration']} ({mismatches}); restarting the iteration"
+            )
+            point = {**point, "step": 0, "carryover": []}
+        journal.record_resume(point, state_ok, mismatches)
+        yield {
+            "event": "resumed",
+            "iteration": point["iteration"],
+            "step": point["step"],
+            "state_ok": state_ok,
+            "mismatches": mismatches,
+        }
+
+    errors = 0
+    cancelled = None
+    status = INTERRUPTED
+    try:
+        for event in iter_workflow(
+            plan["query"],
+            plan["iterations"],
+            plan["agent_sequence"],
+            plan["agent_states"],
+            agent_map,
+            user_proxy_agent,
+            start_iteration=point["iteration"],
+            start_step=point["step"],
+            carryover=point["carryover"],
+            token=token,
+        ):
+            if event["event"] == "step_end":
+                journal.record_step(event, snapshot() if snapshot else None)
+            elif event["event"] == "error":
+                errors += 1
+                journal.record_error(event["iteration"], event["error"])
+            elif event["event"] == "cancelled":
+                cancelled = event["reason"]
+            yield event
+        if not cancelled:
+            status = FAILED if errors else SUCCEEDED
+    finally:
+        journal.finish(status, reason=cancelled)
+
+
+def iter_queued_workflow(
+    job_queue,
+    query: str,
+    iterations: int,
+    agent_sequence: list,
+    agent_states: list,
+    priority: int = 0,
+    source: str = None,
+    deadline_s: float = None,
+):
+    """
+    Submit a planned workflow to the host's job queue and follow it, yielding
+    {"event": "queued"} and then the worker's iter_workflow events.
+
+    deadline_s limits how long the job may run once the worker starts it.
+
+    Raises:
+        AdmissionRejected: If the queue does not admit the job
+        RuntimeError: If the job fails or is cancelled before it runs
+    """
+    from src.jobs.job_queue import CANCELLED, SUCCEEDED, iter_job_progress
+
+    payload = {
+        "query": query,
+        "iterations": iterations,
+        "agent_sequence": agent_sequence,
+        "agent_states": agent_states,
+    }
+    if deadline_s:
+        payload["deadline_s"] = deadline_s
+    job_id = job_queue.submit(payload, priority=priority, source=source)
+    job = job_queue.get(job_id)
+    yield {"event": "queued", "job_id": job_id, "position": job.get("position", 0)}
+
+    stopped = False
+    for event in iter_job_progress(job_queue, job_id):
+        if event["event"] != "finished":
+            stopped = stopped or event["event"] == "cancelled"
+            yield event
+            continue
+        job = event["job"]
+        if job["status"] == CANCELLED and stopped:
+            # The workflow was stopped while running and has said so
+            return
+        if job["status"] != SUCCEEDED:
+            raise RuntimeError(f"Job {job_id} {job['status']}: {job['error']}")
+
+
+async def a_iter_queued_workflow(
+    job_queue,
+    query: str,
+    iterations: int,
+    agent_sequence: list,
+    agent_states: list,
+    priority: int = 0,
+    source: str = None,
+    deadline_s: float = None,
+):
+    """Async iter_queued_workflow; the queue is polled on the LLM executor."""
+    events = iter_queued_workflow(
+        job_queue,
+        query,
+        iterations,
+        agent_sequence,
+        agent_states,
+        priority,
+        source,
+        deadline_s,
+    )
+    done = object()
+    while True:
+        event = await run_blocking(next, events, done)
+        if event is done:
+            return
+        yield event
+
+
+def _conversation_messages(user_input: str) -> list:
+    prompt = f"Current message: {user_input}\n\nPlease respond in a friendly and context-aware manner."
+    return [{"role": "user", "content": prompt}]
+
+
 def handle_conversation(user_input: str, conversation_agent):
     """Handle a conversation with the conversation agent."""
     try:
-        prompt = f"Current message: {user_input}\n\nPlease respond in a friendly and context-aware manner."
-        message = [{"role": "user", "content": prompt}]
-        response = conversation_agent.generate_reply(message)
+        message = _conversation_messages(user_input)
+        with track_component("conversation"):
+            response = conversation_agent.generate_reply(message)
         return response
     except Exception as e:
         return f"Error in conversation: {str(e)}"
 
+
+def _streaming_config(agent) -> dict:
+    """First OpenAI-compatible entry of the agent's config_list, if any."""
+    llm_config = getattr(agent, "llm_config", None)
+    if not isinstance(llm_config, dict):
+        return None
+    for config in llm_config.get("config_list") or []:
+        if config.get("api_type", "openai") == "openai":
+            return config
+    return None
+
+
+def stream_conversation(user_input: str, conversation_agent):
+    """
+    Stream the conversation agent's reply token by token.
+
+    Falls back to a single handle_conversation reply when the agent has no
+    OpenAI-compatible config to stream from.
+
+    Yields:
+        str: The reply so far
+    """
+    config = _streaming_config(conversation_agent)
+    if config is None:
+        yield handle_conversation(user_input, conversation_agent)
+        return
+
+    from src.utils.http_pool import get_openai_client
+
+    messages = [
+        {"role": "system", "content": conversation_agent.system_message}
+    ] + _conversation_messages(user_input)
+    reply = ""
+    try:
+        with track_component("conversation"):
+            client = get_openai_client(
+                api_key=config.get("api_key"), base_url=config.get("base_url")
+            )
+            stream = client.chat.completions.create(
+                model=config["model"],
+                messages=messages,
+                temperature=config.get("temperature", 0.0),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    reply += chunk.choices[0].delta.content
+                    yield reply
+    except Exception as e:
+        yield f"{reply}\n\nError in conversation: {str(e)}".lstrip()
+
+
+def _step_line(event: dict) -> str:
+    if event["event"] == "queued":
+        return f"Queued as job {event['job_id']} ({event['position']} ahead)"
+    prefix = ""
+    if event["iterations"] > 1:
+        prefix = f"[{event['iteration']}/{event['iterations']}] "
+    step = f"Step {event['step']}/{event['total']}: {event['agent']} ({event['action']})"
+    if event["event"] == "step_start":
+        return f"{prefix}▶ {step} running..."
+    return f"{prefix}✓ {step} done in {event['elapsed']:.1f}s"
+
+
+def _route_locally(message: str):
+    """The classifier's (msg_type, iterations, query), or None to ask the interpreter."""
+    routed = get_default_classifier().route(message) if local_routing_enabled() else None
+    if routed is not None:
+        print(f"Routed locally as {routed[0]}")
+    return routed
+
+
+def _interpretation_message(msg_type: str, iterations: int, interpreted_query: str) -> dict:
+    interpretation = f"""Query Interpretation:
+        • Type: {msg_type}
+        • Iterations: {iterations}
+        • Interpreted as: {interpreted_query}"""
+    return {"role": "assistant", "content": interpretation}
+
+
+def _sequence_message(agent_sequence: list) -> dict:
+    sequence_msg = f"""Agent Sequence: {', '.join(agent_sequence) if agent_sequence else 'No agents needed'}"""
+    return {"role": "assistant", "content": sequence_msg}
+
+
+class _WorkflowView:
+    """
+    A chat request's workflow, shown in its chat_history; process_message
+    and a_process_message feed it the same events.
+    """
+
+    def __init__(self, chat_history: list, job_queue):
+        self.chat_history = chat_history
+        self.job_queue = job_queue
+        self.token = CancellationToken(default_deadline())
+        self.job_id = None
+        self.stopped = False
+
+    def show(self, event: dict) -> list:
+        """Add event to chat_history and return it."""
+        if event["event"] in ("step_start", "queued"):
+            self.job_id = event.get("job_id", self.job_id)
+            self.chat_history.append({"role": "assistant", "content": _step_line(event)})
+        elif event["event"] == "step_end":
+            self.chat_history[-1]["content"] = _step_line(event)
+        elif event["event"] == "cancelled":
+            self.stopped = True
+            self.chat_history.append({"role": "assistant", "content": f"Stopped in iteration {event['iteration']}: {event['reason']}"})
+        else:
+            self.chat_history.append({"role": "assistant", "content": f"Error in iteration {event['iteration']}: {event['error']}"})
+        return self.chat_history
+
+    def close(self) -> None:
+        # A request stopped from the UI stops its workflow's tool calls too;
+        # cancelling a finished job is a no-op
+        self.token.cancel("Chat request stopped")
+        if self.job_id is not None:
+            self.job_queue.cancel(self.job_id)
+
+    def finish(self) -> None:
+        if not self.stopped:
+            self.chat_history.append({"role": "assistant", "content": "Task executed successfully!"})
+
+
 def process_message(message: str, chat_history, interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent):
-    """Process a single message through the workflow and return formatted responses."""
+    """
+    Process a single message through the workflow.
+
+    Yields:
+        list: chat_history after every update (interpretation, plan, each
+        step's start and finish, conversation tokens as they stream)
+    """
+    request_id = str(uuid.uuid4())
+    yield from tracked_iter(
+        _process_message(
+            message,
+            chat_history,
+            interpreter_agent,
+            manager_agent,
+            agent_map,
+            user_proxy_agent,
+            conversation_agent,
+        ),
+        request_id=request_id,
+    )
+    print(format_usage_summary(get_usage_summary(request_id=request_id)))
+
+    # The agents outlive the request; keep their histories bounded
+    agents = [interpreter_agent, manager_agent, user_proxy_agent, conversation_agent]
+    agents += list(agent_map.values())
+    apply_history_policies(agents)
+    print(format_history_usage(get_history_usage(agents)))
+
+
+def _process_message(message: str, chat_history, interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent):
     try:
         # First, show the user's message
         chat_history.append({"role": "user", "content": message})
+        yield chat_history
         
-        # Interpret the query
-        msg_type, iterations, interpreted_query = interpret_query(message, interpreter_agent)
+        # Route locally when the classifier is confident, otherwise ask the interpreter
+        msg_type, iterations, interpreted_query = _route_locally(message) or interpret_query(message, interpreter_agent)
 
         if msg_type == "CONVERSATION" or msg_type == "UNCLEAR":
-            # Handle the conversation
-            response = handle_conversation(message, conversation_agent)
-            chat_history.append({"role": "assistant", "content": response})
-            return chat_history
+            # Stream the conversation reply into a single message
+            chat_history.append({"role": "assistant", "content": ""})
+            for reply in stream_conversation(message, conversation_agent):
+                chat_history[-1]["content"] = reply
+                yield chat_history
+            return
 
         # Show the query interpretation
-        interpretation = f"""Query Interpretation:
-        • Type: {msg_type}
-        • Iterations: {iterations}
-        • Interpreted as: {interpreted_query}"""
-
-        # Add the query interpretation to chat history
-        chat_history.append({"role": "assistant", "content": interpretation})
+        chat_history.append(_interpretation_message(msg_type, iterations, interpreted_query))
+        yield chat_history
         
-        # Determine agent sequence
+        # Determine and show the agent sequence
         agent_sequence, agent_states = determine_agents(interpreted_query, manager_agent, agent_map)
-
-        # Show the agent sequence
-        sequence_msg = f"""Agent Sequence: {', '.join(agent_sequence) if agent_sequence else 'No agents needed'}"""
-
-        # Add the agent sequence message to chat history
-        chat_history.append({"role": "assistant", "content": sequence_msg})
+        chat_history.append(_sequence_message(agent_sequence))
+        yield chat_history
         
         # Run the workflow if we have agents to execute
         if agent_sequence:
             try:
                 print("Running workflow...")
-                run_workflow(
-                    query=interpreted_query,
-                    iterations=iterations,
-                    agent_sequence=agent_sequence,
-                    agent_states=agent_states,
-                    agent_map=agent_map,
-                    user_proxy_agent=user_proxy_agent
-                )
-                chat_history.append({"role": "assistant", "content": "Task executed successfully!"})
+                view = _WorkflowView(chat_history, get_job_queue())
+                if view.job_queue is not None:
+                    # Another process may be driving the camera; wait our turn. The
+                    # worker applies the request's deadline once it starts the job
+                    events = iter_queued_workflow(
+                        view.job_queue, interpreted_query, iterations, agent_sequence, agent_states, source="gradio",
+                        deadline_s=view.token.deadline_s
+                    )
+                else:
+                    events = iter_workflow(
+                        query=interpreted_query,
+                        iterations=iterations,
+                        agent_sequence=agent_sequence,
+                        agent_states=agent_states,
+                        agent_map=agent_map,
+                        user_proxy_agent=user_proxy_agent,
+                        token=view.token
+                    )
+                try:
+                    for event in events:
+                        yield view.show(event)
+                finally:
+                    view.close()
+                view.finish()
             except Exception as e:
                 chat_history.append({"role": "assistant", "content": f"Error executing task: {str(e)}"})
-        
-        return chat_history
+            yield chat_history
+    except Exception as e:
+        chat_history.append({"role": "assistant", "content": f"Error processing message: {str(e)}"})
+        yield chat_history
+
+async def a_interpret_query(
+    query: str, interpreter_agent: "AssistantAgent"
+) -> Tuple[str, int, str]:
+    """Async interpret_query."""
+    return await a_routed_reply(
+        interpreter_agent,
+        _interpreter_messages(query),
+        "interpreter",
+        parse_interpreter_response,
+        _interpretation_parsed,
+        fast=True,
+    )
+
+
+async def a_determine_agents(
+    task: str, decision_agent: "ConversableAgent", agent_map: dict
+) -> Tuple[list, list]:
+    """Async determine_agents."""
+    try:
+        plan = await a_routed_reply(
+            decision_agent,
+            [_manager_message(task, agent_map)],
+            "manager",
+            lambda response: parse_agent_lists(response, agent_map),
+            _plan_parsed,
+        )
+        if plan is None:
+            return [], []
+        return reorder_plan(*check_plan(*plan, agent_map, task))
+    except Exception as e:
+        print(f"Error in determine_agents: {str(e)}")
+        return [], []
+
+
+async def a_reflection_summary(sender, recipient, summary_args: dict) -> str:
+    """reflection_summary on the LLM executor, off the event loop."""
+    return await run_blocking(reflection_summary, sender, recipient, summary_args)
+
+
+async def a_iter_sequential_chats(
+    query: str,
+    agent_sequence: list,
+    agent_states: list,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+    start_step: int = 0,
+    carryover: list = None,
+    token: CancellationToken = None,
+):
+    """Async iter_sequential_chats, built on a_initiate_chat."""
+    install_llm_executor()
+    token = token or current_token()
+    steps = _sequence_steps(
+        query, agent_sequence, agent_states, start_step, carryover, token
+    )
+    async for event in _a_run_steps(steps, user_proxy_agent, agent_map, token):
+        yield event
+
+
+async def a_iter_workflow(
+    query: str,
+    iterations: int,
+    agent_sequence: list,
+    agent_states: list,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+    start_iteration: int = 1,
+    start_step: int = 0,
+    carryover: list = None,
+    token: CancellationToken = None,
+):
+    """Async iter_workflow."""
+    install_llm_executor()
+    token = token or current_token()
+    steps = _workflow_steps(
+        query,
+        iterations,
+        agent_sequence,
+        agent_states,
+        start_iteration,
+        start_step,
+        carryover,
+        token,
+    )
+    async for event in _a_run_steps(steps, user_proxy_agent, agent_map, token):
+        yield event
+
+
+async def a_run_workflow(
+    query: str,
+    iterations: int,
+    agent_sequence: list,
+    agent_states: list,
+    agent_map: dict,
+    user_proxy_agent: "UserProxyAgent",
+    deadline_s: float = None,
+) -> None:
+    """Async run_workflow."""
+    token = current_token() or CancellationToken(deadline_s or default_deadline())
+    try:
+        async for _ in a_iter_workflow(
+            query,
+            iterations,
+            agent_sequence,
+            agent_states,
+            agent_map,
+            user_proxy_agent,
+            token=token,
+        ):
+            pass
+    except Exception as e:
+        print(f"Error during task execution: {str(e)}")
+
+
+async def a_stream_conversation(user_input: str, conversation_agent):
+    """
+    Async stream_conversation. The blocking stream is read on the LLM
+    executor one chunk at a time.
+    """
+    replies = tracked_iter(stream_conversation(user_input, conversation_agent))
+    done = object()
+    while True:
+        reply = await run_blocking(next, replies, done)
+        if reply is done:
+            return
+        yield reply
+
+
+async def a_process_message(message: str, chat_history, interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent):
+    """
+    Async process_message: LLM calls are awaited through autogen's async API
+    and tool calls run on the tool executor, so no worker thread is held
+    while a request waits.
+
+    Yields:
+        list: chat_history after every update
+    """
+    install_llm_executor()
+    request_id = str(uuid.uuid4())
+    async for update in tracked_aiter(
+        _a_process_message(
+            message,
+            chat_history,
+            interpreter_agent,
+            manager_agent,
+            agent_map,
+            user_proxy_agent,
+            conversation_agent,
+        ),
+        request_id=request_id,
+    ):
+        yield update
+    print(format_usage_summary(get_usage_summary(request_id=request_id)))
+
+    # The agents outlive the request; keep their histories bounded
+    agents = [interpreter_agent, manager_agent, user_proxy_agent, conversation_agent]
+    agents += list(agent_map.values())
+    await run_blocking(apply_history_policies, agents)
+    print(format_history_usage(get_history_usage(agents)))
+
+
+async def _a_process_message(message: str, chat_history, interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent):
+    try:
+        chat_history.append({"role": "user", "content": message})
+        yield chat_history
+
+        msg_type, iterations, interpreted_query = _route_locally(message) or await a_interpret_query(message, interpreter_agent)
+
+        if msg_type == "CONVERSATION" or msg_type == "UNCLEAR":
+            chat_history.append({"role": "assistant", "content": ""})
+            async for reply in a_stream_conversation(message, conversation_agent):
+                chat_history[-1]["content"] = reply
+                yield chat_history
+            return
+
+        chat_history.append(_interpretation_message(msg_type, iterations, interpreted_query))
+        yield chat_history
+
+        agent_sequence, agent_states = await a_determine_agents(interpreted_query, manager_agent, agent_map)
+        chat_history.append(_sequence_message(agent_sequence))
+        yield chat_history
+
+        if agent_sequence:
+            try:
+                print("Running workflow...")
+                view = _WorkflowView(chat_history, get_job_queue())
+                if view.job_queue is not None:
+                    events = a_iter_queued_workflow(
+                        view.job_queue, interpreted_query, iterations, agent_sequence, agent_states, source="gradio",
+                        deadline_s=view.token.deadline_s
+                    )
+                else:
+                    events = a_iter_workflow(
+                        query=interpreted_query,
+                        iterations=iterations,
+                        agent_sequence=agent_sequence,
+                        agent_states=agent_states,
+                        agent_map=agent_map,
+                        user_proxy_agent=user_proxy_agent,
+                        token=view.token
+                    )
+                try:
+                    async for event in events:
+                        yield view.show(event)
+                finally:
+                    view.close()
+                view.finish()
+            except Exception as e:
+                chat_history.append({"role": "assistant", "content": f"Error executing task: {str(e)}"})
+            yield chat_history
     except Exception as e:
         chat_history.append({"role": "assistant", "content": f"Error processing message: {str(e)}"})
-        return chat_history
+        yield chat_history
+
 
 def create_chat_interface(
-    interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent
+    interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent, agent_pool=None
 ):
-    """Create a minimal, modern chat interface."""
-    
+    """
+    Create a minimal, modern chat interface.
+
+    With an agent_pool, every request checks out its own agent set and up to
+    pool size requests run concurrently; otherwise the given agents are
+    shared and requests run one at a time.
+    """
+    import gradio as gr
+
+    from src.agents.agent_pool import AgentPoolTimeout, format_pool_metrics
+
     custom_css = """
         .container {
             max-width: 1000px;
@@ -434,9 +1321,13 @@ def create_chat_interface(
                         elem_classes="send-button"
                     )
 
-        def respond(message, chat_history):
-            if message:
-                chat_history = process_message(
+        async def respond(message, chat_history):
+            if not message:
+                yield "", chat_history
+                return
+            if agent_pool is None:
+                # Stream every update so the user sees progress straight away
+                async for chat_history in a_process_message(
                     message,
                     chat_history,
                     interpreter_agent,
@@ -444,22 +1335,55 @@ def create_chat_interface(
                     agent_map,
                     user_proxy_agent,
                     conversation_agent
-                )
-            return "", chat_history
+                ):
+                    yield "", chat_history
+                return
 
-        msg.submit(respond, [msg, chatbot], [msg, chatbot])
-        submit.click(respond, [msg, chatbot], [msg, chatbot])
+            try:
+                async with agent_pool.a_checkout() as agents:
+                    async for chat_history in a_process_message(
+                        message,
+                        chat_history,
+                        agents.interpreter_agent,
+                        agents.manager_agent,
+                        agents.agent_map,
+                        agents.user_proxy_agent,
+                        agents.conversation_agent
+                    ):
+                        yield "", chat_history
+            except AgentPoolTimeout as e:
+                chat_history.append({"role": "assistant", "content": f"Server busy, please retry: {str(e)}"})
+                yield "", chat_history
+            print(format_pool_metrics(agent_pool.metrics()))
+
+        concurrency_limit = agent_pool.size if agent_pool is not None else 1
+        msg.submit(respond, [msg, chatbot], [msg, chatbot], concurrency_limit=concurrency_limit)
+        submit.click(respond, [msg, chatbot], [msg, chatbot], concurrency_limit=concurrency_limit)
 
     return chat_interface
 
 
-def launch_chat(interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent, server_name="127.0.0.1"):
-    """Launch the chat interface."""
+def launch_chat(interpreter_agent, manager_agent, agent_map, user_proxy_agent, conversation_agent, server_name="127.0.0.1", agent_pool=None):
+    """Launch the chat interface, optionally serving requests from an agent pool."""
+    from src.utils.load_system_message import start_watching
+
+    # Long-running server: hot reload edited system messages into the agents
+    start_watching()
+
+    # With a job queue, this server executes the host's camera jobs unless a
+    # separate worker process does
+    job_queue = get_job_queue()
+    if job_queue is not None and os.getenv("CAMERA_JOB_WORKER", "1") != "0":
+        from src.agents.agent_factory import build_agent_set
+        from src.jobs.job_queue import JobWorker, make_workflow_handler
+
+        JobWorker(job_queue, make_workflow_handler(build_agent_set())).start()
     chat_interface = create_chat_interface(
         interpreter_agent,
         manager_agent,
         agent_map,
         user_proxy_agent,
-        conversation_agent
+        conversation_agent,
+        agent_pool=agent_pool,
     )
     chat_interface.launch(server_name=server_name, share=False)
@@ -0,0 +1,190 @@
+"""
+Cooperative cancellation and deadlines for running workflows.
+
+A CancellationToken is bound to the running workflow with cancel_scope()
+and reaches every layer through a context variable: iter_workflow checks
+it before each iteration and step, device_action before each tool call
+and while queueing for the device, and the long waits of the tools (a
+take_video recording) wait on it instead of sleeping. Cancelling, or
+passing the deadline, raises Cancelled at the next of those points.
+
+Tools run to completion or not at all; only a recording is cut short,
+and take_video stops it before re-raising, so the Camera app is left in
+a known state. Short UI settle waits are not interrupted for the same
+reason.
+
+Cancelled derives from BaseException, like asyncio.CancelledError, so
+the `except Exception` of the tools, of autogen's function execution and
+of iter_workflow's per-iteration error handling let it through.
+
+    token = CancellationToken(deadline_s=300)
+    with cancel_scope(token):
+        run_workflow(...)
+    # from another thread, or a signal handler
+    token.cancel("Stopped by user")
+
+cancel_on_interrupt() does the latter for Ctrl+C in CLI runs.
+
+Configuration (environment variables):
+    CAMERA_WORKFLOW_DEADLINE_S  Default deadline of a workflow in seconds
+                                (default: none)
+"""
+
+import contextvars
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# How often waits re-check a token's should_cancel callback
+POLL_INTERVAL = 0.5
+
+
+class Cancelled(BaseException):
+    """The workflow was cancelled; raised at the next cancellation point."""
+
+
+class DeadlineExceeded(Cancelled):
+    """The workflow ran past its deadline."""
+
+
+def default_deadline() -> Optional[float]:
+    """CAMERA_WORKFLOW_DEADLINE_S, or None for no deadline."""
+    value = os.getenv("CAMERA_WORKFLOW_DEADLINE_S")
+    return float(value) if value else None
+
+
+class CancellationToken:
+    """Cancellation flag with an optional wall-clock deadline."""
+
+    def __init__(
+        self,
+        deadline_s: float = None,
+        should_cancel: Callable[[], bool] = None,
+    ):
+        """
+        Args:
+            deadline_s: Seconds from now after which the token counts as
+                cancelled, or None for no deadline
+            should_cancel: Polled while waiting and at each check, e.g. a
+                job queue's cancel flag; True cancels the token
+        """
+        self.deadline = time.monotonic() + deadline_s if deadline_s else None
+        self.deadline_s = deadline_s
+        self.should_cancel = should_cancel
+        self.reason = None
+        self.expired = False
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """Request cancellation; safe from any thread or a signal handler."""
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.expired = True
+            self.cancel(f"Deadline of {self.deadline_s:g}s exceeded")
+            return True
+        if self.should_cancel is not None and self.should_cancel():
+            self.cancel("Cancel requested")
+            return True
+        return False
+
+    def check(self) -> None:
+        """
+        Raises:
+            DeadlineExceeded: If the deadline has passed
+            Cancelled: If the token was cancelled
+        """
+        if self.cancelled:
+            raise (DeadlineExceeded if self.expired else Cancelled)(self.reason)
+
+    def wait(self, seconds: float) -> None:
+        """
+        Sleep for seconds, returning early only by raising.
+
+        Raises:
+            Cancelled: If the token is cancelled or its deadline passes
+                before the time is up
+        """
+        end = time.monotonic() + seconds
+        while True:
+            self.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            remaining = self.remaining()
+            if remaining is not None:
+                left = min(left, remaining)
+            if self.should_cancel is not None:
+                left = min(left, POLL_INTERVAL)
+            self._event.wait(left)
+
+
+_current_token = contextvars.ContextVar("cancellation_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancellationToken):
+    """Make token the one checked by the workflow and tools in this context."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+def check_cancelled() -> None:
+    """Raise Cancelled if the current workflow was cancelled; a no-op outside one."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def interruptible_sleep(seconds: float) -> None:
+    """time.sleep that raises Cancelled as soon as the current workflow is cancelled."""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.wait(seconds)
+
+
+@contextmanager
+def cancel_on_interrupt(token: CancellationToken):
+    """
+    Turn the first Ctrl+C into token.cancel(), so a CLI run stops cleanly at
+    the next cancellation point; a second Ctrl+C interrupts as usual.
+    Must be entered on the main thread.
+    """
+    previous = signal.getsignal(signal.SIGINT)
+
+    def handler(signum, frame):
+        if token.reason is not None:
+            signal.signal(signal.SIGINT, previous)
+            raise KeyboardInterrupt
+        print("\nStopping after the current tool call; Ctrl+C again to abort now")
+        token.cancel("Interrupted from the keyboard")
+
+    signal.signal(signal.SIGINT, handler)
+    try:
+        yield token
+    finally:
+        signal.signal(signal.SIGINT, previous)
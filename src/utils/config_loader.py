@@ -3,9 +3,14 @@ import os
 import autogen
 from dotenv import load_dotenv
 
+from src.utils.http_pool import get_http_client
+from src.utils.llm_metrics import enable_llm_accounting
+
 
 def load_config(filter_dict: dict = None):
     load_dotenv()
+    # Record tokens, latency and cost of every LLM call the agents make
+    enable_llm_accounting()
     # Load config list from JSON file
     config_list = autogen.config_list_from_json(
         env_or_file="OAI_CONFIG_LIST.json",
@@ -23,10 +28,20 @@ def load_config(filter_dict: dict = None):
         api_key_name = config["api_key"]
         config["api_key"] = os.getenv(api_key_name)
 
+        # Redirect to an OpenAI-compatible stand-in such as the replay server,
+        # which needs no real key
+        base_url = os.getenv("LLM_BASE_URL")
+        if base_url:
+            config["base_url"] = base_url
+            config["api_key"] = config["api_key"] or "offline"
+
         if not config["api_key"]:
             raise ValueError(
                 f"Missing API key: {api_key_name} not found in environment variables"
             )
+
+        # Share one keep-alive connection pool across every agent's client
+        config["http_client"] = get_http_client()
     return config_list
 
 
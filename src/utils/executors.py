@@ -0,0 +1,68 @@
+"""
+Thread pools behind the async request pipeline.
+
+autogen's async API still runs the OpenAI client synchronously, in the
+event loop's default executor. LLM_EXECUTOR replaces that default
+executor. It is sized for many concurrent LLM waits and copies the
+caller's contextvars, so usage accounting still knows the request and
+component. Camera tools run on their own TOOL_EXECUTOR, so slow UI
+automation never takes threads from LLM calls.
+
+Configuration (environment variables):
+    LLM_EXECUTOR_WORKERS    Threads for blocking LLM calls (default 64)
+    TOOL_EXECUTOR_WORKERS   Threads for camera tool calls (default 4)
+"""
+
+import asyncio
+import contextvars
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs each task in a copy of the submitter's context."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+class SharedThreadPoolExecutor(ContextThreadPoolExecutor):
+    """
+    ContextThreadPoolExecutor that outlives the event loops using it.
+
+    A loop shuts its default executor down when it is closed (asyncio.run
+    does this on return), which would leave the process-wide pool unable
+    to run anything for the next loop. shutdown() is therefore a no-op;
+    the worker threads are joined when the interpreter exits.
+    """
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        pass
+
+
+LLM_EXECUTOR = SharedThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_EXECUTOR_WORKERS", "64")),
+    thread_name_prefix="llm",
+)
+
+TOOL_EXECUTOR = ContextThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_EXECUTOR_WORKERS", "4")),
+    thread_name_prefix="camera-tool",
+)
+
+_installed_loops = weakref.WeakSet()
+
+
+def install_llm_executor(loop: asyncio.AbstractEventLoop = None) -> None:
+    """Make LLM_EXECUTOR the default executor of the (running) event loop."""
+    loop = loop or asyncio.get_running_loop()
+    if loop not in _installed_loops:
+        loop.set_default_executor(LLM_EXECUTOR)
+        _installed_loops.add(loop)
+
+
+async def run_blocking(func, *args, executor=LLM_EXECUTOR):
+    """Await a blocking call on an executor, keeping the caller's context."""
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
@@ -0,0 +1,238 @@
+"""
+Bounded chat history for long-lived agents.
+
+The agents are shared by every chat request, and autogen keeps each
+agent's conversations in chat_messages until something clears them. A
+history policy is applied to every agent after each request:
+
+    reset          Drop all history (default)
+    last_n         Keep the last max_messages messages of each conversation
+    token_budget   When a conversation exceeds max_tokens, replace everything
+                   but the last keep_last messages with an LLM summary
+    none           Keep everything
+
+Policies are configured in config/agent_config.json:
+
+    "history_policy": {
+        "default": {"mode": "reset"},
+        "agents": {
+            "conversation_agent": {"mode": "token_budget", "max_tokens": 2000}
+        }
+    }
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.utils.llm_metrics import count_message_tokens, track_component
+
+HISTORY_MODES = ("reset", "last_n", "token_budget", "none")
+
+AGENT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "agent_config.json"
+
+SUMMARY_PROMPT = (
+    "Summarise the conversation below in a few sentences. Keep every camera "
+    "state change, setting and outcome that later turns may rely on."
+)
+
+
+@dataclass
+class HistoryPolicy:
+    mode: str = "reset"
+    max_messages: int = 20
+    max_tokens: int = 4000
+    keep_last: int = 6
+
+    def __post_init__(self):
+        if self.mode not in HISTORY_MODES:
+            raise ValueError(
+                f"Unknown history mode {self.mode!r}; expected one of {HISTORY_MODES}"
+            )
+
+
+@dataclass
+class HistoryPolicies:
+    default: HistoryPolicy = field(default_factory=HistoryPolicy)
+    agents: dict = field(default_factory=dict)
+
+    def for_agent(self, name: str) -> HistoryPolicy:
+        return self.agents.get(name, self.default)
+
+
+def load_history_policies(path=AGENT_CONFIG_PATH) -> HistoryPolicies:
+    """
+    Read the "history_policy" section of the agent config.
+
+    Returns:
+        HistoryPolicies: Defaults to resetting every agent when the section
+        or the file is missing
+    """
+    try:
+        with open(path, "r") as f:
+            section = json.load(f).get("history_policy", {})
+    except FileNotFoundError:
+        return HistoryPolicies()
+
+    return HistoryPolicies(
+        default=HistoryPolicy(**section.get("default", {})),
+        agents={
+            name: HistoryPolicy(**options)
+            for name, options in section.get("agents", {}).items()
+        },
+    )
+
+
+def _safe_start(messages: list, start: int) -> int:
+    """Move a cut forward so no tool result is kept without its tool call."""
+    while start < len(messages) and (
+        messages[start].get("role") == "tool" or "tool_responses" in messages[start]
+    ):
+        start += 1
+    return start
+
+
+def _llm_summary(agent, messages: list) -> str:
+    """Summarise messages with the agent's own LLM client."""
+    transcript = "\n".join(
+        f"{m.get('name') or m.get('role')}: {m.get('content')}"
+        for m in messages
+        if m.get("content")
+    )
+    if getattr(agent, "client", None) is None:
+        # No LLM to summarise with; keep a truncated transcript instead
+        return transcript[-2000:]
+
+    with track_component(f"history:{agent.name}"):
+        response = agent.client.create(
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": transcript},
+            ],
+            cache=None,
+        )
+    return agent.client.extract_text_or_completion_object(response)[0]
+
+
+def apply_history_policy(agent, policy: HistoryPolicy, summarizer=None) -> int:
+    """
+    Trim one agent's chat history according to its policy.
+
+    Args:
+        agent: A ConversableAgent
+        policy: The policy to apply
+        summarizer: Callable(agent, messages) -> str for token_budget mode,
+            defaults to an LLM summary
+
+    Returns:
+        int: Number of messages removed
+    """
+    if policy.mode == "none":
+        return 0
+
+    removed = 0
+    for partner, messages in list(agent.chat_messages.items()):
+        if policy.mode == "reset":
+            removed += len(messages)
+            agent.clear_history(partner)
+
+        elif policy.mode == "last_n":
+            if len(messages) > policy.max_messages:
+                start = _safe_start(messages, len(messages) - policy.max_messages)
+                removed += start
+                del messages[:start]
+
+        elif policy.mode == "token_budget":
+            if len(messages) <= policy.keep_last:
+                continue
+            if count_message_tokens(messages) <= policy.max_tokens:
+                continue
+            start = _safe_start(messages, len(messages) - policy.keep_last)
+            try:
+                summary = (summarizer or _llm_summary)(agent, messages[:start])
+            except Exception as e:
+                print(f"Error summarising history of {agent.name}: {e}")
+                summary = None
+            removed += start
+            del messages[:start]
+            if summary:
+                messages.insert(
+                    0,
+                    {
+                        "role": "user",
+                        "name": "history_summary",
+                        "content": f"Summary of the earlier conversation: {summary}",
+                    },
+                )
+                removed -= 1
+    return removed
+
+
+def apply_history_policies(agents, policies: HistoryPolicies = None) -> int:
+    """
+    Apply the configured policy to every agent.
+
+    Args:
+        agents: Iterable of agents
+        policies: Loaded policies, read from the agent config if None
+
+    Returns:
+        int: Total number of messages removed
+    """
+    policies = policies or get_history_policies()
+    return sum(
+        apply_history_policy(agent, policies.for_agent(agent.name))
+        for agent in agents
+        if agent is not None
+    )
+
+
+_policies = None
+
+
+def get_history_policies() -> HistoryPolicies:
+    """Policies from the agent config, read once."""
+    global _policies
+    if _policies is None:
+        _policies = load_history_policies()
+    return _policies
+
+
+def get_history_usage(agents) -> dict:
+    """
+    Report how much chat history each agent holds.
+
+    Returns:
+        dict: agent name -> {"conversations", "messages", "tokens", "bytes"}
+    """
+    usage = {}
+    for agent in agents:
+        if agent is None:
+            continue
+        conversations = [m for m in agent.chat_messages.values() if m]
+        messages = [m for conversation in conversations for m in conversation]
+        usage[agent.name] = {
+            "conversations": len(conversations),
+            "messages": len(messages),
+            "tokens": count_message_tokens(messages) if messages else 0,
+            "bytes": len(json.dumps(messages, default=str).encode()),
+        }
+    return usage
+
+
+def format_history_usage(usage: dict) -> str:
+    """One-line total plus a line per agent that holds history."""
+    messages = sum(u["messages"] for u in usage.values())
+    tokens = sum(u["tokens"] for u in usage.values())
+    size = sum(u["bytes"] for u in usage.values())
+    lines = [
+        f"Agent history: {messages} messages, {tokens} tokens, "
+        f"{size / 1024:.1f} KB across {len(usage)} agents"
+    ]
+    for name, u in sorted(usage.items(), key=lambda item: -item[1]["bytes"]):
+        if u["messages"]:
+            lines.append(
+                f"  {name:<35} {u['messages']:>5} msgs {u['tokens']:>8} tokens "
+                f"{u['bytes'] / 1024:>8.1f} KB"
+            )
+    return "\n".join(lines)
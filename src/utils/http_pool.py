@@ -0,0 +1,309 @@
+"""
+Process-wide HTTP connection pool for all LLM traffic.
+
+Every OpenAI client in the process (autogen agents and the anomaly
+pipeline) sends its requests through one keep-alive httpx client, so
+bursts of chat traffic reuse warm TLS connections instead of opening new
+ones per agent.
+
+Configuration (environment variables, read on first use):
+    LLM_HTTP_MAX_CONNECTIONS    Maximum open connections (default 20)
+    LLM_HTTP_MAX_KEEPALIVE      Maximum idle keep-alive connections (default 10)
+    LLM_HTTP_KEEPALIVE_EXPIRY   Seconds an idle connection is kept (default 30)
+    LLM_HTTP2                   "1" to negotiate HTTP/2 when h2 is installed
+    LLM_HTTP_TIMEOUT            Request timeout in seconds (default 60)
+"""
+
+import importlib.util
+import os
+import threading
+import time
+
+import httpx
+
+DEFAULT_POOL_CONFIG = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30.0,
+    "http2": False,
+    "timeout": 60.0,
+}
+
+# Only LLM exchanges are buffered for the observers
+CAPTURED_PATH_SUFFIXES = ("/chat/completions",)
+
+_lock = threading.Lock()
+_pool_config = None
+_http_client = None
+_transport = None
+_openai_clients = {}
+_exchange_observers = []
+
+
+class SharedHttpClient(httpx.Client):
+    """
+    httpx client that survives autogen's deepcopy of llm_config.
+
+    ConversableAgent deep-copies its llm_config; returning self keeps every
+    agent on the same connection pool.
+    """
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _MeteredStream(httpx.SyncByteStream):
+    """
+    Response body wrapper that reports when the connection is released and,
+    when capture is on, hands the complete body to the exchange observers.
+    """
+
+    def __init__(self, stream, on_close, capture: bool = False):
+        self._stream = stream
+        self._on_close = on_close
+        self._chunks = [] if capture else None
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            if self._chunks is not None:
+                self._chunks.append(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                body = b"".join(self._chunks) if self._chunks is not None else None
+                self._on_close(body)
+
+
+class MeteredTransport(httpx.BaseTransport):
+    """HTTPTransport wrapper that counts requests and connection usage."""
+
+    def __init__(self, transport: httpx.HTTPTransport):
+        self._transport = transport
+        self._lock = threading.Lock()
+        self.requests_total = 0
+        self.requests_in_flight = 0
+        self.peak_in_flight = 0
+        self.errors_total = 0
+        self.total_latency = 0.0
+        # Called as observer(request, response, body, elapsed_seconds) once
+        # the body of a captured exchange has been read
+        self.observers = []
+
+    def _release(self):
+        with self._lock:
+            self.requests_in_flight -= 1
+
+    def _notify(self, request, response, body, start):
+        elapsed = time.perf_counter() - start
+        for observer in list(self.observers):
+            try:
+                observer(request, response, body, elapsed)
+            except Exception as e:
+                print(f"Error in HTTP exchange observer: {e}")
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests_total += 1
+            self.requests_in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.requests_in_flight)
+
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            with self._lock:
+                self.errors_total += 1
+            self._release()
+            raise
+
+        with self._lock:
+            self.total_latency += time.perf_counter() - start
+
+        capture = bool(self.observers) and request.url.path.endswith(
+            CAPTURED_PATH_SUFFIXES
+        )
+
+        def on_close(body):
+            self._release()
+            if capture:
+                self._notify(request, response, body, start)
+
+        response.stream = _MeteredStream(response.stream, on_close, capture=capture)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def connection_counts(self) -> dict:
+        """Count open, idle and active connections in the underlying pool."""
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "connections_open": len(connections),
+            "connections_idle": idle,
+            "connections_active": len(connections) - idle,
+        }
+
+
+def _config_from_env() -> dict:
+    config = dict(DEFAULT_POOL_CONFIG)
+    env_map = {
+        "LLM_HTTP_MAX_CONNECTIONS": ("max_connections", int),
+        "LLM_HTTP_MAX_KEEPALIVE": ("max_keepalive_connections", int),
+        "LLM_HTTP_KEEPALIVE_EXPIRY": ("keepalive_expiry", float),
+        "LLM_HTTP_TIMEOUT": ("timeout", float),
+    }
+    for env_name, (key, cast) in env_map.items():
+        value = os.getenv(env_name)
+        if value:
+            config[key] = cast(value)
+    if os.getenv("LLM_HTTP2", "").lower() in ("1", "true", "yes"):
+        config["http2"] = True
+    return config
+
+
+def configure_http_pool(**overrides) -> dict:
+    """
+    Set the pool configuration. Must be called before the first LLM request;
+    later calls replace the configuration for clients created afterwards.
+
+    Args:
+        **overrides: Any key of DEFAULT_POOL_CONFIG
+
+    Returns:
+        dict: The effective configuration
+    """
+    global _pool_config
+    unknown = set(overrides) - set(DEFAULT_POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown HTTP pool options: {sorted(unknown)}")
+    with _lock:
+        _pool_config = {**_config_from_env(), **overrides}
+        return dict(_pool_config)
+
+
+def add_exchange_observer(observer) -> None:
+    """
+    Register a callback for every completed LLM exchange on the shared pool.
+
+    Args:
+        observer: Callable(request, response, body: bytes, elapsed_seconds)
+    """
+    with _lock:
+        if observer in _exchange_observers:
+            return
+        _exchange_observers.append(observer)
+        if _transport is not None:
+            _transport.observers.append(observer)
+
+
+def get_http_client() -> SharedHttpClient:
+    """Return the process-wide pooled HTTP client, creating it on first use."""
+    global _http_client, _transport, _pool_config
+    with _lock:
+        if _http_client is not None:
+            return _http_client
+
+        if _pool_config is None:
+            _pool_config = _config_from_env()
+        config = _pool_config
+
+        http2 = config["http2"]
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive_connections"],
+            keepalive_expiry=config["keepalive_expiry"],
+        )
+        _transport = MeteredTransport(httpx.HTTPTransport(limits=limits, http2=http2))
+        _transport.observers.extend(_exchange_observers)
+        _http_client = SharedHttpClient(
+            transport=_transport, timeout=httpx.Timeout(config["timeout"])
+        )
+        return _http_client
+
+
+def get_openai_client(api_key: str = None, base_url: str = None):
+    """
+    Return an OpenAI client that sends its requests through the shared pool.
+
+    Clients are cached per (api_key, base_url), so module-level callers such
+    as the anomaly pipeline can call this on every request. LLM_BASE_URL
+    redirects the default base URL, e.g. to the offline replay server.
+    """
+    from openai import OpenAI
+
+    from src.utils.llm_metrics import enable_llm_accounting
+
+    enable_llm_accounting(autogen_cache_hits=False)
+    base_url = base_url or os.getenv("LLM_BASE_URL")
+    if base_url and not api_key:
+        api_key = "offline"
+    key = (api_key, base_url)
+    client = _openai_clients.get(key)
+    if client is None:
+        client = OpenAI(
+            api_key=api_key, base_url=base_url, http_client=get_http_client()
+        )
+        _openai_clients[key] = client
+    return client
+
+
+def get_pool_metrics() -> dict:
+    """
+    Report pool configuration and utilisation.
+
+    Returns:
+        dict: Limits, open/idle/active connections, request counters and the
+        mean time to response headers in milliseconds
+    """
+    with _lock:
+        config = dict(_pool_config or _config_from_env())
+        transport = _transport
+
+    metrics = {
+        "max_connections": config["max_connections"],
+        "max_keepalive_connections": config["max_keepalive_connections"],
+        "http2": config["http2"],
+        "connections_open": 0,
+        "connections_idle": 0,
+        "connections_active": 0,
+        "requests_total": 0,
+        "requests_in_flight": 0,
+        "peak_in_flight": 0,
+        "errors_total": 0,
+        "mean_latency_ms": 0.0,
+    }
+    if transport is None:
+        return metrics
+
+    metrics.update(transport.connection_counts())
+    metrics["requests_total"] = transport.requests_total
+    metrics["requests_in_flight"] = transport.requests_in_flight
+    metrics["peak_in_flight"] = transport.peak_in_flight
+    metrics["errors_total"] = transport.errors_total
+    if transport.requests_total:
+        metrics["mean_latency_ms"] = (
+            transport.total_latency / transport.requests_total * 1000
+        )
+    return metrics
+
+
+def close_http_pool() -> None:
+    """Close every pooled connection; the next request builds a fresh pool."""
+    global _http_client, _transport
+    with _lock:
+        client, _http_client, _transport = _http_client, None, None
+        _openai_clients.clear()
+    if client is not None:
+        client.close()
@@ -0,0 +1,139 @@
+"""
+Cold-start budget check for the CLI entry points.
+
+Runs lightweight commands in a fresh interpreter with ``-X importtime`` and
+fails when they take longer than the budget or pull in a heavyweight
+subsystem they do not need.
+
+Usage:
+    python -m src.utils.import_budget
+    python -m src.utils.import_budget --budget_ms 400 --repeat 5
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Top-level packages that must never be imported by the lightweight commands
+HEAVY_MODULES = (
+    "autogen",
+    "cv2",
+    "fastapi",
+    "gradio",
+    "httpx",
+    "openai",
+    "pandas",
+    "pywinauto",
+    "tiktoken",
+)
+
+# Commands that should start without touching agents, tools or the web stack
+LIGHT_COMMANDS = {
+    "list_tests": ["app.py", "--list_tests"],
+}
+
+DEFAULT_BUDGET_MS = 500
+
+
+def parse_imported_modules(importtime_output: str) -> set:
+    """
+    Extract the names of imported modules from ``-X importtime`` output.
+
+    Args:
+        importtime_output: stderr of a process run with ``-X importtime``
+
+    Returns:
+        set: Fully qualified module names
+    """
+    modules = set()
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        if name and name != "imported package":
+            modules.add(name)
+    return modules
+
+
+def measure_command(args: list, repeat: int = 3) -> tuple:
+    """
+    Run a command in a fresh interpreter several times.
+
+    Args:
+        args: Script and arguments, relative to the project root
+        repeat: Number of cold starts to measure
+
+    Returns:
+        tuple: (best wall time in ms, set of imported modules)
+    """
+    best_ms = None
+    modules = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if completed.returncode != 0:
+            raise RuntimeError(
+                f"Command {' '.join(args)} exited with {completed.returncode}: "
+                f"{completed.stdout.strip()}"
+            )
+        modules |= parse_imported_modules(completed.stderr)
+        best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+    return best_ms, modules
+
+
+def check_import_budget(budget_ms: float = DEFAULT_BUDGET_MS, repeat: int = 3) -> list:
+    """
+    Check every lightweight command against the cold-start budget.
+
+    Args:
+        budget_ms: Maximum allowed wall time for the best of ``repeat`` runs
+        repeat: Number of cold starts per command
+
+    Returns:
+        list: Human readable failures, empty when every command is within budget
+    """
+    failures = []
+    for name, args in LIGHT_COMMANDS.items():
+        try:
+            elapsed_ms, modules = measure_command(args, repeat=repeat)
+        except RuntimeError as e:
+            failures.append(f"{name}: {e}")
+            continue
+
+        heavy = sorted(
+            {module.split(".")[0] for module in modules} & set(HEAVY_MODULES)
+        )
+        print(f"{name}: {elapsed_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+
+        if heavy:
+            failures.append(f"{name}: imported heavyweight modules {heavy}")
+        if elapsed_ms > budget_ms:
+            failures.append(
+                f"{name}: cold start {elapsed_ms:.0f} ms exceeds budget {budget_ms:.0f} ms"
+            )
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CLI cold-start budget check")
+    parser.add_argument("--budget_ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = check_import_budget(budget_ms=args.budget_ms, repeat=args.repeat)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,378 @@
+"""
+Local intent classifier for routing messages without the interpreter LLM.
+
+A TF-IDF nearest-centroid model over word unigrams, bigrams and keyword
+features drawn from the camera tool vocabulary. It is trained on labelled
+queries in cases/intent_examples.json and, optionally, on interpreter
+exchanges recorded in replay-server cassettes. Only confident predictions
+are used; everything else still goes through interpret_query. A message
+that mentions the camera is only handled locally as a confident command
+that is not a question and has a clear repeat count, if any: questions
+about the camera, references to an earlier command ("repeat that 3
+times") and counts that are not a repeat ("10 times the resolution")
+go to the interpreter.
+
+Usage:
+    python -m src.utils.intent_classifier --evaluate
+    python -m src.utils.intent_classifier --cassette cassettes/chat.jsonl --query "hi there"
+
+Configuration (environment variables):
+    CAMERA_LOCAL_ROUTING    0 to send every chat message to the interpreter (default 1)
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+LABELS = ("TASK", "CONVERSATION", "UNCLEAR")
+
+EXAMPLES_PATH = Path(__file__).resolve().parents[2] / "cases" / "intent_examples.json"
+
+# Words that only show up when the user is asking the camera to do something
+TOOL_VOCABULARY = {
+    "autoframing",
+    "background",
+    "blur",
+    "camera",
+    "capture",
+    "close",
+    "disable",
+    "effect",
+    "effects",
+    "enable",
+    "ffc",
+    "framing",
+    "minimize",
+    "mode",
+    "off",
+    "on",
+    "open",
+    "photo",
+    "photos",
+    "picture",
+    "pictures",
+    "portrait",
+    "record",
+    "repeat",
+    "restore",
+    "rfc",
+    "standard",
+    "switch",
+    "take",
+    "times",
+    "turn",
+    "video",
+}
+
+# Camera words without a dedicated agent; not model features, but they
+# keep a message away from the conversation agent
+SETTINGS_VOCABULARY = {
+    "1080p",
+    "1440p",
+    "360p",
+    "480p",
+    "4k",
+    "720p",
+    "brightness",
+    "exposure",
+    "fps",
+    "hdr",
+    "quality",
+    "resolution",
+    "settings",
+    "zoom",
+}
+
+QUESTION_WORDS = {"what", "how", "why", "who", "which", "can", "could", "do", "does"}
+
+NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "twenty": 20,
+}
+
+MULTIPLIER_WORDS = {"twice": 2, "thrice": 3}
+
+_COUNT = (
+    r"(?:(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")\s+times?|"
+    r"(?P<multiplier>" + "|".join(MULTIPLIER_WORDS) + r"))"
+)
+
+# "Repeat 5 times", "repeat the above five times" anywhere; "10 times",
+# "twice" only at the end of the message
+REPEAT_PATTERN = re.compile(
+    r"[.,]?\s*(?P<prefix>repeat(?:\s+(?:the\s+)?(?:above|this|that|it))?\s+)?"
+    + _COUNT
+    + r"(?(prefix)\b|(?=\s*[.!]?\s*$))\.?",
+    re.IGNORECASE,
+)
+
+# Any count, repeat or not
+COUNT_PATTERN = re.compile(r"\b" + _COUNT + r"\b", re.IGNORECASE)
+
+DEFAULT_THRESHOLD = 0.8
+TEMPERATURE = 0.1
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens plus bigrams and keyword features."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    tokens = list(words)
+    tokens += [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+    tool_hits = sum(1 for w in words if w in TOOL_VOCABULARY)
+    if tool_hits:
+        tokens += ["__tool__"] * min(tool_hits, 3)
+    else:
+        tokens.append("__no_tool__")
+    if is_question(text):
+        tokens.append("__question__")
+    if len(words) <= 2:
+        tokens.append("__short__")
+    return tokens
+
+
+def parse_iterations(query: str) -> tuple:
+    """
+    Pull a repeat count out of a task query.
+
+    Returns:
+        tuple: (iterations, query with the repeat phrase removed)
+    """
+    match = REPEAT_PATTERN.search(query)
+    if not match:
+        return 1, query.strip()
+    if match.group("multiplier"):
+        iterations = MULTIPLIER_WORDS[match.group("multiplier").lower()]
+    else:
+        value = match.group("count").lower()
+        iterations = int(value) if value.isdigit() else NUMBER_WORDS[value]
+    cleaned = (query[: match.start()] + query[match.end() :]).strip(" .,")
+    return max(iterations, 1), cleaned
+
+
+def is_question(text: str) -> bool:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return "?" in text or bool(words and words[0] in QUESTION_WORDS)
+
+
+def mentions_camera(text: str) -> bool:
+    words = set(re.findall(r"[a-z0-9]+", text.lower()))
+    return bool(words & (TOOL_VOCABULARY | SETTINGS_VOCABULARY))
+
+
+def local_routing_enabled() -> bool:
+    return os.getenv("CAMERA_LOCAL_ROUTING", "1") != "0"
+
+
+class IntentClassifier:
+    """TF-IDF nearest-centroid classifier over TASK/CONVERSATION/UNCLEAR."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.idf = {}
+        self.centroids = {}
+
+    def _vector(self, text: str) -> dict:
+        counts = Counter(tokenize(text))
+        vector = {
+            token: (1 + math.log(count)) * self.idf[token]
+            for token, count in counts.items()
+            if token in self.idf
+        }
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {t: v / norm for t, v in vector.items()} if norm else {}
+
+    def fit(self, examples: list) -> "IntentClassifier":
+        """
+        Train on labelled examples.
+
+        Args:
+            examples: List of (query, label) pairs
+        """
+        examples = [(q, label) for q, label in examples if label in LABELS]
+        if not examples:
+            raise ValueError("No labelled examples to train on")
+
+        document_frequency = Counter()
+        for query, _ in examples:
+            document_frequency.update(set(tokenize(query)))
+        n = len(examples)
+        self.idf = {
+            token: math.log((1 + n) / (1 + df)) + 1
+            for token, df in document_frequency.items()
+        }
+
+        sums = {}
+        for query, label in examples:
+            centroid = sums.setdefault(label, Counter())
+            centroid.update(self._vector(query))
+        self.centroids = {}
+        for label, centroid in sums.items():
+            norm = math.sqrt(sum(v * v for v in centroid.values()))
+            self.centroids[label] = {t: v / norm for t, v in centroid.items()}
+        return self
+
+    def predict_proba(self, text: str) -> dict:
+        """Softmax over cosine similarity to each class centroid."""
+        vector = self._vector(text)
+        scores = {
+            label: sum(v * centroid.get(t, 0.0) for t, v in vector.items())
+            for label, centroid in self.centroids.items()
+        }
+        if not scores:
+            return {}
+        top = max(scores.values())
+        exp = {
+            label: math.exp((score - top) / TEMPERATURE)
+            for label, score in scores.items()
+        }
+        total = sum(exp.values())
+        return {label: value / total for label, value in exp.items()}
+
+    def predict(self, text: str) -> tuple:
+        """
+        Returns:
+            tuple: (label, confidence)
+        """
+        probabilities = self.predict_proba(text)
+        if not probabilities:
+            return None, 0.0
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    def route(self, message: str):
+        """
+        Classify a chat message the way interpret_query would, if confident.
+
+        Returns:
+            tuple or None: (msg_type, iterations, query), or None to defer
+            to the interpreter LLM
+        """
+        probabilities = self.predict_proba(message)
+        if not probabilities:
+            return None
+        if mentions_camera(message):
+            if probabilities.get("TASK", 0.0) < self.threshold or is_question(
+                message
+            ):
+                return None
+            iterations, query = parse_iterations(message)
+            # Nothing left is a reference to an earlier command; a count
+            # left over is not a repeat count
+            if not query or COUNT_PATTERN.search(query):
+                return None
+            return "TASK", iterations, query
+        # CONVERSATION and UNCLEAR both go to the conversation agent, so
+        # only their combined share has to clear the threshold
+        if 1.0 - probabilities.get("TASK", 0.0) >= self.threshold:
+            label = max(
+                ("CONVERSATION", "UNCLEAR"), key=lambda l: probabilities.get(l, 0.0)
+            )
+            return label, 1, message
+        return None
+
+
+def load_examples(path=EXAMPLES_PATH) -> list:
+    """Load (query, label) pairs from an intent examples JSON file."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    return [(e["query"], e["label"]) for e in data["examples"]]
+
+
+def load_examples_from_cassette(path) -> list:
+    """
+    Extract (query, label) pairs from interpreter calls recorded by the
+    replay server (see llm_replay_server).
+    """
+    examples = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            messages = entry["request"].get("messages") or []
+            prompt = messages[-1].get("content") if messages else None
+            if not isinstance(prompt, str) or "TYPE: [TASK" not in prompt:
+                continue
+            query = prompt.split("Query:", 1)[1].split("Output format:", 1)[0].strip()
+            for choice in entry["response"].get("choices", []):
+                reply = (choice.get("message") or {}).get("content") or ""
+                match = re.search(r"TYPE:\s*(\w+)", reply)
+                if match and match.group(1) in LABELS:
+                    examples.append((query, match.group(1)))
+    return examples
+
+
+_default_classifier = None
+
+
+def get_default_classifier() -> IntentClassifier:
+    """Classifier trained on cases/intent_examples.json, built on first use."""
+    global _default_classifier
+    if _default_classifier is None:
+        try:
+            _default_classifier = IntentClassifier().fit(load_examples())
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Local intent classifier unavailable: {e}")
+            _default_classifier = IntentClassifier()
+    return _default_classifier
+
+
+def evaluate(examples: list, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """
+    Leave-one-out evaluation.
+
+    Returns:
+        dict: accuracy on all examples, coverage (share routed locally) and
+        how often a routed message went to the right place (task vs chat)
+    """
+    correct = routed = routed_correct = 0
+    for i, (query, label) in enumerate(examples):
+        model = IntentClassifier(threshold).fit(examples[:i] + examples[i + 1 :])
+        predicted, _ = model.predict(query)
+        correct += predicted == label
+        routed_as = model.route(query)
+        if routed_as is not None:
+            routed += 1
+            routed_correct += (routed_as[0] == "TASK") == (label == "TASK")
+    n = len(examples)
+    return {
+        "examples": n,
+        "accuracy": correct / n if n else 0.0,
+        "coverage": routed / n if n else 0.0,
+        "routed_accuracy": routed_correct / routed if routed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local intent classifier")
+    parser.add_argument("--examples", type=str, default=str(EXAMPLES_PATH))
+    parser.add_argument("--cassette", type=str, action="append", default=[])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--evaluate", action="store_true")
+    parser.add_argument("--query", type=str)
+    args = parser.parse_args()
+
+    examples = load_examples(args.examples)
+    for cassette in args.cassette:
+        examples += load_examples_from_cassette(cassette)
+
+    if args.evaluate:
+        print(json.dumps(evaluate(examples, args.threshold), indent=2))
+    if args.query:
+        classifier = IntentClassifier(args.threshold).fit(examples)
+        print(classifier.predict_proba(args.query))
+        print(classifier.route(args.query))
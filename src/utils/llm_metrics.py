@@ -0,0 +1,542 @@
+"""
+Per-call LLM latency, token and cost accounting.
+
+Every chat completion that goes through the shared HTTP pool is recorded
+with its model, prompt/completion tokens, latency, provider cache hits and
+the calling component. autogen disk-cache hits never reach the network, so
+they are recorded through autogen's runtime logger instead. Token counts
+fall back to tiktoken when the provider does not report usage (e.g. for
+streamed responses).
+
+Records are aggregated per session, per request and per test case:
+
+    with track_test_case("2"), track_request() as request_id:
+        with track_component("interpreter"):
+            interpret_query(...)
+    print(format_usage_summary(get_usage_summary(request_id=request_id)))
+"""
+
+import asyncio
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+# USD per million tokens: (prompt, completion)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "o3-mini": (1.10, 4.40),
+}
+
+# Bounds on retained history for long-running servers
+MAX_RECORDS = 10000
+MAX_TRACKED_REQUESTS = 1000
+
+_component = contextvars.ContextVar("llm_component", default="unknown")
+_request_id = contextvars.ContextVar("llm_request_id", default=None)
+_test_case = contextvars.ContextVar("llm_test_case", default=None)
+
+
+@dataclass
+class LLMCallRecord:
+    """One LLM call as seen by the accounting layer."""
+
+    model: str
+    component: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+    cost: float
+    cache_hit: bool = False
+    cached_tokens: int = 0
+    usage_estimated: bool = False
+    request_id: str = None
+    test_case: str = None
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+def _empty_totals(nested: bool = True) -> dict:
+    totals = {
+        "calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cost": 0.0,
+        "latency": 0.0,
+        "cache_hits": 0,
+        "cached_tokens": 0,
+        "estimated_calls": 0,
+    }
+    if nested:
+        totals["by_component"] = {}
+        totals["by_model"] = {}
+    return totals
+
+
+def _add(totals: dict, record: LLMCallRecord, nested: bool = True) -> None:
+    totals["calls"] += 1
+    totals["prompt_tokens"] += record.prompt_tokens
+    totals["completion_tokens"] += record.completion_tokens
+    totals["total_tokens"] += record.total_tokens
+    totals["cost"] += record.cost
+    totals["latency"] += record.latency
+    totals["cache_hits"] += int(record.cache_hit)
+    totals["cached_tokens"] += record.cached_tokens
+    totals["estimated_calls"] += int(record.usage_estimated)
+    if nested:
+        for key, name in (
+            ("by_component", record.component),
+            ("by_model", record.model),
+        ):
+            bucket = totals[key].setdefault(name, _empty_totals(nested=False))
+            _add(bucket, record, nested=False)
+
+
+class UsageTracker:
+    """Thread-safe aggregation of LLM call records."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.session_id = str(uuid.uuid4())
+            self.started = datetime.now().isoformat(timespec="seconds")
+            self.records = deque(maxlen=MAX_RECORDS)
+            self.session = _empty_totals()
+            self.requests = OrderedDict()
+            self.test_cases = {}
+
+    def add(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            _add(self.session, record)
+            if record.request_id is not None:
+                totals = self.requests.get(record.request_id)
+                if totals is None:
+                    totals = self.requests[record.request_id] = _empty_totals()
+                    while len(self.requests) > MAX_TRACKED_REQUESTS:
+                        self.requests.popitem(last=False)
+                _add(totals, record)
+            if record.test_case is not None:
+                _add(
+                    self.test_cases.setdefault(record.test_case, _empty_totals()),
+                    record,
+                )
+
+    def summary(self, request_id: str = None, test_case: str = None) -> dict:
+        with self._lock:
+            if request_id is not None:
+                totals = self.requests.get(request_id, _empty_totals())
+            elif test_case is not None:
+                totals = self.test_cases.get(test_case, _empty_totals())
+            else:
+                totals = self.session
+            return json.loads(json.dumps(totals))
+
+
+tracker = UsageTracker()
+
+
+@contextmanager
+def track_component(name: str):
+    """Attribute LLM calls made inside the block to a pipeline component."""
+    token = _component.set(name)
+    try:
+        yield name
+    finally:
+        _component.reset(token)
+
+
+@contextmanager
+def track_request(request_id: str = None):
+    """Group LLM calls made inside the block under one request id."""
+    request_id = request_id or str(uuid.uuid4())
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+@contextmanager
+def track_test_case(test_id: str):
+    """Group LLM calls made inside the block under a test case id."""
+    token = _test_case.set(str(test_id))
+    try:
+        yield str(test_id)
+    finally:
+        _test_case.reset(token)
+
+
+def tracked_iter(iterable, request_id: str = None, component: str = None):
+    """
+    Iterate with every step run in one tracking context.
+
+    Generators that stay suspended between steps (e.g. a streaming Gradio
+    handler resumed on a different worker thread) would otherwise lose their
+    request/component context, or fail to reset it, between yields.
+
+    Args:
+        iterable: The iterable or generator to drive
+        request_id: Request id to attribute calls to
+        component: Component to attribute calls to
+    """
+    context = contextvars.copy_context()
+
+    def enter():
+        if request_id is not None:
+            _request_id.set(request_id)
+        if component is not None:
+            _component.set(component)
+
+    context.run(enter)
+    iterator = context.run(iter, iterable)
+    done = object()
+    while True:
+        item = context.run(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+async def tracked_aiter(aiterable, request_id: str = None, component: str = None):
+    """
+    Async counterpart of tracked_iter.
+
+    The async iterable is driven by its own task, created in one tracking
+    context, and its items are handed over through a queue. The consumer may
+    then resume from any task without losing or corrupting the context.
+    """
+    context = contextvars.copy_context()
+
+    def enter():
+        if request_id is not None:
+            _request_id.set(request_id)
+        if component is not None:
+            _component.set(component)
+
+    context.run(enter)
+    items = asyncio.Queue()
+    done = object()
+
+    async def produce():
+        try:
+            async for item in aiterable:
+                items.put_nowait(item)
+        finally:
+            items.put_nowait(done)
+
+    # Tasks run in a copy of the context current at creation
+    task = context.run(asyncio.get_running_loop().create_task, produce())
+    try:
+        while True:
+            item = await items.get()
+            if item is done:
+                break
+            yield item
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def current_component() -> str:
+    return _component.get()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD from MODEL_PRICES, matching dated model names by prefix."""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # e.g. "gpt-4o-mini-2024-07-18"; prefer the longest matching name
+        for name in sorted(MODEL_PRICES, key=len, reverse=True):
+            if model.startswith(name):
+                prices = MODEL_PRICES[name]
+                break
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+_encodings = {}
+
+
+def _encoding_for(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # tiktoken fetches its BPE files on first use; offline hosts approximate
+            print(f"tiktoken unavailable ({e}); approximating token counts")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count tokens in text with tiktoken, or approximate when unavailable."""
+    if not text:
+        return 0
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: list, model: str = "gpt-4o-mini") -> int:
+    """Count prompt tokens for chat messages (3 per message plus 3 for the reply)."""
+    total = 3
+    for message in messages or []:
+        total += 3
+        for key, value in message.items():
+            if isinstance(value, str):
+                total += count_tokens(value, model)
+            elif value is not None:
+                total += count_tokens(json.dumps(value), model)
+    return total
+
+
+def _parse_completion(body: bytes) -> tuple:
+    """
+    Extract (model, content, usage) from a JSON or server-sent-event body.
+    """
+    text = body.decode("utf-8", errors="replace")
+    if not text.lstrip().startswith("data:"):
+        payload = json.loads(text)
+        content = ""
+        for choice in payload.get("choices", []):
+            message = choice.get("message") or {}
+            content += message.get("content") or ""
+            for call in message.get("tool_calls") or []:
+                content += json.dumps(call.get("function", {}))
+        return payload.get("model"), content, payload.get("usage")
+
+    model, content, usage = None, "", None
+    for line in text.splitlines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        model = chunk.get("model") or model
+        usage = chunk.get("usage") or usage
+        for choice in chunk.get("choices", []):
+            delta = choice.get("delta") or {}
+            content += delta.get("content") or ""
+            for call in delta.get("tool_calls") or []:
+                content += (call.get("function") or {}).get("arguments") or ""
+    return model, content, usage
+
+
+def record_call(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    latency: float,
+    component: str = None,
+    cache_hit: bool = False,
+    cached_tokens: int = 0,
+    usage_estimated: bool = False,
+    cost: float = None,
+) -> LLMCallRecord:
+    """Record one LLM call against the current request and test case."""
+    record = LLMCallRecord(
+        model=model,
+        component=component or _component.get(),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency=latency,
+        cost=(
+            estimate_cost(model, prompt_tokens, completion_tokens)
+            if cost is None
+            else cost
+        ),
+        cache_hit=cache_hit,
+        cached_tokens=cached_tokens,
+        usage_estimated=usage_estimated,
+        request_id=_request_id.get(),
+        test_case=_test_case.get(),
+    )
+    tracker.add(record)
+    return record
+
+
+def record_http_exchange(request, response, body: bytes, elapsed: float) -> None:
+    """Exchange observer for the shared HTTP pool (see http_pool)."""
+    if body is None or response.status_code >= 400:
+        return
+    try:
+        request_body = json.loads(request.content or b"{}")
+    except ValueError:
+        request_body = {}
+
+    model, content, usage = _parse_completion(body)
+    model = model or request_body.get("model", "unknown")
+    if usage:
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        details = usage.get("prompt_tokens_details") or {}
+        cached_tokens = details.get("cached_tokens") or 0
+        estimated = False
+    else:
+        prompt_tokens = count_message_tokens(request_body.get("messages"), model)
+        completion_tokens = count_tokens(content, model)
+        cached_tokens = 0
+        estimated = True
+
+    record_call(
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency=elapsed,
+        cache_hit=cached_tokens > 0,
+        cached_tokens=cached_tokens,
+        usage_estimated=estimated,
+    )
+
+
+def _autogen_cache_logger():
+    """autogen runtime logger that records disk-cache hits, which skip HTTP."""
+    from autogen.logger.base_logger import BaseLogger
+
+    class CacheHitLogger(BaseLogger):
+        def start(self) -> str:
+            return tracker.session_id
+
+        def log_chat_completion(
+            self,
+            invocation_id,
+            client_id,
+            wrapper_id,
+            source,
+            request,
+            response,
+            is_cached,
+            cost,
+            start_time,
+        ) -> None:
+            if not is_cached:
+                return
+            usage = getattr(response, "usage", None)
+            record_call(
+                model=getattr(response, "model", None)
+                or request.get("model", "unknown"),
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                latency=0.0,
+                cache_hit=True,
+                cost=0.0,
+            )
+
+        def log_new_agent(self, agent, init_args) -> None:
+            pass
+
+        def log_event(self, source, name, **kwargs) -> None:
+            pass
+
+        def log_new_wrapper(self, wrapper, init_args) -> None:
+            pass
+
+        def log_new_client(self, client, wrapper, init_args) -> None:
+            pass
+
+        def log_function_use(self, source, function, args, returns) -> None:
+            pass
+
+        def stop(self) -> None:
+            pass
+
+        def get_connection(self):
+            return None
+
+    return CacheHitLogger()
+
+
+_enabled = False
+_enable_lock = threading.Lock()
+
+
+def enable_llm_accounting(autogen_cache_hits: bool = True) -> None:
+    """
+    Start recording every LLM call. Safe to call more than once.
+
+    Args:
+        autogen_cache_hits: Also record autogen disk-cache hits through
+            autogen's runtime logger (skipped if autogen is not installed)
+    """
+    global _enabled
+    with _enable_lock:
+        if _enabled:
+            return
+        from src.utils.http_pool import add_exchange_observer
+
+        add_exchange_observer(record_http_exchange)
+        if autogen_cache_hits:
+            try:
+                from autogen import runtime_logging
+            except ImportError:
+                pass
+            else:
+                if not runtime_logging.logging_enabled():
+                    runtime_logging.start(logger=_autogen_cache_logger())
+        _enabled = True
+
+
+def get_usage_summary(request_id: str = None, test_case: str = None) -> dict:
+    """
+    Aggregated usage for one request, one test case or the whole session.
+
+    Returns:
+        dict: Totals plus by_component and by_model breakdowns
+    """
+    return tracker.summary(request_id=request_id, test_case=test_case)
+
+
+def get_call_records(request_id: str = None) -> list:
+    """Raw call records, optionally filtered to one request."""
+    with tracker._lock:
+        records = list(tracker.records)
+    if request_id is not None:
+        records = [r for r in records if r.request_id == request_id]
+    return [asdict(r) for r in records]
+
+
+def format_usage_summary(summary: dict, title: str = "LLM usage") -> str:
+    """Render a usage summary as a compact per-component table."""
+    lines = [
+        f"{title}: {summary['calls']} calls, {summary['total_tokens']} tokens "
+        f"({summary['prompt_tokens']} prompt / {summary['completion_tokens']} completion), "
+        f"${summary['cost']:.4f}, {summary['latency']:.2f}s, "
+        f"{summary['cache_hits']} cache hits"
+    ]
+    components = sorted(
+        summary["by_component"].items(),
+        key=lambda item: item[1]["latency"],
+        reverse=True,
+    )
+    for name, totals in components:
+        lines.append(
+            f"  {name:<32} {totals['calls']:>4} calls {totals['total_tokens']:>8} tokens "
+            f"{totals['latency']:>8.2f}s ${totals['cost']:.4f}"
+        )
+    return "\n".join(lines)
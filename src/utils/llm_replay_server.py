@@ -0,0 +1,484 @@
+"""
+Offline OpenAI-compatible stand-in server with record/replay cassettes.
+
+Serves ``/v1/chat/completions`` from a JSONL cassette keyed by a hash of the
+request body, so the agents and the anomaly pipeline run without network
+access or API keys. Tool calls and structured-output (``response_format``)
+responses replay exactly as recorded; streamed requests are answered with
+server-sent events built from the recorded completion.
+
+Modes:
+    replay   Serve recorded responses only; unknown requests fail with 404
+    record   Forward every request to the real API and append it to the cassette
+    auto     Replay when recorded, otherwise forward and record
+
+Usage:
+    python -m src.utils.llm_replay_server --cassette cassettes/planning.jsonl --mode record
+    python -m src.utils.llm_replay_server --cassette cassettes/planning.jsonl --latency_ms 300
+
+    # then point the app at it
+    LLM_BASE_URL=http://127.0.0.1:8765/v1 python app.py --test_id 2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+MODES = ("replay", "record", "auto")
+
+# Request fields that do not change the model's answer
+VOLATILE_FIELDS = ("stream", "stream_options", "user", "timeout")
+
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+
+
+def request_key(body: dict) -> str:
+    """
+    Hash a chat completion request into a cassette key.
+
+    Args:
+        body: JSON body of the request
+
+    Returns:
+        str: sha256 of the canonical JSON of the answer-relevant fields
+    """
+    relevant = {k: v for k, v in body.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Delay injected before each replayed response.
+
+    Attributes:
+        fixed_ms: Constant delay added to every response
+        jitter_ms: Upper bound of a deterministic uniform jitter
+        recorded_scale: Multiplier for the latency stored in the cassette (0 disables)
+        seed: Seed for the jitter, combined with the request key
+    """
+
+    fixed_ms: float = 0.0
+    jitter_ms: float = 0.0
+    recorded_scale: float = 0.0
+    seed: int = 0
+
+    def delay(self, key: str, recorded_ms: float = 0.0) -> float:
+        """Seconds to wait before answering the request with this key."""
+        delay_ms = self.fixed_ms + recorded_ms * self.recorded_scale
+        if self.jitter_ms:
+            rng = random.Random(f"{self.seed}:{key}")
+            delay_ms += rng.uniform(0, self.jitter_ms)
+        return delay_ms / 1000
+
+
+class Cassette:
+    """
+    Append-only JSONL store of recorded request/response pairs.
+
+    Identical requests recorded several times replay in recorded order and
+    then keep returning the last recording.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> list of entries
+        self._cursor = {}  # key -> next index to replay
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def entries(self):
+        """Iterate over every recorded entry."""
+        for entries in self._entries.values():
+            yield from entries
+
+    def next(self, key: str):
+        """Return the next recorded entry for key, or None when unrecorded."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def rewind(self):
+        """Replay every key from its first recording again."""
+        with self._lock:
+            self._cursor.clear()
+
+    def append(
+        self, key: str, endpoint: str, request: dict, response: dict, latency_ms: float
+    ):
+        entry = {
+            "key": key,
+            "endpoint": endpoint,
+            "request": request,
+            "response": response,
+            "latency_ms": round(latency_ms, 1),
+        }
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+
+def completion_to_chunks(completion: dict, include_usage: bool = False) -> list:
+    """
+    Convert a recorded chat completion into streaming chunks.
+
+    Content is split on whitespace so clients see incremental deltas; tool
+    calls are sent whole in a single delta.
+    """
+    base = {
+        "id": completion.get("id", "chatcmpl-replay"),
+        "object": "chat.completion.chunk",
+        "created": completion.get("created", 0),
+        "model": completion.get("model", ""),
+    }
+    chunks = []
+    for choice in completion.get("choices", []):
+        index = choice.get("index", 0)
+        message = choice.get("message", {})
+        chunks.append(
+            {
+                **base,
+                "choices": [
+                    {
+                        "index": index,
+                        "delta": {"role": "assistant"},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+        )
+
+        content = message.get("content") or ""
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            piece = word if i == len(words) - 1 else word + " "
+            if piece:
+                chunks.append(
+                    {
+                        **base,
+                        "choices": [
+                            {
+                                "index": index,
+                                "delta": {"content": piece},
+                                "finish_reason": None,
+                            }
+                        ],
+                    }
+                )
+
+        if message.get("tool_calls"):
+            tool_calls = [
+                {"index": i, **call} for i, call in enumerate(message["tool_calls"])
+            ]
+            chunks.append(
+                {
+                    **base,
+                    "choices": [
+                        {
+                            "index": index,
+                            "delta": {"tool_calls": tool_calls},
+                            "finish_reason": None,
+                        }
+                    ],
+                }
+            )
+
+        chunks.append(
+            {
+                **base,
+                "choices": [
+                    {
+                        "index": index,
+                        "delta": {},
+                        "finish_reason": choice.get("finish_reason", "stop"),
+                    }
+                ],
+            }
+        )
+
+    if include_usage and completion.get("usage"):
+        chunks.append({**base, "choices": [], "usage": completion["usage"]})
+    return chunks
+
+
+class ReplayServer:
+    """
+    OpenAI-compatible server backed by a cassette.
+
+    Usable as a context manager for in-process tests and benchmarks:
+
+        with ReplayServer("cassettes/planning.jsonl", port=0) as server:
+            os.environ["LLM_BASE_URL"] = server.base_url
+    """
+
+    def __init__(
+        self,
+        cassette,
+        mode: str = "replay",
+        latency: LatencyProfile = None,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        upstream: str = None,
+        api_key: str = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Invalid mode: {mode}. Use one of {MODES}")
+        self.cassette = (
+            cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+        )
+        self.mode = mode
+        self.latency = latency or LatencyProfile()
+        self.upstream = (
+            upstream or os.getenv("LLM_UPSTREAM_URL") or DEFAULT_UPSTREAM
+        ).rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _forward(self, endpoint: str, body: dict) -> tuple:
+        """Send a request to the real API and return (response, latency_ms)."""
+        from src.utils.http_pool import get_http_client
+
+        if not self.api_key:
+            raise RuntimeError("Recording requires OPENAI_API_KEY")
+        start = time.perf_counter()
+        response = get_http_client().post(
+            f"{self.upstream}{endpoint}",
+            json=body,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+        return response.json(), latency_ms
+
+    def complete(self, endpoint: str, body: dict) -> tuple:
+        """
+        Answer a chat completion request.
+
+        Returns:
+            tuple: (completion dict or None, delay in seconds, error message or None)
+        """
+        key = request_key(body)
+        if self.mode != "record":
+            entry = self.cassette.next(key)
+            if entry is not None:
+                self.hits += 1
+                return (
+                    entry["response"],
+                    self.latency.delay(key, entry.get("latency_ms", 0.0)),
+                    None,
+                )
+            if self.mode == "replay":
+                self.misses += 1
+                return None, 0.0, f"No recorded response for request {key}"
+
+        # Record non-streamed; streaming is re-synthesised from the completion
+        upstream_body = {
+            k: v for k, v in body.items() if k not in ("stream", "stream_options")
+        }
+        try:
+            completion, latency_ms = self._forward(endpoint, upstream_body)
+        except Exception as e:
+            return None, 0.0, f"Upstream request failed: {e}"
+        self.cassette.append(key, endpoint, body, completion, latency_ms)
+        self.recorded += 1
+        return completion, 0.0, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, chunks: list):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in chunks:
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def do_GET(self):
+                if self.path.rstrip("/") in ("/health", "/v1/health"):
+                    self._send_json(
+                        200,
+                        {
+                            "status": "ok",
+                            "mode": server.mode,
+                            "entries": len(server.cassette),
+                        },
+                    )
+                elif self.path.rstrip("/") == "/v1/models":
+                    models = sorted(
+                        {
+                            e["request"].get("model", "")
+                            for e in server.cassette.entries()
+                        }
+                    )
+                    self._send_json(
+                        200,
+                        {
+                            "object": "list",
+                            "data": [{"id": m, "object": "model"} for m in models],
+                        },
+                    )
+                else:
+                    self._send_json(
+                        404, {"error": {"message": f"Unknown path {self.path}"}}
+                    )
+
+            def do_POST(self):
+                endpoint = (
+                    self.path[len("/v1") :]
+                    if self.path.startswith("/v1/")
+                    else self.path
+                )
+                if endpoint != "/chat/completions":
+                    self._send_json(
+                        404, {"error": {"message": f"Unsupported endpoint {self.path}"}}
+                    )
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                completion, delay, error = server.complete(endpoint, body)
+                if error:
+                    self._send_json(
+                        404, {"error": {"message": error, "type": "replay_miss"}}
+                    )
+                    return
+
+                if delay:
+                    time.sleep(delay)
+                if body.get("stream"):
+                    include_usage = (body.get("stream_options") or {}).get(
+                        "include_usage", False
+                    )
+                    self._send_stream(completion_to_chunks(completion, include_usage))
+                else:
+                    self._send_json(200, completion)
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        """Serve in a background daemon thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="llm-replay-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline OpenAI-compatible replay server"
+    )
+    parser.add_argument(
+        "--cassette", type=str, required=True, help="JSONL cassette path"
+    )
+    parser.add_argument("--mode", choices=MODES, default="replay")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--upstream", type=str, default=None, help="Real API base URL for recording"
+    )
+    parser.add_argument(
+        "--latency_ms", type=float, default=0.0, help="Fixed delay per response"
+    )
+    parser.add_argument(
+        "--jitter_ms", type=float, default=0.0, help="Deterministic jitter upper bound"
+    )
+    parser.add_argument(
+        "--recorded_latency",
+        type=float,
+        default=0.0,
+        help="Scale for the recorded latency",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.cassette,
+        mode=args.mode,
+        latency=LatencyProfile(
+            fixed_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            recorded_scale=args.recorded_latency,
+            seed=args.seed,
+        ),
+        host=args.host,
+        port=args.port,
+        upstream=args.upstream,
+    )
+    print(
+        f"Serving {len(server.cassette)} recorded responses on {server.base_url} ({args.mode} mode)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
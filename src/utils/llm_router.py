@@ -0,0 +1,351 @@
+"""
+Hedged planning calls and latency-aware model routing.
+
+interpret_query and determine_agents gate every request, and their
+latency has a long tail: now and then one call takes many times the
+median and stalls the whole pipeline. routed_reply runs such a call on
+LLM_EXECUTOR and, if no answer has come back after a percentile of the
+latencies seen so far for that component and model, sends a duplicate
+(hedged) request. The first answer that parses wins; the other call is
+left to finish in the background and still counts towards the usage
+accounting, under the component "<component>:hedge".
+
+Routing picks the model for each call:
+
+    interpreter   the fastest of CAMERA_LLM_FAST_MODELS by median
+                  latency, models with fewer than MIN_SAMPLES calls
+                  first so each gets measured; the agent's model if unset
+    manager       the agent's own model
+
+If no answer parses, the call is repeated once (also hedged) on
+CAMERA_LLM_STRONG_MODEL, under "<component>:escalation", unless that is
+the model that just failed. With neither variable set every call goes
+to the agent's configured model and only hedging changes.
+
+    msg_type, iterations, query = routed_reply(
+        interpreter_agent,
+        messages,
+        "interpreter",
+        parse_interpreter_response,
+        lambda parsed: parsed[0] is not None,
+        fast=True,
+    )
+
+Configuration (environment variables):
+    CAMERA_LLM_HEDGES            Duplicate requests per call (default 1; 0 disables)
+    CAMERA_LLM_HEDGE_PERCENTILE  Latency percentile after which to hedge (default 95)
+    CAMERA_LLM_HEDGE_AFTER_S     Hedge delay before MIN_SAMPLES calls are seen (default 10)
+    CAMERA_LLM_HEDGE_MIN_S       Shortest hedge delay (default 1)
+    CAMERA_LLM_FAST_MODELS       Comma-separated candidates for the interpreter
+    CAMERA_LLM_STRONG_MODEL      Model to escalate to after an unparseable reply
+"""
+
+import asyncio
+import copy
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from src.utils.executors import LLM_EXECUTOR
+from src.utils.llm_metrics import track_component
+
+# Latency samples before a percentile or median is trusted
+MIN_SAMPLES = 3
+# Latency samples kept per (component, model)
+MAX_SAMPLES = 200
+
+_lock = threading.Lock()
+_latencies = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_stats = {
+    "calls": 0,
+    "hedged": 0,
+    "hedge_wins": 0,
+    "escalations": 0,
+    "escalation_wins": 0,
+    "failed": 0,
+}
+_clients = {}
+
+
+def _percentile(samples: list, q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of a non-empty list."""
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def record_latency(component: str, model: str, seconds: float) -> None:
+    with _lock:
+        _latencies[(component, model)].append(seconds)
+
+
+def _samples(component: str, model: str) -> list:
+    with _lock:
+        return list(_latencies.get((component, model), ()))
+
+
+def hedge_delay(component: str, model: str) -> float:
+    """Seconds to wait for an answer before sending a duplicate request."""
+    samples = _samples(component, model)
+    floor = float(os.getenv("CAMERA_LLM_HEDGE_MIN_S", "1"))
+    if len(samples) < MIN_SAMPLES:
+        return max(floor, float(os.getenv("CAMERA_LLM_HEDGE_AFTER_S", "10")))
+    q = float(os.getenv("CAMERA_LLM_HEDGE_PERCENTILE", "95"))
+    return max(floor, _percentile(samples, q))
+
+
+def agent_model(agent) -> str:
+    """The model of an agent's llm_config, or None."""
+    config = agent.llm_config or {}
+    config_list = config.get("config_list") or [config]
+    return config_list[0].get("model")
+
+
+def _env_models(name: str) -> list:
+    return [m.strip() for m in os.getenv(name, "").split(",") if m.strip()]
+
+
+def fastest_model(component: str, candidates: list) -> str:
+    """The candidate with the lowest median latency, unmeasured ones first."""
+
+    def rank(item):
+        position, model = item
+        samples = _samples(component, model)
+        if len(samples) < MIN_SAMPLES:
+            return (0, position, 0.0)
+        return (1, _percentile(samples, 50), position)
+
+    return min(enumerate(candidates), key=rank)[1]
+
+
+def _client(agent, model: str):
+    """An OpenAIWrapper for model; None means the agent's own client."""
+    if model is None or model == agent_model(agent):
+        return None
+    with _lock:
+        client = _clients.get(model)
+    if client is None:
+        from autogen import OpenAIWrapper
+
+        from src.utils.config_loader import load_config
+
+        client = OpenAIWrapper(config_list=load_config({"model": model}))
+        with _lock:
+            client = _clients.setdefault(model, client)
+    return client
+
+
+def _attempt(agent, messages: list, client, component: str, label: str, model: str):
+    """One LLM call, timed into the latency samples of (component, model)."""
+    start = time.perf_counter()
+    with track_component(label):
+        # autogen pops a "context" key off the last message, so each call gets a copy
+        _, reply = agent.generate_oai_reply(copy.deepcopy(messages), config=client)
+    record_latency(component, model, time.perf_counter() - start)
+    return reply
+
+
+class _Race:
+    """A call and its hedges on one model; the first valid answer wins."""
+
+    def __init__(self, agent, messages, component, model, parse, valid, label):
+        self.agent = agent
+        self.messages = messages
+        self.component = component
+        self.model = model
+        self.parse = parse
+        self.valid = valid
+        self.label = label
+        self.client = _client(agent, model)
+        self.hedges = int(os.getenv("CAMERA_LLM_HEDGES", "1"))
+        self.delay = hedge_delay(component, model)
+        self.hedge_futures = set()
+        self.parsed = None
+        self.error = None
+        self.answered = False
+        self.won = False
+
+    def submit(self, hedge: bool = False):
+        label = f"{self.component}:hedge" if hedge else self.label
+        if hedge:
+            self.hedges -= 1
+            with _lock:
+                _stats["hedged"] += 1
+            print(
+                f"No {self.component} reply from {self.model} after "
+                f"{self.delay:.1f}s, sending a hedged request"
+            )
+        return LLM_EXECUTOR.submit(
+            _attempt,
+            self.agent,
+            self.messages,
+            self.client,
+            self.component,
+            label,
+            self.model,
+        )
+
+    def timeout(self):
+        return self.delay if self.hedges > 0 else None
+
+    def finished(self, future) -> bool:
+        """Take a finished call's answer; True if it is the valid one."""
+        try:
+            reply = future.result()
+        except Exception as e:
+            self.error = e
+            return False
+        self.parsed = self.parse(reply)
+        self.answered = True
+        if not self.valid(self.parsed):
+            return False
+        self.won = True
+        if future in self.hedge_futures:
+            with _lock:
+                _stats["hedge_wins"] += 1
+        return True
+
+    def run(self) -> None:
+        """Wait for the first valid answer, or for every call to finish."""
+        pending = {self.submit()}
+        while pending:
+            done, pending = wait(pending, self.timeout(), FIRST_COMPLETED)
+            if not done:
+                future = self.submit(hedge=True)
+                self.hedge_futures.add(future)
+                pending.add(future)
+            elif any(self.finished(future) for future in done):
+                return
+
+    async def a_run(self) -> None:
+        """Async run."""
+        pending = {asyncio.wrap_future(self.submit())}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=self.timeout(), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                future = asyncio.wrap_future(self.submit(hedge=True))
+                self.hedge_futures.add(future)
+                pending.add(future)
+            elif any(self.finished(future) for future in done):
+                return
+
+
+def _plan(agent, component: str, fast: bool) -> tuple:
+    """(model to call first, model to escalate to or None)."""
+    own = agent_model(agent)
+    candidates = _env_models("CAMERA_LLM_FAST_MODELS") if fast else []
+    first = fastest_model(component, candidates) if candidates else own
+    strong = os.getenv("CAMERA_LLM_STRONG_MODEL") or own
+    return first, (strong if strong != first else None)
+
+
+def _races(agent, messages, component, parse, valid, fast):
+    """The first race, then, if it is run and loses, the escalation."""
+    with _lock:
+        _stats["calls"] += 1
+    first, strong = _plan(agent, component, fast)
+    yield _Race(agent, messages, component, first, parse, valid, component)
+    if strong is not None:
+        with _lock:
+            _stats["escalations"] += 1
+        print(f"Unparseable {component} reply from {first}, escalating to {strong}")
+        yield _Race(
+            agent, messages, component, strong, parse, valid, f"{component}:escalation"
+        )
+
+
+def _outcome(race: _Race, escalated: bool):
+    """The answer of the last race: parsed if any call answered, else its error."""
+    with _lock:
+        if race.won and escalated:
+            _stats["escalation_wins"] += 1
+        elif not race.won:
+            _stats["failed"] += 1
+    if not race.answered:
+        raise race.error
+    return race.parsed
+
+
+def routed_reply(
+    agent, messages: list, component: str, parse, valid, fast: bool = False
+):
+    """
+    An agent's reply to messages, hedged and routed, parsed.
+
+    Args:
+        agent: The interpreter or manager agent
+        messages: Messages to reply to, as for generate_reply
+        component: Accounting component and latency key ("interpreter")
+        parse: Turns the reply text into the result
+        valid: True for a parsed result worth keeping
+        fast: Route to the fastest of CAMERA_LLM_FAST_MODELS
+
+    Returns:
+        The first valid parsed reply, or the last parsed one if none is
+        valid (an unparseable reply is handled as before)
+
+    Raises:
+        Exception: The last call's error if no call on the last model answered
+    """
+    for i, race in enumerate(_races(agent, messages, component, parse, valid, fast)):
+        race.run()
+        # Errors are not parse failures: only a reply that did not parse escalates
+        if race.won or not race.answered:
+            break
+    return _outcome(race, i > 0)
+
+
+async def a_routed_reply(
+    agent, messages: list, component: str, parse, valid, fast: bool = False
+):
+    """Async routed_reply."""
+    for i, race in enumerate(_races(agent, messages, component, parse, valid, fast)):
+        await race.a_run()
+        if race.won or not race.answered:
+            break
+    return _outcome(race, i > 0)
+
+
+def get_router_metrics() -> dict:
+    """
+    Report hedging and routing.
+
+    Returns:
+        dict: Counts of routed calls, hedged requests and the ones that
+        won, escalations and the ones that parsed, calls with no valid
+        answer, and per "component/model" the call count and p50/p95
+        latency in milliseconds
+    """
+    with _lock:
+        metrics = dict(_stats)
+        latencies = {key: list(samples) for key, samples in _latencies.items()}
+    metrics["latency"] = {
+        f"{component}/{model}": {
+            "calls": len(samples),
+            "p50_ms": _percentile(samples, 50) * 1000,
+            "p95_ms": _percentile(samples, 95) * 1000,
+        }
+        for (component, model), samples in latencies.items()
+        if samples
+    }
+    return metrics
+
+
+def format_router_metrics(metrics: dict) -> str:
+    lines = [
+        f"LLM routing: {metrics['calls']} calls, "
+        f"{metrics['hedged']} hedged ({metrics['hedge_wins']} won), "
+        f"{metrics['escalations']} escalated ({metrics['escalation_wins']} parsed), "
+        f"{metrics['failed']} failed"
+    ]
+    for key, stats in sorted(metrics["latency"].items()):
+        lines.append(
+            f"  {key}: {stats['calls']} calls, "
+            f"p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms"
+        )
+    return "\n".join(lines)
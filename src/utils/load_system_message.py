@@ -1,32 +1,224 @@
+import hashlib
 import os
 import sys
+import threading
+import time
+import weakref
+from dataclasses import dataclass
 from pathlib import Path
 
+# system_messages/ next to src/, so lookups work from any working directory
+SYSTEM_MESSAGES_DIR = Path(__file__).resolve().parents[2] / "system_messages"
 
-def get_system_message(sys_msg: str, log_dir: Path = None) -> str:
+# Minimum seconds between mtime checks of a cached file on the hot path
+RECHECK_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class SystemMessage:
+    """A parsed system message and the file state it was read from."""
+
+    path: Path
+    text: str
+    mtime_ns: int
+    size: int
+    sha256: str
+
+
+_cache = {}  # resolved path -> SystemMessage
+_resolved = {}  # sys_msg file name -> resolved path
+_last_checked = {}  # resolved path -> time.monotonic() of the last stat
+_bound_agents = weakref.WeakKeyDictionary()  # agent -> (sys_msg, log_dir)
+_lock = threading.RLock()
+_watcher = None
+_watcher_stop = threading.Event()
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def resolve_system_message_path(sys_msg: str) -> Path:
+    """
+    Find a system message file, preferring the project's system_messages
+    directory and falling back to the one in the working directory.
+
+    Raises:
+        FileNotFoundError: If no system_messages directory or file exists
+    """
+    candidates = [SYSTEM_MESSAGES_DIR, Path.cwd() / "system_messages"]
+    directories = [d for d in candidates if d.is_dir()]
+    if not directories:
+        raise FileNotFoundError(
+            "system_messages directory not found in project or working directory"
+        )
+    for directory in directories:
+        filepath = directory / sys_msg
+        if filepath.is_file():
+            return filepath.resolve()
+    raise FileNotFoundError(f"System message file '{sys_msg}' not found")
+
+
+def _read(path: Path, stat: os.stat_result) -> SystemMessage:
+    with open(path, "r") as f:
+        text = f.read()
+    return SystemMessage(
+        path=path,
+        text=text,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        sha256=_hash_text(text),
+    )
+
+
+def _refresh(path: Path, force: bool = False) -> SystemMessage:
+    """Return the cached message for path, re-reading it if the file changed."""
+    with _lock:
+        cached = _cache.get(path)
+        now = time.monotonic()
+        watched = _watcher is not None and _watcher.is_alive()
+        if cached is not None and not force:
+            # The watcher keeps the cache fresh; otherwise stat at most once per interval
+            if watched or now - _last_checked.get(path, 0.0) < RECHECK_INTERVAL:
+                return cached
+
+        stat = path.stat()
+        _last_checked[path] = now
+        if (
+            cached is not None
+            and cached.mtime_ns == stat.st_mtime_ns
+            and cached.size == stat.st_size
+        ):
+            return cached
+
+        message = _read(path, stat)
+        _cache[path] = message
+
+    if cached is not None and cached.sha256 != message.sha256:
+        print(f"Reloaded system message: {path.name}")
+        _notify_agents(path)
+    return message
+
+
+def _notify_agents(path: Path) -> None:
+    """Push a reloaded system message into every agent created from it."""
+    with _lock:
+        bindings = list(_bound_agents.items())
+    for agent, (sys_msg, log_dir) in bindings:
+        try:
+            if _resolved.get(sys_msg) == path:
+                agent.update_system_message(get_system_message(sys_msg, log_dir))
+        except Exception as e:
+            print(f"Error reloading system message for agent: {e}", file=sys.stderr)
+
+
+def load_system_message(sys_msg: str) -> SystemMessage:
+    """
+    Load a system message through the module-level cache.
+
+    Args:
+        sys_msg: File name inside system_messages/ or a literal message
+
+    Returns:
+        SystemMessage: The cached message, including its content hash
+
+    Raises:
+        FileNotFoundError: If sys_msg names a .txt file that does not exist
+    """
     # If sys_msg doesn't end with .txt, treat it as a direct message
     if not sys_msg.endswith(".txt"):
-        message = sys_msg
-    else:
-        # Get the working directory and find system_messages folder
-        working_dir = Path.cwd()
-        filepath = working_dir / "system_messages" / sys_msg
-        try:
-            if not (working_dir / "system_messages").exists():
-                raise FileNotFoundError(
-                    "system_messages directory not found in working directory"
-                )
-            if not filepath.exists():
-                raise FileNotFoundError(f"System message file '{sys_msg}' not found")
-
-            with open(filepath, "r") as f:
-                message = f.read()
-        except FileNotFoundError as e:
-            print(f"Error: {e}", file=sys.stderr)
-            return f"Error loading system message: {e}"
+        return SystemMessage(
+            path=None,
+            text=sys_msg,
+            mtime_ns=0,
+            size=len(sys_msg),
+            sha256=_hash_text(sys_msg),
+        )
+    path = _resolved.get(sys_msg)
+    if path is None:
+        path = resolve_system_message_path(sys_msg)
+        _resolved[sys_msg] = path
+    try:
+        return _refresh(path)
+    except FileNotFoundError:
+        # The file moved or was deleted; resolve again on the next lookup
+        _resolved.pop(sys_msg, None)
+        raise
+
+
+def get_system_message(sys_msg: str, log_dir: Path = None) -> str:
+    try:
+        message = load_system_message(sys_msg).text
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return f"Error loading system message: {e}"
 
     if log_dir is not None:
         # Replace the placeholder with the actual log_dir
         message = message.format(log_dir=log_dir)
 
     return message
+
+
+def get_system_message_hash(sys_msg: str) -> str:
+    """Return the sha256 of a system message's raw content, for use in cache keys."""
+    return load_system_message(sys_msg).sha256
+
+
+def bind_agent(agent, sys_msg: str, log_dir: Path = None) -> None:
+    """
+    Keep an agent's system message in sync with its file.
+
+    Only file based messages are tracked; agents are held weakly so binding
+    never keeps an agent alive.
+    """
+    if not sys_msg.endswith(".txt"):
+        return
+    with _lock:
+        _bound_agents[agent] = (sys_msg, log_dir)
+
+
+def _watch(interval: float) -> None:
+    while not _watcher_stop.wait(interval):
+        with _lock:
+            paths = list(_cache)
+        for path in paths:
+            try:
+                _refresh(path, force=True)
+            except FileNotFoundError:
+                # Keep serving the last good copy while an editor replaces the file
+                continue
+
+
+def start_watching(interval: float = 1.0) -> None:
+    """
+    Poll cached system message files in a background thread and hot reload
+    edits into bound agents. While the watcher runs, lookups never stat files.
+    """
+    global _watcher
+    with _lock:
+        if _watcher is not None and _watcher.is_alive():
+            return
+        _watcher_stop.clear()
+        _watcher = threading.Thread(
+            target=_watch, args=(interval,), name="system-message-watcher", daemon=True
+        )
+        _watcher.start()
+
+
+def stop_watching() -> None:
+    """Stop the background watcher started by start_watching."""
+    global _watcher
+    _watcher_stop.set()
+    with _lock:
+        watcher, _watcher = _watcher, None
+    if watcher is not None:
+        watcher.join()
+
+
+def clear_cache() -> None:
+    """Drop all cached system messages."""
+    with _lock:
+        _cache.clear()
+        _resolved.clear()
+        _last_checked.clear()
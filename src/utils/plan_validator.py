@@ -0,0 +1,352 @@
+"""
+Pre-flight validation of planned workflows against a Camera app state machine.
+
+A plan from the manager agent can ask for something that only fails once
+the tools run: a blur type on the rear camera, a take_video without a
+duration, an agent that does not exist. validate_plan walks the plan
+through a model of the app before any device time is spent and either
+repairs it or rejects it.
+
+The model tracks what the tools can observe, each part either known or
+unknown (None) until a step sets it:
+
+    app      closed -> open_camera -> open <-> minimize/restore -> minimized
+             open/minimized -> close_camera -> closed
+    camera   FFC | RFC      switch_camera; the effect toggles switch to FFC
+    mode     photo | video  camera_mode, take_photo, take_video; the
+                            effects panel needs video mode
+
+Preconditions, with the repair applied where one exists:
+
+    every step but open_camera    app open        insert open_camera_agent
+    UI steps (not open, minimize, not minimized   insert restore_camera_agent
+    restore, close)
+    minimize_camera               not minimized   insert restore_camera_agent
+    set_blur_type                 FFC (the Studio insert switch_camera_agent
+                                  Effects panel)  (target_type='FFC')
+    arguments (desired_state,     present and     take_video's duration is
+    blur_type, mode, duration,    valid           taken from the command when
+    num_photos, target_type)                      it names exactly one
+
+Unknown state is given the benefit of the doubt, except that a plan must
+open the app itself. A workflow may run several iterations, so the plan
+is also checked for a second pass from the state the first one leaves.
+A repair is inserted before the first step that fails in either pass,
+and the plan is checked again from the start, so a step the repeat
+needs (restoring a window the plan minimized) lands after whatever the
+first run needs before it (opening the app). The inserted steps are
+idempotent and harmless in the run that does not need them. Unknown
+agents, missing or invalid arguments without a repair, and mismatched
+Sequence/State lists reject the plan.
+
+    result = validate_plan(agent_sequence, agent_states, agent_map, task)
+    if not result["valid"]:
+        print(format_issues(result["errors"]))
+
+Usage:
+    python -m src.utils.plan_validator --states open_camera_agent
+        "switch_camera_agent(target_type='RFC')" "set_blur_type_agent(blur_type='portrait')"
+        [--task "switch to the rear camera and blur the background"]
+"""
+
+import argparse
+import re
+from typing import Tuple
+
+from src.utils.step_scheduler import step_args
+
+# Agents and the arguments of their tools: name -> (required, parser)
+AGENT_ARGS = {
+    "open_camera_agent": {},
+    "close_camera_agent": {},
+    "minimize_camera_agent": {},
+    "restore_camera_agent": {},
+    "set_automatic_framing_agent": {"desired_state": (True, "flag")},
+    "set_background_effects_agent": {"desired_state": (True, "flag")},
+    "set_blur_type_agent": {"blur_type": (True, ("standard", "portrait"))},
+    "switch_camera_agent": {"target_type": (False, ("FFC", "RFC"))},
+    "camera_mode_agent": {"mode": (True, ("photo", "video"))},
+    "take_photo_agent": {"num_photos": (False, "count")},
+    "take_video_agent": {"duration": (True, "seconds")},
+}
+
+# Steps that work while the window is minimized; opening a running app
+# leaves it as it is
+MINIMIZED_AGENTS = ("open_camera_agent", "close_camera_agent", "restore_camera_agent")
+
+# Passes checked: the first from an unknown state, the second from where it ends
+PASSES = 2
+
+# Steps _repair can insert
+REPAIR_AGENTS = ("open_camera_agent", "restore_camera_agent", "switch_camera_agent")
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*-?\s*(?:s|secs?|seconds?)\b", re.I)
+
+
+def _call_args(action: str) -> Tuple[list, dict]:
+    """Positional and keyword arguments written in an agent state."""
+    inside = action.partition("(")[2].rpartition(")")[0]
+    positional = [
+        part.strip().strip("'\"")
+        for part in inside.split(",")
+        if part.strip() and "=" not in part
+    ]
+    return positional, step_args(action)
+
+
+def _parse(kind, value):
+    """The typed argument, or raise ValueError."""
+    text = str(value).strip()
+    if kind == "flag":
+        flags = {"true": True, "on": True, "false": False, "off": False}
+        parsed = flags.get(text.lower())
+    elif kind == "count":
+        parsed = int(float(text))
+        parsed = parsed if parsed >= 1 else None
+    elif kind == "seconds":
+        parsed = float(text)
+        parsed = parsed if parsed > 0 else None
+    else:
+        parsed = next((c for c in kind if c.lower() == text.lower()), None)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def parse_step(agent: str, action: str) -> Tuple[dict, list]:
+    """
+    Typed arguments of a step.
+
+    Returns:
+        Tuple[dict, list]: The valid arguments, and (name, problem) for each
+        missing or invalid one
+    """
+    spec = AGENT_ARGS.get(agent, {})
+    positional, keywords = _call_args(action)
+    args, problems = {}, []
+    for i, (name, (required, kind)) in enumerate(spec.items()):
+        value = keywords.get(name, positional[i] if i < len(positional) else None)
+        if value is None:
+            if required:
+                problems.append((name, "missing"))
+            continue
+        try:
+            args[name] = _parse(kind, value)
+        except ValueError:
+            problems.append((name, f"invalid value {value!r}"))
+    return args, problems
+
+
+def _issue(step: int, agent: str, code: str, message: str) -> dict:
+    return {"step": step, "agent": agent, "code": code, "message": message}
+
+
+def _transition(state: dict, agent: str, args: dict) -> None:
+    """Apply a valid step to the state in place."""
+    if agent == "open_camera_agent":
+        if state["running"] is not True:
+            state.update(running=True, minimized=False)
+    elif agent == "close_camera_agent":
+        state.update(running=False, minimized=False)
+    elif agent == "minimize_camera_agent":
+        state["minimized"] = True
+    elif agent == "restore_camera_agent":
+        state["minimized"] = False
+    elif agent in ("set_automatic_framing_agent", "set_background_effects_agent"):
+        state.update(camera="FFC", mode="video")
+    elif agent == "set_blur_type_agent":
+        state["mode"] = "video"
+    elif agent == "switch_camera_agent":
+        target = args.get("target_type")
+        if target is None and state["camera"] is not None:
+            target = "RFC" if state["camera"] == "FFC" else "FFC"
+        state["camera"] = target
+    elif agent == "camera_mode_agent":
+        state["mode"] = args["mode"]
+    elif agent == "take_photo_agent":
+        state["mode"] = "photo"
+    elif agent == "take_video_agent":
+        state["mode"] = "video"
+    elif agent not in AGENT_ARGS:
+        # An agent this model does not know may have changed anything on screen
+        state.update(camera=None, mode=None)
+
+
+def _repair(state: dict, agent: str) -> Tuple[str, str, str]:
+    """The (agent, state, reason) to insert before a step whose precondition fails."""
+    if agent != "open_camera_agent" and state["running"] is not True:
+        return "open_camera_agent", "open_camera_agent", "the Camera app is not open"
+    if state["minimized"] is True and agent not in MINIMIZED_AGENTS:
+        return (
+            "restore_camera_agent",
+            "restore_camera_agent",
+            "the Camera app is minimized",
+        )
+    if agent == "set_blur_type_agent" and state["camera"] == "RFC":
+        return (
+            "switch_camera_agent",
+            "switch_camera_agent(target_type='FFC')",
+            "Studio Effects are only available on the front camera",
+        )
+    return None
+
+
+def _first_failure(steps: list):
+    """
+    (index, pass, repair) of the first step whose precondition fails over
+    PASSES runs of the plan from an unknown state, or None.
+    """
+    state = dict.fromkeys(("running", "minimized", "camera", "mode"))
+    for run in range(PASSES):
+        for index, (_, agent, _, args) in enumerate(steps):
+            fix = _repair(state, agent)
+            if fix is not None:
+                return index, run, fix
+            _transition(state, agent, args)
+    return None
+
+
+def _task_duration(task: str):
+    """The one recording duration a command names, or None."""
+    durations = {float(d) for d in _DURATION_RE.findall(task or "")}
+    return durations.pop() if len(durations) == 1 else None
+
+
+def validate_plan(
+    agent_sequence: list, agent_states: list, agent_map: dict = None, task: str = None
+) -> dict:
+    """
+    Check a plan against the Camera state machine, repairing what can be.
+
+    Args:
+        agent_sequence: Agent names from the manager
+        agent_states: Intended action of each agent
+        agent_map: Available agents; the known tool agents if None
+        task: The command the plan is for, used to fill in a missing duration
+
+    Returns:
+        dict: valid, agent_sequence and agent_states (repaired if valid,
+        as given otherwise), errors and repairs (each step, agent, code
+        and message; step numbers refer to the plan as given)
+    """
+    known = agent_map if agent_map is not None else AGENT_ARGS
+    result = {
+        "valid": False,
+        "agent_sequence": agent_sequence,
+        "agent_states": agent_states,
+        "errors": [],
+        "repairs": [],
+    }
+    errors, repairs = result["errors"], result["repairs"]
+    if len(agent_sequence) != len(agent_states):
+        errors.append(
+            _issue(
+                0,
+                None,
+                "length_mismatch",
+                f"{len(agent_sequence)} agents but {len(agent_states)} states",
+            )
+        )
+        return result
+
+    # Arguments first: they do not depend on the state
+    steps = []
+    for number, (agent, action) in enumerate(zip(agent_sequence, agent_states), 1):
+        if agent not in known:
+            errors.append(_issue(number, agent, "unknown_agent", "no such agent"))
+            continue
+        if action.partition("(")[0].strip() != agent:
+            errors.append(
+                _issue(number, agent, "state_mismatch", f"state is {action!r}")
+            )
+            continue
+        args, problems = parse_step(agent, action)
+        for name, problem in problems:
+            duration = _task_duration(task) if name == "duration" else None
+            if problem == "missing" and duration is not None:
+                args[name] = duration
+                action = f"{agent}(duration={duration:g})"
+                repairs.append(
+                    _issue(
+                        number,
+                        agent,
+                        "filled_duration",
+                        f"duration={duration:g} taken from the command",
+                    )
+                )
+            else:
+                errors.append(_issue(number, agent, f"bad_{name}", f"{name} {problem}"))
+        steps.append((number, agent, action, args))
+    if errors:
+        return result
+
+    # Then the state machine, inserting repairs until every pass holds.
+    # Each repair establishes a precondition for good, so this ends; the
+    # bound only guards against a repair that undoes another.
+    for _ in range(len(REPAIR_AGENTS) * PASSES * (len(steps) + 1)):
+        failure = _first_failure(steps)
+        if failure is None:
+            break
+        index, run, (fix_agent, fix_action, reason) = failure
+        number, agent = steps[index][:2]
+        if run:
+            reason += " when the plan repeats"
+        repairs.append(_issue(number, agent, "inserted", f"{fix_action}: {reason}"))
+        steps.insert(
+            index, (number, fix_agent, fix_action, parse_step(fix_agent, fix_action)[0])
+        )
+    else:
+        errors.append(
+            _issue(0, None, "unrepairable", "repairs do not converge on a valid plan")
+        )
+        return result
+
+    result.update(
+        valid=True,
+        agent_sequence=[agent for _, agent, _, _ in steps],
+        agent_states=[action for _, _, action, _ in steps],
+    )
+    return result
+
+
+def format_issues(issues: list) -> str:
+    return "\n".join(
+        f"  step {i['step']} {i['agent'] or ''}: {i['message']}" for i in issues
+    )
+
+
+def check_plan(
+    agent_sequence: list, agent_states: list, agent_map: dict = None, task: str = None
+) -> Tuple[list, list]:
+    """
+    validate_plan for the planning pipeline: the repaired plan, or two
+    empty lists (no workflow) if it cannot run.
+    """
+    result = validate_plan(agent_sequence, agent_states, agent_map, task)
+    if result["repairs"]:
+        print(f"Repaired plan:\n{format_issues(result['repairs'])}")
+    if not result["valid"]:
+        print(f"Rejected plan:\n{format_issues(result['errors'])}")
+        return [], []
+    return result["agent_sequence"], result["agent_states"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a planned workflow")
+    parser.add_argument("--states", nargs="+", required=True, help="Agent states")
+    parser.add_argument(
+        "--agents", nargs="+", help="Agent names (default: from states)"
+    )
+    parser.add_argument("--task", type=str, help="The command the plan is for")
+    args = parser.parse_args()
+
+    agents = args.agents or [state.split("(")[0] for state in args.states]
+    result = validate_plan(agents, args.states, task=args.task)
+    print("Valid" if result["valid"] else "Invalid")
+    if result["errors"]:
+        print(f"Errors:\n{format_issues(result['errors'])}")
+    if result["repairs"]:
+        print(f"Repairs:\n{format_issues(result['repairs'])}")
+    if result["valid"]:
+        for agent_state in result["agent_states"]:
+            print(f"  {agent_state}")
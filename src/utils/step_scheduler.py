@@ -0,0 +1,295 @@
+"""
+Reorder commuting plan steps to save Camera UI transitions.
+
+The planner lists steps in the order the user mentioned them, but many
+of them are independent: toggling automatic framing and background
+effects, or picking a blur type, gives the same end state in either
+order. What they cost does depend on the order, because each tool first
+brings the UI into the context it needs and leaves it there
+(src/tools/tools.py):
+
+    camera   a toggle switches to the front camera, switch_camera   ~2s
+    mode     the effects panel needs video mode, a photo needs photo ~1s
+    panel    toggles open the Windows Studio Effects panel,
+             captures close it again                                 ~1s
+
+Each step is modelled by the context it needs, the state it writes (the
+camera, mode and effect settings a post-condition can observe) and the
+state its result depends on. Two steps commute when neither writes
+something the other reads or writes a different value to; the mode is
+not compared before a capture, which sets its own. Captures, opening,
+closing, minimizing and restoring the app, and any step that cannot be
+modelled (unknown agent, missing arguments) are barriers: nothing moves
+across them, so capture order and everything that depends on it are
+kept. Between barriers the cheapest order that respects the
+dependencies is found exactly for short runs of steps and greedily for
+long ones; ties keep the planner's order.
+
+    agent_sequence, agent_states = reorder_plan(agent_sequence, agent_states)
+
+determine_agents applies this to every plan.
+
+Usage:
+    python -m src.utils.step_scheduler --states open_camera_agent
+        "camera_mode_agent(mode='photo')" "set_automatic_framing_agent(desired_state=True)"
+        "take_photo_agent(num_photos=1)"
+
+Configuration (environment variables):
+    CAMERA_REORDER_STEPS   0 to keep the planner's step order (default 1)
+"""
+
+import argparse
+import os
+import re
+from typing import Tuple
+
+# Seconds to bring each part of the UI context to another value
+TRANSITION_COSTS = {"camera": 2.0, "mode": 1.0, "panel": 1.0}
+CONTEXT_KEYS = ("camera", "mode", "panel")
+
+# Segments up to this many steps are ordered exactly, longer ones greedily
+MAX_EXACT_STEPS = 10
+
+# Captures: the context they bring about before capturing; the camera is
+# left alone, everything else about the UI is unknown after other barriers
+CAPTURE_NEEDS = {
+    "take_photo_agent": {"mode": "photo", "panel": "closed"},
+    "take_video_agent": {"mode": "video", "panel": "closed"},
+}
+
+_ARG_RE = re.compile(r"(\w+)\s*=\s*([^,)]+)")
+
+
+def step_args(action: str) -> dict:
+    """Keyword arguments of an agent state such as "take_video_agent(duration=5)"."""
+    return {
+        name: value.strip().strip("'\"")
+        for name, value in _ARG_RE.findall(action or "")
+    }
+
+
+def _flag(value: str):
+    return {"true": True, "false": False}.get(str(value).lower())
+
+
+def step_model(agent: str, action: str) -> dict:
+    """
+    How a step interacts with the UI, or None if it is a barrier.
+
+    Returns:
+        dict: needs (UI context the tool brings about first), writes
+        (observable state it sets) and reads (state its result depends on)
+    """
+    args = step_args(action)
+    if agent in ("set_automatic_framing_agent", "set_background_effects_agent"):
+        state = _flag(args.get("desired_state"))
+        if state is None:
+            return None
+        feature = agent[len("set_") : -len("_agent")]
+        return {
+            "needs": {"camera": "FFC", "mode": "video", "panel": "open"},
+            "writes": {"camera": "FFC", "mode": "video", feature: state},
+            "reads": set(),
+        }
+    if agent == "set_blur_type_agent":
+        blur_type = args.get("blur_type", "").lower()
+        if blur_type not in ("standard", "portrait"):
+            return None
+        # Enables background effects if needed, on whichever camera is active
+        return {
+            "needs": {"mode": "video", "panel": "open"},
+            "writes": {
+                "mode": "video",
+                "background_effects": True,
+                "blur_type": blur_type,
+            },
+            "reads": {"camera"},
+        }
+    if agent == "switch_camera_agent":
+        target = args.get("target_type", "").upper()
+        if target not in ("FFC", "RFC"):
+            # A plain toggle depends on the camera it starts from
+            return None
+        return {
+            "needs": {"camera": target},
+            "writes": {"camera": target},
+            "reads": set(),
+        }
+    if agent == "camera_mode_agent":
+        mode = args.get("mode", "").lower()
+        if mode not in ("photo", "video"):
+            return None
+        return {"needs": {"mode": mode}, "writes": {"mode": mode}, "reads": set()}
+    return None
+
+
+def conflicts(a: dict, b: dict, ignore=()) -> bool:
+    """True if the two modelled steps must keep their relative order."""
+    for key, value in a["writes"].items():
+        if key in ignore:
+            continue
+        if key in b["reads"] or b["writes"].get(key, value) != value:
+            return True
+    return any(key in a["reads"] and key not in ignore for key in b["writes"])
+
+
+def _transition(context: dict, needs: dict) -> float:
+    """Bring context to needs in place; returns the seconds it costs."""
+    cost = 0.0
+    for key in CONTEXT_KEYS:
+        if key in needs and context.get(key) != needs[key]:
+            cost += TRANSITION_COSTS[key]
+            context[key] = needs[key]
+    return cost
+
+
+def _barrier(context: dict, agent: str) -> float:
+    """Apply a barrier step to context in place; returns its transition seconds."""
+    if agent in CAPTURE_NEEDS:
+        return _transition(context, CAPTURE_NEEDS[agent])
+    context.clear()
+    return 0.0
+
+
+def _order_segment(segment: list, models: list, context: dict, exit_agent) -> list:
+    """
+    Cheapest dependency-respecting order of one segment's indices, counting
+    the transitions of the barrier after it (exit_agent, None at the end).
+    """
+    n = len(segment)
+    exit_needs = CAPTURE_NEEDS.get(exit_agent, {})
+    # A capture sets the mode itself, so the segment's last mode does not matter
+    ignore = ("mode",) if "mode" in exit_needs else ()
+    preds = [
+        sum(
+            1 << i
+            for i in range(j)
+            if conflicts(models[segment[i]], models[segment[j]], ignore)
+        )
+        for j in range(n)
+    ]
+
+    def step(ctx: tuple, needs: dict) -> Tuple[float, tuple]:
+        after = dict(zip(CONTEXT_KEYS, ctx))
+        cost = _transition(after, needs)
+        return cost, tuple(after.get(key) for key in CONTEXT_KEYS)
+
+    start = tuple(context.get(key) for key in CONTEXT_KEYS)
+    if n > MAX_EXACT_STEPS:
+        order, done, ctx = [], 0, start
+        while len(order) < n:
+            ready = [j for j in range(n) if not done >> j & 1 and not preds[j] & ~done]
+            costs = {j: step(ctx, models[segment[j]]["needs"]) for j in ready}
+            j = min(ready, key=lambda j: (costs[j][0], j))
+            order.append(j)
+            done |= 1 << j
+            ctx = costs[j][1]
+        return [segment[j] for j in order]
+
+    # Exact search over (steps done, UI context); ties keep the earliest order
+    best = {(0, start): (0.0, ())}
+    for _ in range(n):
+        layer = {}
+        for (done, ctx), (cost, order) in best.items():
+            for j in range(n):
+                if done >> j & 1 or preds[j] & ~done:
+                    continue
+                extra, after = step(ctx, models[segment[j]]["needs"])
+                key = (done | 1 << j, after)
+                candidate = (cost + extra, order + (j,))
+                if key not in layer or candidate < layer[key]:
+                    layer[key] = candidate
+        best = layer
+    _, order = min(
+        (cost + step(ctx, exit_needs)[0], order)
+        for (_, ctx), (cost, order) in best.items()
+    )
+    return [segment[j] for j in order]
+
+
+def transition_cost(agent_sequence: list, agent_states: list) -> float:
+    """Modelled UI transition seconds of one pass through the plan."""
+    context, total = {}, 0.0
+    for agent, action in zip(agent_sequence, agent_states):
+        model = step_model(agent, action)
+        if model is None:
+            total += _barrier(context, agent)
+        else:
+            total += _transition(context, model["needs"])
+    return total
+
+
+def schedule_steps(agent_sequence: list, agent_states: list) -> dict:
+    """
+    Reorder commuting steps to minimise UI transition time.
+
+    Args:
+        agent_sequence: Agent names from determine_agents
+        agent_states: Intended action of each agent
+
+    Returns:
+        dict: agent_sequence and agent_states in the new order, order
+        (original index of each step), before_s and after_s (modelled
+        transition seconds per pass through the plan)
+    """
+    n = len(agent_sequence)
+    order = list(range(n))
+    if n == len(agent_states):
+        models = [step_model(a, s) for a, s in zip(agent_sequence, agent_states)]
+        context = {}
+        i = 0
+        while i < n:
+            if models[i] is None:
+                _barrier(context, agent_sequence[i])
+                i += 1
+                continue
+            end = i
+            while end < n and models[end] is not None:
+                end += 1
+            exit_agent = agent_sequence[end] if end < n else None
+            order[i:end] = _order_segment(
+                list(range(i, end)), models, context, exit_agent
+            )
+            for j in order[i:end]:
+                _transition(context, models[j]["needs"])
+            i = end
+
+    sequence = [agent_sequence[i] for i in order]
+    states = (
+        [agent_states[i] for i in order] if n == len(agent_states) else agent_states
+    )
+    return {
+        "agent_sequence": sequence,
+        "agent_states": states,
+        "order": order,
+        "before_s": transition_cost(agent_sequence, agent_states),
+        "after_s": transition_cost(sequence, states),
+    }
+
+
+def reorder_plan(agent_sequence: list, agent_states: list) -> Tuple[list, list]:
+    """schedule_steps unless CAMERA_REORDER_STEPS is 0; reports any saving."""
+    if os.getenv("CAMERA_REORDER_STEPS", "1") == "0":
+        return agent_sequence, agent_states
+    schedule = schedule_steps(agent_sequence, agent_states)
+    if schedule["order"] != sorted(schedule["order"]):
+        print(
+            f"Reordered steps to save {schedule['before_s'] - schedule['after_s']:.0f}s "
+            f"of UI transitions: {schedule['agent_states']}"
+        )
+    return schedule["agent_sequence"], schedule["agent_states"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reorder commuting plan steps")
+    parser.add_argument("--states", nargs="+", required=True, help="Agent states")
+    parser.add_argument(
+        "--agents", nargs="+", help="Agent names (default: from states)"
+    )
+    args = parser.parse_args()
+
+    agents = args.agents or [state.split("(")[0] for state in args.states]
+    schedule = schedule_steps(agents, args.states)
+    print(f"Transitions {schedule['before_s']:.0f}s -> {schedule['after_s']:.0f}s")
+    for i in schedule["order"]:
+        print(f"  {i + 1:>2}. {args.states[i]}")
@@ -0,0 +1,297 @@
+"""
+Checkpoint journal for long camera workflows.
+
+A workflow that repeats its steps hundreds of times should not start
+from zero after a crash. Each run appends JSON lines to
+data/checkpoints/<run_id>.jsonl, flushed to disk as they are written:
+
+    {"type": "start", "plan": {...}}                      the planned workflow
+    {"type": "step", "iteration", "step", "summary", "state", ...}
+    {"type": "error", "iteration", "error"}               a failed iteration
+    {"type": "resume", "iteration", "step", "state_ok", ...}
+    {"type": "finish", "status", "reason"}               reason if cancelled
+
+A resumed run continues after the last journaled step, with the step
+summaries of the interrupted iteration as carryover. The Camera app's
+state is checked against the state journaled with that step first; if
+it differs, the interrupted iteration starts again from its first step.
+
+    journal = WorkflowJournal.create(plan)
+    for event in iter_checkpointed_workflow(journal, agent_map, user_proxy):
+        ...
+    # after a crash
+    journal = WorkflowJournal.open(run_id)
+
+Usage:
+    python -m src.utils.workflow_journal list [--limit 10]
+    python -m src.utils.workflow_journal show RUN_ID
+
+Configuration (environment variables):
+    CAMERA_CHECKPOINT_DIR   Journal directory (default data/checkpoints)
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from src.regression.verifier import STATE_KEYS
+
+DEFAULT_JOURNAL_DIR = Path(__file__).resolve().parents[2] / "data" / "checkpoints"
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+
+def get_journal_dir(directory=None) -> Path:
+    return Path(directory or os.getenv("CAMERA_CHECKPOINT_DIR") or DEFAULT_JOURNAL_DIR)
+
+
+def state_mismatches(expected: dict, actual: dict) -> dict:
+    """
+    Snapshot keys that differ, as {key: [expected, actual]}.
+
+    Only the app state (verifier.STATE_KEYS) is compared; media counts
+    legitimately grow between steps.
+    """
+    return {
+        key: [expected.get(key), actual.get(key)]
+        for key in STATE_KEYS
+        if expected.get(key) != actual.get(key)
+    }
+
+
+class WorkflowJournal:
+    """Append-only JSONL journal of one workflow run."""
+
+    def __init__(self, run_id: str, directory=None):
+        """
+        Args:
+            run_id: Journal name; use create() or open() rather than this
+            directory: Journal directory, CAMERA_CHECKPOINT_DIR if None
+        """
+        self.run_id = run_id
+        self.path = get_journal_dir(directory) / f"{run_id}.jsonl"
+        self._lock = threading.Lock()
+        self.records = []
+
+    @classmethod
+    def create(cls, plan: dict, directory=None) -> "WorkflowJournal":
+        """
+        Start a journal for a planned workflow.
+
+        Args:
+            plan: query, iterations, agent_sequence and agent_states, plus
+                any context worth keeping (test id, original command)
+        """
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        journal = cls(run_id, directory)
+        journal.path.parent.mkdir(parents=True, exist_ok=True)
+        journal._append({"type": "start", "plan": plan})
+        return journal
+
+    @classmethod
+    def open(cls, run_id: str, directory=None) -> "WorkflowJournal":
+        """
+        Load an existing journal.
+
+        Raises:
+            FileNotFoundError: If there is no journal for run_id
+        """
+        journal = cls(run_id, directory)
+        intact = 0
+        with open(journal.path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    journal.records.append(json.loads(line))
+                except ValueError:
+                    # A line torn by the crash; everything before it is intact
+                    break
+                intact += len(line)
+        if not journal.records or journal.records[0]["type"] != "start":
+            raise ValueError(f"{journal.path} is not a workflow journal")
+        if intact < journal.path.stat().st_size:
+            # Drop the torn tail so new records start on a line of their own
+            with open(journal.path, "r+b") as f:
+                f.truncate(intact)
+        return journal
+
+    def _append(self, record: dict) -> None:
+        record = {**record, "at": time.time()}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.records.append(record)
+
+    @property
+    def plan(self) -> dict:
+        return self.records[0]["plan"]
+
+    @property
+    def status(self) -> str:
+        for record in reversed(self.records):
+            if record["type"] == "finish":
+                return record["status"]
+            if record["type"] == "resume":
+                break
+        return RUNNING
+
+    def record_step(self, event: dict, state: dict = None) -> None:
+        """Checkpoint a completed step_end event and the state after it."""
+        self._append(
+            {
+                "type": "step",
+                "iteration": event["iteration"],
+                "step": event["step"],
+                "total": event["total"],
+                "agent": event["agent"],
+                "action": event["action"],
+                "elapsed": event["elapsed"],
+                "summary": event["summary"],
+                "state": state,
+            }
+        )
+
+    def record_error(self, iteration: int, error: str) -> None:
+        self._append({"type": "error", "iteration": iteration, "error": error})
+
+    def record_resume(self, point: dict, state_ok: bool, mismatches: dict) -> None:
+        self._append(
+            {
+                "type": "resume",
+                "iteration": point["iteration"],
+                "step": point["step"],
+                "state_ok": state_ok,
+                "mismatches": mismatches,
+            }
+        )
+
+    def finish(self, status: str, reason: str = None) -> None:
+        record = {"type": "finish", "status": status}
+        if reason:
+            record["reason"] = reason
+        self._append(record)
+
+    def last_step(self) -> dict:
+        """The most recent step record, or None."""
+        for record in reversed(self.records):
+            if record["type"] == "step":
+                return record
+        return None
+
+    def resume_point(self) -> dict:
+        """
+        Where a resumed run continues.
+
+        Returns:
+            dict: iteration (1-based), step (0-based index of the next
+            step), carryover (summaries of the earlier steps of that
+            iteration) and state (journaled with the last step, or None)
+        """
+        total = len(self.plan["agent_sequence"])
+        point = {"iteration": 1, "step": 0, "carryover": [], "state": None}
+        for record in self.records:
+            if record["type"] == "step":
+                if record["step"] >= total:
+                    point = {
+                        "iteration": record["iteration"] + 1,
+                        "step": 0,
+                        "carryover": [],
+                    }
+                else:
+                    carryover = (
+                        point["carryover"]
+                        if point["iteration"] == record["iteration"]
+                        else []
+                    )
+                    point = {
+                        "iteration": record["iteration"],
+                        "step": record["step"],
+                        "carryover": carryover + [record["summary"]],
+                    }
+                point["state"] = record["state"]
+            elif record["type"] == "error":
+                # iter_workflow moves on after a failed iteration; so does resume
+                point = {
+                    "iteration": record["iteration"] + 1,
+                    "step": 0,
+                    "carryover": [],
+                    "state": point.get("state"),
+                }
+            elif record["type"] == "resume":
+                # A restarted iteration drops the summaries it will redo
+                point = {
+                    **point,
+                    "iteration": record["iteration"],
+                    "step": record["step"],
+                    "carryover": point["carryover"][: record["step"]],
+                }
+        return point
+
+    def summary(self) -> dict:
+        plan = self.plan
+        last = self.last_step()
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "query": plan.get("query"),
+            "iterations": plan.get("iterations"),
+            "steps_per_iteration": len(plan.get("agent_sequence", [])),
+            "steps_done": sum(r["type"] == "step" for r in self.records),
+            "errors": sum(r["type"] == "error" for r in self.records),
+            "resumes": sum(r["type"] == "resume" for r in self.records),
+            "last_step": (
+                f"{last['iteration']}.{last['step']} {last['agent']}" if last else None
+            ),
+            "started_at": self.records[0]["at"],
+            "updated_at": self.records[-1]["at"],
+        }
+
+
+def list_journals(directory=None, limit: int = None) -> list:
+    """Summaries of the journals in directory, newest first."""
+    paths = sorted(
+        get_journal_dir(directory).glob("*.jsonl"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    summaries = []
+    for path in paths[:limit]:
+        try:
+            summaries.append(WorkflowJournal.open(path.stem, directory).summary())
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+    return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workflow checkpoint journals")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list", help="Recent runs")
+    list_parser.add_argument("--limit", type=int, default=10)
+    show_parser = sub.add_parser("show", help="Every record of one run")
+    show_parser.add_argument("run_id")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for s in list_journals(limit=args.limit):
+            print(
+                f"{s['run_id']}  {s['status']:<11} {s['steps_done']:>5} steps "
+                f"(last {s['last_step']}), {s['errors']} errors, "
+                f"{s['resumes']} resumes  {s['query']}"
+            )
+    else:
+        journal = WorkflowJournal.open(args.run_id)
+        print(json.dumps(journal.summary(), indent=2))
+        for record in journal.records[1:]:
+            print(json.dumps(record, default=str))
@@ -0,0 +1,29 @@
+"""
+Shared setup for the test suite.
+
+The tests run without Windows, a camera or an LLM: tools come from the
+simulated backend, UI settle waits are skipped, and nothing talks to the
+network unless a test starts its own stand-in server.
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ["CAMERA_BACKEND"] = "simulated"
+os.environ["CAMERA_UI_WAIT_SCALE"] = "0"
+
+
+@pytest.fixture(autouse=True)
+def _isolated_env(monkeypatch, tmp_path):
+    """Keep tests off the shared job queue, journals and data directory."""
+    monkeypatch.delenv("CAMERA_JOB_QUEUE_DB", raising=False)
+    monkeypatch.setenv("CAMERA_CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
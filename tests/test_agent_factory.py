@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.agents.agent_factory import build_agent_set
+from src.tools import simulated
+
+LLM_CONFIG = {"config_list": [{"model": "gpt-4o-mini", "api_key": "sk-test"}]}
+
+
+@pytest.fixture(scope="module")
+def user_proxy():
+    return build_agent_set(llm_config=LLM_CONFIG).user_proxy_agent
+
+
+@pytest.fixture
+def tool_threads(monkeypatch, user_proxy):
+    """Names of the threads the open_camera tool runs on."""
+    threads = []
+    tool = user_proxy.function_map["open_camera"]
+
+    def recording_tool(**kwargs):
+        threads.append(threading.current_thread().name)
+        return tool(**kwargs)
+
+    monkeypatch.setitem(user_proxy._function_map, "open_camera", recording_tool)
+    return threads
+
+
+def _tool_call_message():
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": "call_1",
+                "type": "function",
+                "function": {"name": "open_camera", "arguments": "{}"},
+            }
+        ],
+    }
+
+
+def test_tools_are_registered_as_plain_functions(user_proxy):
+    for name, func in user_proxy.function_map.items():
+        assert not asyncio.iscoroutinefunction(func), name
+
+
+def test_sync_chat_runs_tools_from_an_event_loop_thread(user_proxy, tool_threads):
+    simulated.reset_state()
+
+    async def sync_chat_inside_loop():
+        return user_proxy.generate_tool_calls_reply([_tool_call_message()])
+
+    ok, reply = asyncio.run(sync_chat_inside_loop())
+    assert ok
+    assert "Error" not in reply["content"]
+    assert tool_threads == [threading.current_thread().name]
+
+
+def test_async_chat_runs_tools_on_the_tool_executor(user_proxy, tool_threads):
+    simulated.reset_state()
+    ok, reply = asyncio.run(
+        user_proxy.a_generate_tool_calls_reply([_tool_call_message()])
+    )
+    assert ok
+    assert "Error" not in reply["content"]
+    assert tool_threads[0].startswith("camera-tool")
+    assert simulated.get_state()["running"]
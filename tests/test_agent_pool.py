@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents.agent_pool import AgentPool, AgentPoolTimeout
+
+
+def _agent_set(name):
+    resets = []
+    return SimpleNamespace(
+        name=name,
+        resets=resets,
+        all_agents=lambda: [SimpleNamespace(reset=lambda: resets.append(1))],
+    )
+
+
+def _pool(size=1, timeout=1.0):
+    return AgentPool(
+        size=size,
+        agent_sets=[_agent_set(i) for i in range(size)],
+        timeout=timeout,
+    )
+
+
+def test_checkout_resets_the_set_on_return():
+    pool = _pool()
+    with pool.checkout() as agents:
+        assert pool.metrics()["in_use"] == 1
+    assert agents.resets == [1]
+    assert pool.metrics()["available"] == 1
+
+
+def test_checkout_times_out_when_the_pool_is_empty():
+    pool = _pool(timeout=0.05)
+    with pool.checkout():
+        with pytest.raises(AgentPoolTimeout):
+            with pool.checkout():
+                pass
+    assert pool.metrics()["timeouts_total"] == 1
+
+
+def test_async_checkout_waits_for_a_returned_set():
+    pool = _pool()
+
+    async def main():
+        async def hold():
+            async with pool.a_checkout():
+                await asyncio.sleep(0.05)
+
+        async def wait():
+            async with pool.a_checkout() as agents:
+                return agents
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        return await asyncio.gather(holder, wait())
+
+    _, agents = asyncio.run(main())
+    assert agents is not None
+    assert pool.metrics()["waits_total"] == 1
+    assert pool.metrics()["available"] == 1
+
+
+def test_cancelled_async_waiter_does_not_leak_a_set():
+    pool = _pool()
+
+    async def main():
+        async def waiter():
+            async with pool.a_checkout():
+                pass
+
+        with pool.checkout():
+            task = asyncio.create_task(waiter())
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        # A waiter still blocked on a worker thread would take the set now
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert pool.metrics()["available"] == 1
+    assert pool.metrics()["in_use"] == 0
+
+
+def test_async_checkout_times_out():
+    pool = _pool(timeout=0.05)
+
+    async def main():
+        with pool.checkout():
+            async with pool.a_checkout():
+                pass
+
+    with pytest.raises(AgentPoolTimeout):
+        asyncio.run(main())
@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import server
+from src.jobs import job_queue
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("CAMERA_JOB_QUEUE_DB", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setenv("CAMERA_JOB_WORKER", "0")
+    monkeypatch.setattr(job_queue, "_job_queue", None)
+    monkeypatch.setattr(server.state, "agent_pool", SimpleNamespace(size=2))
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"items"', b"{not json", b'{"items": 3}'])
+def test_batch_rejects_malformed_bodies(client, body):
+    response = client.post("/v1/batch", content=body)
+    assert response.status_code == 400
+
+
+def test_batch_marks_bad_items_invalid(client):
+    plan = {
+        "query": "open the camera",
+        "agent_sequence": ["open_camera_agent"],
+        "agent_states": ["open_camera_agent"],
+    }
+    response = client.post(
+        "/v1/batch", json={"items": [plan, {"query": "no plan"}, {"command": 1}]}
+    )
+    assert response.status_code == 202
+    statuses = [r["status"] for r in response.json()["results"]]
+    assert statuses == ["queued", "invalid", "invalid"]
+
+
+def test_batch_commands_are_planned_within_the_pool_size(client, monkeypatch):
+    active = peak = 0
+
+    async def plan_command(command):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {"type": "CONVERSATION", "reply": command}
+
+    monkeypatch.setattr(server, "_plan_command", plan_command)
+    items = [{"command": f"hello {i}"} for i in range(20)]
+    response = client.post("/v1/batch", json={"items": items})
+    assert response.status_code == 202
+    assert len(response.json()["results"]) == 20
+    assert peak == 2
+
+
+def test_plan_that_cannot_run_is_a_400(client):
+    response = client.post(
+        "/v1/plans",
+        json={
+            "query": "zoom in",
+            "agent_sequence": ["zoom_agent"],
+            "agent_states": ["zoom_agent"],
+        },
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"]["errors"][0]["code"] == "unknown_agent"
+
+
+def _job(progress, status="running", started_at=1.0, error=None):
+    return {
+        "progress": progress,
+        "status": status,
+        "started_at": started_at,
+        "error": error,
+    }
+
+
+def test_events_start_over_when_the_job_is_requeued(monkeypatch):
+    step = {"event": "step_end"}
+    polls = iter(
+        [
+            _job([step, step]),
+            _job([], status="queued", started_at=None, error="Device lost"),
+            _job([step], started_at=2.0),
+            _job([step, step], status="succeeded", started_at=2.0),
+        ]
+    )
+    monkeypatch.setattr(server, "EVENT_POLL_INTERVAL", 0)
+    monkeypatch.setattr(
+        server.state, "job_queue", SimpleNamespace(get=lambda job_id: next(polls))
+    )
+
+    async def collect():
+        return [event async for event in server._job_events("job")]
+
+    events = [e["event"] for e in asyncio.run(collect())]
+    assert events == ["step_end"] * 2 + ["requeued"] + ["step_end"] * 2 + ["finished"]
+
+
+def test_events_notice_a_requeue_that_is_already_running_again(monkeypatch):
+    step = {"event": "step_end"}
+    polls = iter(
+        [
+            _job([step]),
+            _job([step, step], started_at=2.0),
+            _job([step, step], status="succeeded", started_at=2.0),
+        ]
+    )
+    monkeypatch.setattr(server, "EVENT_POLL_INTERVAL", 0)
+    monkeypatch.setattr(
+        server.state, "job_queue", SimpleNamespace(get=lambda job_id: next(polls))
+    )
+
+    async def collect():
+        return [event["event"] async for event in server._job_events("job")]
+
+    assert asyncio.run(collect()) == [
+        "step_end",
+        "requeued",
+        "step_end",
+        "step_end",
+        "finished",
+    ]
+
+
+def test_api_key_is_required_when_set(client, monkeypatch):
+    monkeypatch.setenv("CAMERA_API_KEY", "secret")
+    assert client.get("/v1/jobs/missing").status_code == 401
+    wrong = {"Authorization": "Bearer wrong"}
+    assert client.get("/v1/jobs/missing", headers=wrong).status_code == 401
+    right = {"Authorization": "Bearer secret"}
+    assert client.get("/v1/jobs/missing", headers=right).status_code == 404
@@ -0,0 +1,162 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.tools import remote, simulated
+from src.tools.daemon import create_daemon_app
+from src.tools.device import DEVICE_LOCK, device_action
+from src.utils.cancellation import (
+    CancellationToken,
+    Cancelled,
+    DeadlineExceeded,
+    cancel_scope,
+    check_cancelled,
+    current_token,
+    default_deadline,
+    interruptible_sleep,
+)
+
+
+def _cancel_later(token, seconds=0.05):
+    timer = threading.Timer(seconds, token.cancel, ("Stopped by user",))
+    timer.start()
+    return timer
+
+
+def test_cancel_keeps_the_first_reason():
+    token = CancellationToken()
+    token.check()
+    token.cancel("Stopped by user")
+    token.cancel("Stopped again")
+    with pytest.raises(Cancelled, match="Stopped by user") as raised:
+        token.check()
+    assert not isinstance(raised.value, DeadlineExceeded)
+
+
+def test_deadline_raises_deadline_exceeded():
+    token = CancellationToken(deadline_s=0.01)
+    assert token.remaining() <= 0.01
+    time.sleep(0.02)
+    with pytest.raises(DeadlineExceeded, match="Deadline of 0.01s"):
+        token.check()
+    assert token.expired
+
+
+def test_should_cancel_is_polled():
+    flag = []
+    token = CancellationToken(should_cancel=lambda: bool(flag))
+    token.check()
+    flag.append(1)
+    with pytest.raises(Cancelled, match="Cancel requested"):
+        token.check()
+
+
+def test_cancelled_is_not_an_exception():
+    # Tools and autogen catch Exception; a cancellation must get through
+    assert not issubclass(Cancelled, Exception)
+
+
+def test_wait_returns_early_only_by_raising():
+    token = CancellationToken()
+    start = time.monotonic()
+    token.wait(0.01)
+    _cancel_later(token)
+    with pytest.raises(Cancelled):
+        token.wait(5)
+    assert time.monotonic() - start < 1
+
+
+def test_wait_stops_at_the_deadline():
+    token = CancellationToken(deadline_s=0.05)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        token.wait(5)
+    assert time.monotonic() - start < 1
+
+
+def test_cancel_scope_binds_the_token():
+    token = CancellationToken()
+    check_cancelled()
+    interruptible_sleep(0)
+    with cancel_scope(token):
+        assert current_token() is token
+        token.cancel()
+        with pytest.raises(Cancelled):
+            check_cancelled()
+        with pytest.raises(Cancelled):
+            interruptible_sleep(5)
+    assert current_token() is None
+    check_cancelled()
+
+
+def test_default_deadline(monkeypatch):
+    monkeypatch.delenv("CAMERA_WORKFLOW_DEADLINE_S", raising=False)
+    assert default_deadline() is None
+    monkeypatch.setenv("CAMERA_WORKFLOW_DEADLINE_S", "90")
+    assert default_deadline() == 90.0
+
+
+def test_cancelled_tool_does_not_run():
+    calls = []
+    tool = device_action(lambda: calls.append(1))
+    token = CancellationToken()
+    token.cancel()
+    with cancel_scope(token), pytest.raises(Cancelled):
+        tool()
+    assert calls == []
+
+
+def test_cancelled_tool_stops_queueing_for_the_device():
+    calls = []
+    tool = device_action(lambda: calls.append(1))
+    held, release = threading.Event(), threading.Event()
+
+    def hold_device():
+        with DEVICE_LOCK:
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_device)
+    holder.start()
+    held.wait(5)
+    token = CancellationToken()
+    _cancel_later(token)
+    try:
+        with cancel_scope(token), pytest.raises(Cancelled):
+            tool()
+    finally:
+        release.set()
+        holder.join()
+    assert calls == []
+
+
+def test_cancelled_recording_is_stopped_and_saved(monkeypatch):
+    # Scale the UI pauses down but keep the recording far longer than the test
+    monkeypatch.setenv("CAMERA_SIM_TIME_SCALE", "0.01")
+    simulated.reset_state()
+    simulated.open_camera()
+    token = CancellationToken()
+    _cancel_later(token)
+    start = time.monotonic()
+    with cancel_scope(token), pytest.raises(Cancelled):
+        simulated.take_video(duration=3000)
+    assert time.monotonic() - start < 5
+    assert simulated.get_state()["videos_recorded"] == 1
+
+
+def test_cancelled_remote_recording_stops_on_the_daemon(monkeypatch):
+    monkeypatch.setenv("CAMERA_SIM_TIME_SCALE", "0.01")
+    simulated.reset_state()
+    simulated.open_camera()
+    device = remote.RemoteDevice("sim", "http://testserver")
+    device._client = TestClient(create_daemon_app("simulated", "sim"))
+    token = CancellationToken()
+    _cancel_later(token)
+    start = time.monotonic()
+    with remote.use_device(device), cancel_scope(token), pytest.raises(Cancelled):
+        remote.take_video(duration=3000)
+    assert time.monotonic() - start < 5
+    assert simulated.get_state()["videos_recorded"] == 1
+    assert device._client.get("/v1/health").json()["cancelled"] == 1
@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.jobs.cost_model import (
+    MIN_SAMPLES,
+    TOOL_WAITS,
+    CostModel,
+    estimate_plan,
+    format_timeline,
+    load_step_samples,
+    variable_seconds,
+)
+from src.utils.workflow_journal import WorkflowJournal
+
+VIDEO = "take_video_agent(duration=30)"
+
+
+def _samples(agent, action, elapsed):
+    return [{"agent": agent, "action": action, "elapsed": e} for e in elapsed]
+
+
+def test_variable_seconds_follow_the_arguments():
+    assert variable_seconds("take_video_agent", VIDEO) == 30
+    assert variable_seconds("take_photo_agent", "take_photo_agent(num_photos=3)") == 4
+    assert variable_seconds("take_photo_agent", "take_photo_agent") == 0
+    assert variable_seconds("take_video_agent", "take_video_agent(duration=x)") == 0
+
+
+def test_prior_is_the_tool_waits_plus_the_overhead(monkeypatch):
+    monkeypatch.setenv("CAMERA_COST_STEP_OVERHEAD_S", "4")
+    step = CostModel().step_estimate("open_camera_agent", "open_camera_agent")
+    assert (step["source"], step["samples"]) == ("prior", 0)
+    assert step["mean_s"] == sum(TOOL_WAITS["open_camera_agent"]) / 2 + 4
+    assert step["se_s"] == step["sd_s"]
+
+
+def test_history_replaces_the_prior_after_min_samples():
+    samples = _samples("switch_camera_agent", "switch_camera_agent", [5, 6, 7])
+    model = CostModel(samples[: MIN_SAMPLES - 1])
+    assert model.step_estimate("switch_camera_agent", "")["source"] == "prior"
+    step = CostModel(samples).step_estimate("switch_camera_agent", "")
+    assert (step["source"], step["mean_s"], step["samples"]) == ("history", 6, 3)
+
+
+def test_recordings_are_taken_off_the_samples():
+    # A 60s recording teaches the model about take_video's overhead only
+    samples = _samples(
+        "take_video_agent", "take_video_agent(duration=60)", [65, 66, 67]
+    )
+    step = CostModel(samples).step_estimate("take_video_agent", VIDEO)
+    assert step["mean_s"] == 36
+
+
+def test_history_sets_the_overhead_of_agents_without_it():
+    samples = _samples("open_camera_agent", "open_camera_agent", [13, 13, 13])
+    model = CostModel(samples)
+    assert model.step_overhead == 10
+    step = model.step_estimate("minimize_camera_agent", "minimize_camera_agent")
+    assert step["mean_s"] == 11
+
+
+def test_bounds_contain_the_mean_and_widen_with_confidence():
+    model = CostModel()
+    agents = ["open_camera_agent", "take_photo_agent"]
+    narrow = model.estimate(agents, agents, iterations=3, confidence=0.5)
+    wide = model.estimate(agents, agents, iterations=3, confidence=0.99)
+    assert narrow["mean_s"] == 3 * narrow["iteration_s"]
+    assert wide["low_s"] < narrow["low_s"] < narrow["mean_s"]
+    assert narrow["mean_s"] < narrow["high_s"] < wide["high_s"]
+
+
+def test_more_history_gives_tighter_bounds():
+    agents = ["switch_camera_agent"]
+    elapsed = [4, 6] * 10
+    few = CostModel(_samples(agents[0], agents[0], elapsed[:4]))
+    many = CostModel(_samples(agents[0], agents[0], elapsed))
+    few, many = few.estimate(agents, agents, 10), many.estimate(agents, agents, 10)
+    assert few["mean_s"] == many["mean_s"] == 50
+    assert many["high_s"] - many["low_s"] < few["high_s"] - few["low_s"]
+
+
+def test_mean_errors_repeat_in_every_iteration():
+    # The uncertainty of a prior's mean does not average out over iterations
+    agents = ["set_blur_type_agent"]
+    model = CostModel()
+    one = model.estimate(agents, agents, 1)
+    hundred = model.estimate(agents, agents, 100)
+    assert hundred["sd_s"] >= 100 * one["steps"][0]["se_s"]
+
+
+def test_low_bound_is_never_below_the_recordings():
+    estimate = CostModel().estimate(
+        ["take_video_agent"], [VIDEO], iterations=2, confidence=0.999
+    )
+    assert estimate["low_s"] >= 60
+    assert estimate["device_s"] == 2 * (sum(TOOL_WAITS["take_video_agent"]) / 2 + 30)
+
+
+def test_estimate_plan_reads_the_plan_dict():
+    plan = {"agent_sequence": ["open_camera_agent"], "agent_states": ["x"]}
+    assert estimate_plan(plan, CostModel())["iterations"] == 1
+    plan["iterations"] = 4
+    estimate = estimate_plan(plan, CostModel(), confidence=0.5)
+    assert (estimate["iterations"], estimate["confidence"]) == (4, 0.5)
+
+
+def test_history_skips_simulated_runs(tmp_path):
+    plan = {
+        "query": "q",
+        "iterations": 1,
+        "agent_sequence": ["open_camera_agent"],
+        "agent_states": ["open_camera_agent"],
+    }
+    for backend in ("simulated", "windows"):
+        journal = WorkflowJournal.create(dict(plan, backend=backend), tmp_path)
+        journal.record_step(
+            {
+                "iteration": 1,
+                "step": 1,
+                "total": 1,
+                "agent": "open_camera_agent",
+                "action": "open_camera_agent",
+                "elapsed": 9.0,
+                "summary": "",
+            }
+        )
+    store = SimpleNamespace(
+        recent_steps=lambda limit: _samples("take_photo_agent", "", [1])
+    )
+    samples = load_step_samples(results_store=store, journal_dir=tmp_path)
+    assert sorted(s["agent"] for s in samples) == [
+        "open_camera_agent",
+        "take_photo_agent",
+    ]
+
+
+def test_timeline_summarises_later_iterations():
+    agents = ["open_camera_agent", "take_photo_agent"]
+    estimate = CostModel().estimate(agents, agents, iterations=5)
+    lines = format_timeline(estimate, max_iterations=2).splitlines()
+    assert len(lines) == 1 + 2 * 2 + 2
+    assert "3 more iteration(s)" in lines[-2]
+    assert lines[-1].startswith("Estimated run time")
+
+
+@pytest.mark.parametrize("confidence", [0.8, 0.9, 0.95])
+def test_normal_bounds_are_symmetric_above_the_floor(confidence):
+    agents = ["switch_camera_agent"]
+    estimate = CostModel().estimate(agents, agents, 2, confidence)
+    assert estimate["high_s"] - estimate["mean_s"] == pytest.approx(
+        estimate["mean_s"] - estimate["low_s"]
+    )
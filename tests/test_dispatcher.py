@@ -0,0 +1,174 @@
+import threading
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from src.jobs.dispatcher import DeviceWorker
+from src.jobs.job_queue import QUEUED, SUCCEEDED, JobQueue
+from src.tools import remote, simulated
+from src.tools.daemon import create_daemon_app
+from src.tools.remote import (
+    DeviceUnavailable,
+    RemoteDevice,
+    ToolTimeout,
+    batch_seconds,
+    track_device_loss,
+    use_device,
+)
+
+
+def _device(name="lab-01"):
+    """A RemoteDevice talking to an in-process simulated daemon."""
+    device = RemoteDevice(name, "http://testserver")
+    device._client = TestClient(create_daemon_app("simulated", name))
+    return device
+
+
+@pytest.fixture(autouse=True)
+def _fresh_camera():
+    simulated.reset_state()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def test_daemon_runs_a_batch_in_order():
+    client = TestClient(create_daemon_app("simulated", "lab-01"))
+    response = client.post(
+        "/v1/tools/batch",
+        json={
+            "calls": [
+                {"tool": "open_camera"},
+                {"tool": "take_photo", "args": {"num_photos": 2}},
+            ]
+        },
+    )
+    body = response.json()
+    assert (body["device"], body["cancelled"]) == ("lab-01", None)
+    assert [r["tool"] for r in body["results"]] == ["open_camera", "take_photo"]
+    assert [r["error"] for r in body["results"]] == [None, None]
+    assert simulated.get_state()["photos_taken"] == 2
+    health = client.get("/v1/health").json()
+    assert (health["batches"], health["calls"], health["backend"]) == (
+        1,
+        2,
+        "simulated",
+    )
+
+
+def test_daemon_stops_a_batch_at_the_first_error():
+    client = TestClient(create_daemon_app("simulated", "lab-01"))
+    calls = [{"tool": "take_photo", "args": {"bogus": 1}}, {"tool": "open_camera"}]
+    results = client.post("/v1/tools/batch", json={"calls": calls}).json()["results"]
+    assert len(results) == 1 and results[0]["error"].startswith("TypeError")
+    results = client.post(
+        "/v1/tools/batch", json={"calls": calls, "stop_on_error": False}
+    ).json()["results"]
+    assert len(results) == 2
+    response = client.post("/v1/tools/batch", json={"calls": [{"tool": "zoom"}]})
+    assert response.status_code == 400
+
+
+def test_daemon_requires_its_key(monkeypatch):
+    monkeypatch.setenv("CAMERA_DAEMON_KEY", "secret")
+    client = TestClient(create_daemon_app("simulated", "lab-01"))
+    assert client.get("/v1/health").status_code == 401
+    headers = {"Authorization": "Bearer secret"}
+    assert client.get("/v1/health", headers=headers).status_code == 200
+
+
+def test_remote_tools_run_on_the_bound_device():
+    device = _device()
+    with use_device(device):
+        assert remote.open_camera() == "Camera app opened successfully."
+        remote.take_photo(num_photos=1)
+    assert simulated.get_state()["photos_taken"] == 1
+    assert device.calls == 2
+    assert device.check_health() and device.latency_ms is not None
+
+
+def test_batch_timeout_covers_its_recordings():
+    calls = [
+        {"tool": "take_video", "args": {"duration": 600}},
+        {"tool": "take_video", "args": {"duration": "bad"}},
+        {"tool": "take_photo", "args": {"num_photos": 3}},
+    ]
+    assert batch_seconds(calls) == 600
+
+
+def test_read_timeout_on_a_reachable_daemon_is_not_a_device_loss(monkeypatch):
+    device = _device()
+
+    def post(*args, **kwargs):
+        raise httpx.ReadTimeout("timed out")
+
+    monkeypatch.setattr(device._client, "post", post)
+    with track_device_loss() as losses, pytest.raises(ToolTimeout):
+        device.call("open_camera")
+    assert losses == []
+    assert (device.healthy, device.failures) == (True, 0)
+
+
+def _worker(queue, device, handler):
+    return DeviceWorker(queue, handler, device)
+
+
+def test_job_that_loses_its_device_is_requeued(queue):
+    device = RemoteDevice("lab-01", "http://127.0.0.1:9")
+    job_id = queue.submit({"query": "open the camera"})
+
+    def handler(payload, report):
+        # Tool errors reach the agents as strings, as in a real workflow
+        return remote.open_camera()
+
+    worker = _worker(queue, device, handler)
+    assert worker.run_one()
+    job = queue.get(job_id)
+    assert job["status"] == QUEUED
+    assert job["error"].startswith("Device unavailable: lab-01")
+    assert (worker.jobs_requeued, worker.jobs_run) == (1, 0)
+    assert not device.healthy
+    # An unhealthy device claims no more jobs
+    assert not worker.run_one()
+
+
+def test_job_that_finishes_during_a_failed_health_ping_is_kept(queue):
+    device = _device()
+    get = device._client.get
+
+    def flaky_get(url, **kwargs):
+        if url == "/v1/health":
+            raise httpx.ConnectError("ping lost")
+        return get(url, **kwargs)
+
+    device._client.get = flaky_get
+    job_id = queue.submit({"query": "take a photo"})
+
+    def handler(payload, report):
+        remote.open_camera()
+        # The dispatcher's health thread misses a ping mid-job
+        ping = threading.Thread(target=device.check_health)
+        ping.start()
+        ping.join()
+        return remote.take_photo(num_photos=1)
+
+    worker = _worker(queue, device, handler)
+    assert worker.run_one()
+    assert queue.get(job_id)["status"] == SUCCEEDED
+    assert (worker.jobs_run, worker.jobs_requeued) == (1, 0)
+    assert device.failures == 1
+    assert simulated.get_state()["photos_taken"] == 1
+
+
+def test_device_unavailable_from_the_handler_requeues(queue):
+    device = _device()
+    job_id = queue.submit({"query": "a"})
+
+    def handler(payload, report):
+        raise DeviceUnavailable("lab-01: gone")
+
+    _worker(queue, device, handler).run_one()
+    assert queue.get(job_id)["status"] == QUEUED
@@ -0,0 +1,165 @@
+import json
+
+import pytest
+
+from src.utils.history_policy import (
+    HistoryPolicy,
+    _safe_start,
+    apply_history_policies,
+    apply_history_policy,
+    load_history_policies,
+)
+
+
+class StubAgent:
+    """Just the chat history side of a ConversableAgent."""
+
+    def __init__(self, name="conversation_agent", **conversations):
+        self.name = name
+        self.chat_messages = conversations
+        self.client = None
+
+    def clear_history(self, partner=None):
+        self.chat_messages[partner].clear()
+
+
+def _chat(n):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+        for i in range(n)
+    ]
+
+
+def _tool_turn(i):
+    """An assistant tool call followed by its result."""
+    return [
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"id": f"call_{i}", "function": {"name": "open_camera"}}],
+        },
+        {
+            "role": "tool",
+            "content": "Camera app opened successfully.",
+            "tool_responses": [{"tool_call_id": f"call_{i}"}],
+        },
+    ]
+
+
+def _contents(messages):
+    return [m["content"] for m in messages]
+
+
+def test_reset_clears_every_conversation():
+    agent = StubAgent(user=_chat(4), manager=_chat(2))
+    assert apply_history_policy(agent, HistoryPolicy("reset")) == 6
+    assert all(not m for m in agent.chat_messages.values())
+
+
+def test_none_keeps_everything():
+    agent = StubAgent(user=_chat(50))
+    assert apply_history_policy(agent, HistoryPolicy("none")) == 0
+    assert len(agent.chat_messages["user"]) == 50
+
+
+def test_last_n_keeps_the_newest_messages():
+    agent = StubAgent(user=_chat(10), short=_chat(2))
+    assert apply_history_policy(agent, HistoryPolicy("last_n", max_messages=4)) == 6
+    assert _contents(agent.chat_messages["user"]) == [
+        f"message {i}" for i in range(6, 10)
+    ]
+    assert len(agent.chat_messages["short"]) == 2
+
+
+def test_safe_start_skips_orphaned_tool_results():
+    messages = _chat(2) + _tool_turn(1) + _chat(2)
+    # A cut at the tool result would keep it without its call
+    assert _safe_start(messages, 3) == 4
+    # A cut at the call keeps the pair together
+    assert _safe_start(messages, 2) == 2
+    assert _safe_start(_tool_turn(1)[1:], 0) == 1
+
+
+def test_last_n_never_splits_a_tool_call_from_its_result():
+    agent = StubAgent(user=_chat(2) + _tool_turn(1) + _chat(2))
+    apply_history_policy(agent, HistoryPolicy("last_n", max_messages=3))
+    kept = agent.chat_messages["user"]
+    assert kept[0]["role"] != "tool"
+    assert len(kept) == 2
+
+
+def test_token_budget_summarises_all_but_the_last_messages():
+    summarised = []
+
+    def summarizer(agent, messages):
+        summarised.append(_contents(messages))
+        return "opened the camera"
+
+    agent = StubAgent(user=_chat(10))
+    policy = HistoryPolicy("token_budget", max_tokens=10, keep_last=3)
+    assert apply_history_policy(agent, policy, summarizer) == 6
+    messages = agent.chat_messages["user"]
+    assert summarised == [[f"message {i}" for i in range(7)]]
+    assert messages[0] == {
+        "role": "user",
+        "name": "history_summary",
+        "content": "Summary of the earlier conversation: opened the camera",
+    }
+    assert _contents(messages[1:]) == ["message 7", "message 8", "message 9"]
+
+
+def test_token_budget_leaves_small_conversations_alone():
+    def summarizer(agent, messages):
+        raise AssertionError("nothing to summarise")
+
+    agent = StubAgent(user=_chat(10), short=_chat(2))
+    policy = HistoryPolicy("token_budget", max_tokens=10**6, keep_last=3)
+    assert apply_history_policy(agent, policy, summarizer) == 0
+    policy = HistoryPolicy("token_budget", max_tokens=1, keep_last=3)
+    agent = StubAgent(short=_chat(3))
+    assert apply_history_policy(agent, policy, summarizer) == 0
+
+
+def test_token_budget_keeps_tool_pairs_and_survives_a_failed_summary():
+    def summarizer(agent, messages):
+        raise RuntimeError("rate limited")
+
+    agent = StubAgent(user=_chat(4) + _tool_turn(1) + _chat(1))
+    policy = HistoryPolicy("token_budget", max_tokens=10, keep_last=2)
+    # Keeping the last two would keep a tool result without its call
+    assert apply_history_policy(agent, policy, summarizer) == 6
+    assert _contents(agent.chat_messages["user"]) == ["message 0"]
+
+
+def test_default_summary_without_a_client_is_the_transcript():
+    agent = StubAgent(user=_chat(6))
+    policy = HistoryPolicy("token_budget", max_tokens=10, keep_last=2)
+    apply_history_policy(agent, policy)
+    summary = agent.chat_messages["user"][0]["content"]
+    assert "user: message 0" in summary and "message 3" in summary
+    assert "message 4" not in summary
+
+
+def test_policies_are_loaded_per_agent(tmp_path):
+    path = tmp_path / "agent_config.json"
+    path.write_text(
+        json.dumps(
+            {
+                "history_policy": {
+                    "default": {"mode": "none"},
+                    "agents": {"manager_agent": {"mode": "reset"}},
+                }
+            }
+        )
+    )
+    policies = load_history_policies(path)
+    assert policies.for_agent("manager_agent").mode == "reset"
+    assert policies.for_agent("other").mode == "none"
+    agents = [StubAgent("manager_agent", user=_chat(3)), StubAgent(user=_chat(3)), None]
+    assert apply_history_policies(agents, policies) == 3
+    assert load_history_policies(tmp_path / "missing.json").default.mode == "reset"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="forget"):
+        HistoryPolicy("forget")
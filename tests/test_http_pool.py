@@ -0,0 +1,115 @@
+import copy
+
+import httpx
+import pytest
+
+from src.utils import http_pool
+from src.utils.http_pool import (
+    MeteredTransport,
+    SharedHttpClient,
+    close_http_pool,
+    configure_http_pool,
+    get_http_client,
+    get_openai_client,
+    get_pool_metrics,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.delenv("LLM_BASE_URL", raising=False)
+    close_http_pool()
+    yield
+    close_http_pool()
+
+
+class _Body(httpx.SyncByteStream):
+    """A response body that is read from the network, like a real transport's."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def __iter__(self):
+        yield self.content
+
+
+def _completion(request):
+    return httpx.Response(200, stream=_Body(b'{"model": "gpt-4o-mini", "choices": []}'))
+
+
+def test_openai_clients_are_reused_per_key_and_base_url():
+    client = get_openai_client("sk-a")
+    assert get_openai_client("sk-a") is client
+    assert get_openai_client("sk-b") is not client
+    other = get_openai_client("sk-a", "http://127.0.0.1:8765/v1")
+    assert other is not client
+    assert get_openai_client("sk-a", "http://127.0.0.1:8765/v1") is other
+    # Every client sends its requests through the one pool
+    assert client._client is other._client is get_http_client()
+
+
+def test_base_url_from_the_environment_needs_no_key(monkeypatch):
+    monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:8765/v1")
+    client = get_openai_client()
+    assert client.api_key == "offline"
+    assert str(client.base_url).startswith("http://127.0.0.1:8765/v1")
+    assert get_openai_client() is client
+
+
+def test_closing_the_pool_drops_cached_clients():
+    client = get_openai_client("sk-a")
+    http_client = get_http_client()
+    close_http_pool()
+    assert get_openai_client("sk-a") is not client
+    assert get_http_client() is not http_client
+    assert http_client.is_closed
+
+
+def test_shared_client_survives_deepcopy():
+    client = get_http_client()
+    assert isinstance(client, SharedHttpClient)
+    assert copy.deepcopy(client) is client
+    llm_config = {"config_list": [{"model": "gpt-4o", "http_client": client}]}
+    copied = copy.deepcopy(llm_config)
+    assert copied is not llm_config
+    assert copied["config_list"][0]["http_client"] is client
+
+
+def test_metered_transport_counts_requests_and_captures_completions():
+    transport = MeteredTransport(httpx.MockTransport(_completion))
+    exchanges = []
+    transport.observers.append(
+        lambda request, response, body, elapsed: exchanges.append(
+            (request.url.path, body)
+        )
+    )
+    with httpx.Client(transport=transport, base_url="http://llm") as client:
+        client.post("/v1/chat/completions", json={"model": "gpt-4o-mini"})
+        client.get("/v1/models")
+    assert (transport.requests_total, transport.requests_in_flight) == (2, 0)
+    assert transport.peak_in_flight == 1
+    # Only chat completions are buffered for the observers
+    assert [path for path, _ in exchanges] == ["/v1/chat/completions"]
+    assert b'"gpt-4o-mini"' in exchanges[0][1]
+
+
+def test_transport_errors_are_counted():
+    def fail(request):
+        raise httpx.ConnectError("refused")
+
+    transport = MeteredTransport(httpx.MockTransport(fail))
+    with httpx.Client(transport=transport) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.get("http://llm/v1/models")
+    assert (transport.errors_total, transport.requests_in_flight) == (1, 0)
+
+
+def test_pool_configuration(monkeypatch):
+    monkeypatch.setattr(http_pool, "_pool_config", None)
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "4")
+    config = configure_http_pool(max_keepalive_connections=2)
+    assert (config["max_connections"], config["max_keepalive_connections"]) == (4, 2)
+    metrics = get_pool_metrics()
+    assert (metrics["max_connections"], metrics["requests_total"]) == (4, 0)
+    with pytest.raises(ValueError, match="pool_size"):
+        configure_http_pool(pool_size=3)
@@ -0,0 +1,79 @@
+import pytest
+
+from src.utils import agent_utils
+from src.utils.intent_classifier import (
+    IntentClassifier,
+    get_default_classifier,
+    load_examples,
+    parse_iterations,
+)
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier().fit(load_examples())
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("take a photo 3 times", (3, "take a photo")),
+        ("take two photos, repeat 5 times", (5, "take two photos")),
+        ("take a photo. Repeat the above five times.", (5, "take a photo")),
+        ("turn on blur twice", (2, "turn on blur")),
+        ("take a photo", (1, "take a photo")),
+        # Not a repeat count: not at the end and no "repeat"
+        (
+            "take a photo in 10 times the resolution",
+            (1, "take a photo in 10 times the resolution"),
+        ),
+    ],
+)
+def test_parse_iterations(query, expected):
+    assert parse_iterations(query) == expected
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("take a photo 3 times", ("TASK", 3, "take a photo")),
+        ("open the camera", ("TASK", 1, "open the camera")),
+        ("hello there", ("CONVERSATION", 1, "hello there")),
+    ],
+)
+def test_confident_messages_route_locally(classifier, message, expected):
+    assert classifier.route(message) == expected
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        # Nothing but a reference to an earlier command
+        "repeat that 3 times",
+        # A count that is not a repeat count
+        "take a photo in 10 times the resolution",
+        # Questions about the camera are not commands
+        "how do I turn on autoframing?",
+        "what is autoframing?",
+        # A camera request outside the tool vocabulary is not chit-chat
+        "change the resolution to 4k",
+    ],
+)
+def test_ambiguous_messages_go_to_the_interpreter(classifier, message):
+    assert classifier.route(message) is None
+
+
+def test_local_routing_can_be_disabled(monkeypatch):
+    calls = []
+    monkeypatch.setenv("CAMERA_LOCAL_ROUTING", "0")
+    monkeypatch.setattr(
+        agent_utils,
+        "interpret_query",
+        lambda message, agent: calls.append(message) or ("CONVERSATION", 1, message),
+    )
+    monkeypatch.setattr(
+        agent_utils, "stream_conversation", lambda message, agent: iter(["hi"])
+    )
+    assert get_default_classifier().route("hello there") is not None
+    list(agent_utils.process_message("hello there", [], None, None, {}, None, None))
+    assert calls == ["hello there"]
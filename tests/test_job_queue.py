@@ -0,0 +1,206 @@
+import time
+
+import pytest
+
+from src.jobs.job_queue import (
+    CANCELLED,
+    FAILED,
+    PRIORITY_BATCH,
+    PRIORITY_DEFERRED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    AdmissionRejected,
+    JobQueue,
+    JobRetry,
+    JobWorker,
+    _percentile,
+)
+from src.utils.cancellation import current_token
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3", latency_budget=100)
+
+
+def _age_heartbeat(queue, job_id, seconds):
+    queue._connect().execute(
+        "UPDATE jobs SET heartbeat_at = heartbeat_at - ? WHERE id = ?",
+        (seconds, job_id),
+    )
+
+
+def test_claim_takes_the_highest_priority_first(queue):
+    batch = queue.submit({"query": "batch"}, priority=PRIORITY_BATCH)
+    interactive = queue.submit({"query": "now"})
+    assert queue.get(batch)["position"] == 1
+    assert queue.claim("w")["id"] == interactive
+    job = queue.claim("w")
+    assert (job["id"], job["status"], job["worker"]) == (batch, RUNNING, "w")
+    assert queue.claim("w") is None
+
+
+def test_claim_respects_device_pinning(queue):
+    pinned = queue.submit({"query": "a", "device": "lab-02"})
+    anywhere = queue.submit({"query": "b"})
+    assert queue.claim("w", device="lab-01")["id"] == anywhere
+    assert queue.claim("w", device="lab-01") is None
+    assert queue.claim("w", device="lab-02")["id"] == pinned
+
+
+def test_cancel_queued_job(queue):
+    job_id = queue.submit({"query": "a"})
+    assert queue.cancel(job_id)
+    assert queue.get(job_id)["status"] == CANCELLED
+    assert queue.claim("w") is None
+    assert not queue.cancel(job_id)
+
+
+def test_cancel_running_job_stops_at_its_next_report(queue):
+    job_id = queue.submit({"query": "a"})
+    reports = []
+
+    def handler(payload, report):
+        queue.cancel(job_id)
+        reports.append(1)
+        report({"event": "step_end"})
+        reports.append(2)
+
+    JobWorker(queue, handler).run_one()
+    job = queue.get(job_id)
+    assert job["status"] == CANCELLED
+    assert job["progress"] == [{"event": "step_end"}]
+    assert reports == [1]
+
+
+def test_worker_records_outcomes(queue):
+    ok = queue.submit({"query": "ok"})
+    bad = queue.submit({"query": "bad"})
+
+    def handler(payload, report):
+        if payload["query"] == "bad":
+            raise RuntimeError("tool failed")
+        return {"done": True}
+
+    worker = JobWorker(queue, handler)
+    assert worker.run_one() and worker.run_one()
+    assert not worker.run_one()
+    assert queue.get(ok)["status"] == SUCCEEDED
+    assert queue.get(ok)["result"] == {"done": True}
+    assert (queue.get(bad)["status"], queue.get(bad)["error"]) == (
+        FAILED,
+        "tool failed",
+    )
+
+
+def test_worker_runs_the_handler_under_the_job_deadline(queue):
+    job_id = queue.submit({"query": "a", "deadline_s": 12})
+    JobWorker(queue, lambda payload, report: current_token().deadline_s).run_one()
+    assert queue.get(job_id)["result"] == 12
+
+
+def test_job_retry_requeues(queue):
+    job_id = queue.submit({"query": "a"})
+
+    def handler(payload, report):
+        report({"event": "step_start"})
+        raise JobRetry("device went away")
+
+    JobWorker(queue, handler).run_one()
+    job = queue.get(job_id)
+    assert (job["status"], job["progress"], job["worker"]) == (QUEUED, [], None)
+
+
+def test_requeue_stale_recovers_jobs_without_a_heartbeat(queue):
+    orphaned = queue.submit({"query": "a"})
+    alive = queue.submit({"query": "b"})
+    queue.claim("crashed-host:1")
+    queue.add_progress(orphaned, {"event": "step_start"})
+    queue.claim("live-host:2")
+    _age_heartbeat(queue, orphaned, queue.lease + 1)
+
+    assert queue.requeue_stale() == 1
+    job = queue.get(orphaned)
+    assert (job["status"], job["worker"], job["progress"]) == (QUEUED, None, [])
+    assert job["error"].startswith("No heartbeat")
+    assert queue.get(alive)["status"] == RUNNING
+
+
+def test_running_worker_keeps_its_lease(monkeypatch, tmp_path):
+    monkeypatch.setenv("CAMERA_JOB_LEASE_S", "0.3")
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit({"query": "a"})
+    requeued = []
+
+    def handler(payload, report):
+        # Outlive the lease; another process looks for orphans meanwhile
+        for _ in range(4):
+            time.sleep(0.2)
+            requeued.append(JobQueue(queue.path).requeue_stale())
+
+    JobWorker(queue, handler).run_one()
+    assert queue.get(job_id)["status"] == SUCCEEDED
+    assert requeued == [0, 0, 0, 0]
+
+
+def test_admission_rejects_interactive_and_defers_batch(queue):
+    queue.submit({"query": "long", "estimate_s": 150})
+    with pytest.raises(AdmissionRejected) as rejected:
+        queue.submit({"query": "now", "estimate_s": 5})
+    assert rejected.value.estimated_wait == 150
+    batch = queue.submit({"query": "later", "estimate_s": 5}, PRIORITY_BATCH)
+    assert queue.get(batch)["priority"] == PRIORITY_DEFERRED
+    metrics = queue.metrics()
+    assert (metrics["queued"], metrics["rejected"]) == (2, 1)
+
+
+def test_admission_enforces_max_depth(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3", max_depth=1)
+    queue.submit({"query": "a", "estimate_s": 1})
+    with pytest.raises(AdmissionRejected, match="depth"):
+        queue.submit({"query": "b", "estimate_s": 1}, PRIORITY_BATCH)
+
+
+@pytest.mark.parametrize(
+    "samples, q, expected",
+    [
+        ([5.0], 95, 5.0),
+        ([1.0, 2.0], 50, 1.0),
+        ([1.0, 2.0], 95, 2.0),
+        (list(range(1, 21)), 95, 19),
+        (list(range(1, 101)), 95, 95),
+        ([3.0, 1.0, 2.0], 100, 3.0),
+    ],
+)
+def test_percentile_is_nearest_rank(samples, q, expected):
+    assert _percentile(samples, q) == expected
+
+
+def test_worker_that_lost_its_lease_does_not_overwrite_the_new_run(queue):
+    job_id = queue.submit({"query": "a"})
+    queue.claim("old-worker")
+    _age_heartbeat(queue, job_id, queue.lease + 1)
+    queue.requeue_stale()
+    queue.claim("new-worker")
+
+    assert not queue.finish(job_id, SUCCEEDED, result="old", worker="old-worker")
+    assert not queue.requeue(job_id, "device lost", worker="old-worker")
+    job = queue.get(job_id)
+    assert (job["status"], job["worker"], job["result"]) == (
+        RUNNING,
+        "new-worker",
+        None,
+    )
+    assert queue.finish(job_id, FAILED, error="tool failed", worker="new-worker")
+    assert queue.get(job_id)["status"] == FAILED
+
+
+def test_cancelled_job_is_not_marked_succeeded(queue):
+    job_id = queue.submit({"query": "a"})
+    queue.claim("w")
+    _age_heartbeat(queue, job_id, queue.lease + 1)
+    queue.requeue_stale()
+    queue.cancel(job_id)
+    assert not queue.finish(job_id, SUCCEEDED, worker="w")
+    assert queue.get(job_id)["status"] == CANCELLED
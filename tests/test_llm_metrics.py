@@ -0,0 +1,146 @@
+import json
+
+import httpx
+import pytest
+
+from src.utils import llm_metrics
+from src.utils.llm_metrics import (
+    _parse_completion,
+    estimate_cost,
+    format_usage_summary,
+    get_usage_summary,
+    record_call,
+    record_http_exchange,
+    track_component,
+    track_request,
+    track_test_case,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_tracker():
+    llm_metrics.tracker.reset()
+    yield
+    llm_metrics.tracker.reset()
+
+
+def _sse(*chunks):
+    lines = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks]
+    return ("".join(lines) + "data: [DONE]\n\n").encode("utf-8")
+
+
+def test_json_completion_is_parsed():
+    body = {
+        "model": "gpt-4o-mini-2024-07-18",
+        "choices": [
+            {
+                "message": {
+                    "content": "Opening",
+                    "tool_calls": [
+                        {"function": {"name": "open_camera", "arguments": "{}"}}
+                    ],
+                }
+            }
+        ],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 5},
+    }
+    model, content, usage = _parse_completion(json.dumps(body).encode("utf-8"))
+    assert model == "gpt-4o-mini-2024-07-18"
+    assert content == 'Opening{"name": "open_camera", "arguments": "{}"}'
+    assert usage == {"prompt_tokens": 20, "completion_tokens": 5}
+
+
+def test_streamed_completion_is_parsed():
+    body = _sse(
+        {"model": "gpt-4o", "choices": [{"delta": {"role": "assistant"}}]},
+        {"model": "gpt-4o", "choices": [{"delta": {"content": "Camera "}}]},
+        {"model": "gpt-4o", "choices": [{"delta": {"content": "opened"}}]},
+        {
+            "model": "gpt-4o",
+            "choices": [
+                {"delta": {"tool_calls": [{"function": {"arguments": '{"n": 1}'}}]}}
+            ],
+        },
+        {"model": "gpt-4o", "choices": [], "usage": {"prompt_tokens": 9}},
+    )
+    assert _parse_completion(body) == (
+        "gpt-4o",
+        'Camera opened{"n": 1}',
+        {"prompt_tokens": 9},
+    )
+
+
+def test_streamed_completion_without_usage():
+    body = _sse({"model": "gpt-4o", "choices": [{"delta": {"content": "hi"}}]})
+    assert _parse_completion(body) == ("gpt-4o", "hi", None)
+
+
+def test_cost_matches_dated_models_by_longest_prefix():
+    assert estimate_cost("gpt-4o", 1_000_000, 0) == 2.50
+    # "gpt-4o-mini-..." must not be priced as "gpt-4o"
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 1_000_000) == 0.75
+    assert estimate_cost("gpt-4o-2024-08-06", 0, 1_000_000) == 10.00
+    assert estimate_cost("llama-3", 1000, 1000) == 0.0
+
+
+def test_calls_are_grouped_by_request_test_case_and_component():
+    with track_test_case(2), track_request("r1") as request_id:
+        with track_component("interpreter"):
+            record_call("gpt-4o-mini", 100, 10, 0.5)
+        record_call("gpt-4o", 200, 20, 1.5, cache_hit=True, cached_tokens=64)
+    record_call("gpt-4o", 1, 1, 0.1)
+
+    request = get_usage_summary(request_id=request_id)
+    assert (request["calls"], request["total_tokens"], request["cache_hits"]) == (
+        2,
+        330,
+        1,
+    )
+    assert request["by_component"]["interpreter"]["calls"] == 1
+    assert request["by_component"]["unknown"]["cached_tokens"] == 64
+    assert get_usage_summary(test_case="2")["calls"] == 2
+    assert get_usage_summary()["calls"] == 3
+    assert get_usage_summary(request_id="missing")["calls"] == 0
+    assert "interpreter" in format_usage_summary(request)
+
+
+def test_http_exchange_uses_reported_usage():
+    request = httpx.Request(
+        "POST", "http://llm/v1/chat/completions", json={"model": "gpt-4o"}
+    )
+    body = {
+        "model": "gpt-4o-2024-08-06",
+        "choices": [{"message": {"content": "ok"}}],
+        "usage": {
+            "prompt_tokens": 1000,
+            "completion_tokens": 100,
+            "prompt_tokens_details": {"cached_tokens": 512},
+        },
+    }
+    record_http_exchange(
+        request, httpx.Response(200), json.dumps(body).encode("utf-8"), 0.8
+    )
+    [record] = llm_metrics.get_call_records()
+    assert (record["model"], record["prompt_tokens"], record["cached_tokens"]) == (
+        "gpt-4o-2024-08-06",
+        1000,
+        512,
+    )
+    assert record["cache_hit"] and not record["usage_estimated"]
+    assert record["cost"] == pytest.approx(0.0035)
+
+
+def test_http_exchange_without_usage_is_estimated(monkeypatch):
+    monkeypatch.setattr(llm_metrics, "_encoding_for", lambda model: None)
+    request = httpx.Request(
+        "POST",
+        "http://llm/v1/chat/completions",
+        json={"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]},
+    )
+    body = _sse({"choices": [{"delta": {"content": "twelve chars"}}]})
+    record_http_exchange(request, httpx.Response(200), body, 0.2)
+    record_http_exchange(request, httpx.Response(500), body, 0.2)
+    [record] = llm_metrics.get_call_records()
+    assert record["model"] == "gpt-4o"
+    assert record["usage_estimated"]
+    assert record["completion_tokens"] == 3
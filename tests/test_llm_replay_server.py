@@ -0,0 +1,174 @@
+import httpx
+import pytest
+from openai import NotFoundError, OpenAI
+
+from src.utils.llm_replay_server import (
+    Cassette,
+    LatencyProfile,
+    ReplayServer,
+    completion_to_chunks,
+    request_key,
+)
+
+MESSAGES = [{"role": "user", "content": "open the camera"}]
+
+
+def _completion(content=None, tool_calls=None):
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 1,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+    }
+
+
+def _record(cassette, completion, **body):
+    body = {"model": "gpt-4o-mini", "messages": MESSAGES, **body}
+    cassette.append(request_key(body), "/chat/completions", body, completion, 250.0)
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    return Cassette(tmp_path / "cassettes" / "planning.jsonl")
+
+
+@pytest.fixture
+def serve(cassette):
+    servers = []
+
+    def serve(mode="replay", **kwargs):
+        server = ReplayServer(cassette, mode=mode, port=0, **kwargs).start()
+        servers.append(server)
+        return server, OpenAI(api_key="offline", base_url=server.base_url)
+
+    yield serve
+    for server in servers:
+        server.stop()
+
+
+def test_request_key_ignores_streaming_options():
+    body = {"model": "gpt-4o-mini", "messages": MESSAGES}
+    assert request_key(body) == request_key(
+        {**body, "stream": True, "stream_options": {"include_usage": True}}
+    )
+    assert request_key(body) != request_key({**body, "temperature": 0})
+
+
+def test_recorded_cassette_is_replayed(cassette, serve, tmp_path):
+    _record(cassette, _completion("Camera app opened successfully."))
+    # A fresh cassette reads the recording back from disk
+    assert len(Cassette(tmp_path / "cassettes" / "planning.jsonl")) == 1
+    server, client = serve()
+
+    response = client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    assert response.choices[0].message.content == "Camera app opened successfully."
+    assert response.usage.total_tokens == 15
+    assert (server.hits, server.misses) == (1, 0)
+
+
+def test_streamed_requests_replay_the_recorded_completion(cassette, serve):
+    _record(cassette, _completion("Camera app opened successfully."))
+    _, client = serve()
+    stream = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=MESSAGES,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    chunks = list(stream)
+    content = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+    assert content == "Camera app opened successfully."
+    assert chunks[-1].usage.completion_tokens == 3
+
+
+def test_tool_calls_replay_exactly(cassette, serve):
+    call = {
+        "id": "call_1",
+        "type": "function",
+        "function": {"name": "take_photo", "arguments": '{"num_photos": 2}'},
+    }
+    _record(cassette, _completion(tool_calls=[call]))
+    _, client = serve()
+    message = (
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+        .choices[0]
+        .message
+    )
+    assert message.tool_calls[0].function.arguments == '{"num_photos": 2}'
+
+
+def test_repeated_requests_replay_in_recorded_order(cassette, serve):
+    _record(cassette, _completion("first"))
+    _record(cassette, _completion("second"))
+    server, client = serve()
+
+    def ask():
+        response = client.chat.completions.create(
+            model="gpt-4o-mini", messages=MESSAGES
+        )
+        return response.choices[0].message.content
+
+    assert [ask(), ask(), ask()] == ["first", "second", "second"]
+    server.cassette.rewind()
+    assert ask() == "first"
+
+
+def test_unrecorded_requests_fail_in_replay_mode(cassette, serve):
+    server, client = serve()
+    with pytest.raises(NotFoundError, match="No recorded response"):
+        client.with_options(max_retries=0).chat.completions.create(
+            model="gpt-4o-mini", messages=MESSAGES
+        )
+    assert server.misses == 1
+    health = httpx.get(server.base_url + "/health").json()
+    assert (health["mode"], health["entries"]) == ("replay", 0)
+
+
+def test_auto_mode_records_misses(cassette, serve, monkeypatch):
+    server, client = serve(mode="auto")
+    forwarded = []
+
+    def forward(endpoint, body):
+        forwarded.append(body)
+        return _completion("recorded"), 400.0
+
+    monkeypatch.setattr(server, "_forward", forward)
+    for _ in range(2):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini", messages=MESSAGES
+        )
+        assert response.choices[0].message.content == "recorded"
+    assert len(forwarded) == 1 and "stream" not in forwarded[0]
+    assert (server.recorded, server.hits, len(cassette)) == (1, 1, 1)
+    assert next(cassette.entries())["latency_ms"] == 400.0
+
+
+def test_latency_profile_is_deterministic():
+    profile = LatencyProfile(fixed_ms=100, jitter_ms=50, recorded_scale=0.5, seed=3)
+    delay = profile.delay("key", recorded_ms=200)
+    assert 0.2 <= delay <= 0.25
+    assert profile.delay("key", recorded_ms=200) == delay
+    assert LatencyProfile().delay("key", recorded_ms=200) == 0
+
+
+def test_completion_chunks_end_with_the_finish_reason():
+    chunks = completion_to_chunks(_completion("a b"), include_usage=False)
+    deltas = [c["choices"][0]["delta"] for c in chunks]
+    assert deltas == [{"role": "assistant"}, {"content": "a "}, {"content": "b"}, {}]
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+
+def test_unknown_mode_is_rejected(cassette):
+    with pytest.raises(ValueError, match="Invalid mode"):
+        ReplayServer(cassette, mode="live", port=0)
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils import llm_router
+from src.utils.agent_utils import determine_agents, parse_agent_lists
+from src.utils.llm_router import (
+    MIN_SAMPLES,
+    a_routed_reply,
+    fastest_model,
+    get_router_metrics,
+    hedge_delay,
+    record_latency,
+    routed_reply,
+)
+
+STRONG = object()
+
+
+class FakeAgent:
+    """
+    Agent whose replies come from replies[config]: (seconds, text) per
+    call in turn, config None meaning the agent's own model.
+    """
+
+    llm_config = {"model": "base"}
+
+    def __init__(self, replies):
+        self.replies = {config: list(calls) for config, calls in replies.items()}
+        self.calls = []
+        self.done = []
+        self.lock = threading.Lock()
+        self.gate = threading.Event()
+
+    def generate_oai_reply(self, messages, config=None):
+        done = threading.Event()
+        with self.lock:
+            self.calls.append(config)
+            self.done.append(done)
+            seconds, text = self.replies[config].pop(0)
+        try:
+            if seconds:
+                self.gate.wait(seconds)
+            if isinstance(text, Exception):
+                raise text
+            return True, text
+        finally:
+            done.set()
+
+    def release(self):
+        """Let slow calls finish so their latencies land before the next test."""
+        self.gate.set()
+        for done in list(self.done):
+            done.wait(5)
+
+
+@pytest.fixture(autouse=True)
+def router(monkeypatch):
+    monkeypatch.setenv("CAMERA_LLM_HEDGES", "1")
+    monkeypatch.setenv("CAMERA_LLM_HEDGE_AFTER_S", "0.05")
+    monkeypatch.setenv("CAMERA_LLM_HEDGE_MIN_S", "0")
+    for name in ("CAMERA_LLM_FAST_MODELS", "CAMERA_LLM_STRONG_MODEL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(llm_router, "_clients", {"strong": STRONG})
+    llm_router._latencies.clear()
+    for key in llm_router._stats:
+        llm_router._stats[key] = 0
+    yield llm_router
+    llm_router._latencies.clear()
+
+
+def _reply(agent, **kwargs):
+    return routed_reply(
+        agent,
+        [{"role": "user", "content": "hi"}],
+        "interpreter",
+        str.upper,
+        lambda parsed: parsed == "OK",
+        **kwargs
+    )
+
+
+def test_fast_answer_is_not_hedged():
+    agent = FakeAgent({None: [(0, "ok")]})
+    assert _reply(agent) == "OK"
+    metrics = get_router_metrics()
+    assert (metrics["calls"], metrics["hedged"]) == (1, 0)
+    assert metrics["latency"]["interpreter/base"]["calls"] == 1
+
+
+def test_slow_call_is_hedged_and_the_hedge_wins():
+    agent = FakeAgent({None: [(5, "late"), (0, "ok")]})
+    start = time.monotonic()
+    try:
+        assert _reply(agent) == "OK"
+        assert time.monotonic() - start < 2
+    finally:
+        agent.release()
+    metrics = get_router_metrics()
+    assert (metrics["hedged"], metrics["hedge_wins"]) == (1, 1)
+    assert agent.calls == [None, None]
+
+
+def test_async_slow_call_is_hedged():
+    agent = FakeAgent({None: [(5, "late"), (0, "ok")]})
+
+    async def reply():
+        return await a_routed_reply(
+            agent, [], "interpreter", str.upper, lambda parsed: parsed == "OK"
+        )
+
+    try:
+        assert asyncio.run(reply()) == "OK"
+    finally:
+        agent.release()
+    assert get_router_metrics()["hedge_wins"] == 1
+
+
+def test_hedging_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("CAMERA_LLM_HEDGES", "0")
+    agent = FakeAgent({None: [(0.2, "ok")]})
+    assert _reply(agent) == "OK"
+    assert get_router_metrics()["hedged"] == 0
+
+
+def test_hedge_delay_follows_the_latency_percentile(monkeypatch):
+    assert hedge_delay("interpreter", "base") == 0.05
+    for seconds in range(1, 21):
+        record_latency("interpreter", "base", float(seconds))
+    assert hedge_delay("interpreter", "base") == 19
+    for seconds in range(21, 31):
+        record_latency("interpreter", "base", float(seconds))
+    assert hedge_delay("interpreter", "base") == 29
+    monkeypatch.setenv("CAMERA_LLM_HEDGE_PERCENTILE", "50")
+    assert hedge_delay("interpreter", "base") == 15
+    monkeypatch.setenv("CAMERA_LLM_HEDGE_MIN_S", "20")
+    assert hedge_delay("interpreter", "base") == 20
+
+
+def test_unparseable_reply_escalates_to_the_strong_model(monkeypatch):
+    monkeypatch.setenv("CAMERA_LLM_STRONG_MODEL", "strong")
+    agent = FakeAgent({None: [(0, "garbage")], STRONG: [(0, "ok")]})
+    assert _reply(agent) == "OK"
+    assert agent.calls == [None, STRONG]
+    metrics = get_router_metrics()
+    assert (metrics["escalations"], metrics["escalation_wins"]) == (1, 1)
+    assert metrics["latency"]["interpreter/strong"]["calls"] == 1
+
+
+def test_unparseable_reply_without_a_strong_model_is_returned():
+    agent = FakeAgent({None: [(0, "garbage")]})
+    assert _reply(agent) == "GARBAGE"
+    metrics = get_router_metrics()
+    assert (metrics["escalations"], metrics["failed"]) == (0, 1)
+
+
+def test_errors_are_raised_not_escalated(monkeypatch):
+    monkeypatch.setenv("CAMERA_LLM_STRONG_MODEL", "strong")
+    agent = FakeAgent({None: [(0, RuntimeError("rate limited"))]})
+    with pytest.raises(RuntimeError, match="rate limited"):
+        _reply(agent)
+    assert agent.calls == [None]
+    assert get_router_metrics()["escalations"] == 0
+
+
+def test_fastest_model_measures_new_models_first():
+    assert fastest_model("interpreter", ["a", "b"]) == "a"
+    for _ in range(MIN_SAMPLES):
+        record_latency("interpreter", "a", 2.0)
+    assert fastest_model("interpreter", ["a", "b"]) == "b"
+    for _ in range(MIN_SAMPLES):
+        record_latency("interpreter", "b", 3.0)
+    assert fastest_model("interpreter", ["a", "b"]) == "a"
+
+
+def test_fast_routing_calls_the_fastest_candidate(monkeypatch):
+    monkeypatch.setenv("CAMERA_LLM_FAST_MODELS", "base, strong")
+    for _ in range(MIN_SAMPLES):
+        record_latency("interpreter", "base", 2.0)
+        record_latency("interpreter", "strong", 1.0)
+    agent = FakeAgent({STRONG: [(0, "ok")]})
+    assert _reply(agent, fast=True) == "OK"
+    assert agent.calls == [STRONG]
+
+
+def test_empty_plan_is_not_escalated(monkeypatch):
+    monkeypatch.setenv("CAMERA_LLM_STRONG_MODEL", "strong")
+    agent = FakeAgent({None: [(0, "Sequence: []\nState: []")]})
+    assert determine_agents("say hello", agent, {"open_camera_agent": None}) == (
+        [],
+        [],
+    )
+    assert agent.calls == [None]
+    assert get_router_metrics()["escalations"] == 0
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        "no lists here",
+        "Sequence: [\nState: []",
+        "Sequence: ['zoom_agent']\nState: ['zoom_agent']",
+    ],
+)
+def test_unusable_plan_is_escalated(monkeypatch, reply):
+    monkeypatch.setenv("CAMERA_LLM_STRONG_MODEL", "strong")
+    plan = "Sequence: ['open_camera_agent']\nState: ['open_camera_agent']"
+    agent = FakeAgent({None: [(0, reply)], STRONG: [(0, plan)]})
+    agent_map = {"open_camera_agent": None}
+    assert parse_agent_lists(reply, agent_map) is None
+    assert determine_agents("open it", agent, agent_map) == (
+        ["open_camera_agent"],
+        ["open_camera_agent"],
+    )
+    assert agent.calls == [None, STRONG]
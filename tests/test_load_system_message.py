@@ -0,0 +1,117 @@
+import gc
+import os
+import time
+
+import pytest
+
+from src.utils import load_system_message as sm
+from src.utils.load_system_message import (
+    bind_agent,
+    get_system_message,
+    get_system_message_hash,
+    load_system_message,
+)
+
+
+class StubAgent:
+    def __init__(self):
+        self.system_message = None
+
+    def update_system_message(self, message):
+        self.system_message = message
+
+
+@pytest.fixture
+def messages(tmp_path, monkeypatch):
+    """A system_messages directory the cache resolves files from."""
+    directory = tmp_path / "system_messages"
+    directory.mkdir()
+    monkeypatch.setattr(sm, "SYSTEM_MESSAGES_DIR", directory)
+    sm.stop_watching()
+    sm.clear_cache()
+    yield directory
+    sm.stop_watching()
+    sm.clear_cache()
+
+
+def _write(path, text, mtime_ns):
+    """Write text with an explicit mtime, so edits are seen on coarse clocks."""
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_literal_messages_are_not_files(messages):
+    message = load_system_message("You open the camera.")
+    assert (message.path, message.text) == (None, "You open the camera.")
+    assert get_system_message("Logs go to {log_dir}") == "Logs go to {log_dir}"
+
+
+def test_messages_are_cached_between_checks(messages, monkeypatch):
+    monkeypatch.setattr(sm, "RECHECK_INTERVAL", 3600)
+    path = messages / "camera.txt"
+    _write(path, "first", 10**18)
+    assert load_system_message("camera.txt").text == "first"
+    _write(path, "second", 2 * 10**18)
+    # Within the recheck interval the file is not even stat'ed
+    assert load_system_message("camera.txt").text == "first"
+
+
+def test_cache_reloads_when_the_mtime_changes(messages, monkeypatch):
+    monkeypatch.setattr(sm, "RECHECK_INTERVAL", 0)
+    path = messages / "camera.txt"
+    _write(path, "Save logs to {log_dir}", 10**18)
+    first = load_system_message("camera.txt")
+    assert load_system_message("camera.txt") is first
+    assert get_system_message("camera.txt", "/tmp/logs") == "Save logs to /tmp/logs"
+
+    _write(path, "Save nothing", 2 * 10**18)
+    second = load_system_message("camera.txt")
+    assert second.text == "Save nothing"
+    assert second.mtime_ns == 2 * 10**18
+    assert get_system_message_hash("camera.txt") != first.sha256
+
+
+def test_reload_updates_bound_agents(messages, monkeypatch):
+    monkeypatch.setattr(sm, "RECHECK_INTERVAL", 0)
+    path = messages / "camera.txt"
+    _write(path, "old for {log_dir}", 10**18)
+    agent = StubAgent()
+    bind_agent(agent, "camera.txt", "logs")
+    load_system_message("camera.txt")
+    assert agent.system_message is None
+
+    _write(path, "new for {log_dir}", 2 * 10**18)
+    load_system_message("camera.txt")
+    assert agent.system_message == "new for logs"
+
+    # Agents are held weakly
+    del agent
+    gc.collect()
+    assert len(sm._bound_agents) == 0
+
+
+def test_watcher_reloads_in_the_background(messages):
+    path = messages / "camera.txt"
+    _write(path, "old", 10**18)
+    agent = StubAgent()
+    bind_agent(agent, "camera.txt")
+    load_system_message("camera.txt")
+    sm.start_watching(interval=0.01)
+    _write(path, "new", 2 * 10**18)
+    deadline = time.monotonic() + 5
+    while agent.system_message != "new" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert agent.system_message == "new"
+    assert load_system_message("camera.txt").text == "new"
+
+
+def test_missing_files_are_reported(messages, monkeypatch):
+    monkeypatch.setattr(sm, "RECHECK_INTERVAL", 0)
+    assert get_system_message("missing.txt").startswith("Error loading system message")
+    path = messages / "camera.txt"
+    _write(path, "here", 10**18)
+    load_system_message("camera.txt")
+    path.unlink()
+    with pytest.raises(FileNotFoundError):
+        load_system_message("camera.txt")
+    assert "camera.txt" not in sm._resolved
@@ -0,0 +1,146 @@
+import pytest
+
+from src.tools import simulated
+from src.utils.plan_validator import parse_step, validate_plan
+
+
+def _agents(states):
+    return [state.split("(")[0] for state in states]
+
+
+def _validate(*states, task=None):
+    return validate_plan(_agents(states), list(states), task=task)
+
+
+def _run(result, iterations=2):
+    """Run a validated plan on the simulated app from a cold start."""
+    simulated.reset_state()
+    outcomes = []
+    for _ in range(iterations):
+        for agent, action in zip(result["agent_sequence"], result["agent_states"]):
+            tool = getattr(simulated, agent[: -len("_agent")])
+            outcomes.append(tool(**parse_step(agent, action)[0]))
+    return outcomes
+
+
+def _failures(outcomes):
+    return [
+        o
+        for o in outcomes
+        if isinstance(o, str) and ("Failed" in o or "not accessible" in o)
+    ]
+
+
+def test_valid_plan_is_unchanged():
+    states = ["open_camera_agent", "take_photo_agent(num_photos=2)"]
+    result = _validate(*states)
+    assert result["valid"]
+    assert result["agent_states"] == states
+    assert result["repairs"] == []
+
+
+def test_open_is_inserted_first():
+    result = _validate("set_automatic_framing_agent(desired_state=True)")
+    assert result["agent_sequence"] == [
+        "open_camera_agent",
+        "set_automatic_framing_agent",
+    ]
+
+
+def test_repeat_repair_follows_first_run_repair():
+    # Pass 2 starts minimized, but the restore must not precede the open
+    result = _validate("take_photo_agent(num_photos=2)", "minimize_camera_agent")
+    assert result["agent_sequence"] == [
+        "open_camera_agent",
+        "restore_camera_agent",
+        "take_photo_agent",
+        "minimize_camera_agent",
+    ]
+    assert "repeats" in result["repairs"][-1]["message"]
+    assert _failures(_run(result)) == []
+
+
+def test_restore_before_ui_step_after_minimize():
+    result = _validate(
+        "open_camera_agent",
+        "minimize_camera_agent",
+        "set_blur_type_agent(blur_type='portrait')",
+    )
+    assert result["agent_sequence"] == [
+        "open_camera_agent",
+        "minimize_camera_agent",
+        "restore_camera_agent",
+        "set_blur_type_agent",
+    ]
+    assert _failures(_run(result)) == []
+
+
+def test_blur_on_rear_camera_switches_to_front():
+    result = _validate(
+        "open_camera_agent",
+        "switch_camera_agent(target_type='RFC')",
+        "set_blur_type_agent(blur_type='portrait')",
+    )
+    assert result["agent_states"][2:] == [
+        "switch_camera_agent(target_type='FFC')",
+        "set_blur_type_agent(blur_type='portrait')",
+    ]
+
+
+def test_reopen_after_close():
+    result = _validate("open_camera_agent", "close_camera_agent", "take_photo_agent")
+    assert result["agent_sequence"] == [
+        "open_camera_agent",
+        "close_camera_agent",
+        "open_camera_agent",
+        "take_photo_agent",
+    ]
+    assert _failures(_run(result)) == []
+
+
+@pytest.mark.parametrize(
+    "states",
+    [
+        ("take_photo_agent(num_photos=2)", "minimize_camera_agent"),
+        ("minimize_camera_agent", "camera_mode_agent(mode='video')"),
+        ("close_camera_agent", "take_photo_agent", "minimize_camera_agent"),
+        (
+            "switch_camera_agent(target_type='RFC')",
+            "set_background_effects_agent(desired_state=True)",
+            "minimize_camera_agent",
+        ),
+    ],
+)
+def test_repaired_plans_run_from_cold_start(states):
+    result = _validate(*states)
+    assert result["valid"]
+    assert _failures(_run(result, iterations=3)) == []
+
+
+def test_missing_duration_is_taken_from_the_task():
+    result = _validate(
+        "open_camera_agent", "take_video_agent", task="record a 5 second video"
+    )
+    assert result["valid"]
+    assert result["agent_states"][-1] == "take_video_agent(duration=5)"
+    assert result["repairs"][0]["code"] == "filled_duration"
+
+
+@pytest.mark.parametrize(
+    "states, code",
+    [
+        (("open_camera_agent", "take_video_agent"), "bad_duration"),
+        (("open_camera_agent", "camera_mode_agent(mode='panorama')"), "bad_mode"),
+        (("open_camera_agent", "zoom_agent"), "unknown_agent"),
+    ],
+)
+def test_rejected_plans(states, code):
+    result = _validate(*states)
+    assert not result["valid"]
+    assert [e["code"] for e in result["errors"]] == [code]
+
+
+def test_length_mismatch():
+    result = validate_plan(["open_camera_agent"], [])
+    assert not result["valid"]
+    assert result["errors"][0]["code"] == "length_mismatch"
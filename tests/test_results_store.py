@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from src.regression.results_store import (
+    FAILED,
+    LEGACY_RUN_ID,
+    PASSED,
+    ResultsStore,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(tmp_path / "results.sqlite3")
+
+
+def _legacy_file(tmp_path, cases):
+    path = tmp_path / "test_cases.json"
+    path.write_text(json.dumps({"testCases": cases}))
+    return path
+
+
+def test_results_cannot_be_updated_or_deleted(store):
+    row_id = store.record("1", PASSED, build="b1")
+    conn = store._connect()
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute("UPDATE results SET status = ? WHERE id = ?", (FAILED, row_id))
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute("DELETE FROM results WHERE id = ?", (row_id,))
+    assert store.latest()["1"]["status"] == PASSED
+
+
+def test_statuses_are_normalised(store):
+    store.record("1", "Pass", build="b1")
+    store.record("2", " FAIL ", build="b1")
+    assert {k: v["status"] for k, v in store.latest().items()} == {
+        "1": PASSED,
+        "2": FAILED,
+    }
+
+
+def test_latest_is_the_newest_result_per_test(store):
+    store.record("1", PASSED, build="b1", timings={"plan_s": 1.0})
+    store.record("1", FAILED, build="b2", message="camera not found")
+    store.record("2", PASSED, build="b1")
+    latest = store.latest()
+    assert (latest["1"]["status"], latest["1"]["build"]) == (FAILED, "b2")
+    assert store.latest(build="b1")["1"]["timings"] == {"plan_s": 1.0}
+    assert list(store.latest(test_ids=[2])) == ["2"]
+
+
+def test_results_take_the_build_of_their_run(store):
+    run_id = store.start_run(build="1.4.2", source="regression")
+    store.record("1", PASSED, run_id=run_id, elapsed=3.0)
+    assert store.latest()["1"]["build"] == "1.4.2"
+    run = store.runs()[0]
+    assert (run["run_id"], run["total"], run["passed"]) == (run_id, 1, 1)
+
+
+def test_pass_rates_by_build(store):
+    for status in (PASSED, FAILED, PASSED, PASSED):
+        store.record("1", status, build="b1", elapsed=2.0)
+    store.record("1", PASSED, build="b2", elapsed=4.0)
+    store.record("2", FAILED, build="b2")
+    rates = store.pass_rates(by="build")
+    assert [(r["group"], r["runs"], r["passed"]) for r in rates] == [
+        ("b1", 4, 3),
+        ("b2", 2, 1),
+    ]
+    assert rates[0]["pass_rate"] == 0.75
+    only = store.pass_rates(test_id="1")
+    assert [(r["group"], r["mean_elapsed"]) for r in only] == [
+        ("b1", 2.0),
+        ("b2", 4.0),
+    ]
+    assert store.pass_rates(by="build", limit=1)[0]["group"] == "b2"
+    with pytest.raises(ValueError):
+        store.pass_rates(by="week")
+
+
+def test_import_legacy_is_idempotent(store, tmp_path):
+    path = _legacy_file(
+        tmp_path,
+        {
+            "1": {"description": "switch to FFC", "result": "N/A"},
+            "9": {"description": "minimize", "result": "N/A", "status": "Pass"},
+        },
+    )
+    assert store.import_legacy(path) == 1
+    assert store.import_legacy(path) == 0
+    # A checkout gives the file a new modification time, not new results
+    os.utime(path, (1, 1))
+    assert store.import_legacy(path) == 0
+
+    row = store.latest()["9"]
+    assert (row["status"], row["run_id"], row["source"]) == (
+        PASSED,
+        LEGACY_RUN_ID,
+        "legacy",
+    )
+    assert row["result"] == "N/A"
+    assert len(store.history("9")) == 1
+    assert "1" not in store.latest()
+
+
+def test_import_legacy_adds_changed_results(store, tmp_path):
+    cases = {"9": {"description": "minimize", "result": "N/A", "status": "Pass"}}
+    path = _legacy_file(tmp_path, cases)
+    store.import_legacy(path)
+    cases["9"]["status"] = "Fail"
+    _legacy_file(tmp_path, cases)
+    os.utime(path, (2, 2))
+    assert store.import_legacy(path) == 1
+    assert [r["status"] for r in store.history("9")] == [FAILED, PASSED]
@@ -0,0 +1,71 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.regression.runner import PASSED, TIMEOUT, CaseTimeout, RegressionRunner, Slots
+from src.utils import agent_utils
+
+LLM_CONFIG = {"config_list": [{"model": "gpt-4o-mini", "api_key": "sk-test"}]}
+CASES = {"1": {"description": "open the camera"}, "2": {"description": "again"}}
+
+
+@pytest.fixture(autouse=True)
+def _planned(monkeypatch):
+    """Plan every case as one open_camera step that runs for 0.3s."""
+
+    def iter_workflow(**kwargs):
+        time.sleep(0.3)
+        yield {
+            "event": "step_end",
+            "iteration": 1,
+            "step": 1,
+            "agent": "open_camera_agent",
+            "action": "open_camera_agent",
+            "elapsed": 0.3,
+            "result": SimpleNamespace(chat_history=[]),
+        }
+
+    monkeypatch.setattr(
+        agent_utils, "interpret_query", lambda query, agent: ("command", 1, query)
+    )
+    monkeypatch.setattr(
+        agent_utils,
+        "determine_agents",
+        lambda query, manager, agent_map: (
+            ["open_camera_agent"],
+            ["open_camera_agent"],
+        ),
+    )
+    monkeypatch.setattr(agent_utils, "iter_workflow", iter_workflow)
+
+
+def _runner(**kwargs):
+    return RegressionRunner(
+        workers=2, backend="simulated", llm_config=LLM_CONFIG, **kwargs
+    )
+
+
+def test_waiting_for_the_device_does_not_use_up_the_timeout():
+    # Both cases fit in 0.5s, but together they do not
+    results = _runner(timeout=0.5).run(CASES)
+    assert [r.status for r in results] == [PASSED, PASSED]
+    assert max(r.timings["device_wait_s"] for r in results) >= 0.2
+
+
+def test_device_wait_has_its_own_timeout():
+    results = _runner(timeout=5, device_timeout=0.1).run(CASES)
+    assert sorted(r.status for r in results) == [PASSED, TIMEOUT]
+    timed_out = next(r for r in results if r.status == TIMEOUT)
+    assert timed_out.message == "No device free within 0s"
+
+
+def test_slots_checkout_times_out():
+    slots = Slots(["lab-01"])
+    with slots.checkout() as slot:
+        assert slot == "lab-01"
+        with pytest.raises(CaseTimeout):
+            with slots.checkout(timeout=0.01):
+                pass
+    with slots.checkout(timeout=0.01) as slot:
+        assert slot == "lab-01"
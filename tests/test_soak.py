@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from src.regression.soak import (
+    PRESETS,
+    Cycle,
+    SoakRunner,
+    SoakStats,
+    format_report_line,
+    latency_summary,
+    parse_step,
+    percentile,
+    write_json_report,
+)
+from src.tools import simulated
+
+
+@pytest.fixture(autouse=True)
+def _fresh_camera():
+    simulated.reset_state()
+
+
+def _stats(latencies, window=10, failed=()):
+    stats = SoakStats(window=window)
+    for number, elapsed in enumerate(latencies, 1):
+        stats.add(Cycle(number, 0.0, elapsed, number not in failed))
+    return stats
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert [percentile(values, q) for q in (0.5, 0.95, 0.99)] == [50, 95, 99]
+    assert percentile(values, 1.0) == 100
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_latency_summary():
+    summary = latency_summary([0.3, 0.1, 0.2])
+    assert (summary["count"], summary["p50_s"], summary["max_s"]) == (3, 0.2, 0.3)
+    assert summary["mean_s"] == pytest.approx(0.2)
+    assert latency_summary([])["p99_s"] == 0.0
+
+
+def test_drift_is_unknown_until_the_first_window_is_full():
+    drift = _stats([1.0] * 9).drift()
+    assert drift["drift_pct"] is None and not drift["drifting"]
+
+
+def test_steady_latency_does_not_drift():
+    drift = _stats([1.0, 1.1] * 20).drift()
+    assert drift["drift_pct"] == 0.0
+    assert not drift["drifting"]
+
+
+def test_slowdown_after_the_first_window_is_drift():
+    stats = _stats([1.0] * 10 + [1.5] * 10)
+    drift = stats.drift()
+    assert (drift["baseline_p50_s"], drift["current_p50_s"]) == (1.0, 1.5)
+    assert drift["drift_pct"] == pytest.approx(50.0)
+    assert drift["drifting"]
+    assert drift["slope_ms_per_100"] > 0
+    assert "DRIFTING" in format_report_line(20, stats)
+    stats.drift_threshold = 60
+    assert not stats.drift()["drifting"]
+
+
+def test_failed_cycles_count_against_the_window_not_the_latency():
+    stats = _stats([1.0] * 8 + [9.0, 9.0], window=4, failed={9, 10})
+    rolling = stats.rolling()
+    assert rolling["failure_rate"] == 0.5
+    assert rolling["max_s"] == 1.0
+    assert (stats.failures, stats.consecutive_failures) == (2, 2)
+    assert not stats.drift()["drifting"]
+
+
+def test_parse_step():
+    assert parse_step("set_automatic_framing:desired_state=true") == {
+        "tool": "set_automatic_framing",
+        "args": {"desired_state": True},
+    }
+    assert parse_step("camera_mode:mode=video")["args"] == {"mode": "video"}
+    assert parse_step("open_camera") == {"tool": "open_camera", "args": {}}
+    with pytest.raises(ValueError, match="zoom"):
+        parse_step("zoom:level=2")
+
+
+def test_preset_soaks_on_the_simulated_camera(tmp_path):
+    setup, steps = PRESETS["background_effects"]
+    runner = SoakRunner(steps, setup=setup, backend="simulated")
+    runner.run_setup()
+    stats = runner.run(cycles=5)
+    summary = stats.summary()
+    assert (summary["cycles"], summary["failures"]) == (5, 0)
+    assert list(summary["steps"]) == [
+        "1:set_background_effects",
+        "2:set_background_effects",
+    ]
+
+    path = tmp_path / "reports" / "soak.json"
+    write_json_report(path, stats, {"preset": "background_effects"})
+    report = json.loads(path.read_text())
+    assert len(report["cycles"]) == 5
+    assert "output" not in report["cycles"][0]["steps"][0]
+
+
+def test_soak_stops_after_consecutive_failures():
+    steps = [{"tool": "set_background_effects", "args": {"bogus": True}}]
+    runner = SoakRunner(steps, backend="simulated")
+    stats = runner.run(cycles=100, max_consecutive_failures=3)
+    assert len(stats.cycles) == 3
+    assert stats.cycles[-1].error.startswith("set_background_effects: TypeError")
+
+
+def test_failed_setup_raises():
+    setup = [{"tool": "take_photo", "args": {"bogus": 1}}]
+    runner = SoakRunner([], setup=setup, backend="simulated")
+    with pytest.raises(RuntimeError, match="Setup failed at take_photo"):
+        runner.run_setup()
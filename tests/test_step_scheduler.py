@@ -0,0 +1,132 @@
+import random
+
+import pytest
+
+from src.tools import simulated
+from src.utils.plan_validator import parse_step
+from src.utils.step_scheduler import (
+    MAX_EXACT_STEPS,
+    reorder_plan,
+    schedule_steps,
+    transition_cost,
+)
+
+# What a post-condition can observe after the plan
+OBSERVABLE = (
+    "running",
+    "minimized",
+    "camera",
+    "mode",
+    "background_effects",
+    "automatic_framing",
+    "blur_type",
+    "photos_taken",
+    "videos_recorded",
+)
+
+FRAMING_ON = "set_automatic_framing_agent(desired_state=True)"
+FRAMING_OFF = "set_automatic_framing_agent(desired_state=False)"
+EFFECTS_ON = "set_background_effects_agent(desired_state=True)"
+EFFECTS_OFF = "set_background_effects_agent(desired_state=False)"
+PORTRAIT = "set_blur_type_agent(blur_type='portrait')"
+PHOTO_MODE = "camera_mode_agent(mode='photo')"
+VIDEO_MODE = "camera_mode_agent(mode='video')"
+RFC = "switch_camera_agent(target_type='RFC')"
+FFC = "switch_camera_agent(target_type='FFC')"
+PHOTO = "take_photo_agent(num_photos=1)"
+VIDEO = "take_video_agent(duration=1)"
+
+PLANS = [
+    ["open_camera_agent", PHOTO_MODE, FRAMING_ON, PHOTO],
+    ["open_camera_agent", RFC, FRAMING_ON, RFC, EFFECTS_ON],
+    ["open_camera_agent", FRAMING_ON, PHOTO_MODE, EFFECTS_ON, PHOTO, FRAMING_OFF],
+    ["open_camera_agent", RFC, PORTRAIT, FFC, FRAMING_ON, VIDEO],
+    ["open_camera_agent", FRAMING_ON, FRAMING_OFF, EFFECTS_ON, EFFECTS_OFF],
+    ["open_camera_agent", VIDEO_MODE, PHOTO_MODE, RFC, "minimize_camera_agent"],
+]
+
+
+def _agents(states):
+    return [state.split("(")[0] for state in states]
+
+
+def _end_state(states):
+    """Run a plan on the simulated app from a cold start."""
+    simulated.reset_state()
+    for agent, action in zip(_agents(states), states):
+        tool = getattr(simulated, agent[: -len("_agent")])
+        result = tool(**parse_step(agent, action)[0])
+        assert not (isinstance(result, str) and "Failed" in result), result
+    state = simulated.get_state()
+    return {key: state[key] for key in OBSERVABLE}
+
+
+@pytest.mark.parametrize("states", PLANS)
+def test_reordered_plan_reaches_the_same_state(states):
+    schedule = schedule_steps(_agents(states), states)
+    assert sorted(schedule["order"]) == list(range(len(states)))
+    assert schedule["agent_sequence"] == _agents(schedule["agent_states"])
+    assert schedule["after_s"] <= schedule["before_s"]
+    assert _end_state(schedule["agent_states"]) == _end_state(states)
+
+
+def test_mode_switch_moves_next_to_the_capture():
+    states = ["open_camera_agent", PHOTO_MODE, FRAMING_ON, PHOTO]
+    schedule = schedule_steps(_agents(states), states)
+    assert schedule["order"] == [0, 2, 1, 3]
+    assert (schedule["before_s"], schedule["after_s"]) == (7.0, 6.0)
+
+
+def test_toggles_do_not_cross_camera_switches():
+    # Each toggle switches to the front camera, so the switches stay put
+    states = ["open_camera_agent", RFC, FRAMING_ON, RFC, EFFECTS_ON]
+    assert schedule_steps(_agents(states), states)["order"] == [0, 1, 2, 3, 4]
+
+
+def test_conflicting_writes_keep_their_order():
+    states = ["open_camera_agent", FRAMING_OFF, EFFECTS_ON, FRAMING_ON]
+    schedule = schedule_steps(_agents(states), states)
+    order = schedule["order"]
+    assert order.index(1) < order.index(3)
+
+
+@pytest.mark.parametrize(
+    "barrier", [PHOTO, VIDEO, "minimize_camera_agent", "switch_camera_agent"]
+)
+def test_nothing_moves_across_a_barrier(barrier):
+    states = ["open_camera_agent", FRAMING_ON, RFC, barrier, FFC, EFFECTS_ON]
+    order = schedule_steps(_agents(states), states)["order"]
+    assert order.index(3) == 3
+    assert set(order[:3]) == {0, 1, 2}
+
+
+def test_long_segments_are_ordered_greedily_and_stay_valid():
+    rng = random.Random(7)
+    steps = [FRAMING_ON, FRAMING_OFF, EFFECTS_ON, EFFECTS_OFF, RFC, FFC]
+    steps += [PHOTO_MODE, VIDEO_MODE, PORTRAIT]
+    states = ["open_camera_agent"] + [
+        rng.choice(steps) for _ in range(MAX_EXACT_STEPS + 5)
+    ]
+    schedule = schedule_steps(_agents(states), states)
+    assert schedule["after_s"] <= schedule["before_s"]
+    assert _end_state(schedule["agent_states"]) == _end_state(states)
+
+
+def test_transition_cost_counts_context_changes():
+    assert transition_cost(["camera_mode_agent"], [PHOTO_MODE]) == 1.0
+    states = [FRAMING_ON, RFC, EFFECTS_ON]
+    # Camera, mode and panel for the first toggle, then the camera twice
+    assert transition_cost(_agents(states), states) == 8.0
+
+
+def test_mismatched_lengths_are_left_alone():
+    schedule = schedule_steps(["open_camera_agent", "take_photo_agent"], [PHOTO])
+    assert schedule["order"] == [0, 1]
+
+
+def test_reorder_can_be_disabled(monkeypatch):
+    states = ["open_camera_agent", PHOTO_MODE, FRAMING_ON, PHOTO]
+    monkeypatch.setenv("CAMERA_REORDER_STEPS", "0")
+    assert reorder_plan(_agents(states), states) == (_agents(states), states)
+    monkeypatch.delenv("CAMERA_REORDER_STEPS")
+    assert reorder_plan(_agents(states), states)[1] != states
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.regression.verifier import (
+    failed_checks,
+    format_checks,
+    validate_expected,
+    verify,
+)
+from src.tools import simulated
+
+CASES = Path(__file__).resolve().parents[1] / "cases" / "test_cases.json"
+
+
+def _cases():
+    with open(CASES, encoding="utf-8") as f:
+        return json.load(f)["testCases"]
+
+
+@pytest.mark.parametrize("case_id, case", sorted(_cases().items()))
+def test_case_expectations_use_known_keys(case_id, case):
+    validate_expected(case.get("expected", {}))
+
+
+def test_effect_toggles_pass_case_two():
+    simulated.reset_state()
+    simulated.open_camera()
+    before = simulated.take_snapshot()
+    for _ in range(5):
+        simulated.set_background_effects(desired_state=True)
+        simulated.set_background_effects(desired_state=False)
+    checks = verify(_cases()["2"]["expected"], before, simulated.take_snapshot())
+    assert failed_checks(checks) == []
+
+
+def test_new_photos_are_counted_between_snapshots():
+    simulated.reset_state()
+    simulated.open_camera()
+    before = simulated.take_snapshot()
+    simulated.take_photo(num_photos=2)
+    checks = verify(
+        {"new_photos": 2, "new_videos": 0}, before, simulated.take_snapshot()
+    )
+    assert [c["actual"] for c in checks] == [2, 0]
+    assert failed_checks(checks) == []
+
+
+def test_counts_without_a_before_snapshot_fail():
+    checks = verify({"new_photos": 0}, None, {"photos": 3})
+    assert checks == [{"key": "new_photos", "expected": 0, "actual": None, "ok": False}]
+
+
+def test_unobservable_state_fails():
+    simulated.reset_state()
+    simulated.open_camera()
+    simulated.minimize_camera()
+    checks = verify(
+        {"camera": "FFC", "minimized": True}, None, simulated.take_snapshot()
+    )
+    assert [c["key"] for c in failed_checks(checks)] == ["camera"]
+    assert format_checks(checks) == "camera: expected 'FFC', got not observable"
+
+
+def test_wrong_state_is_reported():
+    checks = verify({"camera": "FFC"}, None, {"camera": "RFC"})
+    assert format_checks(checks) == "camera: expected 'FFC', got 'RFC'"
+
+
+def test_unknown_keys_are_rejected():
+    with pytest.raises(ValueError, match="blur"):
+        verify({"blur": "portrait"}, None, {})
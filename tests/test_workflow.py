@@ -0,0 +1,203 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import agent_utils
+from src.utils.agent_utils import a_iter_workflow, iter_workflow
+from src.utils.cancellation import CancellationToken, Cancelled
+
+SEQUENCE = ["open_camera_agent", "take_photo_agent"]
+STATES = ["open_camera_agent", "take_photo_agent(num_photos=1)"]
+AGENT_MAP = {name: name for name in SEQUENCE}
+
+
+class FakeProxy:
+    """Stands in for the user proxy; each chat's summary names its agent."""
+
+    def __init__(self, fail_on=None, raise_on=None):
+        self.fail_on = fail_on
+        self.raise_on = raise_on
+        self.chats = []
+
+    def initiate_chat(self, recipient, message, carryover, **kwargs):
+        self.chats.append((recipient, carryover))
+        if (recipient, len(self.chats)) == self.raise_on:
+            raise Cancelled("Stopped by user")
+        if (recipient, len(self.chats)) == self.fail_on:
+            raise RuntimeError("tool failed")
+        return SimpleNamespace(summary=f"ran {recipient}")
+
+    async def a_initiate_chat(self, recipient, message, carryover, **kwargs):
+        return self.initiate_chat(recipient, message, carryover)
+
+
+@pytest.fixture(autouse=True)
+def _no_reflection(monkeypatch):
+    monkeypatch.setattr(
+        agent_utils,
+        "reflection_summary",
+        lambda sender, recipient, args: f"ran {recipient}",
+    )
+
+
+def _run(proxy, asynchronous, **kwargs):
+    kwargs = {
+        "query": "take a photo",
+        "iterations": 2,
+        "agent_sequence": SEQUENCE,
+        "agent_states": STATES,
+        "agent_map": AGENT_MAP,
+        "user_proxy_agent": proxy,
+        **kwargs,
+    }
+    if not asynchronous:
+        return list(iter_workflow(**kwargs))
+
+    async def collect():
+        return [event async for event in a_iter_workflow(**kwargs)]
+
+    return asyncio.run(collect())
+
+
+def _shape(events):
+    return [
+        (e["event"], e.get("iteration"), e.get("step"), e.get("summary"))
+        for e in events
+    ]
+
+
+def test_sync_and_async_paths_yield_the_same_events():
+    sync_proxy, async_proxy = FakeProxy(), FakeProxy()
+    events = _run(sync_proxy, asynchronous=False)
+    assert _shape(events) == _shape(_run(async_proxy, asynchronous=True))
+    assert [e["event"] for e in events] == ["step_start", "step_end"] * 4
+    assert sync_proxy.chats == async_proxy.chats
+    # Each iteration carries over the summaries of its own earlier steps
+    assert [carryover for _, carryover in sync_proxy.chats] == [
+        [],
+        ["ran open_camera_agent"],
+    ] * 2
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_failed_iteration_is_reported_and_the_next_one_runs(asynchronous):
+    proxy = FakeProxy(fail_on=("take_photo_agent", 2))
+    events = _run(proxy, asynchronous)
+    assert ("error", 1, None, None) in _shape(events)
+    assert _shape(events)[-1] == ("step_end", 2, 2, "ran take_photo_agent")
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_cancelled_chat_ends_the_workflow(asynchronous):
+    proxy = FakeProxy(raise_on=("take_photo_agent", 2))
+    events = _run(proxy, asynchronous)
+    assert events[-1]["event"] == "cancelled"
+    assert events[-1]["iteration"] == 1
+    assert not events[-1]["deadline"]
+    assert len(proxy.chats) == 2
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_cancelled_token_stops_before_the_next_step(asynchronous):
+    token = CancellationToken()
+    token.cancel("Stopped by user")
+    proxy = FakeProxy()
+    events = _run(proxy, asynchronous, token=token)
+    assert _shape(events) == [("cancelled", 1, None, None)]
+    assert proxy.chats == []
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_resume_skips_the_steps_already_run(asynchronous):
+    proxy = FakeProxy()
+    events = _run(
+        proxy,
+        asynchronous,
+        start_iteration=2,
+        start_step=1,
+        carryover=["ran open_camera_agent"],
+    )
+    assert _shape(events) == [
+        ("step_start", 2, 2, None),
+        ("step_end", 2, 2, "ran take_photo_agent"),
+    ]
+    assert proxy.chats == [("take_photo_agent", ["ran open_camera_agent"])]
+
+
+def test_sync_and_async_chats_render_the_same_history(monkeypatch):
+    monkeypatch.setenv("CAMERA_LOCAL_ROUTING", "0")
+    interpretation = ("TASK", 2, "take a photo")
+    plan = (SEQUENCE, STATES)
+
+    async def a_interpret(message, agent):
+        return interpretation
+
+    async def a_determine(query, agent, agent_map):
+        return plan
+
+    monkeypatch.setattr(agent_utils, "interpret_query", lambda m, a: interpretation)
+    monkeypatch.setattr(agent_utils, "a_interpret_query", a_interpret)
+    monkeypatch.setattr(agent_utils, "determine_agents", lambda q, a, m: plan)
+    monkeypatch.setattr(agent_utils, "a_determine_agents", a_determine)
+    args = ("take two photos", [], None, None, AGENT_MAP, FakeProxy(), None)
+
+    sync_history = list(agent_utils._process_message(*args))[-1]
+
+    async def collect():
+        updates = [h async for h in agent_utils._a_process_message(*args)]
+        return updates[-1]
+
+    args = ("take two photos", [], None, None, AGENT_MAP, FakeProxy(), None)
+    assert asyncio.run(collect()) == sync_history
+    contents = [message["content"] for message in sync_history]
+    assert contents[-1] == "Task executed successfully!"
+    assert "[2/2] ✓ Step 2/2: take_photo_agent" in contents[-2]
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_queued_chat_passes_its_deadline_to_the_worker(
+    monkeypatch, tmp_path, asynchronous
+):
+    from src.jobs.job_queue import JobQueue, JobWorker
+    from src.utils.cancellation import current_token
+
+    monkeypatch.setenv("CAMERA_LOCAL_ROUTING", "0")
+    monkeypatch.setenv("CAMERA_WORKFLOW_DEADLINE_S", "30")
+    plan = (SEQUENCE, STATES)
+
+    async def a_interpret(message, agent):
+        return ("TASK", 1, "take a photo")
+
+    async def a_determine(query, agent, agent_map):
+        return plan
+
+    monkeypatch.setattr(
+        agent_utils, "interpret_query", lambda m, a: ("TASK", 1, "take a photo")
+    )
+    monkeypatch.setattr(agent_utils, "a_interpret_query", a_interpret)
+    monkeypatch.setattr(agent_utils, "determine_agents", lambda q, a, m: plan)
+    monkeypatch.setattr(agent_utils, "a_determine_agents", a_determine)
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(agent_utils, "get_job_queue", lambda: queue)
+    deadlines = []
+
+    def handler(payload, report):
+        deadlines.append((payload.get("deadline_s"), current_token().deadline_s))
+        return {}
+
+    worker = JobWorker(queue, handler, poll_interval=0.05).start()
+    args = ("take a photo", [], None, None, AGENT_MAP, FakeProxy(), None)
+    try:
+        if asynchronous:
+
+            async def collect():
+                return [h async for h in agent_utils._a_process_message(*args)]
+
+            history = asyncio.run(collect())[-1]
+        else:
+            history = list(agent_utils._process_message(*args))[-1]
+    finally:
+        worker.stop(timeout=5)
+    assert history[-1]["content"] == "Task executed successfully!"
+    assert deadlines == [(30.0, 30.0)]
@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.agent_utils import iter_checkpointed_workflow
+from src.utils.cancellation import Cancelled
+from src.utils.workflow_journal import (
+    INTERRUPTED,
+    RUNNING,
+    SUCCEEDED,
+    WorkflowJournal,
+    state_mismatches,
+)
+
+PLAN = {
+    "query": "toggle effects",
+    "iterations": 2,
+    "agent_sequence": ["a_agent", "b_agent", "c_agent"],
+    "agent_states": ["a_agent", "b_agent", "c_agent"],
+}
+
+
+def _step(iteration, step, state=None):
+    return (
+        {
+            "iteration": iteration,
+            "step": step,
+            "total": 3,
+            "agent": f"agent{step}",
+            "action": f"action{step}",
+            "elapsed": 0.1,
+            "summary": f"{iteration}.{step}",
+        },
+        state,
+    )
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return WorkflowJournal.create(PLAN, tmp_path)
+
+
+def test_new_journal_starts_at_the_top(journal):
+    assert journal.resume_point() == {
+        "iteration": 1,
+        "step": 0,
+        "carryover": [],
+        "state": None,
+    }
+
+
+def test_resume_continues_after_the_last_step(journal):
+    journal.record_step(*_step(1, 1))
+    journal.record_step(*_step(1, 2, {"camera": "FFC"}))
+    assert journal.resume_point() == {
+        "iteration": 1,
+        "step": 2,
+        "carryover": ["1.1", "1.2"],
+        "state": {"camera": "FFC"},
+    }
+
+
+def test_finished_iteration_resumes_at_the_next(journal):
+    for step in (1, 2, 3):
+        journal.record_step(*_step(1, step))
+    point = journal.resume_point()
+    assert (point["iteration"], point["step"], point["carryover"]) == (2, 0, [])
+
+
+def test_failed_iteration_is_skipped_like_iter_workflow_does(journal):
+    journal.record_step(*_step(1, 1, {"camera": "RFC"}))
+    journal.record_error(1, "tool failed")
+    assert journal.resume_point() == {
+        "iteration": 2,
+        "step": 0,
+        "carryover": [],
+        "state": {"camera": "RFC"},
+    }
+
+
+def test_restarted_iteration_drops_its_carryover(journal):
+    journal.record_step(*_step(1, 1))
+    journal.record_step(*_step(1, 2))
+    journal.finish(INTERRUPTED)
+    journal.record_resume(
+        {"iteration": 1, "step": 0}, False, {"camera": ["FFC", "RFC"]}
+    )
+    assert journal.status == RUNNING
+    point = journal.resume_point()
+    assert (point["iteration"], point["step"], point["carryover"]) == (1, 0, [])
+    journal.record_step(*_step(1, 1))
+    assert journal.resume_point()["carryover"] == ["1.1"]
+
+
+def test_torn_tail_is_dropped_and_truncated(journal, tmp_path):
+    journal.record_step(*_step(1, 1))
+    with open(journal.path, "ab") as f:
+        f.write(b'{"type": "step", "iteration": 1, "st')
+
+    reopened = WorkflowJournal.open(journal.run_id, tmp_path)
+    assert [r["type"] for r in reopened.records] == ["start", "step"]
+    assert reopened.resume_point()["step"] == 1
+    reopened.record_step(*_step(1, 2))
+    again = WorkflowJournal.open(journal.run_id, tmp_path)
+    assert again.resume_point()["carryover"] == ["1.1", "1.2"]
+
+
+def test_garbled_line_ends_the_intact_records(journal, tmp_path):
+    journal.record_step(*_step(1, 1))
+    with open(journal.path, "ab") as f:
+        f.write(b"\x00\x00garbage\n")
+        f.write(b'{"type": "step", "iteration": 1, "step": 2}\n')
+    reopened = WorkflowJournal.open(journal.run_id, tmp_path)
+    assert len(reopened.records) == 2
+
+
+def test_open_rejects_files_that_are_not_journals(tmp_path):
+    (tmp_path / "other.jsonl").write_text('{"type": "step"}\n')
+    with pytest.raises(ValueError):
+        WorkflowJournal.open("other", tmp_path)
+    with pytest.raises(FileNotFoundError):
+        WorkflowJournal.open("missing", tmp_path)
+
+
+def test_state_mismatches_ignore_media_counts():
+    assert state_mismatches(
+        {"camera": "FFC", "mode": "video", "photos": 1},
+        {"camera": "RFC", "mode": "video", "photos": 4},
+    ) == {"camera": ["FFC", "RFC"]}
+
+
+class InterruptingProxy:
+    """User proxy whose chat number interrupt_at is cut short."""
+
+    def __init__(self, interrupt_at=None):
+        self.interrupt_at = interrupt_at
+        self.chats = []
+
+    def initiate_chat(self, recipient, message, carryover, **kwargs):
+        self.chats.append((recipient, carryover))
+        if len(self.chats) == self.interrupt_at:
+            raise Cancelled("Stopped by user")
+        return SimpleNamespace(summary=f"ran {recipient}")
+
+
+def test_interrupted_run_resumes_at_the_interrupted_step(journal, tmp_path):
+    agent_map = {name: name for name in PLAN["agent_sequence"]}
+
+    first = InterruptingProxy(interrupt_at=5)
+    events = list(iter_checkpointed_workflow(journal, agent_map, first))
+    assert events[-1]["event"] == "cancelled"
+    assert journal.status == INTERRUPTED
+
+    second = InterruptingProxy()
+    reopened = WorkflowJournal.open(journal.run_id, tmp_path)
+    events = list(iter_checkpointed_workflow(reopened, agent_map, second, resume=True))
+    assert events[0]["event"] == "resumed"
+    assert (events[0]["iteration"], events[0]["step"]) == (2, 1)
+    assert second.chats == [
+        ("b_agent", ["ran a_agent"]),
+        ("c_agent", ["ran a_agent", "ran b_agent"]),
+    ]
+    assert reopened.status == SUCCEEDED